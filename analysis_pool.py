@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+결과 분석 작업 풀 모듈
+- 무거운 분석(로그 읽기/파싱, ML 판정)을 크기가 정해진 스레드 풀에서 실행해 이벤트 루프를 막지 않음
+- 같은 키의 작업이 이미 실행/대기 중이면 새로 넣지 않고 그 결과를 함께 기다림 (요청 몰림 시 중복 계산 방지)
+- 대기열이 가득 차면 429, 대기/실행 시간이 제한을 넘으면 503을 Retry-After 추정값과 함께 알림
+- 단계별 소요 시간(queue/analyze/predict …)을 기록해 Server-Timing 헤더로 내보냄
+"""
+
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Tuple
+
+
+class PoolBusy(Exception):
+    """작업을 받을 수 없거나 제한 시간 안에 끝내지 못함"""
+
+    def __init__(self, status_code: int, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code  # 429(대기열 가득) / 503(대기·실행 시간 초과)
+        self.retry_after = retry_after  # 다시 시도할 때까지 기다릴 시간 (초)
+        self.reason = reason
+
+
+class StageTimer:
+    """단계별 소요 시간 기록기 (ms)"""
+
+    def __init__(self):
+        self._stages: List[Tuple[str, float]] = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            self._stages.append((name, max(0.0, seconds) * 1000.0))
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """with 블록 실행 시간을 name 단계로 기록"""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def extend(self, other: "StageTimer"):
+        for name, ms in other.stages():
+            self.add(name, ms / 1000.0)
+
+    def stages(self) -> List[Tuple[str, float]]:
+        with self._lock:
+            return list(self._stages)
+
+    def as_dict(self) -> Dict[str, float]:
+        return {name: round(ms, 3) for name, ms in self.stages()}
+
+    def server_timing(self) -> str:
+        """Server-Timing 헤더 값 (예: "queue;dur=0.4, analyze;dur=12.8")"""
+        return ", ".join(f"{name};dur={ms:.1f}" for name, ms in self.stages())
+
+
+class _Job:
+    __slots__ = ("key", "future", "timer", "submitted", "started")
+
+    def __init__(self, key: Hashable, future: asyncio.Future):
+        self.key = key
+        self.future = future
+        self.timer = StageTimer()
+        self.submitted = time.perf_counter()
+        self.started = False
+
+
+class AnalysisPool:
+    """
+    크기가 정해진 분석 스레드 풀 + 대기열 제한 + 같은 키 작업 합치기
+
+    - 실행 중/대기 중인 서로 다른 작업 수가 workers + queue_max 이상이면 PoolBusy(429)
+    - queue_timeout초 안에 시작하지 못한 작업은 취소하고 PoolBusy(503)
+    - 시작한 작업이 job_timeout초 안에 끝나지 않으면 기다리던 요청은 PoolBusy(503)을 받고,
+      작업은 스레드에서 끝까지 실행됨 (그동안 같은 키 요청은 새 작업 없이 그 결과를 기다림)
+    - run()은 이벤트 루프 하나에서만 호출해야 함 (상태는 루프 스레드에서만 바뀜)
+    """
+
+    def __init__(self, workers: int = 4, queue_max: int = 16, queue_timeout: float = 5.0,
+                 job_timeout: float = 20.0, name: str = "analysis"):
+        """
+        Args:
+            workers: 분석 스레드 수
+            queue_max: 스레드를 기다릴 수 있는 작업 수 (넘으면 429)
+            queue_timeout: 작업이 스레드를 기다리는 최대 시간 (초, 넘으면 503)
+            job_timeout: 요청이 결과를 기다리는 최대 시간 (초, 넘으면 503)
+            name: 스레드 이름 접두사
+        """
+        self.workers = max(1, int(workers))
+        self.queue_max = max(0, int(queue_max))
+        self.queue_timeout = float(queue_timeout)
+        self.job_timeout = float(job_timeout)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=name)
+        self._inflight: Dict[Hashable, _Job] = {}
+        self._pending = 0
+        self._running = 0
+        self._avg_job = 0.05  # 작업 1개 평균 실행 시간 (초, 지수 이동 평균)
+        self._work_lock = threading.Lock()  # 스레드에서 바꾸는 _running/_avg_job 보호
+        self._counters = {"submitted": 0, "coalesced": 0, "completed": 0, "failed": 0,
+                          "rejected_429": 0, "rejected_503": 0}
+
+    def retry_after(self) -> int:
+        """지금 대기열이 빌 때까지 걸릴 것으로 보이는 시간 (초, 1~60)"""
+        backlog = (self._pending + 1) / self.workers
+        return max(1, min(60, int(math.ceil(backlog * self._avg_job))))
+
+    async def run(self, key: Hashable, fn: Callable[..., Any], *args) -> Tuple[Any, StageTimer]:
+        """
+        fn(timer, *args)를 풀에서 실행하고 결과를 기다림
+
+        Args:
+            key: 작업 키 (같은 키의 작업이 진행 중이면 그 결과를 함께 사용)
+            fn: 스레드에서 실행할 함수 (첫 인자로 StageTimer를 받아 단계 시간 기록)
+
+        Returns:
+            (fn 결과, 작업의 StageTimer)
+
+        Raises:
+            PoolBusy: 대기열이 가득 찼거나(429) 제한 시간을 넘음(503)
+        """
+        job = self._inflight.get(key)
+        if job is None:
+            if self._pending >= self.workers + self.queue_max:
+                self._counters["rejected_429"] += 1
+                raise PoolBusy(429, self.retry_after(), "queue_full")
+            job = self._submit(key, fn, args)
+        else:
+            self._counters["coalesced"] += 1
+
+        try:
+            result = await asyncio.wait_for(asyncio.shield(job.future), self.queue_timeout + self.job_timeout)
+        except asyncio.TimeoutError:
+            self._counters["rejected_503"] += 1
+            raise PoolBusy(503, self.retry_after(), "timeout") from None
+        except PoolBusy:
+            self._counters["rejected_503"] += 1
+            raise
+        return result, job.timer
+
+    def _submit(self, key: Hashable, fn: Callable[..., Any], args: tuple) -> _Job:
+        loop = asyncio.get_running_loop()
+        job = _Job(key, loop.create_future())
+        # 기다리던 요청이 모두 시간 초과로 떠나도 "처리되지 않은 예외" 경고가 나지 않게 함
+        job.future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = job
+        self._pending += 1
+        self._counters["submitted"] += 1
+
+        cf = self._executor.submit(self._work, job, fn, args)
+        expire = loop.call_later(self.queue_timeout, self._expire, job, cf)
+        cf.add_done_callback(lambda f: loop.call_soon_threadsafe(self._finish, job, f, expire))
+        return job
+
+    def _work(self, job: _Job, fn: Callable[..., Any], args: tuple) -> Any:
+        """스레드에서 실행"""
+        t0 = time.perf_counter()
+        job.started = True
+        job.timer.add("queue", t0 - job.submitted)
+        with self._work_lock:
+            self._running += 1
+        try:
+            return fn(job.timer, *args)
+        finally:
+            elapsed = time.perf_counter() - t0
+            with self._work_lock:
+                self._running -= 1
+                self._avg_job = self._avg_job * 0.8 + elapsed * 0.2
+
+    def _expire(self, job: _Job, cf: Future):
+        """queue_timeout 안에 시작하지 못한 작업 취소 (이미 실행 중이면 그대로 둠)"""
+        if not job.started:
+            cf.cancel()
+
+    def _finish(self, job: _Job, cf: Future, expire: asyncio.TimerHandle):
+        """작업 종료 처리 (루프 스레드)"""
+        expire.cancel()
+        self._pending -= 1
+        if self._inflight.get(job.key) is job:
+            del self._inflight[job.key]
+        if job.future.done():
+            return
+        if cf.cancelled():
+            job.future.set_exception(PoolBusy(503, self.retry_after(), "queue_timeout"))
+        elif cf.exception() is not None:
+            self._counters["failed"] += 1
+            job.future.set_exception(cf.exception())
+        else:
+            self._counters["completed"] += 1
+            job.future.set_result(cf.result())
+
+    def stats(self) -> Dict[str, Any]:
+        """풀 상태/누적 카운터"""
+        return {
+            "workers": self.workers,
+            "queue_max": self.queue_max,
+            "pending": self._pending,
+            "running": self._running,
+            "avg_job_ms": round(self._avg_job * 1000.0, 3),
+            **self._counters,
+        }
+
+    def close(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -1,29 +1,218 @@
 # -*- coding: utf-8 -*-
 """
 앱 사용 데이터 분석 모듈
-- activity_log.json에서 데이터 읽기
+- activity_log.json에서 데이터 읽기 (JSON Lines / 기존 JSON 배열 형식 / 바이너리 로그)
 - 앱별 사용 시간 및 비율 계산
 - 학습 앱 사용률(signal 0 비율) 계산
+- 증분 모드: 파일 오프셋과 누적 합계를 유지하고 새로 추가된 이벤트만 파싱
+  (바이너리 로그는 이벤트 dict를 만들지 않고 레코드 헤더의 시각/앱/signal만 읽음)
+- 로그는 메모리 매핑해 줄/레코드 하나씩 처리하므로 메모리 사용량은 파일 크기가 아니라 집계 상태 크기를 따름
+- analyze(): 앱 사용 통계/학습 앱 사용률/총 시간/신호별 시간을 한 번의 정렬·순회로 계산
+- SegmentedAppAnalyzer: 여러 세그먼트 파일로 나뉜 사용자별 로그를 같은 방식으로 증분 분석
+- CheckpointedAppAnalyzer: 모니터가 기록하며 저장한 집계 체크포인트에서 시작해 그 뒤에 추가된 로그만 읽음
 """
 
 import json
 import os
+import threading
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from collections import defaultdict
 
+from binary_log import BINARY_MAGIC, BinaryLogReader, is_binary_log
+from event_fields import TIME_FORMAT, event_app_name, parse_event_time
+from event_log import JsonLinesReader, is_legacy_json_array, read_events
+from mapped_file import Buffer, mapped_file
+
+CHECKPOINT_VERSION = 2  # 2: prev_time은 마지막으로 시각이 바뀐 이벤트 기준 (1로 저장된 체크포인트는 버리고 재집계)
+
+
+@dataclass
+class UsageAnalysis:
+    """analyze() 결과"""
+    app_usages: List[Dict[str, float]] = field(default_factory=list)  # 앱별 사용 시간/비율
+    learning_rate: float = 0.0  # signal 0 비율 (0.0 ~ 100.0)
+    total_span_seconds: float = 0.0  # 첫 이벤트 ~ 마지막 이벤트 (초)
+    signal_seconds: Dict[int, float] = field(default_factory=dict)  # signal별 사용 시간 (초)
+    event_count: int = 0  # 시간 정보가 있는 이벤트 수
+
+
+class _UsageAccumulator:
+    """
+    시간순으로 들어오는 이벤트의 앱별/신호별 사용 시간 누적기
+
+    인접한 두 이벤트의 시간 차이를 앞 이벤트의 앱과 signal에 더함.
+    마지막 이벤트는 직전 이벤트와의 간격만큼 한 번 더 반영(기존 계산 방식 유지)하며,
+    이 부분은 다음 이벤트가 들어오면 바뀌므로 조회 시점에 계산함.
+    같은 시각에 이어진 이벤트(LLM 판정 보정 기록 등)는 앞 이벤트를 대신하는 것으로 보고,
+    마지막 이벤트의 간격은 시각이 바뀐 마지막 간격으로 계산함.
+    """
+
+    def __init__(self):
+        self.app_seconds: Dict[str, float] = defaultdict(float)
+        self.app_total_seconds = 0.0
+        self.signal_seconds: Dict[int, float] = defaultdict(float)
+        self.total_seconds = 0.0
+        self.count = 0
+        self.first_time: Optional[float] = None
+        self.last_time: Optional[float] = None
+        self.prev_time: Optional[float] = None
+        self.last_app = ""
+        self.last_signal = 1
+
+    def add(self, time_sec: float, app_name: str, signal):
+        """이벤트 하나 반영 (time_sec는 직전 이벤트 이상이어야 함)"""
+        if self.count:
+            time_diff = time_sec - self.last_time
+            if time_diff > 0:
+                if self.last_app:
+                    self.app_seconds[self.last_app] += time_diff
+                    self.app_total_seconds += time_diff
+                self.signal_seconds[self.last_signal] += time_diff
+                self.total_seconds += time_diff
+                self.prev_time = self.last_time
+        else:
+            self.first_time = time_sec
+            self.prev_time = time_sec
+        self.last_time = time_sec
+        self.last_app = app_name
+        self.last_signal = signal
+        self.count += 1
+
+    def _tail_seconds(self) -> float:
+        """마지막 이벤트와 직전 이벤트의 간격 (같은 시각 이벤트는 건너뜀)"""
+        if self.count < 2:
+            return 0.0
+        return self.last_time - self.prev_time
+
+    def app_usages(self) -> List[Dict[str, float]]:
+        """앱별 사용 시간 및 비율 (비율 내림차순)"""
+        if self.count < 2:
+            return []
+
+        app_time_dict = dict(self.app_seconds)
+        total_time_seconds = self.app_total_seconds
+        tail = self._tail_seconds()
+        if self.last_app and tail > 0:
+            app_time_dict[self.last_app] = app_time_dict.get(self.last_app, 0.0) + tail
+            total_time_seconds += tail
+
+        if total_time_seconds == 0:
+            return []
+
+        app_usages = []
+        for app_name, usage_time in app_time_dict.items():
+            percentage = (usage_time / total_time_seconds) * 100.0
+            app_usages.append({
+                "appName": app_name,
+                "usageTime": int(usage_time),
+                "percentage": round(percentage, 2)
+            })
+        app_usages.sort(key=lambda x: x["percentage"], reverse=True)
+        return app_usages
+
+    def learning_rate(self) -> float:
+        """signal 0 비율 (0.0 ~ 100.0)"""
+        if self.count < 2:
+            return 0.0
+
+        learning_time_seconds = self.signal_seconds.get(0, 0.0)
+        total_time_seconds = self.total_seconds
+        tail = self._tail_seconds()
+        if tail > 0:
+            if self.last_signal == 0:
+                learning_time_seconds += tail
+            total_time_seconds += tail
+
+        if total_time_seconds == 0:
+            return 0.0
+        return round((learning_time_seconds / total_time_seconds) * 100.0, 2)
+
+    def span_seconds(self) -> float:
+        """첫 이벤트와 마지막 이벤트의 시간 차이"""
+        if self.count < 2:
+            return 0.0
+        return max(0.0, self.last_time - self.first_time)
+
+    def signal_totals(self) -> Dict[int, float]:
+        """signal별 사용 시간 (마지막 이벤트 보정 포함)"""
+        if self.count < 2:
+            return {}
+        totals = dict(self.signal_seconds)
+        tail = self._tail_seconds()
+        if tail > 0:
+            totals[self.last_signal] = totals.get(self.last_signal, 0.0) + tail
+        return totals
+
+    def to_analysis(self) -> UsageAnalysis:
+        return UsageAnalysis(
+            app_usages=self.app_usages(),
+            learning_rate=self.learning_rate(),
+            total_span_seconds=self.span_seconds(),
+            signal_seconds=self.signal_totals(),
+            event_count=self.count,
+        )
+
+    def to_state(self) -> Dict:
+        """체크포인트 파일에 저장할 누적 상태 (JSON으로 직렬화 가능)"""
+        return {
+            "app_seconds": dict(self.app_seconds),
+            "app_total_seconds": self.app_total_seconds,
+            # signal은 숫자 외 값도 올 수 있어 키로 쓰지 않고 [signal, 초] 쌍으로 저장
+            "signal_seconds": [[signal, seconds] for signal, seconds in self.signal_seconds.items()],
+            "total_seconds": self.total_seconds,
+            "count": self.count,
+            "first_time": self.first_time,
+            "last_time": self.last_time,
+            "prev_time": self.prev_time,
+            "last_app": self.last_app,
+            "last_signal": self.last_signal,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "_UsageAccumulator":
+        """to_state() 결과로 누적기 복원 (형식이 다르면 KeyError/TypeError/ValueError)"""
+        acc = cls()
+        acc.app_seconds.update({str(k): float(v) for k, v in state["app_seconds"].items()})
+        acc.app_total_seconds = float(state["app_total_seconds"])
+        acc.signal_seconds.update({signal: float(seconds) for signal, seconds in state["signal_seconds"]})
+        acc.total_seconds = float(state["total_seconds"])
+        acc.count = int(state["count"])
+        acc.first_time = state["first_time"]
+        acc.last_time = state["last_time"]
+        acc.prev_time = state["prev_time"]
+        acc.last_app = state["last_app"]
+        acc.last_signal = state["last_signal"]
+        return acc
+
 
 class AppAnalyzer:
     """앱 사용 데이터 분석기"""
 
-    def __init__(self, json_file: str = "activity_log.json"):
+    def __init__(self, json_file: str = "activity_log.json", incremental: bool = False):
         """
         Args:
             json_file: 이벤트 로그 JSON 파일 경로
+            incremental: True면 파일을 처음부터 다시 읽지 않고 새로 추가된 줄만 파싱
+                (JSON Lines 로그에서만 동작, 기존 JSON 배열 파일은 매번 전체 파싱)
         """
         self.json_file = json_file
+        self.incremental = incremental
         self.events: List[Dict] = []
-        self._load_events()
+        # 여러 스레드(API 서버 작업 풀)에서 호출해도 파일 읽기/누적 상태 갱신이 겹치지 않게 함
+        self._lock = threading.RLock()
+
+        # 증분 모드 상태
+        self._acc = _UsageAccumulator()
+        self._file_id: Optional[tuple] = None
+        self._offset = 0
+        self._binary: Optional[BinaryLogReader] = None  # 바이너리 로그의 문자열 표/읽은 위치
+
+        if incremental:
+            self._refresh_incremental()
+        else:
+            self._load_events()
 
     def _load_events(self):
         """이벤트 로그 파일 로드"""
@@ -33,17 +222,10 @@ class AppAnalyzer:
             return
 
         try:
-            with open(self.json_file, "r", encoding="utf-8") as f:
-                data = f.read().strip()
-                if not data:
-                    self.events = []
-                    return
-
-                # JSON 배열 형태로 파싱
-                self.events = json.loads(data)
-                if not isinstance(self.events, list):
-                    self.events = [self.events] if self.events else []
-
+            # 다시 읽을 때 이전 이벤트 리스트와 새 리스트를 함께 들고 있지 않도록 먼저 버림
+            self.events = []
+            # JSON Lines / 기존 JSON 배열 / 바이너리 로그 (JSON Lines와 바이너리는 파일 전체 문자열 없이 매핑해서 읽음)
+            self.events = read_events(self.json_file)
             print(f"[INFO] {len(self.events)}개의 이벤트 로드 완료")
 
             # 이벤트 형식 확인 (출력 형식 또는 저장 형식)
@@ -61,6 +243,25 @@ class AppAnalyzer:
             print(f"[ERROR] 파일 읽기 오류: {e}")
             self.events = []
 
+    def analyze(self) -> UsageAnalysis:
+        """
+        최신 로그를 한 번만 읽고 한 번의 정렬·순회로 전체 지표 계산
+
+        get_app_usage_statistics()와 get_learning_app_usage_rate()를 각각 호출하면
+        로그 로드와 정렬이 두 번 일어나므로, 여러 지표가 필요하면 이 메서드를 사용
+
+        Returns:
+            UsageAnalysis (오류 시 빈 결과)
+        """
+        try:
+            with self._lock:
+                return self._current_accumulator(reload=True).to_analysis()
+        except Exception as e:
+            print(f"[ERROR] 사용 데이터 분석 오류: {e}")
+            import traceback
+            traceback.print_exc()
+            return UsageAnalysis()
+
     def get_app_usage_statistics(self) -> List[Dict[str, float]]:
         """
         앱별 사용 시간 및 비율 계산
@@ -71,94 +272,9 @@ class AppAnalyzer:
                 ...
             ]
         """
-        # 최신 데이터 로드
-        self._load_events()
-
-        if not self.events or len(self.events) < 2:
-            return []
-
-        # 시간 파싱 및 정렬
         try:
-            events_with_time = []
-            for event in self.events:
-                if "time" not in event:
-                    continue
-
-                try:
-                    time_obj = datetime.strptime(event["time"], "%Y-%m-%d %H:%M:%S")
-                    events_with_time.append((time_obj, event))
-                except Exception:
-                    continue
-
-            if len(events_with_time) < 2:
-                return []
-
-            # 시간순 정렬
-            events_with_time.sort(key=lambda x: x[0])
-
-            # 앱별 사용 시간 집계 (초 단위)
-            app_time_dict = defaultdict(float)
-            total_time_seconds = 0.0
-
-            for i in range(len(events_with_time) - 1):
-                time1, event1 = events_with_time[i]
-                time2, event2 = events_with_time[i + 1]
-
-                # 시간 차이 계산 (초)
-                time_diff = (time2 - time1).total_seconds()
-                if time_diff <= 0:
-                    continue
-
-                # 해당 이벤트의 앱 이름 추출
-                # 출력 형식: {"time": "...", "app": "...", "signal": 1, "message": "..."}
-                # 저장 형식: {"time": "...", "snapshot": {...}, "signal": 1, "message": "..."}
-                if "app" in event1:
-                    # 직접 app 필드가 있는 경우 (출력 형식)
-                    app_name = event1.get("app", "")
-                else:
-                    # snapshot에서 추출하는 경우 (저장 형식)
-                    snapshot = event1.get("snapshot", {})
-                    app_name = self._extract_app_name(snapshot)
-
-                if app_name:
-                    app_time_dict[app_name] += time_diff
-                    total_time_seconds += time_diff
-
-            # 마지막 이벤트도 처리 (마지막으로부터 이전 이벤트까지의 시간)
-            if len(events_with_time) >= 2:
-                time_last, event_last = events_with_time[-1]
-                time_prev, event_prev = events_with_time[-2]
-                time_diff = (time_last - time_prev).total_seconds()
-
-                # 마지막 이벤트의 앱 이름 추출
-                if "app" in event_last:
-                    app_name = event_last.get("app", "")
-                else:
-                    snapshot = event_last.get("snapshot", {})
-                    app_name = self._extract_app_name(snapshot)
-
-                if app_name and time_diff > 0:
-                    app_time_dict[app_name] += time_diff
-                    total_time_seconds += time_diff
-
-            if total_time_seconds == 0:
-                return []
-
-            # 비율 계산 및 정렬
-            app_usages = []
-            for app_name, usage_time in app_time_dict.items():
-                percentage = (usage_time / total_time_seconds) * 100.0
-                app_usages.append({
-                    "appName": app_name,
-                    "usageTime": int(usage_time),
-                    "percentage": round(percentage, 2)
-                })
-
-            # 비율 내림차순 정렬
-            app_usages.sort(key=lambda x: x["percentage"], reverse=True)
-
-            return app_usages
-
+            with self._lock:
+                return self._current_accumulator(reload=True).app_usages()
         except Exception as e:
             print(f"[ERROR] 앱 사용 통계 계산 오류: {e}")
             import traceback
@@ -172,148 +288,452 @@ class AppAnalyzer:
         Returns:
             학습 앱 사용률 (0.0 ~ 100.0)
         """
-        # 최신 데이터 로드
-        self._load_events()
+        try:
+            with self._lock:
+                return self._current_accumulator(reload=True).learning_rate()
+        except Exception as e:
+            print(f"[ERROR] 학습 앱 사용률 계산 오류: {e}")
+            import traceback
+            traceback.print_exc()
+            return 0.0
 
-        if not self.events or len(self.events) < 2:
+    def get_total_study_time_seconds(self) -> float:
+        """
+        총 학습 시간 계산 (초 단위)
+
+        Returns:
+            총 학습 시간 (초)
+        """
+        try:
+            with self._lock:
+                return self._current_accumulator(reload=False).span_seconds()
+        except Exception as e:
+            print(f"[ERROR] 총 학습 시간 계산 오류: {e}")
             return 0.0
 
+    def _current_accumulator(self, reload: bool) -> _UsageAccumulator:
+        """
+        현재 로그 기준 누적 결과 반환
+
+        Args:
+            reload: True면 최신 데이터 반영 (전체 모드는 파일 재로드, 증분 모드는 새 줄만 파싱)
+        """
+        if self.incremental:
+            if reload:
+                self._refresh_incremental()
+            return self._acc
+
+        if reload:
+            self._load_events()
+        return self._accumulate(self.events)
+
+    def _accumulate(self, events: List[Dict]) -> _UsageAccumulator:
+        """이벤트 리스트를 시간순 정렬 후 누적기로 집계"""
+        events_with_time = []
+        for event in events:
+            self._observe_event(event)
+            time_sec = parse_event_time(event)
+            if time_sec is not None:
+                events_with_time.append((time_sec, event))
+
+        # 시간순 정렬 (같은 시간은 기록 순서 유지)
+        events_with_time.sort(key=lambda x: x[0])
+
+        acc = _UsageAccumulator()
+        for time_sec, event in events_with_time:
+            acc.add(time_sec, self._event_app_name(event), event.get("signal", 1))
+        return acc
+
+    def _observe_event(self, event: Dict):
+        """로그에서 읽은 이벤트마다 호출 (하위 클래스에서 집계 외 정보를 모을 때 사용)"""
+
+    def _event_app_name(self, event: Dict) -> str:
+        """이벤트의 앱 이름 추출 (event_app_name 참고)"""
+        return event_app_name(event)
+
+    def _accumulate_items(self, make_items: Callable[[], Iterable[Tuple[float, str, object]]]) -> _UsageAccumulator:
+        """
+        (시각, 앱 이름, signal)을 기록 순서대로 받아 바로 누적기에 반영
+
+        시간 역순 항목이 나오면 make_items()로 처음부터 다시 받아 정렬 후 집계
+        (이 경우에만 항목 목록을 메모리에 둠, 같은 시간은 기록 순서 유지)
+        """
+        acc = _UsageAccumulator()
+        for time_sec, app_name, signal in make_items():
+            if acc.count and time_sec < acc.last_time:
+                break
+            acc.add(time_sec, app_name, signal)
+        else:
+            return acc
+
+        acc = _UsageAccumulator()
+        for time_sec, app_name, signal in sorted(make_items(), key=lambda x: x[0]):
+            acc.add(time_sec, app_name, signal)
+        return acc
+
+    def _line_items(self, buf: Buffer, reader: JsonLinesReader) -> Iterator[Tuple[float, str, object]]:
+        """JSON Lines 이벤트를 하나씩 (시각, 앱 이름, signal)로 (시각이 없는 이벤트 제외)"""
+        for event in reader.iter_events(buf):
+            self._observe_event(event)
+            time_sec = parse_event_time(event)
+            if time_sec is not None:
+                yield time_sec, self._event_app_name(event), event.get("signal", 1)
+
+    def _refresh_incremental(self):
+        """
+        증분 모드: 마지막으로 읽은 오프셋 이후에 추가된 줄만 파싱해 누적 합계 갱신
+
+        파일이 교체(inode 변경)되었거나 줄어들었으면, 또는 시간 역순 이벤트가 들어오면
+        처음부터 다시 집계함
+        """
         try:
-            events_with_time = []
-            for event in self.events:
-                if "time" not in event:
-                    continue
+            st = os.stat(self.json_file)
+        except FileNotFoundError:
+            if self._file_id is not None:
+                print(f"[WARN] {self.json_file} 파일이 없습니다.")
+            self._reset_incremental()
+            return
+        except OSError as e:
+            print(f"[ERROR] 파일 읽기 오류: {e}")
+            return
 
-                try:
-                    time_obj = datetime.strptime(event["time"], "%Y-%m-%d %H:%M:%S")
-                    events_with_time.append((time_obj, event))
-                except Exception:
-                    continue
+        file_id = (st.st_dev, st.st_ino)
+        if file_id != self._file_id or st.st_size < self._offset:
+            self._reset_incremental()
+            self._file_id = file_id
+        if st.st_size == self._offset:
+            return
 
-            if len(events_with_time) < 2:
-                return 0.0
+        if is_binary_log(self.json_file):
+            self._refresh_binary()
+            return
 
-            events_with_time.sort(key=lambda x: x[0])
+        if is_legacy_json_array(self.json_file):
+            # 배열 형식은 끝부분만 잘라 읽을 수 없으므로 전체 재집계
+            self._load_events()
+            self._acc = self._accumulate(self.events)
+            self.events = []
+            self._offset = st.st_size
+            return
 
-            total_time_seconds = 0.0
-            learning_time_seconds = 0.0
+        try:
+            with mapped_file(self.json_file) as buf:
+                consumed = self._consume(buf, self._offset)
+        except OSError as e:
+            print(f"[ERROR] 파일 읽기 오류: {e}")
+            return
 
-            for i in range(len(events_with_time) - 1):
-                time1, event1 = events_with_time[i]
-                time2, event2 = events_with_time[i + 1]
+        if consumed is None:
+            print("[INFO] 시간 역순 이벤트 감지 - 전체 재집계")
+            self._rebuild_incremental()
+            return
+        self._offset = consumed[0]
+        if consumed[1]:
+            print(f"[INFO] 새 이벤트 {consumed[1]}개 반영 (누적 {self._acc.count}개)")
 
-                time_diff = (time2 - time1).total_seconds()
-                if time_diff <= 0:
-                    continue
+    def _consume(self, buf: Buffer, start: int) -> Optional[Tuple[int, int]]:
+        """
+        로그(buf, 파일 전체)의 start 이후 완성된 줄의 이벤트를 하나씩 누적기에 반영
 
-                # signal 확인 (0이면 학습 앱)
-                signal = event1.get("signal", 1)
-                if signal == 0:
-                    learning_time_seconds += time_diff
+        아직 다 쓰이지 않은 마지막 줄은 남겨 두었다가 다음 호출에서 읽음
 
-                total_time_seconds += time_diff
+        Returns:
+            (다음에 읽을 오프셋, 반영한 이벤트 수), 시간 역순 이벤트가 있으면 None
+        """
+        reader = JsonLinesReader(start)
+        added = 0
+        for time_sec, app_name, signal in self._line_items(buf, reader):
+            if self._acc.count and time_sec < self._acc.last_time:
+                return None
+            self._acc.add(time_sec, app_name, signal)
+            added += 1
+        return reader.offset, added
+
+    def _refresh_binary(self):
+        """
+        바이너리 로그의 오프셋 이후 레코드를 헤더(시각/앱/signal)만 읽어 누적 합계 갱신
 
-            # 마지막 이벤트 처리
-            if len(events_with_time) >= 2:
-                time_last, event_last = events_with_time[-1]
-                time_prev, event_prev = events_with_time[-2]
-                time_diff = (time_last - time_prev).total_seconds()
+        체크포인트 복원이나 record()로 오프셋만 앞서 있으면, 그 사이 구간은 문자열 레코드만 읽어
+        문자열 표를 맞춘 뒤 이어서 읽음 (이벤트 dict는 만들지 않으므로 _observe_event는 호출되지 않음)
+        """
+        reader = self._binary
+        if reader is None or reader.offset > self._offset:
+            reader = self._binary = BinaryLogReader()
+        added = 0
+        rebuild = None
+        try:
+            with mapped_file(self.json_file) as buf:
+                if reader.offset < self._offset:
+                    reader.scan(buf, "strings", end=self._offset)
+                if reader.offset != self._offset:
+                    rebuild = "바이너리 로그 오프셋 불일치"  # 오프셋이 레코드 경계가 아님 (맞지 않는 체크포인트 등)
+                else:
+                    for time_sec, app_name, signal in reader.iter_records(buf, "headers"):
+                        if self._acc.count and time_sec < self._acc.last_time:
+                            rebuild = "시간 역순 이벤트 감지"
+                            break
+                        self._acc.add(time_sec, app_name, signal)
+                        added += 1
+        except OSError as e:
+            print(f"[ERROR] 파일 읽기 오류: {e}")
+            return
 
-                if time_diff > 0:
-                    signal = event_last.get("signal", 1)
-                    if signal == 0:
-                        learning_time_seconds += time_diff
-                    total_time_seconds += time_diff
+        if rebuild:
+            print(f"[INFO] {rebuild} - 전체 재집계")
+            self._rebuild_incremental()
+            return
+        self._offset = reader.offset
+        if added:
+            print(f"[INFO] 새 이벤트 {added}개 반영 (누적 {self._acc.count}개)")
 
-            if total_time_seconds == 0:
-                return 0.0
+    def _reset_incremental(self):
+        self._acc = _UsageAccumulator()
+        self._file_id = None
+        self._offset = 0
+        self._binary = None
 
-            learning_rate = (learning_time_seconds / total_time_seconds) * 100.0
-            return round(learning_rate, 2)
+    def _rebuild_incremental(self):
+        """증분 상태를 버리고 현재 파일 전체를 다시 집계 (시간 역순 이벤트가 있으면 정렬)"""
+        readers: List = []
 
-        except Exception as e:
-            print(f"[ERROR] 학습 앱 사용률 계산 오류: {e}")
-            import traceback
-            traceback.print_exc()
-            return 0.0
+        def binary_items():
+            readers.append(BinaryLogReader())
+            return readers[-1].iter_records(buf, "headers")
 
-    def get_total_study_time_seconds(self) -> float:
-        """
-        총 학습 시간 계산 (초 단위)
+        def line_items():
+            readers.append(JsonLinesReader())
+            return self._line_items(buf, readers[-1])
 
-        Returns:
-            총 학습 시간 (초)
+        try:
+            with mapped_file(self.json_file) as buf:
+                binary = buf[:len(BINARY_MAGIC)] == BINARY_MAGIC
+                self._acc = self._accumulate_items(binary_items if binary else line_items)
+        except OSError as e:
+            print(f"[ERROR] 파일 읽기 오류: {e}")
+            self._reset_incremental()
+            return
+        self._binary = readers[-1] if binary else None
+        self._offset = readers[-1].offset
+
+
+class SegmentedAppAnalyzer(AppAnalyzer):
+    """
+    세그먼트 파일 여러 개(오래된 순)로 나뉜 로그의 증분 분석기
+
+    닫힌 세그먼트는 한 번만 읽고, 마지막(기록 중인) 세그먼트는 오프셋 이후만 읽음.
+    앞쪽 세그먼트가 삭제/교체되었거나 시간 역순 이벤트가 들어오면 전체 재집계.
+    세그먼트는 JSON Lines만 지원 (UserSegmentWriter는 LOG_MODE와 관계없이 JSON Lines로 기록),
+    바이너리 로그가 섞여 있으면 잘못된 줄로 건너뛰지 않고 ValueError
+    """
+
+    def __init__(self, segments: Callable[[], List[str]], name: str = ""):
         """
-        if not self.events or len(self.events) < 2:
-            return 0.0
+        Args:
+            segments: 현재 세그먼트 경로 목록(오래된 순)을 돌려주는 함수
+            name: 로그 표시 이름 (사용자 키 등)
+        """
+        self._segments = segments
+        self._sealed: List[str] = []  # 끝까지 읽은 세그먼트
+        super().__init__(json_file=name, incremental=True)
+
+    def _refresh_incremental(self):
+        paths = self._segments()
+        if paths[: len(self._sealed)] != self._sealed:
+            self._rebuild_incremental()
+            return
 
-        try:
-            events_with_time = []
-            for event in self.events:
-                if "time" not in event:
-                    continue
+        added = 0
+        for index in range(len(self._sealed), len(paths)):
+            path = paths[index]
+            is_last = index == len(paths) - 1
+            try:
+                with mapped_file(path) as buf:
+                    if self._offset == 0:
+                        _check_segment(buf, path)
+                    consumed = self._consume(buf, self._offset)
+            except FileNotFoundError:
+                self._rebuild_incremental()
+                return
+            except OSError as e:
+                print(f"[ERROR] 파일 읽기 오류: {e}")
+                return
+            if consumed is None:
+                print(f"[INFO] {self.json_file}: 시간 역순 이벤트 감지 - 전체 재집계")
+                self._rebuild_incremental()
+                return
+            added += consumed[1]
+            if is_last:
+                self._offset = consumed[0]
+            else:
+                # 다음 세그먼트가 생겼으면 이 세그먼트는 더 이상 바뀌지 않음
+                self._sealed.append(path)
+                self._offset = 0
+
+        if added:
+            print(f"[INFO] {self.json_file}: 새 이벤트 {added}개 반영 (누적 {self._acc.count}개)")
+
+    def _reset_incremental(self):
+        super()._reset_incremental()
+        self._sealed = []
+
+    def _rebuild_incremental(self):
+        """세그먼트 전체를 다시 집계 (시간 역순 이벤트가 있으면 정렬)"""
+        paths = self._segments()
+        last_offset = [0]
 
+        def items():
+            for path in paths:
+                reader = JsonLinesReader()
                 try:
-                    time_obj = datetime.strptime(event["time"], "%Y-%m-%d %H:%M:%S")
-                    events_with_time.append(time_obj)
-                except Exception:
-                    continue
+                    with mapped_file(path) as buf:
+                        _check_segment(buf, path)
+                        yield from self._line_items(buf, reader)
+                except OSError:
+                    pass
+                last_offset[0] = reader.offset
 
-            if len(events_with_time) < 2:
-                return 0.0
+        self._acc = self._accumulate_items(items)
+        self._sealed = paths[:-1]
+        self._offset = last_offset[0] if paths else 0
 
-            events_with_time.sort()
 
-            # 첫 이벤트와 마지막 이벤트의 시간 차이
-            total_seconds = (events_with_time[-1] - events_with_time[0]).total_seconds()
-            return max(0.0, total_seconds)
+def _check_segment(buf: Buffer, path: str):
+    """세그먼트가 바이너리 로그면 ValueError (세그먼트는 JSON Lines만 지원)"""
+    if buf[:len(BINARY_MAGIC)] == BINARY_MAGIC:
+        raise ValueError(f"{path}는 바이너리 로그입니다. (사용자 로그 세그먼트는 JSON Lines만 지원)")
 
-        except Exception as e:
-            print(f"[ERROR] 총 학습 시간 계산 오류: {e}")
-            return 0.0
 
-    def _extract_app_name(self, snapshot: Dict) -> str:
-        """
-        스냅샷에서 앱 이름 추출
+def default_checkpoint_path(json_file: str) -> str:
+    """로그 파일의 집계 체크포인트 경로 (activity_log.json → activity_log.agg.json)"""
+    return os.path.splitext(json_file)[0] + ".agg.json"
 
+
+class CheckpointedAppAnalyzer(AppAnalyzer):
+    """
+    집계 체크포인트 + 로그 꼬리만 읽는 증분 분석기
+
+    체크포인트 파일에는 누적 상태(앱별/신호별 시간, 첫/마지막 시각)와 함께
+    그 상태가 반영된 로그 파일의 (dev, inode)와 바이트 오프셋이 들어 있음.
+    처음 조회할 때 체크포인트가 지금 로그와 맞으면 그 오프셋부터만 읽고,
+    맞지 않으면(로그 교체, 잘림, 형식 오류) 로그 전체를 읽음.
+
+    모니터는 record()로 기록한 이벤트를 바로 반영하고 checkpoint()로 주기적으로 저장함
+    (checkpoint_data()로 상태만 떠 두고 save_checkpoint()는 다른 스레드에서 실행할 수 있음)
+    """
+
+    def __init__(self, json_file: str = "activity_log.json", checkpoint_file: Optional[str] = None):
+        """
         Args:
-            snapshot: 이벤트의 snapshot 딕셔너리
+            json_file: 이벤트 로그 파일 경로 (JSON Lines)
+            checkpoint_file: 집계 체크포인트 경로 (None이면 default_checkpoint_path(json_file))
+        """
+        self.checkpoint_file = checkpoint_file or default_checkpoint_path(json_file)
+        self.checkpoint_offset = 0  # 마지막으로 읽거나 저장한 체크포인트의 로그 오프셋
+        self._saved_file_id: Optional[Tuple[int, int]] = None
+        self._save_lock = threading.Lock()  # 체크포인트 파일 쓰기 직렬화 (임시 파일 공유)
+        super().__init__(json_file=json_file, incremental=True)
+
+    def _refresh_incremental(self):
+        if self._file_id is None:
+            self._load_checkpoint()
+        super()._refresh_incremental()
+
+    def _load_checkpoint(self) -> bool:
+        """체크포인트가 현재 로그와 맞으면 누적 상태/오프셋 복원"""
+        try:
+            with open(self.checkpoint_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            st = os.stat(self.json_file)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            print(f"[WARN] 집계 체크포인트 읽기 실패: {e}")
+            return False
 
-        Returns:
-            앱 이름 문자열 (예: "chrome(notion.so)")
+        try:
+            if data.get("version") != CHECKPOINT_VERSION:
+                return False
+            file_id = tuple(data["file_id"])
+            offset = int(data["offset"])
+            if file_id != (st.st_dev, st.st_ino) or offset > st.st_size:
+                # 로그가 교체되었거나 잘렸으면 체크포인트를 버리고 전체 집계
+                return False
+            acc = _UsageAccumulator.from_state(data["state"])
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"[WARN] 집계 체크포인트 형식 오류: {e}")
+            return False
+
+        self._acc = acc
+        self._file_id = file_id
+        self._offset = offset
+        self.checkpoint_offset = offset
+        self._saved_file_id = file_id
+        return True
+
+    def record(self, event: Dict, nbytes: int):
         """
-        if not snapshot:
-            return "unknown"
-
-        # snapshot에 "app" 키가 있으면 직접 사용
-        app = snapshot.get("app", "")
-
-        # domain이 있으면 "app(domain)" 형식으로
-        domain = snapshot.get("domain", "")
-
-        if domain:
-            # 브라우저 앱 이름 정규화
-            app_lower = app.lower()
-            if app_lower == "google chrome":
-                return f"chrome({domain})"
-            elif app_lower == "safari":
-                return f"safari({domain})"
-            elif app_lower == "microsoft edge":
-                return f"edge({domain})"
-            elif app_lower == "firefox":
-                return f"firefox({domain})"
-            else:
-                return f"{app}({domain})" if app else domain
-        else:
-            # 앱 이름만
-            app_lower = app.lower()
-            if app_lower == "google chrome":
-                return "chrome"
-            elif app_lower == "safari":
-                return "safari"
-            elif app_lower == "microsoft edge":
-                return "edge"
-            elif app_lower == "firefox":
-                return "firefox"
-            else:
-                return app if app else "unknown"
+        방금 로그 끝에 nbytes 바이트로 기록한 이벤트 반영 (로그를 다시 읽지 않음)
+
+        로그를 쓰는 프로세스(모니터)만 호출해야 하며, 기록 전에 한 번 이상 analyze() 등으로
+        기존 로그를 반영해 둔 상태여야 오프셋이 맞음
+        """
+        with self._lock:
+            if self._file_id is None:
+                # 아직 로그를 읽지 않았으면 방금 기록한 이벤트까지 파일에서 읽음
+                self._refresh_incremental()
+                return
+            self._offset += nbytes
+            self._observe_event(event)
+            time_sec = parse_event_time(event)
+            if time_sec is None:
+                return
+            if self._acc.count and time_sec < self._acc.last_time:
+                print("[INFO] 시간 역순 이벤트 감지 - 전체 재집계")
+                self._rebuild_incremental()
+                return
+            self._acc.add(time_sec, self._event_app_name(event), event.get("signal", 1))
+
+    def checkpoint_data(self) -> Optional[Dict]:
+        """현재 누적 상태로 만든 체크포인트 내용 (아직 로그를 읽지 않았으면 None)"""
+        with self._lock:
+            if self._file_id is None:
+                return None
+            return {
+                "version": CHECKPOINT_VERSION,
+                "log": os.path.basename(self.json_file),
+                "file_id": list(self._file_id),
+                "offset": self._offset,
+                "state": self._acc.to_state(),
+                "saved_at": datetime.now().strftime(TIME_FORMAT),
+            }
+
+    def save_checkpoint(self, data: Dict) -> bool:
+        """
+        checkpoint_data()의 내용을 체크포인트 파일에 저장 (임시 파일에 쓴 뒤 교체)
+
+        호출하는 쪽에서 로그를 먼저 fsync해야 체크포인트가 디스크의 로그보다 앞서지 않음.
+        같은 로그에 대해 이미 저장한 것보다 오래된 내용이면 저장하지 않음 (늦게 끝난 백그라운드 저장)
+        """
+        file_id = tuple(data["file_id"])
+        offset = data["offset"]
+        with self._save_lock:
+            if file_id == self._saved_file_id and offset < self.checkpoint_offset:
+                return True
+            tmp_path = f"{self.checkpoint_file}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.checkpoint_file)
+            except OSError as e:
+                print(f"[WARN] 집계 체크포인트 저장 실패: {e}")
+                return False
+            self.checkpoint_offset = offset
+            self._saved_file_id = file_id
+        return True
+
+    def checkpoint(self) -> bool:
+        """현재 누적 상태를 체크포인트 파일에 저장 (로그 fsync는 호출하는 쪽에서 먼저)"""
+        data = self.checkpoint_data()
+        return data is not None and self.save_checkpoint(data)
@@ -2,6 +2,8 @@
 
 import asyncio
 
+import atexit
+
 import json
 
 import os
@@ -10,21 +12,81 @@ import platform
 
 import subprocess
 
+import time
+
+import uuid
+
 from datetime import datetime
 
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Hashable, List, Optional, Tuple, Union
 
 from urllib.parse import urlparse, quote
 
 import random
 
-from collections import deque
+from collections import OrderedDict, deque
 
 
 
 import aiohttp
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+
+
+
+from change_sources import (
+
+    MACOS_FOCUS_WATCHER_ARGV,
+
+    AdaptivePollingSource,
+
+    ChangeSource,
+
+    FixedPollingSource,
+
+    NotificationChangeSource,
+
+    display_of,
+
+    process_line_notifications,
+
+)
+
+from classification_cache import ClassificationCache, open_classification_cache
+
+from classification_rules import CATEGORY_SIGNALS, RuleBook
+
+from app_analyzer import CheckpointedAppAnalyzer, default_checkpoint_path
+
+from binary_log import BinaryLogWriter, open_binary_log
+
+from event_log import EventLogWriter, SpillingEventHistory, open_event_log, read_recent_events, write_events_json_array
+
+from user_logs import UserSegmentWriter
+
+from loop_lag import LoopLagMonitor
+
+from message_pool import MessagePool
+
+from openai_client import client_manager_from_env
+
+from outbound_queue import EventUploader, OutboundQueue
+
+from snapshot_backends import (
+
+    MACOS_HELPER_ARGV,
+
+    CallableSnapshotBackend,
+
+    ExecutorSnapshotProber,
+
+    PersistentHelperBackend,
+
+    ReplaySnapshotBackend,
+
+    SnapshotBackend,
+
+)
 
 
 
@@ -80,16 +142,135 @@ except Exception:
 
 # 로컬 기록
 
-EVENT_HISTORY: List[Dict] = []
+# 최근 이벤트만 메모리에 두고, 상한(바이트)을 넘는 오래된 이벤트는 세그먼트 파일로 내보냄
+
+EVENT_HISTORY = SpillingEventHistory(
+
+    segment_dir=os.getenv("EVENT_HISTORY_DIR", "event_history_segments"),
+
+    max_memory_bytes=int(os.getenv("EVENT_HISTORY_MAX_BYTES", str(4 * 1024 * 1024))),
+
+    segment_max_bytes=int(os.getenv("EVENT_HISTORY_SEGMENT_BYTES", str(8 * 1024 * 1024))),
+
+    max_segments=int(os.getenv("EVENT_HISTORY_MAX_SEGMENTS", "0")),
+
+)
 
 JSON_FILE = "activity_log.json"
 
+# "append": JSON Lines로 이벤트마다 한 줄 추가(기본), "rewrite": 기존처럼 JSON 배열 전체 재기록
+
+LOG_MODE = os.getenv("LOG_MODE", "append").strip().lower()
+
+# "binary": 문자열 표(앱/도메인/창 제목/메시지)를 쓰는 바이너리 로그에 append (binary_log.py, 기존 로그 변환은 python binary_log.py)
+
+LOG_FILE = os.getenv("BINARY_LOG_FILE", "activity_log.bin").strip() if LOG_MODE == "binary" else JSON_FILE
+
+_EVENT_LOG_WRITER: Optional[Union[EventLogWriter, BinaryLogWriter]] = None
+
+# 기록하면서 갱신하는 사용 시간 집계 체크포인트 (append 모드에서만, API 서버는 이 파일 + 로그 꼬리만 읽음)
+
+AGGREGATE_ENABLED = os.getenv("AGGREGATE_ENABLED", "1").strip() not in ("0", "false", "no")
+
+AGGREGATE_FILE = os.getenv("AGGREGATE_FILE", "").strip() or default_checkpoint_path(LOG_FILE)
+
+AGGREGATE_CHECKPOINT_EVERY = int(os.getenv("AGGREGATE_CHECKPOINT_EVERY", "50"))  # 이벤트 수
+
+AGGREGATE_CHECKPOINT_INTERVAL = float(os.getenv("AGGREGATE_CHECKPOINT_INTERVAL", "30.0"))  # 초
+
+_USAGE_AGGREGATE: Optional[CheckpointedAppAnalyzer] = None
+
+_AGGREGATE_SAVING: Optional[asyncio.Future] = None  # 작업 스레드에서 진행 중인 체크포인트 저장
+
+_AGGREGATE_PENDING = 0
+
+_AGGREGATE_LAST_SAVE = time.monotonic()
+
+# 교실 단위 사용자별 로그 저장소 ({디렉터리}/{ROOM_PATH}/{SENDER_EMAIL}/segment-*.jsonl, API 서버와 공유)
+
+# 비어 있으면 사용하지 않음
+
+EVENT_STORE_DIR = os.getenv("EVENT_STORE_DIR", "").strip()
+
+EVENT_STORE_SEGMENT_BYTES = int(os.getenv("EVENT_STORE_SEGMENT_BYTES", str(8 * 1024 * 1024)))
+
+_USER_LOG_WRITER: Optional[UserSegmentWriter] = None
+
+# 이벤트 수집 API (예: http://서버:8080/ingest), 지정하면 이벤트를 묶어서 서버로 전송 (서버가 기록·집계)
+
+INGEST_URL = os.getenv("INGEST_URL", "").strip()
+
+INGEST_TOKEN = os.getenv("INGEST_TOKEN", "").strip()
+
+INGEST_BATCH = int(os.getenv("INGEST_BATCH", "100"))  # 묶음 하나의 최대 이벤트 수
+
+INGEST_FLUSH_INTERVAL = float(os.getenv("INGEST_FLUSH_INTERVAL", "2.0"))  # 초
+
+INGEST_BUFFER_MAX = int(os.getenv("INGEST_BUFFER_MAX", "10000"))  # 서버가 내려가 있을 때 보관할 최대 이벤트 수
+
+# 모니터 실행마다 새 에이전트 ID (서버는 에이전트별 seq로 재전송 중복을 걸러냄)
+
+INGEST_AGENT_ID = uuid.uuid4().hex[:16]
+
+_EVENT_UPLOADER: Optional[EventUploader] = None
+
+_EVENT_UPLOADER_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
 POLL_INTERVAL = float(os.getenv("POLL_INTERVAL", "1.0"))  # 초
 
+# 스냅샷 백엔드: "spawn"(폴링마다 osascript 실행, 기본) | "helper"(상주 도우미 프로세스) | "replay"(기록 재생)
+
+SNAPSHOT_BACKEND = os.getenv("SNAPSHOT_BACKEND", "spawn").strip().lower()
+
+SNAPSHOT_REPLAY_FILE = os.getenv("SNAPSHOT_REPLAY_FILE", "").strip()
+
+# 스냅샷은 전용 스레드에서 조회: 제한 시간을 넘기면 SNAPSHOT_STALE_MAX_AGE초 이내의 마지막 스냅샷을 재사용
+
+SNAPSHOT_TIMEOUT = float(os.getenv("SNAPSHOT_TIMEOUT", "3.0"))
+
+SNAPSHOT_STALE_MAX_AGE = float(os.getenv("SNAPSHOT_STALE_MAX_AGE", "10.0"))
+
+OSASCRIPT_TIMEOUT = float(os.getenv("OSASCRIPT_TIMEOUT", "5.0"))  # 멈춘 osascript 강제 종료까지 대기 시간
+
+# 이벤트 루프 지연 측정 결과 로그 주기 (초, 0이면 출력 안 함)
+
+LOOP_LAG_REPORT = float(os.getenv("LOOP_LAG_REPORT", "60"))
+
+# 변경 감지 방식: "auto"(macOS면 notify, 아니면 adaptive, 기본) | "notify"(OS 포커스 알림) | "adaptive"(적응형 폴링) | "poll"(고정 간격)
+
+CHANGE_SOURCE = os.getenv("CHANGE_SOURCE", "auto").strip().lower()
+
+ADAPTIVE_POLL_MIN = float(os.getenv("ADAPTIVE_POLL_MIN", "0.25"))  # 초, 변화 직후 폴링 간격
+
+ADAPTIVE_POLL_MAX = float(os.getenv("ADAPTIVE_POLL_MAX", "2.0"))  # 초, 유휴 상태 최대 폴링 간격
+
+# 초, 알림 모드에서 창 제목 변경 확인 최대 간격. 브라우저 탭 전환(도메인 변경)은 포커스 알림이 없어
+# 이 간격으로만 잡히므로 기본은 POLL_INTERVAL (늘리면 조회는 줄지만 탭 전환이 그만큼 늦게 기록됨)
+
+NOTIFY_POLL_MAX = float(os.getenv("NOTIFY_POLL_MAX", "").strip() or POLL_INTERVAL)
+
 LAST_MESSAGES: deque[str] = deque(maxlen=8)
 
+# OpenAI 클라이언트(HTTP 연결 풀)는 프로세스 전체에서 재사용
+
+_OPENAI_CLIENTS = client_manager_from_env()
+
 _RNG = random.SystemRandom()
 
+# 규칙 기반(폴백) 분류 설정 파일: 바뀌면 RULES_CHECK_INTERVAL초 안에 다시 읽음
+
+CLASSIFICATION_RULES_FILE = os.getenv(
+
+    "CLASSIFICATION_RULES_FILE",
+
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "classification_rules.json"),
+
+)
+
+RULES_CHECK_INTERVAL = float(os.getenv("RULES_CHECK_INTERVAL", "2.0"))
+
+CLASSIFICATION_RULES = RuleBook(CLASSIFICATION_RULES_FILE, check_interval=RULES_CHECK_INTERVAL)
+
 
 
 # ======== macOS 프런트 앱/윈도우 감지 ========
@@ -104,6 +285,8 @@ def _run_osascript(script: str) -> str:
 
         text=True,
 
+        timeout=OSASCRIPT_TIMEOUT,
+
     ).stdout.strip()
 
 
@@ -176,7 +359,47 @@ def _format_display(app_name: str, window_name: str = "", detail: Optional[str]
 
 
 
-def get_active_snapshot() -> Dict[str, str]:
+def _snapshot_from_raw(raw: Dict[str, str]) -> Dict[str, str]:
+
+    # 도우미가 준 app/window/url을 get_active_snapshot()과 같은 형식으로 변환
+
+    app_name = raw.get("app", "") or "unknown"
+
+    window_name = raw.get("window", "")
+
+    snapshot: Dict[str, str] = {
+
+        "app": app_name,
+
+        "window": window_name,
+
+    }
+
+
+
+    detail: Optional[str] = None
+
+    if app_name.lower() in ("safari", "google chrome") and "url" in raw:
+
+        url = raw.get("url", "") or ""
+
+        site = _host_from_url(url)
+
+        snapshot["url"] = url
+
+        snapshot["domain"] = site
+
+        detail = site or url
+
+
+
+    snapshot["display"] = _format_display(app_name, window_name, detail)
+
+    return snapshot
+
+
+
+def _spawn_snapshot() -> Dict[str, str]:
 
     if platform.system() != "Darwin":
 
@@ -242,497 +465,1533 @@ def get_active_snapshot() -> Dict[str, str]:
 
 
 
-def save_events_to_json():
+_SNAPSHOT_BACKEND_IMPL: Optional[SnapshotBackend] = None
 
-    with open(JSON_FILE, "w", encoding="utf-8") as f:
 
-        json.dump(EVENT_HISTORY, f, ensure_ascii=False, indent=4)
 
+def _create_snapshot_backend(kind: str) -> SnapshotBackend:
 
+    if kind == "replay":
 
-# ======== 유틸: "chrome(notion.so)" → ("chrome","notion.so") ========
+        return ReplaySnapshotBackend.from_file(SNAPSHOT_REPLAY_FILE)
 
-def _parse_app(current_app: str) -> tuple[str, str]:
+    if kind == "helper" and platform.system() == "Darwin":
 
-    s = (current_app or "").strip()
+        return PersistentHelperBackend(MACOS_HELPER_ARGV, postprocess=_snapshot_from_raw)
 
-    if "(" in s and s.endswith(")"):
+    if kind not in ("spawn", "helper"):
 
-        core = s[: s.index("(")].strip()
+        print(f"[WARN] 알 수 없는 SNAPSHOT_BACKEND={kind}, spawn 사용")
 
-        site = s[s.index("(") + 1 : -1].strip()
+    return CallableSnapshotBackend(_spawn_snapshot)
 
-        return core.lower(), site.lower()
 
-    return s.lower(), ""
 
+def set_snapshot_backend(backend: Optional[SnapshotBackend]) -> None:
 
+    global _SNAPSHOT_BACKEND_IMPL
 
-def _normalize_browser_name(app_name: str) -> str:
+    if _SNAPSHOT_BACKEND_IMPL is not None and _SNAPSHOT_BACKEND_IMPL is not backend:
 
-    lower = (app_name or "").lower()
+        _SNAPSHOT_BACKEND_IMPL.close()
 
-    if lower == "google chrome":
+    _SNAPSHOT_BACKEND_IMPL = backend
 
-        return "chrome"
 
-    if lower == "safari":
 
-        return "safari"
+def get_active_snapshot() -> Dict[str, str]:
 
-    if lower == "microsoft edge":
+    global _SNAPSHOT_BACKEND_IMPL
 
-        return "edge"
+    if _SNAPSHOT_BACKEND_IMPL is None:
 
-    if lower == "firefox":
+        _SNAPSHOT_BACKEND_IMPL = _create_snapshot_backend(SNAPSHOT_BACKEND)
 
-        return "firefox"
+        atexit.register(_SNAPSHOT_BACKEND_IMPL.close)
 
-    return lower
+    return _SNAPSHOT_BACKEND_IMPL.snapshot()
 
 
 
-def snapshot_to_current_app_string(snapshot: Dict[str, str]) -> str:
+_SNAPSHOT_PROBER: Optional[ExecutorSnapshotProber] = None
 
-    app_name = snapshot.get("app", "") or "unknown"
 
-    domain = snapshot.get("domain", "") or ""
 
-    browser_core = _normalize_browser_name(app_name)
+async def get_active_snapshot_async() -> Dict[str, str]:
 
-    if browser_core in {"chrome", "safari", "edge", "firefox"}:
+    """get_active_snapshot()을 전용 스레드에서 실행 (이벤트 루프를 막지 않음)"""
 
-        if domain:
+    global _SNAPSHOT_PROBER
 
-            return f"{browser_core}({domain})"
+    if _SNAPSHOT_PROBER is None:
 
-        return browser_core
+        _SNAPSHOT_PROBER = ExecutorSnapshotProber(
 
-    return app_name
+            get_active_snapshot,
 
+            timeout=SNAPSHOT_TIMEOUT,
 
+            stale_max_age=SNAPSHOT_STALE_MAX_AGE,
 
-# ======== LLM 판정 ========
+        )
 
-def step2_llm_signal_and_message(
+        atexit.register(_SNAPSHOT_PROBER.close)
 
-    current_app: str,
+    return await _SNAPSHOT_PROBER.snapshot()
 
-    model: str = "gpt-4o-mini",
 
-    default_on_error: Tuple[int, str] = (1, "LLM 판정 중 문제가 발생했어요. 잠시 후 다시 시도해 주세요."),
 
-) -> Tuple[int, str]:
+def snapshot_prober_stats() -> Dict[str, int]:
 
-    def _fallback_classify(app_string: str) -> Tuple[int, str]:
+    return _SNAPSHOT_PROBER.stats() if _SNAPSHOT_PROBER is not None else {}
 
-        app_core, site = _parse_app(app_string)
 
-        core = app_core.lower()
 
-        site_l = (site or "").lower()
+def save_events_to_json():
 
+    write_events_json_array(JSON_FILE, list(EVENT_HISTORY))
 
 
-        games = {
 
-            "lol","league of legends","valorant","steam","battlenet","nexon",
+def _get_event_log_writer() -> Union[EventLogWriter, BinaryLogWriter]:
 
-            "maple","lostark","fortnite","roblox","genshin","pubg","minecraft","fifa","fc online",
+    global _EVENT_LOG_WRITER
 
-        }
+    if _EVENT_LOG_WRITER is None:
 
-        study_tools = {
+        _EVENT_LOG_WRITER = open_binary_log(LOG_FILE) if LOG_MODE == "binary" else open_event_log(JSON_FILE)
 
-            "vscode","visual studio","pycharm","cursor","slack","microsoft word","notes","apple notes",
+        atexit.register(_EVENT_LOG_WRITER.close)
 
-            "intellij","android studio","jupyter","colab","notion","obsidian","excel","powerpoint","ppt",
+    return _EVENT_LOG_WRITER
 
-            "pdf","skim","acrobat","postman","figma","miro","xcode","matlab","rstudio","latex",
 
-        }
 
-        study_domains = {
+def _get_user_log_writer() -> UserSegmentWriter:
 
-            "notion.so","colab.research.google.com","leetcode.com","github.com","stackoverflow.com",
+    global _USER_LOG_WRITER
 
-            "paperswithcode.com","arxiv.org","scholar.google.com","kaggle.com","coursera.org","edx.org",
+    if _USER_LOG_WRITER is None:
 
-            "udemy.com","docs.python.org","gooroomee.com","cams-dev.gooroomee.com","cams-dev-plus.gooroomee.com",
+        _USER_LOG_WRITER = UserSegmentWriter(EVENT_STORE_DIR, ROOM_PATH, SENDER_EMAIL,
 
-        }
+                                             segment_max_bytes=EVENT_STORE_SEGMENT_BYTES)
 
-        content_domains = {
+        atexit.register(_USER_LOG_WRITER.close)
 
-            "youtube.com","netflix.com","twitch.tv","instagram.com","tiktok.com","spotify.com",
+    return _USER_LOG_WRITER
 
-            "music.youtube.com","webtoon.kakao.com","webtoons.com","facebook.com",
 
-        }
 
-        browsers = {"chrome","safari","edge","firefox","google chrome"}
+def _get_usage_aggregate() -> CheckpointedAppAnalyzer:
 
+    global _USAGE_AGGREGATE
 
+    if _USAGE_AGGREGATE is None:
 
-        def _pick(choices: List[str]) -> str:
+        # 로그 파일을 먼저 열어(꼬리 복구/형식 변환) 체크포인트 오프셋이 복구된 파일 기준이 되게 함
 
-            shuffled = choices[:]
+        _get_event_log_writer()
 
-            _RNG.shuffle(shuffled)
+        aggregate = CheckpointedAppAnalyzer(LOG_FILE, AGGREGATE_FILE)
 
-            for c in shuffled:
+        # 체크포인트 + 그 뒤의 로그 꼬리를 지금 읽어 둠 (record()가 기록 경로에서 로그를 읽지 않도록)
 
-                if c not in LAST_MESSAGES:
+        aggregate.analyze()
 
-                    return c
+        _USAGE_AGGREGATE = aggregate
 
-            return shuffled[0]
+        atexit.register(checkpoint_usage_aggregate)
 
+    return _USAGE_AGGREGATE
 
 
-        if core in games:
 
-            return 2, _pick([
+async def prepare_usage_aggregate() -> None:
 
-                "지금은 집중 시간이에요, 게임은 잠시 접어둘까요?",
+    """시작할 때 로그 열기(꼬리 복구)와 기존 로그 집계를 작업 스레드에서 미리 수행 (모니터 루프를 막지 않도록)"""
 
-                "목표에 맞춰보아요, 게임은 이따 쉬는 시간에 즐겨볼까요?",
+    if LOG_MODE == "rewrite" or not AGGREGATE_ENABLED:
 
-                "학습 우선으로 전환해볼까요? 게임은 잠깐 내려두는 게 어때요?",
+        return
 
-            ])
+    try:
 
+        await asyncio.to_thread(_get_usage_aggregate)
 
+    except Exception as e:
 
-        if core in browsers:
+        print(f"[LOG ERROR] 사용 시간 집계: {e}")
 
-            if not site_l:
 
-                return 1, _pick([
 
-                    "현재 탭이 학습과 연결되는지 확인하고 목표 페이지로 이동해볼까요?",
+def checkpoint_usage_aggregate() -> None:
 
-                    "학습 목적의 페이지인지 점검하고 필요한 자료로 전환해볼까요?",
+    """로그를 fsync한 뒤 집계 체크포인트 저장 (체크포인트가 디스크의 로그보다 앞서지 않게)"""
 
-                    "이번 세션 목표와 맞는 탭인지 확인한 뒤 이어가볼까요?",
+    global _AGGREGATE_PENDING, _AGGREGATE_LAST_SAVE
 
-                ])
+    if _USAGE_AGGREGATE is None or _AGGREGATE_PENDING == 0:
 
-            if site_l in study_domains or site_l.endswith(".edu"):
+        return
 
-                return 0, _pick([
+    _get_event_log_writer().sync()
 
-                    f"{site_l}에서 집중 중이시네요, 20~30분만 더 몰입해볼까요?",
+    if _USAGE_AGGREGATE.checkpoint():
 
-                    f"{site_l} 작업 흐름 좋아요, 지금 리듬 유지해 한 구간 더 가볼까요?",
+        _AGGREGATE_PENDING = 0
 
-                    f"{site_l} 학습 괜찮습니다, 잠깐 더 밀고 나가면 좋겠어요.",
+    _AGGREGATE_LAST_SAVE = time.monotonic()
 
-                    f"{site_l} 진행 좋아요, 짧은 몰입 구간을 한 번 더 가져볼까요?",
 
-                ])
 
-            if site_l in content_domains:
+def _save_usage_checkpoint(aggregate: CheckpointedAppAnalyzer, data: Dict) -> bool:
 
-                return 1, _pick([
+    # data는 이미 기록한 이벤트까지만 반영하므로 로그를 fsync한 뒤 저장하면 디스크의 로그보다 앞서지 않음
 
-                    f"{site_l} 이용 중이네요. 학습 영상/자료라면 이어가고, 아니면 목표로 돌아가볼까요?",
+    _get_event_log_writer().sync()
 
-                    f"{site_l}이 학습 목적이라면 괜찮아요, 아니라면 계획한 페이지로 전환해볼까요?",
+    return aggregate.save_checkpoint(data)
 
-                    f"{site_l} 콘텐츠가 목표와 맞는지 확인하고 필요한 경우 과제 화면으로 갈까요?",
 
-                    f"{site_l} 시청이 학습에 도움이 되는지 점검하고, 아니면 학습 탭으로 전환해볼까요?",
 
-                ])
+def _schedule_usage_checkpoint(aggregate: CheckpointedAppAnalyzer) -> None:
 
-            return 1, _pick([
+    # 상태는 루프에서 떠 두고, fsync와 파일 쓰기는 작업 스레드에서 (한 번에 하나만)
 
-                "현재 페이지가 목표와 연결되는지 확인하고 필요한 자료로 이동해볼까요?",
+    global _AGGREGATE_SAVING, _AGGREGATE_LAST_SAVE
 
-                "이번 세션 목표에 맞는지 점검하고 과제 화면으로 이어가볼까요?",
+    if _AGGREGATE_SAVING is not None and not _AGGREGATE_SAVING.done():
 
-                "목표와의 연관성을 확인한 뒤 필요한 경우 학습 탭으로 돌아가볼까요?",
+        return
 
-            ])
+    try:
 
+        loop = asyncio.get_running_loop()
 
+    except RuntimeError:
 
-        if core in study_tools:
+        checkpoint_usage_aggregate()
 
-            pretty = {"pycharm":"PyCharm","vscode":"VS Code","rstudio":"RStudio","latex":"LaTeX"}.get(core, core.capitalize())
+        return
 
-            return 0, _pick([
+    data = aggregate.checkpoint_data()
 
-                f"{pretty}에서 집중 중이시네요, 한 구간 더 몰입해볼까요?",
+    if data is None:
 
-                f"{pretty} 작업 흐름 좋아요, 20~30분 페이스 유지해볼까요?",
+        return
 
-                f"{pretty} 진행 좋습니다, 지금 리듬으로 조금만 더 이어가볼까요?",
+    saved = _AGGREGATE_PENDING
 
-                f"{pretty}에서 코드/문서 작업 좋습니다, 짧게 한 토막 더 가볼까요?",
+    _AGGREGATE_LAST_SAVE = time.monotonic()
 
-                f"{pretty} 흐름 괜찮아요, 잠깐만 더 밀어붙이고 휴식하실까요?",
+    _AGGREGATE_SAVING = loop.run_in_executor(None, _save_usage_checkpoint, aggregate, data)
 
-            ])
 
 
+    def _done(future: asyncio.Future) -> None:
 
-        return 1, _pick([
+        global _AGGREGATE_PENDING
 
-            "학습 목적이면 이어가고, 아니라면 목표 화면으로 전환해볼까요?",
+        if future.cancelled():
 
-            "현재 활동이 목표와 맞다면 계속, 아니면 계획한 작업으로 돌아가볼까요?",
+            return
 
-            "목표와의 연관성을 확인하고 필요하면 학습 화면으로 넘어가볼까요?",
+        if future.exception() is not None:
 
-            "지금 활동이 과제/학습과 맞으면 유지, 아니면 목표로 전환해볼까요?",
+            print(f"[LOG ERROR] 집계 체크포인트: {future.exception()}")
 
-        ])
+        elif future.result():
 
+            _AGGREGATE_PENDING = max(0, _AGGREGATE_PENDING - saved)
 
 
-    current_app = str(current_app or "").strip()
 
-    if not current_app:
+    _AGGREGATE_SAVING.add_done_callback(_done)
 
-        return (1, "앱이 감지되지 않았어요. 학습 화면을 열면 바로 체크할게요.")
 
 
+def _update_usage_aggregate(aggregate: CheckpointedAppAnalyzer, event: Dict, nbytes: int) -> None:
 
-    api_key = os.getenv("OPENAI_API_KEY")
+    global _AGGREGATE_PENDING
 
-    if not api_key:
+    aggregate.record(event, nbytes)
 
-        return _fallback_classify(current_app)
+    _AGGREGATE_PENDING += 1
 
+    if (_AGGREGATE_PENDING >= AGGREGATE_CHECKPOINT_EVERY
 
+            or time.monotonic() - _AGGREGATE_LAST_SAVE >= AGGREGATE_CHECKPOINT_INTERVAL):
 
-    app_core, site = _parse_app(current_app)
+        _schedule_usage_checkpoint(aggregate)
 
 
 
-    system_prompt = (
+def _record_event(event: Dict) -> None:
 
-        "너는 학습 보조 AI 에이전트다. 입력값(app_core, site)을 기반으로 \"학습 집중도 신호등\"을 판정하고, 한 문장 코멘트를 생성한다.\n\n"
+    EVENT_HISTORY.append(event)
 
-        "【최종 산출물】\n"
+    if EVENT_STORE_DIR:
 
-        "1) signal: 0(초록) | 1(주황) | 2(빨강)\n"
+        try:
 
-        "2) message: 한 문장, 존댓말, 18~60자, 과장/반말/감탄사 남발 금지, 이모지 금지\n\n"
+            _get_user_log_writer().append(event)
 
-        "【우선순위 규칙】 A:게임=2, B:학습=0, C:애매/소비=1\n"
+        except Exception as e:
 
-        "브라우저는 site로 판정, site가 비면 1.\n"
+            print(f"[LOG ERROR] 사용자 로그 저장소: {e}")
 
-        "출력은 오직 JSON: {\"signal\":0|1|2,\"message\":\"...\"}\n"
+    if INGEST_URL:
 
-    )
+        _get_event_uploader().put(event)
 
+    if LOG_MODE == "rewrite":
 
+        save_events_to_json()
 
-    user_prompt = {
+        return
 
-        "current_app_raw": current_app,
+    aggregate: Optional[CheckpointedAppAnalyzer] = None
 
-        "app_core": app_core,
+    if AGGREGATE_ENABLED:
 
-        "site": site,
+        try:
 
-        "time_of_day": datetime.now().strftime("%H:%M"),
+            # 기록 전에 만들어야 기존 로그만 읽고, 이번 이벤트는 record()로 한 번만 반영됨
 
-        "variation_hint": int(datetime.now().strftime("%M")),
+            aggregate = _get_usage_aggregate()
 
-        "recent_messages": list(LAST_MESSAGES),
+        except Exception as e:
 
-        "avoid_phrases": list(LAST_MESSAGES),
+            print(f"[LOG ERROR] 사용 시간 집계: {e}")
 
-        "schema": {"signal": "0|1|2", "message": "18~60자, 한 문장, 존댓말"},
+    try:
 
-    }
+        nbytes = _get_event_log_writer().append(event)
 
+    except Exception as e:
 
+        print(f"[LOG ERROR] {e}")
 
-    base_url = os.getenv("OPENAI_BASE_URL") or None
+        return
 
-    client = OpenAI(api_key=api_key, base_url=base_url) if base_url else OpenAI(api_key=api_key)
+    if aggregate is not None:
 
-    try:
+        try:
 
-        resp = client.chat.completions.create(
+            _update_usage_aggregate(aggregate, event, nbytes)
 
-            model=model,
+        except Exception as e:
 
-            temperature=0.6,
+            print(f"[LOG ERROR] 사용 시간 집계: {e}")
 
-            response_format={"type": "json_object"},
 
-            messages=[
 
-                {"role": "system", "content": system_prompt},
+# ======== 유틸: "chrome(notion.so)" → ("chrome","notion.so") ========
 
-                {"role": "user", "content": json.dumps(user_prompt, ensure_ascii=False)},
+def _parse_app(current_app: str) -> tuple[str, str]:
 
-            ],
+    s = (current_app or "").strip()
 
-            timeout=20,
+    if "(" in s and s.endswith(")"):
 
-        )
+        core = s[: s.index("(")].strip()
 
-        content = resp.choices[0].message.content or "{}"
+        site = s[s.index("(") + 1 : -1].strip()
 
-        data = json.loads(content)
+        return core.lower(), site.lower()
 
+    return s.lower(), ""
 
 
-        raw_signal = data.get("signal", 1)
 
-        try:
+def _normalize_browser_name(app_name: str) -> str:
 
-            signal = int(raw_signal)
+    lower = (app_name or "").lower()
 
-        except Exception:
+    if lower == "google chrome":
 
-            signal = 1
+        return "chrome"
 
+    if lower == "safari":
 
+        return "safari"
 
-        message = str(data.get("message") or "").strip()
+    if lower == "microsoft edge":
 
+        return "edge"
 
+    if lower == "firefox":
 
-        if message in LAST_MESSAGES:
+        return "firefox"
 
-            try:
+    return lower
 
-                user_prompt_retry = {
 
-                    **user_prompt,
 
-                    "variation_hint": (user_prompt["variation_hint"] + 7) % 60,
+def snapshot_to_current_app_string(snapshot: Dict[str, str]) -> str:
 
-                    "avoid_phrases": list(LAST_MESSAGES),
+    app_name = snapshot.get("app", "") or "unknown"
 
-                }
+    domain = snapshot.get("domain", "") or ""
 
-                resp2 = client.chat.completions.create(
+    browser_core = _normalize_browser_name(app_name)
 
-                    model=model,
+    if browser_core in {"chrome", "safari", "edge", "firefox"}:
 
-                    temperature=0.8,
+        if domain:
 
-                    response_format={"type": "json_object"},
+            return f"{browser_core}({domain})"
 
-                    messages=[
+        return browser_core
 
-                        {"role": "system", "content": system_prompt},
+    return app_name
 
-                        {"role": "user", "content": json.dumps(user_prompt_retry, ensure_ascii=False)},
 
-                    ],
 
-                    timeout=20,
+# ======== 판정 캐시 ========
 
-                )
+_CLASSIFICATION_CACHE: Optional[ClassificationCache] = None
 
-                content2 = resp2.choices[0].message.content or "{}"
+_CLASSIFICATION_CACHE_OPENED = False
 
-                data2 = json.loads(content2)
 
-                message2 = str(data2.get("message") or "").strip()
 
-                if 18 <= len(message2) <= 60 and message2 not in LAST_MESSAGES:
+# 캐시된 signal과 규칙 기반 판정이 다를 때 사용할 signal별 기본 메시지
 
-                    message = message2
+_SIGNAL_GENERIC_MESSAGES: Dict[int, List[str]] = {
 
-                    raw_signal2 = data2.get("signal", signal)
+    0: [
 
-                    try:
+        "좋아요, 이 흐름으로 25분만 더 집중해볼까요?",
 
-                        signal = int(raw_signal2)
+        "지금 학습 흐름 좋아요, 한 구간만 더 몰입해볼까요?",
 
-                    except Exception:
+        "집중이 잘 되고 있어요, 지금 리듬을 조금 더 이어가볼까요?",
 
-                        pass
+    ],
 
-            except Exception:
+    1: [
 
-                pass
+        "학습 목적이면 이어가고, 아니라면 목표 화면으로 전환해볼까요?",
 
+        "현재 활동이 목표와 맞다면 계속, 아니면 계획한 작업으로 돌아가볼까요?",
 
+        "목표와의 연관성을 확인하고 필요하면 학습 화면으로 넘어가볼까요?",
 
-        if signal not in (0, 1, 2):
+    ],
 
-            signal = 1
+    2: [
 
-        if not (18 <= len(message) <= 60):
+        "지금은 집중 시간이에요, 게임은 잠시 접어둘까요?",
 
-            if signal == 2:
+        "목표에 맞춰보아요, 게임은 이따 쉬는 시간에 즐겨볼까요?",
 
-                message = "지금은 공부 시간이에요, 게임은 잠시 접어둘까요?"
+        "학습 우선으로 전환해볼까요? 게임은 잠깐 내려두는 게 어때요?",
 
-            elif signal == 1:
+    ],
 
-                message = "학습 목적이면 계속 진행하세요, 아니면 목표로 돌아가봐요."
+}
 
-            else:
 
-                message = "좋아요, 이 흐름으로 25분만 더 집중해볼까요?"
 
+def _get_classification_cache() -> Optional[ClassificationCache]:
 
+    global _CLASSIFICATION_CACHE, _CLASSIFICATION_CACHE_OPENED
 
-        LAST_MESSAGES.append(message)
+    if not _CLASSIFICATION_CACHE_OPENED:
 
-        return (signal, message)
+        _CLASSIFICATION_CACHE = open_classification_cache()
 
-    except Exception as e:
+        _CLASSIFICATION_CACHE_OPENED = True
 
-        print(f"[API ERROR] {e}")
+    return _CLASSIFICATION_CACHE
 
-        signal, message = _fallback_classify(current_app)
 
-        LAST_MESSAGES.append(message)
 
-        return signal, message
+def _message_for_signal(current_app: str, signal: int) -> str:
 
+    # 규칙 분류 범주의 signal이 같으면 그 범주 메시지, 다르면 signal별 일반 메시지
 
+    app_core, site = _parse_app(current_app)
 
-# ======== 서버 전송 ========
+    _, category, name = CLASSIFICATION_RULES.classify(app_core, site)
 
-_post_diag_once = False  # 과도 로그 방지
+    return _pool_message(signal, category, name)
 
 
 
-def _signal_to_color(sig: int) -> str:
+def _cached_signal(current_app: str) -> Optional[int]:
 
-    return {0: "green", 1: "yellow", 2: "red"}.get(sig, "yellow")
+    cache = _get_classification_cache()
 
+    if cache is None:
 
+        return None
 
-async def _probe_allow(session: aiohttp.ClientSession, url: str) -> Tuple[set, str]:
+    app_core, site = _parse_app(current_app)
 
     try:
 
-        async with session.options(url) as r:
+        return cache.get(app_core, site)
 
-            allow = r.headers.get("Allow", "")
+    except Exception as e:
 
-            return {m.strip().upper() for m in allow.split(",") if m.strip()}, allow
+        print(f"[CACHE ERROR] {e}")
 
-    except Exception:
+        return None
 
-        return set(), ""
 
 
+def _cached_verdict(current_app: str) -> Optional[Tuple[int, str]]:
 
-def _candidate_urls() -> List[str]:
+    # 캐시에는 signal만 있으므로 메시지는 새로 고름
 
-    if FULL_ENDPOINT:
+    signal = _cached_signal(current_app)
 
-        return [FULL_ENDPOINT]  # 단일 URL 고정
+    if signal is None:
 
-    room = quote(ROOM_PATH.strip("/"))
+        return None
+
+    message = _message_for_signal(current_app, signal)
+
+    LAST_MESSAGES.append(message)
+
+    return signal, message
+
+
+
+def _remember_verdict(current_app: str, signal: int) -> None:
+
+    cache = _get_classification_cache()
+
+    if cache is None:
+
+        return
+
+    app_core, site = _parse_app(current_app)
+
+    try:
+
+        cache.put(app_core, site, signal)
+
+    except Exception as e:
+
+        print(f"[CACHE ERROR] {e}")
+
+
+
+
+
+# ======== LLM 판정 ========
+
+
+
+# 규칙 분류 범주별 메시지 ({name}: 사이트 도메인 또는 앱 표시 이름)
+
+_FALLBACK_MESSAGES: Dict[str, Tuple[str, ...]] = {
+
+    "game": (
+
+        "지금은 집중 시간이에요, 게임은 잠시 접어둘까요?",
+
+        "목표에 맞춰보아요, 게임은 이따 쉬는 시간에 즐겨볼까요?",
+
+        "학습 우선으로 전환해볼까요? 게임은 잠깐 내려두는 게 어때요?",
+
+    ),
+
+    "browser_blank": (
+
+        "현재 탭이 학습과 연결되는지 확인하고 목표 페이지로 이동해볼까요?",
+
+        "학습 목적의 페이지인지 점검하고 필요한 자료로 전환해볼까요?",
+
+        "이번 세션 목표와 맞는 탭인지 확인한 뒤 이어가볼까요?",
+
+    ),
+
+    "study_site": (
+
+        "{name}에서 집중 중이시네요, 20~30분만 더 몰입해볼까요?",
+
+        "{name} 작업 흐름 좋아요, 지금 리듬 유지해 한 구간 더 가볼까요?",
+
+        "{name} 학습 괜찮습니다, 잠깐 더 밀고 나가면 좋겠어요.",
+
+        "{name} 진행 좋아요, 짧은 몰입 구간을 한 번 더 가져볼까요?",
+
+    ),
+
+    "content_site": (
+
+        "{name} 이용 중이네요. 학습 영상/자료라면 이어가고, 아니면 목표로 돌아가볼까요?",
+
+        "{name}이 학습 목적이라면 괜찮아요, 아니라면 계획한 페이지로 전환해볼까요?",
+
+        "{name} 콘텐츠가 목표와 맞는지 확인하고 필요한 경우 과제 화면으로 갈까요?",
+
+        "{name} 시청이 학습에 도움이 되는지 점검하고, 아니면 학습 탭으로 전환해볼까요?",
+
+    ),
+
+    "browser_other": (
+
+        "현재 페이지가 목표와 연결되는지 확인하고 필요한 자료로 이동해볼까요?",
+
+        "이번 세션 목표에 맞는지 점검하고 과제 화면으로 이어가볼까요?",
+
+        "목표와의 연관성을 확인한 뒤 필요한 경우 학습 탭으로 돌아가볼까요?",
+
+    ),
+
+    "study_tool": (
+
+        "{name}에서 집중 중이시네요, 한 구간 더 몰입해볼까요?",
+
+        "{name} 작업 흐름 좋아요, 20~30분 페이스 유지해볼까요?",
+
+        "{name} 진행 좋습니다, 지금 리듬으로 조금만 더 이어가볼까요?",
+
+        "{name}에서 코드/문서 작업 좋습니다, 짧게 한 토막 더 가볼까요?",
+
+        "{name} 흐름 괜찮아요, 잠깐만 더 밀어붙이고 휴식하실까요?",
+
+    ),
+
+    "other": (
+
+        "학습 목적이면 이어가고, 아니라면 목표 화면으로 전환해볼까요?",
+
+        "현재 활동이 목표와 맞다면 계속, 아니면 계획한 작업으로 돌아가볼까요?",
+
+        "목표와의 연관성을 확인하고 필요하면 학습 화면으로 넘어가볼까요?",
+
+        "지금 활동이 과제/학습과 맞으면 유지, 아니면 목표로 전환해볼까요?",
+
+    ),
+
+}
+
+
+
+# 메시지 풀: 키 "signal:범주" (규칙 범주와 signal이 다르면 "signal:generic")
+
+# 기본 메시지 + LLM이 백그라운드에서 보충한 메시지(MESSAGE_POOL_FILE에 저장)에서 반복 없이 고름
+
+MESSAGE_POOL_FILE = os.getenv("MESSAGE_POOL_FILE", "message_pool.json").strip()
+
+MESSAGE_POOL_MIN = int(os.getenv("MESSAGE_POOL_MIN", "8"))  # 키별 LLM 메시지가 이보다 적으면 보충
+
+MESSAGE_POOL_REFRESH = float(os.getenv("MESSAGE_POOL_REFRESH", str(24 * 3600)))  # 초, 보충 주기
+
+MESSAGE_POOL = MessagePool(
+
+    seeds={
+
+        **{f"{CATEGORY_SIGNALS[c]}:{c}": messages for c, messages in _FALLBACK_MESSAGES.items()},
+
+        **{f"{s}:generic": messages for s, messages in _SIGNAL_GENERIC_MESSAGES.items()},
+
+    },
+
+    path=MESSAGE_POOL_FILE or None,
+
+    min_generated=MESSAGE_POOL_MIN,
+
+    refresh_seconds=MESSAGE_POOL_REFRESH,
+
+    rng=_RNG,
+
+)
+
+
+
+def _pool_message(signal: int, category: str, name: str) -> str:
+
+    if CATEGORY_SIGNALS.get(category) == signal:
+
+        key = f"{signal}:{category}"
+
+    else:
+
+        key = f"{signal}:generic"
+
+    _schedule_pool_top_up(key)
+
+    return MESSAGE_POOL.pick(key, name=name, recent=LAST_MESSAGES)
+
+
+
+def _fallback_classify(app_string: str) -> Tuple[int, str]:
+
+    app_core, site = _parse_app(app_string)
+
+    signal, category, name = CLASSIFICATION_RULES.classify(app_core, site)
+
+    return signal, _pool_message(signal, category, name)
+
+
+
+def _llm_prompts(current_app: str) -> Tuple[str, Dict[str, object]]:
+
+    app_core, site = _parse_app(current_app)
+
+    system_prompt = (
+
+        "너는 학습 보조 AI 에이전트다. 입력값(app_core, site)을 기반으로 \"학습 집중도 신호등\"을 판정하고, 한 문장 코멘트를 생성한다.\n\n"
+
+        "【최종 산출물】\n"
+
+        "1) signal: 0(초록) | 1(주황) | 2(빨강)\n"
+
+        "2) message: 한 문장, 존댓말, 18~60자, 과장/반말/감탄사 남발 금지, 이모지 금지\n\n"
+
+        "【우선순위 규칙】 A:게임=2, B:학습=0, C:애매/소비=1\n"
+
+        "브라우저는 site로 판정, site가 비면 1.\n"
+
+        "출력은 오직 JSON: {\"signal\":0|1|2,\"message\":\"...\"}\n"
+
+    )
+
+    user_prompt = {
+
+        "current_app_raw": current_app,
+
+        "app_core": app_core,
+
+        "site": site,
+
+        "time_of_day": datetime.now().strftime("%H:%M"),
+
+        "variation_hint": int(datetime.now().strftime("%M")),
+
+        "recent_messages": list(LAST_MESSAGES),
+
+        "avoid_phrases": list(LAST_MESSAGES),
+
+        "schema": {"signal": "0|1|2", "message": "18~60자, 한 문장, 존댓말"},
+
+    }
+
+    return system_prompt, user_prompt
+
+
+
+def _llm_request(model: str, temperature: float, system_prompt: str, user_prompt: Dict[str, object]) -> Dict[str, object]:
+
+    return {
+
+        "model": model,
+
+        "temperature": temperature,
+
+        "response_format": {"type": "json_object"},
+
+        "messages": [
+
+            {"role": "system", "content": system_prompt},
+
+            {"role": "user", "content": json.dumps(user_prompt, ensure_ascii=False)},
+
+        ],
+
+        "timeout": 20,
+
+    }
+
+
+
+def _llm_first_verdict(content: Optional[str]) -> Tuple[int, str]:
+
+    data = json.loads(content or "{}")
+
+    raw_signal = data.get("signal", 1)
+
+    try:
+
+        signal = int(raw_signal)
+
+    except Exception:
+
+        signal = 1
+
+    message = str(data.get("message") or "").strip()
+
+    return signal, message
+
+
+
+def _llm_dedupe_message(current_app: str, signal: int, message: str) -> str:
+
+    # 최근에 보낸 메시지와 같으면 LLM에 다시 묻지 않고 메시지 풀에서 고름
+
+    if message in LAST_MESSAGES and signal in (0, 1, 2):
+
+        return _message_for_signal(current_app, signal)
+
+    return message
+
+
+
+def _llm_finalize(signal: int, message: str) -> Tuple[int, str]:
+
+    if signal not in (0, 1, 2):
+
+        signal = 1
+
+    if not (18 <= len(message) <= 60):
+
+        if signal == 2:
+
+            message = "지금은 공부 시간이에요, 게임은 잠시 접어둘까요?"
+
+        elif signal == 1:
+
+            message = "학습 목적이면 계속 진행하세요, 아니면 목표로 돌아가봐요."
+
+        else:
+
+            message = "좋아요, 이 흐름으로 25분만 더 집중해볼까요?"
+
+    LAST_MESSAGES.append(message)
+
+    return (signal, message)
+
+
+
+def step2_llm_signal_and_message(
+
+    current_app: str,
+
+    model: str = "gpt-4o-mini",
+
+    default_on_error: Tuple[int, str] = (1, "LLM 판정 중 문제가 발생했어요. 잠시 후 다시 시도해 주세요."),
+
+) -> Tuple[int, str]:
+
+    current_app = str(current_app or "").strip()
+
+    if not current_app:
+
+        return (1, "앱이 감지되지 않았어요. 학습 화면을 열면 바로 체크할게요.")
+
+
+
+    api_key = os.getenv("OPENAI_API_KEY")
+
+    if not api_key:
+
+        return _fallback_classify(current_app)
+
+
+
+    cached = _cached_verdict(current_app)
+
+    if cached is not None:
+
+        return cached
+
+
+
+    system_prompt, user_prompt = _llm_prompts(current_app)
+
+
+
+    client: OpenAI = _OPENAI_CLIENTS.sync_client()
+
+    try:
+
+        resp = client.chat.completions.create(**_llm_request(model, 0.6, system_prompt, user_prompt))
+
+        signal, message = _llm_first_verdict(resp.choices[0].message.content)
+
+        message = _llm_dedupe_message(current_app, signal, message)
+
+
+
+        signal, message = _llm_finalize(signal, message)
+
+        _remember_verdict(current_app, signal)
+
+        return signal, message
+
+    except Exception as e:
+
+        print(f"[API ERROR] {e}")
+
+        signal, message = _fallback_classify(current_app)
+
+        LAST_MESSAGES.append(message)
+
+        return signal, message
+
+
+
+# ======== LLM 판정 (비동기) ========
+
+# 한 번의 판정(API 요청 한 번)에 허용하는 최대 시간(초)
+
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "8.0"))
+
+
+
+async def _llm_verdict_async(current_app: str, model: str = "gpt-4o-mini", deadline: Optional[float] = None) -> Optional[Tuple[int, str]]:
+
+    api_key = os.getenv("OPENAI_API_KEY")
+
+    if not current_app or not api_key:
+
+        return None
+
+
+
+    system_prompt, user_prompt = _llm_prompts(current_app)
+
+
+
+    async def _classify(client: AsyncOpenAI) -> Tuple[int, str]:
+
+        resp = await client.chat.completions.create(**_llm_request(model, 0.6, system_prompt, user_prompt))
+
+        signal, message = _llm_first_verdict(resp.choices[0].message.content)
+
+        message = _llm_dedupe_message(current_app, signal, message)
+
+        return _llm_finalize(signal, message)
+
+
+
+    try:
+
+        client = _OPENAI_CLIENTS.async_client()
+
+        signal, message = await asyncio.wait_for(_classify(client), timeout=deadline if deadline is not None else LLM_DEADLINE)
+
+        _remember_verdict(current_app, signal)
+
+        return signal, message
+
+    except asyncio.TimeoutError:
+
+        print(f"[API TIMEOUT] {current_app}: {deadline if deadline is not None else LLM_DEADLINE}s 내 응답 없음")
+
+        return None
+
+    except Exception as e:
+
+        print(f"[API ERROR] {e}")
+
+        return None
+
+
+
+async def step2_llm_signal_and_message_async(
+
+    current_app: str,
+
+    model: str = "gpt-4o-mini",
+
+    deadline: Optional[float] = None,
+
+) -> Tuple[int, str]:
+
+    current_app = str(current_app or "").strip()
+
+    if not current_app:
+
+        return (1, "앱이 감지되지 않았어요. 학습 화면을 열면 바로 체크할게요.")
+
+    if os.getenv("OPENAI_API_KEY"):
+
+        cached = _cached_verdict(current_app)
+
+        if cached is not None:
+
+            return cached
+
+    verdict = await _llm_verdict_async(current_app, model=model, deadline=deadline)
+
+    if verdict is not None:
+
+        return verdict
+
+    signal, message = _fallback_classify(current_app)
+
+    LAST_MESSAGES.append(message)
+
+    return signal, message
+
+
+
+# ======== LLM 판정 (배치) ========
+
+# 요청 하나에 담을 최대 앱 수, 배치 요청 하나의 최대 대기 시간(초)
+
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "20"))
+
+LLM_BATCH_DEADLINE = float(os.getenv("LLM_BATCH_DEADLINE", "30.0"))
+
+# 시작 시 최근 로그의 이벤트 몇 개에서 아직 판정이 없는 앱을 찾아 미리 배치 판정할지 (0이면 안 함)
+
+LLM_WARMUP_EVENTS = int(os.getenv("LLM_WARMUP_EVENTS", "500"))
+
+# 오프라인 등으로 LLM 판정을 못 받은 앱 (연결이 돌아오면 한 번에 배치 판정)
+
+_BATCH_BACKLOG: "OrderedDict[str, None]" = OrderedDict()
+
+_BATCH_BACKLOG_MAX = 200
+
+_BATCH_FLUSHING = False
+
+
+
+def _llm_batch_prompts(apps: List[str]) -> Tuple[str, Dict[str, object]]:
+
+    system_prompt = (
+
+        "너는 학습 보조 AI 에이전트다. 여러 입력(id, app_core, site) 각각에 대해 \"학습 집중도 신호등\"을 판정하고, 한 문장 코멘트를 생성한다.\n\n"
+
+        "【항목별 산출물】\n"
+
+        "1) signal: 0(초록) | 1(주황) | 2(빨강)\n"
+
+        "2) message: 한 문장, 존댓말, 18~60자, 과장/반말/감탄사 남발 금지, 이모지 금지\n\n"
+
+        "【우선순위 규칙】 A:게임=2, B:학습=0, C:애매/소비=1\n"
+
+        "브라우저는 site로 판정, site가 비면 1.\n"
+
+        "모든 id에 대해 하나씩 답하고, 출력은 오직 JSON: {\"results\":[{\"id\":0,\"signal\":0|1|2,\"message\":\"...\"}]}\n"
+
+    )
+
+    items = []
+
+    for i, app in enumerate(apps):
+
+        app_core, site = _parse_app(app)
+
+        items.append({"id": i, "app_core": app_core, "site": site})
+
+    user_prompt = {
+
+        "items": items,
+
+        "time_of_day": datetime.now().strftime("%H:%M"),
+
+        "avoid_phrases": list(LAST_MESSAGES),
+
+        "schema": {"results": [{"id": "입력 id", "signal": "0|1|2", "message": "18~60자, 한 문장, 존댓말"}]},
+
+    }
+
+    return system_prompt, user_prompt
+
+
+
+def _llm_batch_verdicts(content: Optional[str], count: int) -> Dict[int, Tuple[int, str]]:
+
+    # 항목별로 검사해 올바른 것만 돌려줌 (id가 없거나 signal이 잘못된 항목은 빠짐)
+
+    try:
+
+        data = json.loads(content or "{}")
+
+    except Exception:
+
+        return {}
+
+    results = data.get("results") if isinstance(data, dict) else None
+
+    verdicts: Dict[int, Tuple[int, str]] = {}
+
+    for item in results if isinstance(results, list) else []:
+
+        try:
+
+            idx = int(item["id"])
+
+            signal = int(item["signal"])
+
+        except Exception:
+
+            continue
+
+        if not (0 <= idx < count) or signal not in (0, 1, 2) or idx in verdicts:
+
+            continue
+
+        verdicts[idx] = (signal, str(item.get("message") or "").strip())
+
+    return verdicts
+
+
+
+def _batch_candidates(apps: List[str]) -> Tuple[Dict[str, Dict[str, object]], List[str]]:
+
+    # 중복/빈 값을 빼고, 캐시에 판정이 있는 앱과 LLM 판정이 필요한 앱으로 나눔
+
+    results: Dict[str, Dict[str, object]] = {}
+
+    pending: List[str] = []
+
+    for app in apps:
+
+        app = str(app or "").strip()
+
+        if not app or app in results or app in pending:
+
+            continue
+
+        signal = _cached_signal(app) if os.getenv("OPENAI_API_KEY") else None
+
+        if signal is None:
+
+            pending.append(app)
+
+        else:
+
+            results[app] = {"signal": signal, "message": _message_for_signal(app, signal), "source": "cache"}
+
+    return results, pending
+
+
+
+def _apply_batch_verdicts(chunk: List[str], verdicts: Dict[int, Tuple[int, str]], results: Dict[str, Dict[str, object]]) -> None:
+
+    for i, app in enumerate(chunk):
+
+        verdict = verdicts.get(i)
+
+        if verdict is None:
+
+            # 이 항목만 실패: 규칙 기반 판정 (캐시에는 저장하지 않음)
+
+            signal, message = _fallback_classify(app)
+
+            results[app] = {"signal": signal, "message": message, "source": "fallback"}
+
+            continue
+
+        signal, message = verdict
+
+        if not (18 <= len(message) <= 60):
+
+            message = _message_for_signal(app, signal)
+
+        _remember_verdict(app, signal)
+
+        results[app] = {"signal": signal, "message": message, "source": "llm"}
+
+
+
+def _batch_chunks(pending: List[str], batch_size: Optional[int]) -> List[List[str]]:
+
+    size = max(1, int(batch_size or LLM_BATCH_SIZE))
+
+    return [pending[i:i + size] for i in range(0, len(pending), size)]
+
+
+
+def classify_apps_batch(apps: List[str], model: str = "gpt-4o-mini", batch_size: Optional[int] = None) -> Dict[str, Dict[str, object]]:
+
+    """
+
+    여러 앱을 batch_size개씩 묶어 LLM 요청 하나로 판정하고 캐시에 저장
+
+
+
+    Returns:
+
+        {앱 문자열: {"signal", "message", "source": "cache"|"llm"|"fallback"}}
+
+    """
+
+    results, pending = _batch_candidates(apps)
+
+    client: Optional[OpenAI] = _OPENAI_CLIENTS.sync_client()
+
+    for chunk in _batch_chunks(pending, batch_size):
+
+        verdicts: Dict[int, Tuple[int, str]] = {}
+
+        if client is not None:
+
+            system_prompt, user_prompt = _llm_batch_prompts(chunk)
+
+            try:
+
+                resp = client.chat.completions.create(**_llm_request(model, 0.6, system_prompt, user_prompt))
+
+                verdicts = _llm_batch_verdicts(resp.choices[0].message.content, len(chunk))
+
+            except Exception as e:
+
+                print(f"[API ERROR] 배치 판정 실패({len(chunk)}개): {e}")
+
+        _apply_batch_verdicts(chunk, verdicts, results)
+
+    return results
+
+
+
+async def classify_apps_batch_async(
+
+    apps: List[str],
+
+    model: str = "gpt-4o-mini",
+
+    batch_size: Optional[int] = None,
+
+    deadline: Optional[float] = None,
+
+) -> Dict[str, Dict[str, object]]:
+
+    """classify_apps_batch의 비동기 버전 (배치 요청들을 동시에 보냄)"""
+
+    results, pending = _batch_candidates(apps)
+
+    client = _OPENAI_CLIENTS.async_client()
+
+    timeout = deadline if deadline is not None else LLM_BATCH_DEADLINE
+
+
+
+    async def _classify_chunk(chunk: List[str]) -> None:
+
+        verdicts: Dict[int, Tuple[int, str]] = {}
+
+        if client is not None:
+
+            system_prompt, user_prompt = _llm_batch_prompts(chunk)
+
+            try:
+
+                resp = await asyncio.wait_for(
+
+                    client.chat.completions.create(**_llm_request(model, 0.6, system_prompt, user_prompt)),
+
+                    timeout=timeout,
+
+                )
+
+                verdicts = _llm_batch_verdicts(resp.choices[0].message.content, len(chunk))
+
+            except asyncio.TimeoutError:
+
+                print(f"[API TIMEOUT] 배치 판정({len(chunk)}개): {timeout}s 내 응답 없음")
+
+            except Exception as e:
+
+                print(f"[API ERROR] 배치 판정 실패({len(chunk)}개): {e}")
+
+        _apply_batch_verdicts(chunk, verdicts, results)
+
+
+
+    await asyncio.gather(*(_classify_chunk(chunk) for chunk in _batch_chunks(pending, batch_size)))
+
+    return results
+
+
+
+def _defer_to_batch(current_app: str) -> None:
+
+    _BATCH_BACKLOG.pop(current_app, None)
+
+    _BATCH_BACKLOG[current_app] = None
+
+    while len(_BATCH_BACKLOG) > _BATCH_BACKLOG_MAX:
+
+        _BATCH_BACKLOG.popitem(last=False)
+
+
+
+async def _classify_in_background(apps: List[str], label: str) -> None:
+
+    results = await classify_apps_batch_async(apps)
+
+    counts = {"cache": 0, "llm": 0, "fallback": 0}
+
+    for item in results.values():
+
+        counts[str(item["source"])] += 1
+
+    print(f"[INFO] {label} 배치 판정: {len(results)}개 (LLM {counts['llm']}, 캐시 {counts['cache']}, 규칙 {counts['fallback']})")
+
+    if results and counts["llm"] == 0 and counts["cache"] < len(results):
+
+        # 한 건도 LLM 판정을 받지 못했으면(여전히 오프라인) 다음 기회에 다시 시도
+
+        for app, item in results.items():
+
+            if item["source"] == "fallback":
+
+                _defer_to_batch(app)
+
+
+
+async def _flush_batch_backlog() -> None:
+
+    global _BATCH_FLUSHING
+
+    if _BATCH_FLUSHING or not _BATCH_BACKLOG:
+
+        return
+
+    _BATCH_FLUSHING = True
+
+    try:
+
+        apps = list(_BATCH_BACKLOG)
+
+        _BATCH_BACKLOG.clear()
+
+        await _classify_in_background(apps, "밀린 앱")
+
+    finally:
+
+        _BATCH_FLUSHING = False
+
+
+
+def _recent_logged_apps(limit: int) -> List[str]:
+
+    # 최근 로그 이벤트의 앱 문자열 (최근 것부터, 중복 제거), 로그 끝부분만 읽음
+
+    try:
+
+        events = read_recent_events(LOG_FILE, limit)
+
+    except FileNotFoundError:
+
+        return []
+
+    except Exception as e:
+
+        print(f"[WARN] 최근 로그를 읽을 수 없습니다: {e}")
+
+        return []
+
+    apps: List[str] = []
+
+    for event in reversed(events):
+
+        snapshot = event.get("snapshot") if isinstance(event, dict) else None
+
+        if isinstance(snapshot, dict) and snapshot.get("app"):
+
+            app = snapshot_to_current_app_string(snapshot)
+
+            if app not in apps:
+
+                apps.append(app)
+
+    return apps
+
+
+
+async def warm_classification_cache() -> None:
+
+    """시작 시 최근 로그에 나온 앱 중 판정이 캐시에 없는 앱을 배치로 미리 판정"""
+
+    if LLM_WARMUP_EVENTS <= 0 or not os.getenv("OPENAI_API_KEY") or _get_classification_cache() is None:
+
+        return
+
+    apps = await asyncio.to_thread(_recent_logged_apps, LLM_WARMUP_EVENTS)
+
+    if apps:
+
+        await _classify_in_background(apps, "시작 시")
+
+
+
+# ======== 메시지 풀 보충 ========
+
+MESSAGE_POOL_TOP_UP = int(os.getenv("MESSAGE_POOL_TOP_UP", "10"))  # 보충 요청 한 번에 만들 메시지 수
+
+MESSAGE_POOL_RETRY = 600.0  # 초, 같은 키의 보충을 다시 시도하기까지 최소 간격
+
+_POOL_TOP_UP_ATTEMPTS: Dict[str, float] = {}
+
+
+
+# 보충 요청 시 LLM에 알려줄 범주 설명
+
+_CATEGORY_DESCRIPTIONS: Dict[str, str] = {
+
+    "game": "게임을 실행 중",
+
+    "browser_blank": "브라우저를 보고 있지만 사이트를 알 수 없음",
+
+    "study_site": "학습 사이트 {name} 이용 중",
+
+    "content_site": "영상/SNS 등 콘텐츠 사이트 {name} 이용 중",
+
+    "browser_other": "분류되지 않은 사이트 {name} 이용 중",
+
+    "study_tool": "학습/작업 도구 {name} 사용 중",
+
+    "other": "분류되지 않은 앱 {name} 사용 중",
+
+    "generic": "특정 앱과 관계없는 일반 상황",
+
+}
+
+
+
+def _schedule_pool_top_up(key: str) -> None:
+
+    # 보충이 필요하면 백그라운드에서 LLM으로 메시지를 만들어 풀에 추가 (이벤트 루프 밖에서는 건너뜀)
+
+    if not os.getenv("OPENAI_API_KEY") or not MESSAGE_POOL.needs_top_up(key):
+
+        return
+
+    now = time.monotonic()
+
+    last = _POOL_TOP_UP_ATTEMPTS.get(key)
+
+    if last is not None and now - last < MESSAGE_POOL_RETRY:
+
+        return
+
+    try:
+
+        asyncio.get_running_loop()
+
+    except RuntimeError:
+
+        return
+
+    _POOL_TOP_UP_ATTEMPTS[key] = now
+
+    _spawn_background(_top_up_message_pool(key))
+
+
+
+async def _top_up_message_pool(key: str, model: str = "gpt-4o-mini") -> int:
+
+    signal_str, category = key.split(":", 1)
+
+    system_prompt = (
+
+        "너는 학습 보조 AI 에이전트다. 학습 집중도 신호등 알림에 쓸 한 문장 코멘트를 여러 개 만든다.\n"
+
+        "조건: 한 문장, 존댓말, 18~60자, 과장/반말/감탄사 남발 금지, 이모지 금지, 서로 다른 표현.\n"
+
+        "사이트/앱 이름이 들어갈 자리는 {name}으로 남겨둔다 (그 외 중괄호 사용 금지).\n"
+
+        "출력은 오직 JSON: {\"messages\":[\"...\"]}\n"
+
+    )
+
+    user_prompt = {
+
+        "signal": int(signal_str),
+
+        "signal_meaning": {0: "학습 중(초록)", 1: "확인 필요(주황)", 2: "학습 방해(빨강)"}.get(int(signal_str)),
+
+        "situation": _CATEGORY_DESCRIPTIONS.get(category, category),
+
+        "variation_count": MESSAGE_POOL_TOP_UP,
+
+        "existing_messages": MESSAGE_POOL.templates(key),
+
+    }
+
+    try:
+
+        client = _OPENAI_CLIENTS.async_client()
+
+        resp = await asyncio.wait_for(
+
+            client.chat.completions.create(**_llm_request(model, 0.9, system_prompt, user_prompt)),
+
+            timeout=LLM_BATCH_DEADLINE,
+
+        )
+
+        data = json.loads(resp.choices[0].message.content or "{}")
+
+        # 형식이 다른 JSON(배열 등)도 백그라운드 작업에서 예외로 끝나지 않게 여기서 걸러냄
+
+        if not isinstance(data, dict) or not isinstance(data.get("messages") or [], list):
+
+            raise ValueError(f"응답 형식이 올바르지 않습니다: {str(data)[:80]}")
+
+    except Exception as e:
+
+        print(f"[WARN] 메시지 풀 보충 실패({key}): {e}")
+
+        return 0
+
+    candidates = []
+
+    for template in data.get("messages") or []:
+
+        text = str(template or "").strip()
+
+        sample = text.replace("{name}", "github.com")
+
+        if 18 <= len(sample) <= 60 and "{" not in sample and "}" not in sample:
+
+            candidates.append(text)
+
+    added = MESSAGE_POOL.add(key, candidates)
+
+    try:
+
+        await asyncio.to_thread(MESSAGE_POOL.save)
+
+    except Exception as e:
+
+        print(f"[WARN] 메시지 풀 저장 실패: {e}")
+
+    print(f"[INFO] 메시지 풀 보충: {key} +{added} (총 {MESSAGE_POOL.size(key)}개)")
+
+    return added
+
+
+
+# ======== 서버 전송 ========
+
+_post_diag_once = False  # 과도 로그 방지
+
+
+
+def _signal_to_color(sig: int) -> str:
+
+    return {0: "green", 1: "yellow", 2: "red"}.get(sig, "yellow")
+
+
+
+async def _probe_allow(session: aiohttp.ClientSession, url: str) -> Tuple[set, str]:
+
+    try:
+
+        async with session.options(url) as r:
+
+            allow = r.headers.get("Allow", "")
+
+            return {m.strip().upper() for m in allow.split(",") if m.strip()}, allow
+
+    except Exception:
+
+        return set(), ""
+
+
+
+def _candidate_urls() -> List[str]:
+
+    if FULL_ENDPOINT:
+
+        return [FULL_ENDPOINT]  # 단일 URL 고정
+
+    room = quote(ROOM_PATH.strip("/"))
 
     base = API_BASE.rstrip("/")
 
@@ -748,13 +2007,95 @@ def _candidate_urls() -> List[str]:
 
 
 
-async def _post_signal_to_server_async(app_str: str, signal: int, message: str) -> None:
+# 이벤트마다 세션을 새로 만들지 않도록 연결 풀을 가진 세션 하나를 재사용
+
+POST_POOL_SIZE = int(os.getenv("POST_POOL_SIZE", "4"))
+
+_HTTP_SESSION: Optional[aiohttp.ClientSession] = None
+
+_HTTP_SESSION_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+# 마지막으로 성공한 (URL, 메서드). 실패하면 비우고 다시 탐색
+
+_ENDPOINT_MEMO: Optional[Tuple[str, str]] = None
+
+
+
+async def _get_http_session() -> aiohttp.ClientSession:
+
+    global _HTTP_SESSION, _HTTP_SESSION_LOOP
+
+    loop = asyncio.get_running_loop()
+
+    if _HTTP_SESSION is None or _HTTP_SESSION.closed or _HTTP_SESSION_LOOP is not loop:
+
+        _HTTP_SESSION = aiohttp.ClientSession(
+
+            timeout=aiohttp.ClientTimeout(total=6),
+
+            connector=aiohttp.TCPConnector(limit=POST_POOL_SIZE, keepalive_timeout=60),
+
+        )
+
+        _HTTP_SESSION_LOOP = loop
+
+    return _HTTP_SESSION
+
+
+
+async def close_http_session() -> None:
+
+    global _HTTP_SESSION
+
+    if _HTTP_SESSION is not None and not _HTTP_SESSION.closed:
+
+        await _HTTP_SESSION.close()
+
+    _HTTP_SESSION = None
+
+
+
+async def _send_signal_request(
+
+    session: aiohttp.ClientSession,
+
+    method: str,
+
+    url: str,
+
+    payload: Dict[str, object],
+
+    headers: Dict[str, str],
+
+) -> Tuple[int, str]:
+
+    if method == "GET":
+
+        q = (f"{url}"
+
+             f"{'&' if '?' in url else '?'}email={quote(SENDER_EMAIL)}"
+
+             f"&color={payload['color']}"
+
+             f"&name={quote(str(payload['name']))}"
+
+             f"&text={quote(str(payload['text']))}")
+
+        async with session.get(q, headers=headers) as resp:
+
+            return resp.status, await resp.text()
+
+    req = session.post if method == "POST" else session.put
+
+    async with req(url, json=payload, headers=headers) as resp:
+
+        return resp.status, await resp.text()
 
-    global _post_diag_once
 
 
+def _signal_payload(app_str: str, signal: int, message: str) -> Dict[str, object]:
 
-    payload = {
+    return {
 
         "email": SENDER_EMAIL,
 
@@ -766,7 +2107,11 @@ async def _post_signal_to_server_async(app_str: str, signal: int, message: str)
 
     }
 
-    headers = {
+
+
+def _request_headers() -> Dict[str, str]:
+
+    return {
 
         "Accept": "application/json, */*",
 
@@ -780,119 +2125,319 @@ async def _post_signal_to_server_async(app_str: str, signal: int, message: str)
 
 
 
-    timeout = aiohttp.ClientTimeout(total=6)
+async def _post_signal_to_server_async(app_str: str, signal: int, message: str) -> bool:
+
+    return await _post_payload_async(_signal_payload(app_str, signal, message))
+
+
+
+async def _post_payload_async(payload: Dict[str, object]) -> bool:
+
+    global _post_diag_once, _ENDPOINT_MEMO
+
+
+
+    headers = _request_headers()
+
+    session = await _get_http_session()
+
+    last_err = None
+
+
+
+    # 이전에 성공한 엔드포인트가 있으면 요청 한 번으로 끝냄
+
+    if _ENDPOINT_MEMO is not None:
+
+        url, method = _ENDPOINT_MEMO
+
+        try:
+
+            status, text = await _send_signal_request(session, method, url, payload, headers)
+
+            if status < 400:
+
+                return True
+
+            last_err = f"HTTP {status} {method} {url}: {text}"
+
+        except Exception as e:
+
+            last_err = f"{type(e).__name__} {method} {url}: {e}"
+
+        print(f"[POST] 기존 엔드포인트 실패, 다시 탐색합니다. ({last_err})")
+
+        _ENDPOINT_MEMO = None
+
 
-    async with aiohttp.ClientSession(timeout=timeout) as session:
 
-        last_err = None
+    for url in _candidate_urls():
 
-        for url in _candidate_urls():
+        allowed, allow_raw = await _probe_allow(session, url)
 
-            allowed, allow_raw = await _probe_allow(session, url)
+        if not _post_diag_once:
 
-            if not _post_diag_once:
+            print(f"[POST DIAG] URL={url} | Allow={allow_raw or '(none)'} | payload={payload}")
 
-                print(f"[POST DIAG] URL={url} | Allow={allow_raw or '(none)'} | payload={payload}")
+            _post_diag_once = True
 
-                _post_diag_once = True
 
 
+        # 호출 메서드 결정
 
-            # 호출 메서드 결정
+        methods_chain = []
 
-            methods_chain = []
+        if API_METHOD:
 
-            if API_METHOD:
+            methods_chain = [API_METHOD]
 
-                methods_chain = [API_METHOD]
+        else:
+
+            if allowed:
+
+                if "POST" in allowed: methods_chain.append("POST")
+
+                if "GET" in allowed:  methods_chain.append("GET")
+
+                if "PUT" in allowed:  methods_chain.append("PUT")
 
             else:
 
-                if allowed:
+                # Allow 헤더가 없으면 세 가지 모두 시도
+
+                methods_chain = ["POST", "GET", "PUT"]
+
+
+
+        for method in methods_chain:
+
+            for attempt in range(2):
+
+                try:
+
+                    status, text = await _send_signal_request(session, method, url, payload, headers)
+
+                    if status < 400:
+
+                        _ENDPOINT_MEMO = (url, method)
+
+                        return True
+
+                    if status == 405:
+
+                        last_err = f"405 {method} {url}: {text}"
+
+                        break
+
+                    raise RuntimeError(f"HTTP {status} {method} {url}: {text}")
+
+                except Exception as e:
+
+                    last_err = f"{type(e).__name__} {method} {url}: {e}"
+
+                    await asyncio.sleep(0.4 * (attempt + 1))
+
+            if isinstance(last_err, str) and last_err.startswith("405"):
+
+                continue  # 다음 메서드
+
+        # 다음 URL 후보
+
+    print(f"[POST ERROR] all candidates failed.\nlast={last_err}\n"
+
+          f"hint: 정적 CDN/스토리지로 라우팅 중일 수 있습니다. 정확한 게이트웨이 URL/메서드/인증 헤더 확인 필요.")
+
+    return False
+
+
+
+# ======== 전송 대기열 ========
+
+# 모니터 루프는 대기열에 넣기만 하고 전송은 백그라운드 작업자가 담당
+
+OUTBOUND_QUEUE_MAX = int(os.getenv("OUTBOUND_QUEUE_MAX", "100"))
 
-                    if "POST" in allowed: methods_chain.append("POST")
+# 1이면 아직 보내지 못한 이전 상태는 최신 상태로 덮어씀 (방에는 최신 상태만 의미 있음)
 
-                    if "GET" in allowed:  methods_chain.append("GET")
+# 배치 엔드포인트가 있으면 (이메일, 앱)별로 합쳐서 앱 전환 내역을 한 번에 보내고, 없으면 이메일별 최신 하나만 남김
 
-                    if "PUT" in allowed:  methods_chain.append("PUT")
+OUTBOUND_COALESCE = os.getenv("OUTBOUND_COALESCE", "1").strip() not in ("0", "false", "no")
 
-                else:
+# 여러 건을 JSON 배열로 한 번에 받는 배치 엔드포인트 (없으면 개별 전송)
 
-                    # Allow 헤더가 없으면 세 가지 모두 시도
+BATCH_ENDPOINT = os.getenv("BATCH_ENDPOINT", "").strip()
 
-                    methods_chain = ["POST", "GET", "PUT"]
+_OUTBOUND_QUEUE: Optional[OutboundQueue] = None
 
+_OUTBOUND_QUEUE_LOOP: Optional[asyncio.AbstractEventLoop] = None
 
 
-            for method in methods_chain:
 
-                for attempt in range(2):
+async def _post_batch_async(payloads: List[Dict[str, object]]) -> Optional[bool]:
 
-                    try:
+    session = await _get_http_session()
 
-                        if method == "GET":
+    try:
+
+        async with session.post(BATCH_ENDPOINT, json=payloads, headers=_request_headers()) as resp:
+
+            text = await resp.text()
+
+            if resp.status in (404, 405):
+
+                print(f"[POST BATCH] 배치 엔드포인트 사용 불가({resp.status}), 개별 전송으로 전환")
+
+                return None
+
+            if resp.status < 400:
+
+                return True
+
+            print(f"[POST BATCH ERROR] HTTP {resp.status}: {text}")
+
+            return False
+
+    except Exception as e:
+
+        print(f"[POST BATCH ERROR] {type(e).__name__}: {e}")
+
+        return False
+
+
+
+def _outbound_coalesce_key() -> Callable[[Dict[str, object]], Hashable]:
+
+    if BATCH_ENDPOINT:
+
+        # 합친 항목을 맨 뒤로 옮기므로 마지막으로 전송되는 것은 항상 최신 상태
+
+        return lambda p: (p.get("email"), p.get("name"))
+
+    return lambda p: p.get("email")
+
+
+
+def _get_outbound_queue() -> OutboundQueue:
+
+    global _OUTBOUND_QUEUE, _OUTBOUND_QUEUE_LOOP
+
+    loop = asyncio.get_running_loop()
+
+    if _OUTBOUND_QUEUE is None or _OUTBOUND_QUEUE_LOOP is not loop:
+
+        _OUTBOUND_QUEUE = OutboundQueue(
+
+            send=_post_payload_async,
+
+            send_batch=_post_batch_async if BATCH_ENDPOINT else None,
+
+            maxsize=OUTBOUND_QUEUE_MAX,
+
+            coalesce_key=_outbound_coalesce_key() if OUTBOUND_COALESCE else None,
 
-                            q = (f"{url}"
+        )
+
+        _OUTBOUND_QUEUE_LOOP = loop
+
+    _OUTBOUND_QUEUE.start()
+
+    return _OUTBOUND_QUEUE
+
+
+
+async def _post_ingest_batch(events: List[Dict]) -> Tuple[bool, Optional[float]]:
+
+    """이벤트 묶음을 수집 API로 전송 → (성공 여부, Retry-After 초)"""
+
+    session = await _get_http_session()
+
+    headers = _request_headers()
+
+    if INGEST_TOKEN:
+
+        headers["Authorization"] = f"Bearer {INGEST_TOKEN}"
+
+    body = {"room": ROOM_PATH, "email": SENDER_EMAIL, "agent": INGEST_AGENT_ID, "events": events}
+
+    try:
+
+        async with session.post(INGEST_URL, json=body, headers=headers) as resp:
 
-                                 f"{'&' if '?' in url else '?'}email={quote(SENDER_EMAIL)}"
+            text = await resp.text()
 
-                                 f"&color={_signal_to_color(signal)}"
+            if resp.status < 400:
 
-                                 f"&name={quote(app_str)}"
+                return True, None
 
-                                 f"&text={quote(message)}")
+            retry_after = resp.headers.get("Retry-After")
 
-                            async with session.get(q, headers=headers) as resp:
+            print(f"[INGEST ERROR] HTTP {resp.status}: {text[:200]}")
 
-                                text = await resp.text()
+            if resp.status in (429, 503) and retry_after and retry_after.isdigit():
 
-                                if resp.status < 400:
+                return False, float(retry_after)
 
-                                    return
+            return False, None
 
-                                if resp.status == 405:
+    except Exception as e:
+
+        print(f"[INGEST ERROR] {type(e).__name__}: {e}")
+
+        return False, None
+
+
+
+def _get_event_uploader() -> EventUploader:
+
+    global _EVENT_UPLOADER, _EVENT_UPLOADER_LOOP
+
+    loop = asyncio.get_running_loop()
 
-                                    last_err = f"405 GET {url}: {text}"
+    if _EVENT_UPLOADER is None or _EVENT_UPLOADER_LOOP is not loop:
 
-                                    break
+        _EVENT_UPLOADER = EventUploader(
 
-                                raise RuntimeError(f"HTTP {resp.status} GET {url}: {text}")
+            _post_ingest_batch,
 
-                        else:
+            max_batch=INGEST_BATCH,
 
-                            req = session.post if method == "POST" else session.put
+            flush_interval=INGEST_FLUSH_INTERVAL,
 
-                            async with req(url, json=payload, headers=headers) as resp:
+            max_buffer=INGEST_BUFFER_MAX,
 
-                                text = await resp.text()
+        )
+
+        _EVENT_UPLOADER_LOOP = loop
+
+    _EVENT_UPLOADER.start()
+
+    return _EVENT_UPLOADER
 
-                                if resp.status < 400:
 
-                                    return
 
-                                if resp.status == 405:
+async def _stop_event_uploader() -> None:
 
-                                    last_err = f"405 {method} {url}: {text}"
+    """남은 이벤트를 전송하고 업로더 종료"""
 
-                                    break
+    if _EVENT_UPLOADER is not None:
 
-                                raise RuntimeError(f"HTTP {resp.status} {method} {url}: {text}")
+        await _EVENT_UPLOADER.stop(drain=True, timeout=5.0)
 
-                    except Exception as e:
 
-                        last_err = f"{type(e).__name__} {method} {url}: {e}"
 
-                        await asyncio.sleep(0.4 * (attempt + 1))
+def enqueue_signal(app_str: str, signal: int, message: str) -> None:
 
-                if isinstance(last_err, str) and last_err.startswith("405"):
+    _get_outbound_queue().put(_signal_payload(app_str, signal, message))
 
-                    continue  # 다음 메서드
 
-            # 다음 URL 후보
 
-        print(f"[POST ERROR] all candidates failed.\nlast={last_err}\n"
+def outbound_queue_stats() -> Dict[str, int]:
 
-              f"hint: 정적 CDN/스토리지로 라우팅 중일 수 있습니다. 정확한 게이트웨이 URL/메서드/인증 헤더 확인 필요.")
+    if _OUTBOUND_QUEUE is None:
+
+        return {"depth": 0, "enqueued": 0, "sent": 0, "failed": 0, "dropped": 0, "coalesced": 0, "batches": 0}
+
+    return _OUTBOUND_QUEUE.stats()
 
 
 
@@ -908,133 +2453,321 @@ def build_signal_json_from_snapshot(snapshot: Dict[str, str]) -> Dict[str, objec
 
 
 
-# ======== 실행 루프 ========
+def build_quick_signal_json_from_snapshot(snapshot: Dict[str, str]) -> Dict[str, object]:
 
-async def monitor_activity_and_send_on_change():
+    # LLM을 기다리지 않는 규칙 기반 즉시 판정
 
-    prev_display: Optional[str] = None
+    current_app_str = snapshot_to_current_app_string(snapshot)
 
-    while True:
+    signal, message = _fallback_classify(current_app_str)
 
-        snapshot = get_active_snapshot()
+    LAST_MESSAGES.append(message)
 
-        current_display = snapshot.get("display", snapshot.get("app", "unknown"))
+    return {"app": current_app_str, "signal": signal, "message": message}
 
-        if prev_display is None or current_display != prev_display:
 
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-            result = build_signal_json_from_snapshot(snapshot)
+# ======== 판정 기록/전송 ========
 
-            result_with_time = {"time": timestamp, **result}
+_EMIT_SEQ = 0  # 마지막으로 기록한 이벤트 번호 (LLM 보정 결과가 최신인지 확인용)
 
-            print(json.dumps(result_with_time, ensure_ascii=False), flush=True)
+_BACKGROUND_TASKS: set = set()
 
 
 
-            # 로컬 이벤트 로그
+def _enqueue_result(result: Dict[str, object]) -> None:
 
-            EVENT_HISTORY.append({
+    try:
 
-                "time": timestamp,
+        enqueue_signal(
 
-                "from": prev_display,
+            app_str=result["app"],
 
-                "to": current_display,
+            signal=result["signal"],
 
-                "snapshot": snapshot,
+            message=result["message"],
 
-                "signal": result["signal"],
+        )
 
-                "message": result["message"],
+    except Exception as e:
 
-            })
+        print(f"[POST FATAL] {e}")
 
-            save_events_to_json()
 
 
+async def _emit_event(snapshot: Dict[str, str], prev_display: Optional[str], current_display: str) -> None:
 
-            # 서버 전송(앱 변경 즉시)
+    global _EMIT_SEQ
 
-            try:
+    _EMIT_SEQ += 1
 
-                await _post_signal_to_server_async(
+    seq = _EMIT_SEQ
 
-                    app_str=result["app"],
+    now = datetime.now()
 
-                    signal=result["signal"],
+    timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
 
-                    message=result["message"],
+    # 분석 시 문자열을 다시 파싱하지 않도록 같은 시각의 epoch 초를 함께 기록
 
-                )
+    ts = int(now.timestamp())
 
-            except Exception as e:
 
-                print(f"[POST FATAL] {e}")
 
+    use_llm = bool(os.getenv("OPENAI_API_KEY"))
 
+    current_app_str = snapshot_to_current_app_string(snapshot)
 
-            prev_display = current_display
 
-        await asyncio.sleep(POLL_INTERVAL)
 
+    # 1) 캐시된 판정(없으면 규칙 기반 판정)으로 즉시 기록/전송
 
+    cached = _cached_verdict(current_app_str) if use_llm else None
 
-async def monitor_activity_and_send_every_tick():
+    if cached is not None:
 
-    while True:
+        result = {"app": current_app_str, "signal": cached[0], "message": cached[1]}
 
-        snapshot = get_active_snapshot()
+    else:
 
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        result = build_quick_signal_json_from_snapshot(snapshot)
 
-        result = build_signal_json_from_snapshot(snapshot)
+    result_with_time = {"time": timestamp, **result}
 
-        result_with_time = {"time": timestamp, **result}
+    print(json.dumps(result_with_time, ensure_ascii=False), flush=True)
 
-        print(json.dumps(result_with_time, ensure_ascii=False), flush=True)
 
 
+    # 로컬 이벤트 로그
 
-        EVENT_HISTORY.append({
+    _record_event({
 
-            "time": timestamp,
+        "time": timestamp,
 
-            "from": None,
+        "ts": ts,
 
-            "to": snapshot.get("display", snapshot.get("app", "unknown")),
+        "from": prev_display,
 
-            "snapshot": snapshot,
+        "to": current_display,
 
-            "signal": result["signal"],
+        "snapshot": snapshot,
 
-            "message": result["message"],
+        "signal": result["signal"],
 
-        })
+        "message": result["message"],
 
-        save_events_to_json()
+    })
 
 
 
-        try:
+    # 서버 전송(앱 변경 즉시, 대기열을 통해 백그라운드로 전송)
 
-            await _post_signal_to_server_async(
+    _enqueue_result(result)
 
-                app_str=result["app"],
 
-                signal=result["signal"],
 
-                message=result["message"],
+    # 2) 캐시에 없으면 LLM 판정을 백그라운드에서 진행하고, 응답이 오면 결과를 보정
 
-            )
+    if use_llm and cached is None:
 
-        except Exception as e:
+        _spawn_background(_upgrade_with_llm(seq, timestamp, ts, snapshot, result))
+
+
+
+def _spawn_background(coro) -> None:
+
+    task = asyncio.create_task(coro)
+
+    _BACKGROUND_TASKS.add(task)
+
+    task.add_done_callback(_BACKGROUND_TASKS.discard)
+
+
+
+async def _upgrade_with_llm(
+
+    seq: int,
+
+    timestamp: str,
+
+    ts: int,
+
+    snapshot: Dict[str, str],
+
+    quick: Dict[str, object],
+
+) -> None:
+
+    verdict = await _llm_verdict_async(str(quick["app"]))
+
+    if verdict is None:
+
+        _defer_to_batch(str(quick["app"]))
+
+        return
+
+    if _BATCH_BACKLOG:
+
+        # 다시 연결되었으므로 그동안 판정을 못 받은 앱을 한 번에 판정
+
+        _spawn_background(_flush_batch_backlog())
+
+    signal, message = verdict
+
+    if seq != _EMIT_SEQ:
+
+        # 응답을 기다리는 사이 앱이 바뀌었으면 지난 판정은 보내지 않음
+
+        return
+
+    if signal == quick["signal"] and message == quick["message"]:
+
+        return
+
+
+
+    result = {"app": quick["app"], "signal": signal, "message": message}
+
+    print(json.dumps({"time": timestamp, **result, "upgraded": True}, ensure_ascii=False), flush=True)
+
+
+
+    # 앱 전환 기록이 아니라 같은 시각의 보정 기록 (from/to 없음)
+
+    # 분석기는 같은 시각 이벤트를 앞 이벤트를 대신하는 것으로 보므로 이 구간은 LLM 판정으로 집계됨
+
+    _record_event({
+
+        "time": timestamp,
+
+        "ts": ts,
+
+        "snapshot": snapshot,
+
+        "signal": signal,
+
+        "message": message,
+
+        "upgraded": True,
+
+    })
+
+
+
+    _enqueue_result(result)
+
+
+
+# ======== 실행 루프 ========
+
+_LOOP_LAG = LoopLagMonitor(report_interval=LOOP_LAG_REPORT)
+
+
+
+def loop_lag_stats() -> Dict[str, float]:
+
+    """모니터 이벤트 루프 지연 집계 (max/p99, ms)"""
+
+    return _LOOP_LAG.stats()
+
+
+
+def _create_change_source(kind: str) -> ChangeSource:
+
+    """CHANGE_SOURCE 설정에 맞는 변경 감지기 생성"""
+
+    if kind == "auto":
+
+        kind = "notify" if platform.system() == "Darwin" else "adaptive"
+
+    if kind == "notify":
+
+        return NotificationChangeSource(
+
+            get_active_snapshot_async,
+
+            lambda: process_line_notifications(MACOS_FOCUS_WATCHER_ARGV),
+
+            min_interval=ADAPTIVE_POLL_MIN,
+
+            max_interval=NOTIFY_POLL_MAX,
+
+            fallback_max_interval=ADAPTIVE_POLL_MAX,
+
+        )
+
+    if kind == "adaptive":
+
+        return AdaptivePollingSource(get_active_snapshot_async, min_interval=ADAPTIVE_POLL_MIN, max_interval=ADAPTIVE_POLL_MAX)
+
+    if kind != "poll":
+
+        print(f"[WARN] 알 수 없는 CHANGE_SOURCE={kind}, 고정 간격 폴링을 사용합니다.")
+
+    return FixedPollingSource(get_active_snapshot_async, interval=POLL_INTERVAL)
+
+
+
+async def monitor_activity_and_send_on_change():
+
+    source = _create_change_source(CHANGE_SOURCE)
+
+    print(f"[INFO] 변경 감지 방식: {source.name}")
+
+    prev_display: Optional[str] = None
+
+    _LOOP_LAG.start()
+
+    await prepare_usage_aggregate()
+
+    _spawn_background(warm_classification_cache())
+
+    try:
+
+        while True:
+
+            snapshot = await source.next_change(prev_display)
+
+            current_display = display_of(snapshot)
+
+            await _emit_event(snapshot, prev_display, current_display)
+
+            prev_display = current_display
+
+    finally:
+
+        await source.close()
+
+        await _stop_event_uploader()
+
+        await asyncio.to_thread(checkpoint_usage_aggregate)
+
+        await _LOOP_LAG.stop()
+
+
+
+async def monitor_activity_and_send_every_tick():
+
+    _LOOP_LAG.start()
+
+    await prepare_usage_aggregate()
+
+    try:
+
+        while True:
+
+            snapshot = await get_active_snapshot_async()
+
+            await _emit_event(snapshot, None, display_of(snapshot))
+
+            await asyncio.sleep(POLL_INTERVAL)
 
-            print(f"[POST FATAL] {e}")
+    finally:
 
+        await _stop_event_uploader()
 
+        await asyncio.to_thread(checkpoint_usage_aggregate)
 
-        await asyncio.sleep(POLL_INTERVAL)
+        await _LOOP_LAG.stop()
 
 
 
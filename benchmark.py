@@ -0,0 +1,1233 @@
+# -*- coding: utf-8 -*-
+"""
+성능 측정 스크립트
+- 사용법: python benchmark.py <항목> [옵션]
+- openai-client: 호출마다 OpenAI 클라이언트를 새로 만드는 방식 vs 클라이언트 재사용 (로컬 스텁 서버)
+- snapshot: 폴링마다 프로세스 실행(spawn) vs 상주 도우미 프로세스(helper) 스냅샷 지연
+- change-detect: 고정 폴링 vs 적응형 폴링 vs 포커스 알림 (가상 포커스 변경으로 감지 지연/조회 횟수/CPU 비교)
+- loop-lag: 스냅샷 조회를 루프에서 직접 호출 vs 전용 스레드(ExecutorSnapshotProber) 실행 시 이벤트 루프 지연
+- classify: 규칙 기반(폴백) 분류 처리량 (초당 분류 횟수)
+- llm-batch: 처음 보는 앱 여러 개를 하나씩 판정 vs 배치 판정 (로컬 스텁 서버, 항목별 실패 포함)
+- message-pool: 메시지 풀 선택 속도와 최근 메시지 반복 횟수
+- finish: /finish 동시 요청 몰림 (기존 방식: 기본 스레드풀의 동기 엔드포인트 vs 작업 풀 + 429/503)
+- finish-cache: 같은 /finish 요청 반복 시 응답 캐시/ETag(304) 효과, 로그 추가 후 무효화
+- finish-users: 교실 전체 로그 하나 분석 vs 사용자별 세그먼트 저장소(처음 조회/메모리에 있는 사용자)
+- aggregate: 로그 전체 분석 vs 모니터가 저장한 집계 체크포인트 + 로그 꼬리만 읽기, 기록 시 집계 갱신 비용
+- columnar: 이벤트 dict 루프(AppAnalyzer) vs NumPy 열 배열(ColumnarEvents) 분석, 합성 로그 1M 이벤트
+- parse-time: 이벤트 시각 파싱 처리량 (strptime vs 고정 폭 파서 vs 숫자 ts 필드), 큰 로그 전체 분석 시간
+- binary-log: JSON 배열/JSON Lines/바이너리 로그의 파일 크기, 이벤트 읽기 시간, 헤더만 읽는 분석 시간
+- log-memory: 큰 로그 분석 시 최대 RSS와 시간 (파일 전체 읽기 + 전체 파싱 vs 메모리 매핑 후 줄/레코드 단위 처리)
+- ingest: 여러 에이전트가 POST /ingest로 이벤트 묶음 전송(재전송 포함) 처리량, 수집 집계로 답하는 /finish 지연
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+
+# ======== 공용 유틸 ========
+def _summarize(label: str, samples_ms: List[float]):
+    """지연 시간 샘플 요약 출력 (ms)"""
+    samples = sorted(samples_ms)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{label:<28} n={len(samples):<6} mean={statistics.mean(samples):8.3f}ms "
+          f"p50={statistics.median(samples):8.3f}ms p95={p95:8.3f}ms")
+
+
+def _start_stub_openai_server(delay: float = 0.0, drop_every: int = 0,
+                              stats: Optional[Dict[str, int]] = None) -> Tuple[str, Callable[[], None]]:
+    """
+    OpenAI 호환 /v1/chat/completions 스텁 서버를 백그라운드 스레드에서 실행
+
+    사용자 메시지에 "items"가 있으면 배치 판정 형식({"results": [...]})으로,
+    "variation_count"가 있으면 메시지 풀 보충 형식({"messages": [...]})으로 응답함
+
+    Args:
+        delay: 응답 전 대기 시간 (초, 모델 추론 시간 흉내)
+        drop_every: 배치 응답에서 drop_every번째 항목마다 결과를 빼고 응답 (항목별 실패 흉내, 0이면 안 뺌)
+        stats: 요청/항목 수를 누적할 딕셔너리 ("requests", "items")
+
+    Returns:
+        (base_url, stop 함수)
+    """
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    state: Dict[str, object] = {}
+    counters = stats if stats is not None else {}
+    counters.setdefault("requests", 0)
+    counters.setdefault("items", 0)
+
+    async def chat(request: web.Request) -> web.Response:
+        body = await request.json()
+        if delay:
+            await asyncio.sleep(delay)
+        counters["requests"] += 1
+        try:
+            user = json.loads(body["messages"][-1]["content"])
+        except Exception:
+            user = {}
+        if isinstance(user, dict) and user.get("variation_count"):
+            # 메시지 풀 보충 요청
+            counters["items"] += 1
+            n = int(user["variation_count"])
+            content = json.dumps(
+                {"messages": [f"{{name}} 흐름 좋아요, {i + 1}번째 구간만 더 이어가볼까요?" for i in range(n)]},
+                ensure_ascii=False,
+            )
+        elif isinstance(user, dict) and isinstance(user.get("items"), list):
+            results = []
+            for n, item in enumerate(user["items"], start=1):
+                counters["items"] += 1
+                if drop_every and n % drop_every == 0:
+                    continue
+                signal = 2 if item.get("app_core") in ("lol", "steam") else 0
+                results.append({"id": item["id"], "signal": signal,
+                                "message": "지금 학습 흐름 좋아요, 한 구간만 더 몰입해볼까요?"})
+            content = json.dumps({"results": results}, ensure_ascii=False)
+        else:
+            counters["items"] += 1
+            content = json.dumps(
+                {"signal": 0, "message": "지금 학습 흐름 좋아요, 한 구간만 더 몰입해볼까요?"},
+                ensure_ascii=False,
+            )
+        return web.json_response({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        })
+
+    async def _serve():
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", chat)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        state["runner"] = runner
+        state["port"] = site._server.sockets[0].getsockname()[1]
+        started.set()
+
+    def _run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(_serve())
+        loop.run_forever()
+
+    thread = threading.Thread(target=_run, daemon=True)
+    thread.start()
+    started.wait()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(state["runner"].cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+
+    return f"http://127.0.0.1:{state['port']}/v1", stop
+
+
+# ======== openai-client ========
+def bench_openai_client(calls: int, delay: float):
+    """호출마다 클라이언트 생성 vs OpenAIClientManager 재사용 호출 지연 비교"""
+    from openai import OpenAI
+    from openai_client import OpenAIClientManager
+
+    base_url, stop = _start_stub_openai_server(delay)
+    os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+    os.environ["OPENAI_BASE_URL"] = base_url
+    request = {
+        "model": "gpt-4o-mini",
+        "temperature": 0.6,
+        "response_format": {"type": "json_object"},
+        "messages": [{"role": "user", "content": "{}"}],
+        "timeout": 20,
+    }
+
+    try:
+        per_call: List[float] = []
+        for _ in range(calls):
+            t0 = time.perf_counter()
+            client = OpenAI(api_key="sk-benchmark", base_url=base_url)
+            client.chat.completions.create(**request)
+            client.close()
+            per_call.append((time.perf_counter() - t0) * 1000.0)
+
+        manager = OpenAIClientManager()
+        manager.sync_client().chat.completions.create(**request)  # 연결 준비
+        shared: List[float] = []
+        for _ in range(calls):
+            t0 = time.perf_counter()
+            manager.sync_client().chat.completions.create(**request)
+            shared.append((time.perf_counter() - t0) * 1000.0)
+        manager.close()
+    finally:
+        stop()
+
+    print(f"[openai-client] stub={base_url} delay={delay}s calls={calls}")
+    _summarize("new client per call", per_call)
+    _summarize("shared client (pooled)", shared)
+    print(f"mean speedup: {statistics.mean(per_call) / statistics.mean(shared):.2f}x")
+
+
+# ======== snapshot ========
+# macOS가 아닌 환경에서 osascript 대신 쓰는 파이썬 도우미 (한 번 실행 / 상주)
+_FAKE_SNAPSHOT = '{"app": "Google Chrome", "window": "LeetCode", "url": "https://leetcode.com/problems"}'
+_FAKE_ONE_SHOT = f"print({_FAKE_SNAPSHOT!r})"
+_FAKE_HELPER_LOOP = (
+    "import sys\n"
+    "for _ in sys.stdin:\n"
+    f"    sys.stdout.write({_FAKE_SNAPSHOT!r} + '\\n')\n"
+    "    sys.stdout.flush()\n"
+)
+
+
+def bench_snapshot(polls: int, real: bool):
+    """폴링마다 프로세스를 띄우는 방식과 상주 도우미 방식의 스냅샷 지연 비교"""
+    from snapshot_backends import (
+        MACOS_HELPER_ARGV,
+        CallableSnapshotBackend,
+        PersistentHelperBackend,
+    )
+
+    if real:
+        if platform.system() != "Darwin":
+            print("[snapshot] --real은 macOS에서만 사용할 수 있습니다.")
+            return
+        import app_monitor
+
+        spawn = CallableSnapshotBackend(app_monitor._spawn_snapshot)
+        helper = PersistentHelperBackend(MACOS_HELPER_ARGV, postprocess=app_monitor._snapshot_from_raw)
+        label = "osascript"
+    else:
+        def _spawn_once() -> Dict[str, str]:
+            out = subprocess.run([sys.executable, "-c", _FAKE_ONE_SHOT], capture_output=True, text=True).stdout
+            return json.loads(out)
+
+        spawn = CallableSnapshotBackend(_spawn_once)
+        helper = PersistentHelperBackend([sys.executable, "-u", "-c", _FAKE_HELPER_LOOP])
+        label = "python stand-in"
+
+    results = {}
+    for name, backend in (("spawn per poll", spawn), ("persistent helper", helper)):
+        backend.snapshot()  # 도우미 기동 비용은 측정에서 제외
+        samples: List[float] = []
+        cpu0 = time.process_time()
+        children0 = os.times()
+        for _ in range(polls):
+            t0 = time.perf_counter()
+            backend.snapshot()
+            samples.append((time.perf_counter() - t0) * 1000.0)
+        children1 = os.times()
+        cpu = (time.process_time() - cpu0) + (children1.children_user - children0.children_user) \
+            + (children1.children_system - children0.children_system)
+        backend.close()
+        results[name] = samples
+        _summarize(name, samples)
+        print(f"{'':<28} cpu/poll={cpu / polls * 1000.0:.3f}ms (부모 + 종료된 자식 프로세스)")
+
+    print(f"[snapshot] backend={label} polls={polls} "
+          f"mean speedup: {statistics.mean(results['spawn per poll']) / statistics.mean(results['persistent helper']):.2f}x")
+
+
+# ======== change-detect ========
+async def _run_change_source(kind: str, timeline, args) -> Dict[str, object]:
+    from change_sources import (
+        AdaptivePollingSource,
+        FixedPollingSource,
+        NotificationChangeSource,
+        SimulatedFocusWorld,
+        display_of,
+    )
+
+    world = SimulatedFocusWorld(timeline, probe_cost=args.probe_cost / 1000.0, notify_ratio=args.notify_ratio)
+    scale = args.scale
+    if kind == "poll":
+        source = FixedPollingSource(world.probe, interval=1.0 * scale)
+    elif kind == "adaptive":
+        source = AdaptivePollingSource(world.probe, min_interval=0.25 * scale, max_interval=2.0 * scale)
+    else:
+        source = NotificationChangeSource(world.probe, world.notifications,
+                                          min_interval=0.25 * scale, max_interval=5.0 * scale)
+
+    world.start()
+    latencies: List[float] = []
+    cpu0 = time.process_time()
+    prev = None
+    try:
+        while True:
+            remaining = world.duration + 1.0 * scale - (time.monotonic() - world._start)
+            if remaining <= 0:
+                break
+            try:
+                snapshot = await asyncio.wait_for(source.next_change(prev), remaining)
+            except asyncio.TimeoutError:
+                break
+            now = time.monotonic()
+            display = display_of(snapshot)
+            if prev is not None:
+                latencies.append((now - world.change_time(display)) * 1000.0)
+            prev = display
+    finally:
+        await source.close()
+    cpu = time.process_time() - cpu0
+    return {"latencies": latencies, "stats": source.stats(), "cpu": cpu, "duration": world.duration}
+
+
+def bench_change_detect(args):
+    """가상 포커스 변경 타임라인으로 변경 감지 방식별 지연/조회 횟수/CPU 비교"""
+    from change_sources import SimulatedFocusWorld
+
+    timeline = SimulatedFocusWorld.random_timeline(args.changes, args.mean_gap * args.scale, seed=args.seed)
+    print(f"[change-detect] changes={args.changes} mean_gap={args.mean_gap}s scale={args.scale} "
+          f"probe_cost={args.probe_cost}ms notify_ratio={args.notify_ratio} "
+          f"(지연은 scale이 적용된 시간, 1/scale배 하면 실제 간격 기준)")
+    for kind in ("poll", "adaptive", "notify"):
+        result = asyncio.run(_run_change_source(kind, timeline, args))
+        samples = result["latencies"] or [0.0]
+        _summarize(f"{kind} latency", samples)
+        stats = result["stats"]
+        print(f"{'':<28} detected={len(result['latencies'])}/{args.changes} probes={stats['probes']} "
+              f"probes/s={stats['probes'] / max(result['duration'], 1e-9):.2f} cpu={result['cpu'] * 1000.0:.1f}ms")
+
+
+# ======== loop-lag ========
+async def _run_loop_lag(mode: str, args) -> Tuple[Dict[str, float], Dict[str, int]]:
+    from loop_lag import LoopLagMonitor
+    from snapshot_backends import ExecutorSnapshotProber
+
+    calls = {"n": 0}
+
+    def slow_probe() -> Dict[str, str]:
+        # 보통은 probe_ms만큼 걸리고, hang_every번째 호출마다 hang_ms 동안 멈춤 (멈춘 osascript 흉내)
+        calls["n"] += 1
+        hang = args.hang_every and calls["n"] % args.hang_every == 0
+        time.sleep((args.hang_ms if hang else args.probe_ms) / 1000.0)
+        return {"app": "Code", "window": "", "display": "Code"}
+
+    lag = LoopLagMonitor(interval=0.01)
+    lag.start()
+    prober = ExecutorSnapshotProber(slow_probe, timeout=args.timeout_ms / 1000.0, stale_max_age=10.0)
+    try:
+        for _ in range(args.polls):
+            if mode == "direct":
+                slow_probe()
+            else:
+                await prober.snapshot()
+            await asyncio.sleep(args.interval_ms / 1000.0)
+    finally:
+        await lag.stop()
+        prober.close()
+    return lag.stats(), prober.stats()
+
+
+def bench_loop_lag(args):
+    """스냅샷 조회 방식별 이벤트 루프 지연(max/p99) 비교"""
+    print(f"[loop-lag] polls={args.polls} interval={args.interval_ms}ms probe={args.probe_ms}ms "
+          f"hang={args.hang_ms}ms every {args.hang_every} polls timeout={args.timeout_ms}ms")
+    for mode in ("direct", "executor"):
+        lag, prober = asyncio.run(_run_loop_lag(mode, args))
+        print(f"{mode:<28} lag max={lag['max_ms']:8.3f}ms p99={lag['p99_ms']:8.3f}ms "
+              f"mean={lag['mean_ms']:8.3f}ms samples={lag['samples']}")
+        if mode == "executor":
+            print(f"{'':<28} probes={prober['probes']} timeouts={prober['timeouts']} "
+                  f"stale_served={prober['stale_served']}")
+
+
+# ======== classify ========
+_CLASSIFY_SAMPLES = [
+    "chrome(github.com)", "chrome(docs.github.com)", "safari(youtube.com)", "chrome(m.youtube.com)",
+    "edge(cs.stanford.edu)", "chrome(example.com)", "chrome", "pycharm", "vscode", "lol",
+    "steam", "kakaotalk", "firefox(arxiv.org)", "chrome(colab.research.google.com)", "notion", "finder",
+]
+
+
+def _rate(label: str, fn: Callable[[str], object], n: int):
+    samples = _CLASSIFY_SAMPLES
+    k = len(samples)
+    t0 = time.perf_counter()
+    for i in range(n):
+        fn(samples[i % k])
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<28} n={n:<8} {n / elapsed:14,.0f} /s  ({elapsed / n * 1e9:8.1f} ns/op)")
+
+
+def bench_classify(n: int, swap_ms: float):
+    """규칙 분류 처리량: 컴파일된 규칙 / RuleBook / 메시지 선택까지 포함한 전체 / 규칙 교체 중 조회"""
+    import app_monitor
+    from classification_rules import CompiledRules, RuleBook
+
+    rules = CompiledRules.from_file(app_monitor.CLASSIFICATION_RULES_FILE)
+    book = RuleBook(app_monitor.CLASSIFICATION_RULES_FILE, watch=False)
+    parse = app_monitor._parse_app
+    print(f"[classify] rules={rules.source} v{rules.version} domains={rules.domains.size}")
+    _rate("compiled rules", lambda s: rules.classify(*parse(s)), n)
+    _rate("rule book", lambda s: book.classify(*parse(s)), n)
+    _rate("_fallback_classify", app_monitor._fallback_classify, n)
+
+    # 다른 스레드가 swap_ms마다 규칙을 다시 컴파일해 교체하는 동안의 조회 처리량
+    stop = threading.Event()
+
+    def swapper():
+        while not stop.wait(swap_ms / 1000.0):
+            book.reload(force=True)
+
+    thread = threading.Thread(target=swapper, daemon=True)
+    thread.start()
+    try:
+        _rate(f"rule book (swap/{swap_ms:g}ms)", lambda s: book.classify(*parse(s)), n)
+    finally:
+        stop.set()
+        thread.join()
+    print(f"{'':<28} swaps={book.reloads - 1}")
+
+
+# ======== llm-batch ========
+def bench_llm_batch(apps: int, batch_size: int, delay: float, drop_every: int):
+    """처음 보는 앱 apps개: step2를 하나씩 호출 vs classify_apps_batch_async 배치 판정"""
+    import tempfile
+
+    stats: Dict[str, int] = {}
+    base_url, stop = _start_stub_openai_server(delay, drop_every=drop_every, stats=stats)
+    os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+    os.environ["OPENAI_BASE_URL"] = base_url
+    tmpdir = tempfile.mkdtemp(prefix="bench-llm-batch-")
+    os.environ["CLASSIFICATION_CACHE_FILE"] = os.path.join(tmpdir, "single.db")
+    # 요청 수 비교에 섞이지 않도록 메시지 풀 보충은 끔
+    os.environ["MESSAGE_POOL_FILE"] = ""
+    os.environ["MESSAGE_POOL_MIN"] = "0"
+    os.environ["MESSAGE_POOL_REFRESH"] = "0"
+    import app_monitor
+    from classification_cache import ClassificationCache
+
+    names = [f"chrome(site{i}.example.com)" for i in range(apps)]
+    try:
+        t0 = time.perf_counter()
+        for name in names:
+            app_monitor.step2_llm_signal_and_message(name)
+        single = time.perf_counter() - t0
+        single_requests = stats["requests"]
+        print(f"[llm-batch] stub={base_url} delay={delay}s apps={apps} batch_size={batch_size} drop_every={drop_every}")
+        print(f"{'one request per app':<28} {single * 1000.0:10.1f}ms requests={single_requests}")
+
+        app_monitor._CLASSIFICATION_CACHE = ClassificationCache(os.path.join(tmpdir, "batch.db"))
+        stats["requests"] = 0
+        t0 = time.perf_counter()
+        results = asyncio.run(app_monitor.classify_apps_batch_async(names, batch_size=batch_size))
+        batch = time.perf_counter() - t0
+        sources: Dict[str, int] = {}
+        for item in results.values():
+            sources[item["source"]] = sources.get(item["source"], 0) + 1
+        print(f"{'batch':<28} {batch * 1000.0:10.1f}ms requests={stats['requests']} sources={sources} "
+              f"cached={app_monitor._CLASSIFICATION_CACHE.stats()['entries']}")
+
+        again = asyncio.run(app_monitor.classify_apps_batch_async(names, batch_size=batch_size))
+        print(f"{'batch (second run)':<28} cache hits={sum(1 for v in again.values() if v['source'] == 'cache')}/{apps}")
+    finally:
+        stop()
+
+
+# ======== message-pool ========
+def bench_message_pool(n: int):
+    """메시지 풀 선택 처리량과 최근 8개 메시지와의 반복 횟수"""
+    from collections import deque
+
+    os.environ["MESSAGE_POOL_FILE"] = ""
+    import app_monitor
+
+    pool = app_monitor.MESSAGE_POOL
+    recent: deque = deque(maxlen=8)
+    keys = pool.keys()
+    repeats = 0
+    t0 = time.perf_counter()
+    for i in range(n):
+        message = pool.pick(keys[i % len(keys)], name="github.com", recent=recent)
+        if message in recent:
+            repeats += 1
+        recent.append(message)
+    elapsed = time.perf_counter() - t0
+    print(f"[message-pool] keys={len(keys)} templates={sum(pool.size(k) for k in keys)}")
+    print(f"{'pick':<28} n={n:<8} {n / elapsed:14,.0f} /s  ({elapsed / n * 1e9:8.1f} ns/op) repeats={repeats}")
+
+
+# ======== finish ========
+_BENCH_APPS = ["chrome(github.com)", "pycharm", "chrome(youtube.com)", "notion", "kakaotalk", "vscode"]
+
+
+def _write_activity_log(path: str, events: int, start: float = 1767225600.0):
+    """events개의 JSON Lines 이벤트를 1초 간격으로 기록"""
+    from datetime import datetime
+
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(events):
+            app_name = _BENCH_APPS[(i // 7) % len(_BENCH_APPS)]
+            f.write(json.dumps({
+                "time": datetime.fromtimestamp(start + i).strftime("%Y-%m-%d %H:%M:%S"),
+                "app": app_name,
+                "signal": 0 if app_name in ("chrome(github.com)", "pycharm", "notion", "vscode") else 1,
+                "message": "",
+            }, ensure_ascii=False) + "\n")
+
+
+def _start_api_server(app) -> Tuple[str, Callable[[], None]]:
+    """FastAPI 앱을 백그라운드 스레드의 uvicorn으로 실행 (base_url, stop 함수 반환)"""
+    import socket
+
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    def stop():
+        server.should_exit = True
+        thread.join(timeout=5)
+
+    return f"http://127.0.0.1:{port}", stop
+
+
+async def _finish_burst(base_url: str, path: str, requests: int, distinct: int) -> Dict[str, object]:
+    """requests개의 /finish 요청을 한꺼번에 보내고, 그동안 /health 응답 지연을 측정"""
+    import aiohttp
+
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    health_ms: List[float] = []
+    done = asyncio.Event()
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+        async def one(i: int):
+            t0 = time.perf_counter()
+            async with session.get(f"{base_url}{path}?time={600 + i % distinct}") as resp:
+                await resp.read()
+                statuses[resp.status] = statuses.get(resp.status, 0) + 1
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+
+        async def probe_health():
+            while not done.is_set():
+                t0 = time.perf_counter()
+                async with session.get(f"{base_url}/health") as resp:
+                    await resp.read()
+                health_ms.append((time.perf_counter() - t0) * 1000.0)
+                await asyncio.sleep(0.02)
+
+        prober = asyncio.create_task(probe_health())
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - t0
+        done.set()
+        await prober
+    return {"latencies": latencies, "statuses": statuses, "health": health_ms or [0.0], "elapsed": elapsed}
+
+
+def bench_finish(events: int, requests: int, distinct: int, workers: int, queue_max: int):
+    """같은 로그에 /finish 요청이 몰릴 때: 동기 엔드포인트(기존) vs 작업 풀 엔드포인트"""
+    import tempfile
+
+    tmpdir = tempfile.mkdtemp(prefix="bench-finish-")
+    log_path = os.path.join(tmpdir, "activity_log.json")
+    _write_activity_log(log_path, events)
+    os.environ["FINISH_WORKERS"] = str(workers)
+    os.environ["FINISH_QUEUE_MAX"] = str(queue_max)
+    os.environ["FINISH_CACHE_MAX"] = "0"  # 작업 풀만 비교
+    import finish_api_server as server
+    from analysis_pool import StageTimer
+    from app_analyzer import AppAnalyzer
+
+    server.JSON_FILE = log_path
+
+    @server.app.get("/finish-sync")
+    def finish_sync(time: int):
+        # 기존 방식: 기본 스레드풀에서 요청마다 분석
+        return server._build_finish_result(StageTimer(), time, server.app_analyzer)
+
+    base_url, stop = _start_api_server(server.app)
+    # 증분 모드는 두 번째 요청부터 거의 일이 없으므로, 요청마다 전체를 다시 읽는 분석기로 부하를 만듦
+    server.app_analyzer = AppAnalyzer(log_path, incremental=False)
+    print(f"[finish] events={events} requests={requests} distinct_time={distinct} "
+          f"workers={workers} queue_max={queue_max}")
+    try:
+        for label, path in (("sync endpoint", "/finish-sync"), ("worker pool", "/finish")):
+            result = asyncio.run(_finish_burst(base_url, path, requests, distinct))
+            _summarize(f"{label} latency", result["latencies"])
+            _summarize(f"{label} /health", result["health"])
+            print(f"{'':<28} burst={result['elapsed'] * 1000.0:.0f}ms statuses={dict(sorted(result['statuses'].items()))}")
+        pool = server.analysis_pool.stats()
+        print(f"{'':<28} pool submitted={pool['submitted']} coalesced={pool['coalesced']} "
+              f"429={pool['rejected_429']} 503={pool['rejected_503']} avg_job={pool['avg_job_ms']}ms")
+    finally:
+        stop()
+
+
+def bench_finish_cache(events: int, repeats: int):
+    """같은 time으로 반복 요청: 캐시 없음 / 캐시 적중 / If-None-Match(304) / 로그 추가 직후"""
+    import tempfile
+    import urllib.request
+    from urllib.error import HTTPError
+
+    tmpdir = tempfile.mkdtemp(prefix="bench-finish-cache-")
+    log_path = os.path.join(tmpdir, "activity_log.json")
+    _write_activity_log(log_path, events)
+    import finish_api_server as server
+    from app_analyzer import AppAnalyzer
+
+    server.JSON_FILE = log_path
+    base_url, stop = _start_api_server(server.app)
+    # 로그를 매번 전체로 다시 읽는 분석기 (캐시가 없으면 요청마다 전체 분석)
+    server.app_analyzer = AppAnalyzer(log_path, incremental=False)
+
+    def get(etag: Optional[str] = None) -> Tuple[int, Optional[str], int]:
+        request = urllib.request.Request(f"{base_url}/finish?time=3600")
+        if etag:
+            request.add_header("If-None-Match", etag)
+        try:
+            with urllib.request.urlopen(request) as resp:
+                return resp.status, resp.headers.get("ETag"), len(resp.read())
+        except HTTPError as e:
+            return e.code, e.headers.get("ETag"), 0
+
+    def run(label: str, etag: Optional[str] = None) -> Optional[str]:
+        samples = []
+        status = body = 0
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            status, etag_seen, body = get(etag)
+            samples.append((time.perf_counter() - t0) * 1000.0)
+        _summarize(label, samples)
+        print(f"{'':<28} status={status} body={body}B")
+        return etag_seen
+
+    print(f"[finish-cache] events={events} repeats={repeats}")
+    try:
+        server.response_cache.max_entries = 0
+        run("no cache")
+        server.response_cache.max_entries = 256
+        etag = run("cache")
+        run("If-None-Match (304)", etag)
+        # 로그에 이벤트가 추가되면 서명이 바뀌어 첫 요청은 다시 계산
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"time": "2026-01-02 00:00:00", "app": "pycharm", "signal": 0, "message": ""}) + "\n")
+        t0 = time.perf_counter()
+        status, new_etag, _ = get(etag)
+        print(f"{'after append':<28} {(time.perf_counter() - t0) * 1000.0:8.3f}ms status={status} "
+              f"etag_changed={new_etag != etag}")
+        print(f"{'':<28} cache={server.response_cache.stats()}")
+    finally:
+        stop()
+
+
+def bench_finish_users(users: int, events: int, hot: int, queries: int, segment_kb: int):
+    """사용자 users명 x 이벤트 events개: 교실 전체 로그 하나 vs 사용자별 세그먼트 + 최근 사용자 분석기 LRU"""
+    import random
+    import tempfile
+    from datetime import datetime
+
+    from app_analyzer import AppAnalyzer, SegmentedAppAnalyzer
+    from user_logs import HotAnalyzers, UserLogIndex, UserSegmentWriter
+
+    tmpdir = tempfile.mkdtemp(prefix="bench-finish-users-")
+    store = os.path.join(tmpdir, "store")
+    shared_path = os.path.join(tmpdir, "classroom.jsonl")
+    emails = [f"student{i:03d}@example.com" for i in range(users)]
+    writers = [UserSegmentWriter(store, "room-a", email, segment_max_bytes=segment_kb * 1024) for email in emails]
+    start = 1767225600.0
+    with open(shared_path, "w", encoding="utf-8") as shared:
+        for i in range(events):
+            stamp = datetime.fromtimestamp(start + i).strftime("%Y-%m-%d %H:%M:%S")
+            for u, writer in enumerate(writers):
+                app_name = _BENCH_APPS[(i // 7 + u) % len(_BENCH_APPS)]
+                event = {"time": stamp, "app": app_name, "signal": 0 if app_name in ("pycharm", "notion") else 1,
+                         "message": "", "email": emails[u]}
+                writer.append(event)
+                shared.write(json.dumps(event, ensure_ascii=False) + "\n")
+    for writer in writers:
+        writer.close()
+
+    index = UserLogIndex(store)
+    print(f"[finish-users] users={users} events/user={events} segments/user={len(index.segments('room-a', emails[0]))} "
+          f"hot={hot} queries={queries}")
+
+    t0 = time.perf_counter()
+    AppAnalyzer(shared_path, incremental=False).analyze()
+    print(f"{'classroom log (all users)':<28} {(time.perf_counter() - t0) * 1000.0:10.1f}ms per request (기존: email 무시)")
+
+    analyzers = HotAnalyzers(
+        lambda user: SegmentedAppAnalyzer(lambda: index.segments(*user), name=user[1]), max_resident=hot
+    )
+    rng = random.Random(0)
+    cold: List[float] = []
+    warm: List[float] = []
+    for _ in range(queries):
+        # 최근 접속한 일부 사용자에게 요청이 몰리는 분포
+        email = emails[min(users - 1, int(rng.paretovariate(1.2)) - 1)]
+        loads = analyzers.stats()["loads"]
+        t0 = time.perf_counter()
+        analyzers.get(("room-a", email)).analyze()
+        elapsed = (time.perf_counter() - t0) * 1000.0
+        (cold if analyzers.stats()["loads"] > loads else warm).append(elapsed)
+    if cold:
+        _summarize("per-user (load)", cold)
+    if warm:
+        _summarize("per-user (resident)", warm)
+    print(f"{'':<28} {analyzers.stats()}")
+
+
+def bench_aggregate(events: int, tail: int, records: int):
+    """events개 로그: 전체 분석 / 증분 분석기 시작 / 체크포인트(마지막 tail개 제외) + 꼬리 읽기"""
+    import contextlib
+    import io
+    import tempfile
+    from datetime import datetime
+
+    from app_analyzer import AppAnalyzer, CheckpointedAppAnalyzer
+    from event_log import open_event_log
+
+    tmpdir = tempfile.mkdtemp(prefix="bench-aggregate-")
+    log_path = os.path.join(tmpdir, "activity_log.json")
+    start = 1767225600.0
+    _write_activity_log(log_path, events - tail, start=start)
+    with contextlib.redirect_stdout(io.StringIO()):
+        CheckpointedAppAnalyzer(log_path).checkpoint()
+    with open(log_path, "a", encoding="utf-8") as f:
+        for i in range(events - tail, events):
+            f.write(json.dumps({"time": datetime.fromtimestamp(start + i).strftime("%Y-%m-%d %H:%M:%S"),
+                                "app": _BENCH_APPS[(i // 7) % len(_BENCH_APPS)], "signal": 1, "message": ""}) + "\n")
+
+    print(f"[aggregate] events={events} tail(after checkpoint)={tail}")
+
+    def timed(label: str, make: Callable[[], AppAnalyzer]):
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = make().analyze()
+        print(f"{label:<28} {(time.perf_counter() - t0) * 1000.0:10.1f}ms events={result.event_count}")
+        return result
+
+    full = timed("full log (per request)", lambda: AppAnalyzer(log_path, incremental=False))
+    timed("incremental (cold start)", lambda: AppAnalyzer(log_path, incremental=True))
+    checkpointed = timed("checkpoint + tail", lambda: CheckpointedAppAnalyzer(log_path))
+    print(f"{'':<28} same result={full == checkpointed}")
+
+    # 모니터 쪽 비용: 이벤트 기록만 vs 기록 + 집계 갱신, 체크포인트 저장 1회
+    sample = [{"time": datetime.fromtimestamp(start + i).strftime("%Y-%m-%d %H:%M:%S"),
+               "app": _BENCH_APPS[i % len(_BENCH_APPS)], "signal": i % 2, "message": ""} for i in range(records)]
+    writer = open_event_log(os.path.join(tmpdir, "append_only.json"), fsync_every=10 ** 9, fsync_interval=10 ** 9)
+    t0 = time.perf_counter()
+    for event in sample:
+        writer.append(event)
+    append_us = (time.perf_counter() - t0) / records * 1e6
+    writer.close()
+    record_path = os.path.join(tmpdir, "record.json")
+    writer = open_event_log(record_path, fsync_every=10 ** 9, fsync_interval=10 ** 9)
+    with contextlib.redirect_stdout(io.StringIO()):
+        aggregate = CheckpointedAppAnalyzer(record_path)
+    t0 = time.perf_counter()
+    for event in sample:
+        aggregate.record(event, writer.append(event))
+    record_us = (time.perf_counter() - t0) / records * 1e6
+    t0 = time.perf_counter()
+    aggregate.checkpoint()
+    checkpoint_ms = (time.perf_counter() - t0) * 1000.0
+    writer.close()
+    print(f"{'append only':<28} {append_us:10.1f}us/event")
+    print(f"{'append + record()':<28} {record_us:10.1f}us/event")
+    print(f"{'checkpoint()':<28} {checkpoint_ms:10.2f}ms ({os.path.getsize(aggregate.checkpoint_file)}B)")
+
+
+def _synthetic_events(n: int, start: float = 1767225600.0) -> List[Dict]:
+    """n개 합성 이벤트 (1~30초 간격, 앱은 몇 개씩 이어서 전환)"""
+    import random
+    from datetime import datetime
+
+    rng = random.Random(0)
+    events = []
+    t = start
+    app_name = _BENCH_APPS[0]
+    for _ in range(n):
+        if rng.random() < 0.3:
+            app_name = rng.choice(_BENCH_APPS)
+        events.append({"time": datetime.fromtimestamp(t).strftime("%Y-%m-%d %H:%M:%S"), "app": app_name,
+                       "signal": 0 if app_name in ("pycharm", "notion", "vscode") else 1, "message": ""})
+        t += rng.randint(1, 30)
+    return events
+
+
+def bench_columnar(events: int, window: int):
+    """events개 이벤트: dict 루프 누적 vs 열 배열(np.diff/np.bincount) 분석, 구간별 통계"""
+    from app_analyzer import AppAnalyzer, _UsageAccumulator, event_app_name, parse_event_time
+    from columnar_events import ColumnarEvents
+
+    print(f"[columnar] events={events:,} window={window}s")
+    t0 = time.perf_counter()
+    sample = _synthetic_events(events)
+    print(f"{'generate':<28} {(time.perf_counter() - t0) * 1000.0:10.1f}ms")
+
+    analyzer = AppAnalyzer.__new__(AppAnalyzer)  # 파일 없이 _accumulate만 사용
+    t0 = time.perf_counter()
+    expected = analyzer._accumulate(sample).to_analysis()
+    print(f"{'dict loop (parse+sum)':<28} {(time.perf_counter() - t0) * 1000.0:10.1f}ms")
+
+    # 시각 파싱을 뺀 순수 집계 루프
+    parsed = [(parse_event_time(e), event_app_name(e), e.get("signal", 1)) for e in sample]
+    t0 = time.perf_counter()
+    acc = _UsageAccumulator()
+    for time_sec, app_name, signal in parsed:
+        acc.add(time_sec, app_name, signal)
+    acc.to_analysis()
+    loop_ms = (time.perf_counter() - t0) * 1000.0
+    print(f"{'dict loop (sum only)':<28} {loop_ms:10.1f}ms")
+
+    t0 = time.perf_counter()
+    columns = ColumnarEvents.from_events(sample)
+    print(f"{'columnar build (parse)':<28} {(time.perf_counter() - t0) * 1000.0:10.1f}ms "
+          f"({columns.times.nbytes + columns.signals.nbytes + columns.app_ids.nbytes:,}B arrays)")
+    t0 = time.perf_counter()
+    result = columns.analyze()
+    numpy_ms = (time.perf_counter() - t0) * 1000.0
+    print(f"{'columnar analyze':<28} {numpy_ms:10.1f}ms ({loop_ms / max(numpy_ms, 1e-9):.0f}x vs sum loop) "
+          f"same result={result == expected}")
+    t0 = time.perf_counter()
+    stats = columns.window_stats(window)
+    print(f"{'columnar window_stats':<28} {(time.perf_counter() - t0) * 1000.0:10.1f}ms windows={len(stats):,}")
+
+
+def bench_parse_time(events: int):
+    """events개 이벤트 시각 파싱: 이벤트마다 strptime(기존) / 고정 폭 파서 / ts 필드, 로그 전체 분석 비교"""
+    import contextlib
+    import io
+    import tempfile
+    from datetime import datetime
+
+    import event_fields
+    from app_analyzer import AppAnalyzer
+    from event_fields import TIME_FORMAT, parse_event_time
+
+    sample = _synthetic_events(events)
+    with_ts = [{**e, "ts": int(datetime.strptime(e["time"], TIME_FORMAT).timestamp())} for e in sample]
+    print(f"[parse-time] events={events:,}")
+
+    def rate(label: str, fn: Callable[[], object]):
+        event_fields._HOUR_EPOCH_CACHE.clear()
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        print(f"{label:<28} {elapsed * 1000.0:10.1f}ms {events / elapsed:14,.0f} events/s")
+
+    rate("strptime (before)", lambda: [datetime.strptime(e["time"], TIME_FORMAT).timestamp() for e in sample])
+    rate("fixed-width parser", lambda: [parse_event_time(e) for e in sample])
+    rate("ts field", lambda: [parse_event_time(e) for e in with_ts])
+    same = all(parse_event_time(a) == parse_event_time(b) for a, b in zip(sample, with_ts))
+    print(f"{'':<28} same timestamps={same}")
+
+    # 로그 파일 전체 분석 (JSON 파싱 포함): 기존 로그 vs ts가 있는 로그
+    tmpdir = tempfile.mkdtemp(prefix="bench-parse-time-")
+    for label, rows in (("analyze log (time only)", sample), ("analyze log (with ts)", with_ts)):
+        path = os.path.join(tmpdir, label.split("(")[1].rstrip(")").replace(" ", "_") + ".jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        event_fields._HOUR_EPOCH_CACHE.clear()
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            AppAnalyzer(path, incremental=True)
+        elapsed = time.perf_counter() - t0
+        print(f"{label:<28} {elapsed * 1000.0:10.1f}ms {events / elapsed:14,.0f} events/s")
+
+
+def bench_ingest(users: int, events: int, batch: int, resend_every: int, queries: int):
+    """users명의 에이전트가 이벤트를 묶어 /ingest로 전송 → 처리량, 중복 제거, /finish 지연, 파일 재분석과 결과 비교"""
+    import tempfile
+    import urllib.request
+    from datetime import datetime
+
+    import aiohttp
+
+    tmpdir = tempfile.mkdtemp(prefix="bench-ingest-")
+    store = os.path.join(tmpdir, "store")
+    os.environ["EVENT_STORE_DIR"] = store
+    os.environ["INGEST_ENABLED"] = "1"
+    os.environ["INGEST_TOKEN"] = "bench-token"
+    os.environ["FINISH_CACHE_MAX"] = "0"  # 캐시 없이 집계 조회 시간 측정
+    os.environ["FINISH_HOT_USERS"] = str(max(64, users))
+    import finish_api_server as server
+    from app_analyzer import SegmentedAppAnalyzer
+    from user_logs import UserLogIndex
+
+    base_url, stop = _start_api_server(server.app)
+    emails = [f"student{i:03d}@example.com" for i in range(users)]
+    start = 1767225600.0
+
+    def user_events(u: int) -> List[Dict]:
+        out = []
+        for i in range(events):
+            app_name = _BENCH_APPS[(i // 7 + u) % len(_BENCH_APPS)]
+            out.append({"seq": i + 1, "time": datetime.fromtimestamp(start + i).strftime("%Y-%m-%d %H:%M:%S"),
+                        "app": app_name, "signal": 0 if app_name in ("pycharm", "notion") else 1, "message": ""})
+        return out
+
+    batch_ms: List[float] = []
+    totals = {"accepted": 0, "duplicates": 0, "retried": 0}
+
+    async def agent(session: aiohttp.ClientSession, u: int):
+        pending = user_events(u)
+        n = 0
+        for i in range(0, len(pending), batch):
+            body = {"room": "room-a", "email": emails[u], "agent": f"agent-{u}", "events": pending[i:i + batch]}
+            n += 1
+            # 응답을 못 받은 것처럼 같은 묶음을 한 번 더 보냄
+            for _ in range(2 if resend_every and n % resend_every == 0 else 1):
+                while True:
+                    t0 = time.perf_counter()
+                    async with session.post(f"{base_url}/ingest", json=body) as resp:
+                        result = await resp.json()
+                        retry_after = resp.headers.get("Retry-After")
+                    batch_ms.append((time.perf_counter() - t0) * 1000.0)
+                    if resp.status == 200:
+                        totals["accepted"] += result["accepted"]
+                        totals["duplicates"] += result["duplicates"]
+                        break
+                    totals["retried"] += 1
+                    await asyncio.sleep(float(retry_after or 1))
+
+    async def run_agents() -> float:
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0),
+                                         headers={"Authorization": "Bearer bench-token"}) as session:
+            t0 = time.perf_counter()
+            await asyncio.gather(*(agent(session, u) for u in range(users)))
+            return time.perf_counter() - t0
+
+    print(f"[ingest] users={users} events/user={events} batch={batch} resend_every={resend_every}")
+    try:
+        elapsed = asyncio.run(run_agents())
+        _summarize("POST /ingest (batch)", batch_ms)
+        print(f"{'':<28} {users * events / elapsed:,.0f} events/s accepted={totals['accepted']} "
+              f"duplicates={totals['duplicates']} retried(429/503)={totals['retried']}")
+
+        def finish(email: str) -> float:
+            t0 = time.perf_counter()
+            with urllib.request.urlopen(f"{base_url}/finish?time=3600&room=room-a&email={email}") as resp:
+                resp.read()
+            return (time.perf_counter() - t0) * 1000.0
+
+        _summarize("/finish (ingest aggregate)", [finish(emails[i % users]) for i in range(queries)])
+
+        # 수집하면서 갱신한 집계 == 저장된 세그먼트를 처음부터 다시 읽은 결과
+        index = UserLogIndex(store)
+        mismatched = 0
+        reload_ms: List[float] = []
+        for email in emails:
+            live = server.user_analyzers.get(("room-a", email)).analyze()
+            t0 = time.perf_counter()
+            fresh = SegmentedAppAnalyzer(lambda: index.segments("room-a", email), name=email).analyze()
+            reload_ms.append((time.perf_counter() - t0) * 1000.0)
+            mismatched += live != fresh
+        _summarize("reload segments (per user)", reload_ms)
+        print(f"{'':<28} aggregate mismatches={mismatched}/{users} {server.user_analyzers.stats()}")
+    finally:
+        stop()
+
+
+def _monitor_events(n: int, start: float = 1767225600.0) -> List[Dict]:
+    """모니터가 기록하는 저장 형식과 같은 이벤트 n개 (snapshot, from/to, 메시지 풀에서 고른 한국어 메시지, ts)"""
+    import random
+    from datetime import datetime
+
+    rng = random.Random(0)
+    sites = [("Google Chrome", "github.com", "https://github.com/{}/pulls", "Pull requests · {}"),
+             ("Google Chrome", "youtube.com", "https://www.youtube.com/watch?v={}", "{} - YouTube"),
+             ("Safari", "notion.so", "https://www.notion.so/{}", "{} 학습 노트"),
+             ("PyCharm", "", "", "{} – main.py"),
+             ("KakaoTalk", "", "", "{} 채팅"),
+             ("Code", "", "", "{}.py — Visual Studio Code")]
+    messages = ["지금 아주 잘 집중하고 있어요! 이대로 계속해 볼까요?", "잠깐 쉬는 것도 좋지만 곧 다시 돌아와 주세요.",
+                "학습과 관련 없는 창이 열려 있어요. 다시 공부로 돌아가 볼까요?", "코드를 작성하고 있군요, 멋져요!",
+                "영상 시청이 길어지고 있어요. 학습 영상인지 확인해 보세요.", "메신저 대화가 길어지고 있어요."]
+    events = []
+    t = start
+    prev = ""
+    site = sites[0]
+    topic = "proactive-agent"
+    for _ in range(n):
+        if rng.random() < 0.3:
+            site = rng.choice(sites)
+            topic = rng.choice(["proactive-agent", "week3", "algorithm", "db-design", "lecture-7", "team-chat"])
+        app, domain, url, title = site
+        snapshot = {"app": app, "window": title.format(topic), "url": url.format(topic), "domain": domain,
+                    "display": "Built-in Retina Display"}
+        name = f"{app}({domain})" if domain else app
+        events.append({
+            "time": datetime.fromtimestamp(t).strftime("%Y-%m-%d %H:%M:%S"),
+            "ts": int(t),
+            "from": prev,
+            "to": name,
+            "snapshot": snapshot,
+            "signal": 0 if app in ("PyCharm", "Code") or domain in ("github.com", "notion.so") else 1,
+            "message": rng.choice(messages),
+        })
+        prev = name
+        t += rng.randint(1, 30)
+    return events
+
+
+def bench_binary_log(events: int):
+    """events개 저장 형식 이벤트: JSON 배열/JSON Lines/바이너리 로그의 크기, 읽기·분석 시간 비교"""
+    import contextlib
+    import io
+    import tempfile
+
+    from app_analyzer import AppAnalyzer
+    from binary_log import convert_json_log
+    from event_log import read_events, write_events_json_array
+
+    tmpdir = tempfile.mkdtemp(prefix="bench-binary-log-")
+    rows = _monitor_events(events)
+    array_path = os.path.join(tmpdir, "activity_log.array.json")
+    jsonl_path = os.path.join(tmpdir, "activity_log.json")
+    bin_path = os.path.join(tmpdir, "activity_log.bin")
+    write_events_json_array(array_path, rows)
+    with open(jsonl_path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n")
+    t0 = time.perf_counter()
+    convert_json_log(jsonl_path, bin_path)
+    convert_ms = (time.perf_counter() - t0) * 1000.0
+
+    jsonl_size = os.path.getsize(jsonl_path)
+    print(f"[binary-log] events={events:,} (convert {convert_ms:.0f}ms)")
+    for label, path in (("json array (rewrite)", array_path), ("json lines", jsonl_path), ("binary", bin_path)):
+        size = os.path.getsize(path)
+        print(f"{label:<28} {size / 1024 / 1024:10.1f}MB {size / events:8.1f}B/event  x{jsonl_size / size:.2f} vs jsonl")
+
+    def timed(label: str, fn: Callable[[], object]):
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = fn()
+        elapsed = time.perf_counter() - t0
+        print(f"{label:<28} {elapsed * 1000.0:10.1f}ms {events / elapsed:14,.0f} events/s")
+        return result
+
+    from_jsonl = timed("read_events (json lines)", lambda: read_events(jsonl_path))
+    from_bin = timed("read_events (binary)", lambda: read_events(bin_path))
+    print(f"{'':<28} same events={from_jsonl == from_bin}")
+    jsonl_result = timed("analyze (json lines)", lambda: AppAnalyzer(jsonl_path, incremental=True).analyze())
+    bin_result = timed("analyze (binary headers)", lambda: AppAnalyzer(bin_path, incremental=True).analyze())
+    print(f"{'':<28} same result={jsonl_result == bin_result}")
+
+
+def _log_memory_case(case: str, path: str):
+    """(자식 프로세스에서 실행) 로그 하나를 case 방식으로 분석하고 소요 시간/최대 RSS를 JSON 한 줄로 출력"""
+    import contextlib
+    import io
+    import resource
+
+    from app_analyzer import AppAnalyzer
+
+    from event_log import parse_events, read_events
+
+    def load_all(load: Callable[[], List[Dict]]):
+        events = load()
+        return AppAnalyzer.__new__(AppAnalyzer)._accumulate(events).to_analysis()
+
+    def read_text() -> List[Dict]:
+        # 기존 _load_events: 파일 전체 문자열(+ 줄 리스트)과 전체 이벤트 dict 리스트를 함께 보유
+        with open(path, "r", encoding="utf-8") as f:
+            return parse_events(f.read().strip())
+
+    runs = {
+        "baseline": lambda: None,
+        "before": lambda: load_all(read_text),
+        "full": lambda: load_all(lambda: read_events(path)),
+        "incremental": lambda: AppAnalyzer(path, incremental=True).analyze(),
+    }
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = runs[case]()
+    elapsed = time.perf_counter() - t0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        max_rss *= 1024  # Linux는 KB, macOS는 바이트
+    print(json.dumps({"ms": elapsed * 1000.0, "max_rss": max_rss,
+                      "events": result.event_count if result is not None else 0}))
+
+
+def _write_memory_logs(events: int, jsonl_path: str, bin_path: str):
+    """(자식 프로세스에서 실행) 저장 형식 로그를 JSON Lines와 바이너리로 기록"""
+    from binary_log import write_binary_log
+
+    rows = _monitor_events(events)
+    with open(jsonl_path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n")
+    write_binary_log(bin_path, rows)
+
+
+def bench_log_memory(events: int):
+    """events개 저장 형식 로그 분석 시 최대 RSS: 파일 전체 읽기(기존) vs 메모리 매핑 + 줄/레코드 단위 처리"""
+    import tempfile
+
+    tmpdir = tempfile.mkdtemp(prefix="bench-log-memory-")
+    jsonl_path = os.path.join(tmpdir, "activity_log.json")
+    bin_path = os.path.join(tmpdir, "activity_log.bin")
+    here = os.path.dirname(os.path.abspath(__file__))
+    # Linux는 fork한 부모의 최대 RSS가 자식에게 이어지므로, 이벤트 생성도 자식에서 해서 부모를 작게 유지
+    subprocess.run([sys.executable, "-c", f"import benchmark; benchmark._write_memory_logs({events}, "
+                    f"{jsonl_path!r}, {bin_path!r})"], check=True, cwd=here)
+    print(f"[log-memory] events={events:,} json lines={os.path.getsize(jsonl_path) / 1024 / 1024:.1f}MB "
+          f"binary={os.path.getsize(bin_path) / 1024 / 1024:.1f}MB")
+
+    def run(label: str, case: str, path: str, baseline: int = 0) -> int:
+        # 최대 RSS는 프로세스마다 한 번만 재므로 방식마다 새 프로세스에서 실행
+        code = f"import benchmark; benchmark._log_memory_case({case!r}, {path!r})"
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                             cwd=here).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        print(f"{label:<32} {result['ms']:10.1f}ms  max RSS {result['max_rss'] / 1024 / 1024:8.1f}MB "
+              f"(+{(result['max_rss'] - baseline) / 1024 / 1024:.1f}MB) events={result['events']:,}")
+        return result["max_rss"]
+
+    baseline = run("interpreter + imports", "baseline", jsonl_path)
+    run("read + parse all (before)", "before", jsonl_path, baseline)
+    run("load all (mmap blocks)", "full", jsonl_path, baseline)
+    run("incremental (json lines)", "incremental", jsonl_path, baseline)
+    run("incremental (binary headers)", "incremental", bin_path, baseline)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="proactive-learning-ai-agent 성능 측정")
+    sub = parser.add_subparsers(dest="target", required=True)
+
+    p = sub.add_parser("openai-client", help="OpenAI 클라이언트 재사용 효과")
+    p.add_argument("--calls", type=int, default=200)
+    p.add_argument("--delay", type=float, default=0.0, help="스텁 서버 응답 지연(초)")
+
+    p = sub.add_parser("snapshot", help="스냅샷 백엔드 비교 (spawn vs helper)")
+    p.add_argument("--polls", type=int, default=200)
+    p.add_argument("--real", action="store_true", help="macOS에서 실제 osascript 사용")
+
+    p = sub.add_parser("change-detect", help="변경 감지 방식 비교 (poll/adaptive/notify)")
+    p.add_argument("--changes", type=int, default=10, help="포커스 변경 횟수")
+    p.add_argument("--mean-gap", type=float, default=20.0, help="변경 사이 평균 간격(초, scale 적용 전)")
+    p.add_argument("--scale", type=float, default=0.1, help="모든 간격에 곱할 배율 (측정 시간 단축용)")
+    p.add_argument("--probe-cost", type=float, default=2.0, help="스냅샷 조회 1회 CPU 비용(ms)")
+    p.add_argument("--notify-ratio", type=float, default=0.8, help="OS 알림이 오는 변경의 비율")
+    p.add_argument("--seed", type=int, default=0)
+
+    p = sub.add_parser("loop-lag", help="스냅샷 조회 방식별 이벤트 루프 지연 (direct vs executor)")
+    p.add_argument("--polls", type=int, default=40)
+    p.add_argument("--interval-ms", type=float, default=50.0, help="조회 간격(ms)")
+    p.add_argument("--probe-ms", type=float, default=30.0, help="보통 조회 1회 소요 시간(ms)")
+    p.add_argument("--hang-ms", type=float, default=1500.0, help="멈춘 조회 소요 시간(ms)")
+    p.add_argument("--hang-every", type=int, default=10, help="몇 번째 조회마다 멈출지 (0이면 멈춤 없음)")
+    p.add_argument("--timeout-ms", type=float, default=300.0, help="executor 조회 제한 시간(ms)")
+
+    p = sub.add_parser("classify", help="규칙 기반 분류 처리량")
+    p.add_argument("-n", type=int, default=200000)
+    p.add_argument("--swap-ms", type=float, default=20.0, help="교체 측정 시 규칙 재컴파일 간격(ms)")
+
+    p = sub.add_parser("llm-batch", help="하나씩 판정 vs 배치 판정 (스텁 서버)")
+    p.add_argument("--apps", type=int, default=60)
+    p.add_argument("--batch-size", type=int, default=20)
+    p.add_argument("--delay", type=float, default=0.2, help="스텁 서버 응답 지연(초)")
+    p.add_argument("--drop-every", type=int, default=7, help="배치 응답에서 n번째 항목마다 결과 누락 (0이면 누락 없음)")
+
+    p = sub.add_parser("message-pool", help="메시지 풀 선택 속도/반복 횟수")
+    p.add_argument("-n", type=int, default=200000)
+
+    p = sub.add_parser("finish", help="/finish 요청 몰림 (동기 엔드포인트 vs 작업 풀)")
+    p.add_argument("--events", type=int, default=5000, help="로그 이벤트 수")
+    p.add_argument("--requests", type=int, default=200, help="동시에 보낼 요청 수")
+    p.add_argument("--distinct", type=int, default=40, help="서로 다른 time 값 개수")
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--queue-max", type=int, default=16)
+
+    p = sub.add_parser("finish-cache", help="/finish 응답 캐시/ETag 효과")
+    p.add_argument("--events", type=int, default=5000, help="로그 이벤트 수")
+    p.add_argument("--repeats", type=int, default=50)
+
+    p = sub.add_parser("finish-users", help="교실 전체 로그 vs 사용자별 세그먼트 저장소")
+    p.add_argument("--users", type=int, default=30)
+    p.add_argument("--events", type=int, default=3000, help="사용자당 이벤트 수")
+    p.add_argument("--hot", type=int, default=8, help="메모리에 유지할 사용자 분석기 수")
+    p.add_argument("--queries", type=int, default=500)
+    p.add_argument("--segment-kb", type=int, default=64, help="세그먼트 파일 최대 크기(KB)")
+
+    p = sub.add_parser("aggregate", help="로그 전체 분석 vs 집계 체크포인트 + 로그 꼬리")
+    p.add_argument("--events", type=int, default=200000, help="로그 이벤트 수")
+    p.add_argument("--tail", type=int, default=500, help="체크포인트 이후에 추가된 이벤트 수")
+    p.add_argument("--records", type=int, default=20000, help="기록 비용 측정 이벤트 수")
+
+    p = sub.add_parser("columnar", help="dict 루프 vs NumPy 열 배열 분석")
+    p.add_argument("--events", type=int, default=1000000)
+    p.add_argument("--window", type=int, default=600, help="구간별 통계 구간 길이(초)")
+
+    p = sub.add_parser("parse-time", help="이벤트 시각 파싱 처리량 (strptime vs 고정 폭 파서 vs ts)")
+    p.add_argument("--events", type=int, default=500000)
+
+    p = sub.add_parser("binary-log", help="JSON 로그 vs 바이너리 로그 (크기, 읽기/분석 시간)")
+    p.add_argument("--events", type=int, default=200000)
+
+    p = sub.add_parser("log-memory", help="로그 분석 최대 RSS (파일 전체 읽기 vs 메모리 매핑 줄/레코드 단위)")
+    p.add_argument("--events", type=int, default=300000)
+
+    p = sub.add_parser("ingest", help="POST /ingest 수집 처리량 + 수집 집계 /finish 지연")
+    p.add_argument("--users", type=int, default=30, help="에이전트(사용자) 수")
+    p.add_argument("--events", type=int, default=3000, help="사용자당 이벤트 수")
+    p.add_argument("--batch", type=int, default=100, help="묶음 하나의 이벤트 수")
+    p.add_argument("--resend-every", type=int, default=5, help="n번째 묶음마다 한 번 더 전송 (0이면 재전송 없음)")
+    p.add_argument("--queries", type=int, default=300)
+
+    args = parser.parse_args()
+    if args.target == "openai-client":
+        bench_openai_client(args.calls, args.delay)
+    elif args.target == "snapshot":
+        bench_snapshot(args.polls, args.real)
+    elif args.target == "change-detect":
+        bench_change_detect(args)
+    elif args.target == "loop-lag":
+        bench_loop_lag(args)
+    elif args.target == "classify":
+        bench_classify(args.n, args.swap_ms)
+    elif args.target == "llm-batch":
+        bench_llm_batch(args.apps, args.batch_size, args.delay, args.drop_every)
+    elif args.target == "message-pool":
+        bench_message_pool(args.n)
+    elif args.target == "finish":
+        bench_finish(args.events, args.requests, args.distinct, args.workers, args.queue_max)
+    elif args.target == "finish-cache":
+        bench_finish_cache(args.events, args.repeats)
+    elif args.target == "finish-users":
+        bench_finish_users(args.users, args.events, args.hot, args.queries, args.segment_kb)
+    elif args.target == "aggregate":
+        bench_aggregate(args.events, args.tail, args.records)
+    elif args.target == "columnar":
+        bench_columnar(args.events, args.window)
+    elif args.target == "parse-time":
+        bench_parse_time(args.events)
+    elif args.target == "binary-log":
+        bench_binary_log(args.events)
+    elif args.target == "log-memory":
+        bench_log_memory(args.events)
+    elif args.target == "ingest":
+        bench_ingest(args.users, args.events, args.batch, args.resend_every, args.queries)
+
+
+if __name__ == "__main__":
+    main()
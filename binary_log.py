@@ -0,0 +1,520 @@
+# -*- coding: utf-8 -*-
+"""
+바이너리 이벤트 로그 모듈 (LOG_MODE=binary)
+- 파일 = 매직(8바이트) + 레코드 나열, 레코드 = <u32 본문 길이><u8 종류><본문> (append-only)
+- 문자열 레코드: 앱/도메인/창 제목/URL/메시지/키 이름 등 모든 문자열을 처음 나올 때 한 번만 기록하고
+  이후에는 번호(u32)로만 참조 (문자열 표는 파일 앞에서부터 읽으며 복원)
+- dict는 키 목록(모양)도 문자열 하나("\x1f"로 연결)로 등록해 두고, 이벤트마다 모양 번호 + 값만 기록
+- 이벤트 레코드: 고정 헤더(시각 float64, signal int8, 분석용 앱 이름 번호) + 원래 이벤트 dict
+  → 사용 시간 분석은 헤더만 읽고, 이벤트 dict가 필요할 때만 나머지를 풀어냄
+- 헤더와 같은 값인 ts/signal 필드는 본문에 다시 쓰지 않고, time 문자열은 헤더 시각과의 차이(UTC 오프셋)만 기록
+  (키 순서 유지, 읽는 쪽 시간대와 관계없이 같은 문자열로 복원)
+- 비정상 종료로 잘린 마지막 레코드는 다음 실행 시 자동으로 잘라냄
+- 읽기는 파일을 메모리 매핑해 레코드를 하나씩 처리 (BinaryLogReader.iter_records)
+- 변환: python binary_log.py activity_log.json activity_log.bin
+"""
+
+import json
+import math
+import os
+import struct
+import sys
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from event_fields import TIME_FORMAT, event_app_name, parse_event_time
+from mapped_file import Buffer, PageReleaser, mapped_file
+
+BINARY_MAGIC = b"CAMSBIN1"
+
+KIND_STRING = 1
+KIND_EVENT = 2
+
+_RECORD = struct.Struct("<IB")  # 본문 길이, 레코드 종류
+_EVENT_HEAD = struct.Struct("<dbI")  # 시각(없으면 NaN), signal, 분석용 앱 이름 번호
+_U32 = struct.Struct("<I")
+_I32 = struct.Struct("<i")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+
+# 값 태그 (msgpack과 비슷한 자기 기술형 인코딩, 문자열은 모두 문자열 표 번호)
+_T_NONE = 0
+_T_FALSE = 1
+_T_TRUE = 2
+_T_INT32 = 3
+_T_INT64 = 4
+_T_FLOAT = 5
+_T_STR = 6
+_T_MAP = 7  # <u32 모양 문자열 번호> + 키 순서대로 값
+_T_LIST = 8
+_T_JSON = 9  # 위 형식으로 표현할 수 없는 값 (int64 범위 밖 정수, 문자열이 아닌 키 등): JSON 텍스트의 문자열 번호
+_T_HEADER = 10  # 이벤트 최상위의 ts/signal: 값은 헤더에서 복원
+_T_LOCAL_TIME = 11  # 이벤트 최상위의 time: <i32 UTC 오프셋(초)>, 헤더 시각 + 오프셋을 TIME_FORMAT으로 표시한 문자열
+
+_SHAPE_SEP = "\x1f"
+
+
+class BinaryLogError(ValueError):
+    """바이너리 로그 형식 오류"""
+
+
+def is_binary_log(path: str) -> bool:
+    """바이너리 로그 파일인지 확인 (매직 비교)"""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+    except OSError:
+        return False
+
+
+_WALL_EPOCH = datetime(1970, 1, 1)
+# 벽시계 시(hour) 번호 → "YYYY-MM-DD HH:" (이어지는 이벤트는 대부분 같은 시간대라 적중률이 높음)
+_WALL_HOUR_CACHE: Dict[int, str] = {}
+_WALL_HOUR_CACHE_MAX = 100000
+
+
+def _wall_seconds(value: str) -> Optional[int]:
+    """TIME_FORMAT 문자열 → 같은 벽시계 시각의 1970-01-01 00:00:00 기준 초 (시간대와 무관), 형식이 다르면 None"""
+    try:
+        delta = datetime.strptime(value, TIME_FORMAT) - _WALL_EPOCH
+    except (TypeError, ValueError):
+        return None
+    return delta.days * 86400 + delta.seconds
+
+
+def _format_wall(wall: int) -> str:
+    """_wall_seconds의 역변환"""
+    hour, rest = divmod(wall, 3600)
+    prefix = _WALL_HOUR_CACHE.get(hour)
+    if prefix is None:
+        if len(_WALL_HOUR_CACHE) >= _WALL_HOUR_CACHE_MAX:
+            _WALL_HOUR_CACHE.clear()
+        prefix = _WALL_HOUR_CACHE[hour] = (_WALL_EPOCH + timedelta(hours=hour)).strftime("%Y-%m-%d %H:")
+    return f"{prefix}{rest // 60:02d}:{rest % 60:02d}"
+
+
+def _shape_keys(shapes: Dict[int, Tuple[str, ...]], strings: List[str], shape_id: int) -> Tuple[str, ...]:
+    """모양 문자열 번호 → 키 목록 (처음 쓰일 때 한 번만 나눔)"""
+    keys = shapes.get(shape_id)
+    if keys is None:
+        text = strings[shape_id]
+        keys = shapes[shape_id] = tuple(text.split(_SHAPE_SEP)) if text else ()
+    return keys
+
+
+def _decode_value(buf, pos: int, strings: List[str], shapes: Dict[int, Tuple[str, ...]]):
+    """pos 위치의 값 하나를 풀어서 (값, 다음 위치) 반환"""
+    tag = buf[pos]
+    pos += 1
+    if tag == _T_STR:
+        return strings[_U32.unpack_from(buf, pos)[0]], pos + 4
+    if tag == _T_INT32:
+        return _I32.unpack_from(buf, pos)[0], pos + 4
+    if tag == _T_MAP:
+        keys = _shape_keys(shapes, strings, _U32.unpack_from(buf, pos)[0])
+        pos += 4
+        value = {}
+        for key in keys:
+            if buf[pos] == _T_STR:
+                # 대부분의 값은 문자열이므로 함수 호출 없이 바로 읽음
+                value[key] = strings[_U32.unpack_from(buf, pos + 1)[0]]
+                pos += 5
+            else:
+                value[key], pos = _decode_value(buf, pos, strings, shapes)
+        return value, pos
+    if tag == _T_NONE:
+        return None, pos
+    if tag == _T_FALSE:
+        return False, pos
+    if tag == _T_TRUE:
+        return True, pos
+    if tag == _T_INT64:
+        return _I64.unpack_from(buf, pos)[0], pos + 8
+    if tag == _T_FLOAT:
+        return _F64.unpack_from(buf, pos)[0], pos + 8
+    if tag == _T_LIST:
+        count = _U32.unpack_from(buf, pos)[0]
+        pos += 4
+        items = []
+        for _ in range(count):
+            item, pos = _decode_value(buf, pos, strings, shapes)
+            items.append(item)
+        return items, pos
+    if tag == _T_JSON:
+        return json.loads(strings[_U32.unpack_from(buf, pos)[0]]), pos + 4
+    raise BinaryLogError(f"알 수 없는 값 태그 {tag}")
+
+
+def _decode_event(buf, pos: int, strings: List[str], shapes: Dict[int, Tuple[str, ...]]) -> Dict:
+    """이벤트 레코드 본문(pos부터)을 원래 이벤트 dict로 복원"""
+    time_sec, signal, _ = _EVENT_HEAD.unpack_from(buf, pos)
+    pos += _EVENT_HEAD.size
+    if buf[pos] != _T_MAP:
+        return _decode_value(buf, pos, strings, shapes)[0]
+    keys = _shape_keys(shapes, strings, _U32.unpack_from(buf, pos + 1)[0])
+    pos += 5
+    event = {}
+    for key in keys:
+        tag = buf[pos]
+        if tag == _T_STR:
+            event[key] = strings[_U32.unpack_from(buf, pos + 1)[0]]
+            pos += 5
+        elif tag == _T_LOCAL_TIME:
+            event[key] = _format_wall(int(time_sec) + _I32.unpack_from(buf, pos + 1)[0])
+            pos += 5
+        elif tag == _T_HEADER:
+            pos += 1
+            event[key] = signal if key == "signal" else int(time_sec)
+        else:
+            event[key], pos = _decode_value(buf, pos, strings, shapes)
+    return event
+
+
+class BinaryLogReader:
+    """
+    바이너리 로그 순차/증분 읽기 상태 (문자열 표 + 다음에 읽을 파일 오프셋)
+
+    파일 전체(mapped_file 매핑 또는 bytes)를 넘기면 offset부터 완성된 레코드만 처리하고
+    아직 다 쓰이지 않은 마지막 레코드는 다음 호출에서 읽음
+    """
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self.offset = 0
+        self._shapes: Dict[int, Tuple[str, ...]] = {}
+
+    def iter_records(self, buf: Buffer, mode: str = "events", end: Optional[int] = None) -> Iterator:
+        """
+        offset 이후 레코드를 차례로 처리하며 항목을 하나씩 반환 (반환할 때마다 offset 전진)
+
+        Args:
+            buf: 파일 전체 (mapped_file 매핑 또는 bytes)
+            mode: "events" → 이벤트 dict,
+                  "headers" → (시각, 앱 이름, signal) (시각이 없는 이벤트 제외, 본문은 풀지 않음),
+                  "strings" → 문자열 표만 갱신 (반환 항목 없음),
+                  "offsets" → 이벤트 본문 오프셋 (문자열 표를 다 만든 뒤 필요한 이벤트만 풀 때)
+            end: 이 오프셋까지만 읽음 (기본: 버퍼 끝)
+        """
+        size = len(buf) if end is None else min(end, len(buf))
+        pos = self.offset
+        if pos == 0:
+            if size < len(BINARY_MAGIC):
+                return
+            if buf[:len(BINARY_MAGIC)] != BINARY_MAGIC:
+                raise BinaryLogError("바이너리 로그 파일이 아닙니다.")
+            pos = self.offset = len(BINARY_MAGIC)
+
+        strings = self.strings
+        releaser = PageReleaser(buf, pos)
+        record_unpack = _RECORD.unpack_from
+        head_unpack = _EVENT_HEAD.unpack_from
+        while pos + 5 <= size:
+            length, kind = record_unpack(buf, pos)
+            body = pos + 5
+            stop = body + length
+            if stop > size:
+                break
+            item = None
+            if kind == KIND_EVENT:
+                if mode == "headers":
+                    time_sec, signal, app_id = head_unpack(buf, body)
+                    if time_sec == time_sec:  # NaN(시각 없음) 제외
+                        item = (time_sec, strings[app_id], signal)
+                elif mode == "events":
+                    item = _decode_event(buf, body, strings, self._shapes)
+                elif mode == "offsets":
+                    item = body
+            elif kind == KIND_STRING:
+                strings.append(buf[body:stop].decode("utf-8", "surrogatepass"))
+            else:
+                raise BinaryLogError(f"알 수 없는 레코드 종류 {kind} (오프셋 {pos})")
+            pos = self.offset = stop
+            releaser.advance(pos)
+            if item is not None:
+                yield item
+
+    def scan(self, buf: Buffer, mode: str = "events", end: Optional[int] = None) -> List:
+        """iter_records()의 항목 리스트 (mode="strings"면 빈 리스트)"""
+        return list(self.iter_records(buf, mode, end))
+
+
+def read_binary_events(path: str) -> List[Dict]:
+    """바이너리 로그 파일의 이벤트 dict 리스트 (파일이 없으면 빈 리스트)"""
+    if not os.path.exists(path):
+        return []
+    with mapped_file(path) as buf:
+        reader = BinaryLogReader()
+        events = reader.scan(buf, "events")
+        size = len(buf)
+    if reader.offset < size:
+        print(f"[WARN] 잘린 로그 꼬리 {size - reader.offset}바이트를 건너뛰었습니다.")
+    return events
+
+
+def read_recent_binary_events(path: str, limit: int) -> List[Dict]:
+    """
+    바이너리 로그 끝의 이벤트 limit개 (기록 순서)
+
+    문자열 표는 파일 앞에서부터 만들어야 하므로 레코드 헤더는 모두 훑지만, 이벤트 본문은 마지막 limit개만 풂
+    """
+    if limit <= 0 or not os.path.exists(path):
+        return []
+    with mapped_file(path) as buf:
+        reader = BinaryLogReader()
+        offsets = deque(reader.iter_records(buf, "offsets"), maxlen=limit)
+        return [_decode_event(buf, pos, reader.strings, reader._shapes) for pos in offsets]
+
+
+class BinaryLogWriter:
+    """append-only 바이너리 이벤트 로그 기록기 (EventLogWriter와 같은 사용법)"""
+
+    def __init__(self, path: str, fsync_every: int = 20, fsync_interval: float = 5.0):
+        """
+        Args:
+            path: 로그 파일 경로
+            fsync_every: 이 개수만큼 기록될 때마다 fsync
+            fsync_interval: 마지막 fsync 이후 이 시간(초)이 지나면 fsync
+        """
+        self.path = path
+        self.fsync_every = max(1, int(fsync_every))
+        self.fsync_interval = float(fsync_interval)
+        self._fh = None
+        self._ids: Dict[str, int] = {}
+        self._shape_ids: Dict[Tuple[str, ...], int] = {}  # 키 목록 → 모양 문자열 번호 (-1이면 모양으로 표현 불가)
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def open(self):
+        """로그 파일 열기 (기존 파일의 문자열 표 복원 및 꼬리 복구 포함)"""
+        if self._fh is not None:
+            return
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= len(BINARY_MAGIC):
+            self._load_existing()
+        else:
+            # 새 파일 (매직을 쓰다 종료된 파일도 포함)
+            with open(self.path, "wb") as f:
+                f.write(BINARY_MAGIC)
+                f.flush()
+                os.fsync(f.fileno())
+            self._ids = {}
+            self._shape_ids = {}
+        self._fh = open(self.path, "ab")
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def _load_existing(self):
+        """기존 로그의 문자열 표를 읽고, 잘린 마지막 레코드가 있으면 잘라냄"""
+        with mapped_file(self.path) as buf:
+            if buf[:len(BINARY_MAGIC)] != BINARY_MAGIC:
+                raise BinaryLogError(f"{self.path}는 바이너리 로그가 아닙니다. (변환: python binary_log.py)")
+            reader = BinaryLogReader()
+            reader.scan(buf, "strings")
+            size = len(buf)
+        if reader.offset < size:
+            # 매핑을 닫은 뒤에 잘라냄
+            with open(self.path, "r+b") as f:
+                f.truncate(reader.offset)
+                f.flush()
+                os.fsync(f.fileno())
+            print(f"[WARN] 잘린 로그 꼬리 {size - reader.offset}바이트 제거")
+        self._ids = {value: index for index, value in enumerate(reader.strings)}
+        self._shape_ids = {}
+
+    def _intern(self, value: str, out: bytearray) -> int:
+        """문자열 번호 (처음 나온 문자열이면 문자열 레코드를 out에 추가)"""
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = self._ids[value] = len(self._ids)
+            data = value.encode("utf-8", "surrogatepass")
+            out += _RECORD.pack(len(data), KIND_STRING)
+            out += data
+        return string_id
+
+    def _shape_id(self, value: Dict, strings: bytearray) -> int:
+        """dict 키 목록의 모양 문자열 번호 (문자열이 아닌 키 등 모양으로 나타낼 수 없으면 -1)"""
+        keys = tuple(value)
+        shape_id = self._shape_ids.get(keys)
+        if shape_id is None:
+            if keys == ("",) or not all(isinstance(key, str) and _SHAPE_SEP not in key for key in keys):
+                shape_id = -1
+            else:
+                shape_id = self._intern(_SHAPE_SEP.join(keys), strings)
+            self._shape_ids[keys] = shape_id
+        return shape_id
+
+    def _encode_value(self, value, out: bytearray, strings: bytearray):
+        """값 하나를 out에 인코딩 (새 문자열 레코드는 strings에 추가)"""
+        if isinstance(value, str):
+            out.append(_T_STR)
+            out += _U32.pack(self._intern(value, strings))
+        elif value is None:
+            out.append(_T_NONE)
+        elif value is True:
+            out.append(_T_TRUE)
+        elif value is False:
+            out.append(_T_FALSE)
+        elif isinstance(value, int) and -2 ** 31 <= value < 2 ** 31:
+            out.append(_T_INT32)
+            out += _I32.pack(value)
+        elif isinstance(value, int) and -2 ** 63 <= value < 2 ** 63:
+            out.append(_T_INT64)
+            out += _I64.pack(value)
+        elif isinstance(value, float):
+            out.append(_T_FLOAT)
+            out += _F64.pack(value)
+        elif isinstance(value, dict) and self._shape_id(value, strings) >= 0:
+            out.append(_T_MAP)
+            out += _U32.pack(self._shape_id(value, strings))
+            for item in value.values():
+                self._encode_value(item, out, strings)
+        elif isinstance(value, (list, tuple)):
+            out.append(_T_LIST)
+            out += _U32.pack(len(value))
+            for item in value:
+                self._encode_value(item, out, strings)
+        else:
+            # JSON Lines 로그와 같은 값이 되도록 JSON 텍스트로 보관 (직렬화할 수 없으면 TypeError)
+            out.append(_T_JSON)
+            out += _U32.pack(self._intern(json.dumps(value, ensure_ascii=False), strings))
+
+    def _encode_event(self, event: Dict) -> bytes:
+        """이벤트 하나를 (새 문자열 레코드 + 이벤트 레코드) 바이트로 인코딩"""
+        strings = bytearray()
+        time_sec = parse_event_time(event)
+        signal = event.get("signal", 1)
+        if not (type(signal) is int and -128 <= signal <= 127):
+            signal = 1  # 분석기와 같은 방식 (본문에는 원래 값 보관)
+
+        # 헤더로 복원되는 필드: 시각과 같은 정수 ts, int8 범위의 signal, 초 단위 시각의 time 문자열
+        from_header = set()
+        time_offset = None
+        if time_sec is not None and time_sec.is_integer():
+            if type(event.get("ts")) is int and event["ts"] == time_sec:
+                from_header.add("ts")
+            wall = _wall_seconds(event.get("time"))
+            if wall is not None and -2 ** 31 <= wall - int(time_sec) < 2 ** 31 and _format_wall(wall) == event["time"]:
+                time_offset = wall - int(time_sec)
+        if type(event.get("signal")) is int and event["signal"] == signal:
+            from_header.add("signal")
+
+        body = bytearray(_EVENT_HEAD.pack(
+            time_sec if time_sec is not None else math.nan,
+            signal,
+            self._intern(event_app_name(event), strings),
+        ))
+        shape_id = self._shape_id(event, strings)
+        if shape_id < 0:
+            self._encode_value(event, body, strings)
+        else:
+            body.append(_T_MAP)
+            body += _U32.pack(shape_id)
+            for key, value in event.items():
+                if key == "time" and time_offset is not None:
+                    body.append(_T_LOCAL_TIME)
+                    body += _I32.pack(time_offset)
+                elif key in from_header:
+                    body.append(_T_HEADER)
+                else:
+                    self._encode_value(value, body, strings)
+        strings += _RECORD.pack(len(body), KIND_EVENT)
+        strings += body
+        return bytes(strings)
+
+    def append(self, event: Dict) -> int:
+        """이벤트 하나를 로그 끝에 추가 (기록한 바이트 수 반환)"""
+        if self._fh is None:
+            self.open()
+        ids_before = len(self._ids)
+        try:
+            data = self._encode_event(event)
+        except Exception:
+            # 기록하지 못한 문자열 번호는 되돌림 (파일의 문자열 표와 어긋나지 않게)
+            for value in [value for value, index in self._ids.items() if index >= ids_before]:
+                del self._ids[value]
+            self._shape_ids = {}
+            raise
+        self._fh.write(data)
+        # 분석기가 바로 읽을 수 있도록 OS 버퍼까지는 매번 내보냄
+        self._fh.flush()
+        self._pending += 1
+        if (self._pending >= self.fsync_every
+                or time.monotonic() - self._last_sync >= self.fsync_interval):
+            self.sync()
+        return len(data)
+
+    def sync(self):
+        """버퍼를 디스크에 강제로 기록"""
+        if self._fh is None:
+            return
+        self._fh.flush()
+        try:
+            os.fsync(self._fh.fileno())
+        except OSError as e:
+            print(f"[WARN] fsync 실패: {e}")
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        """남은 이벤트를 fsync하고 파일 닫기"""
+        if self._fh is None:
+            return
+        self.sync()
+        self._fh.close()
+        self._fh = None
+
+
+def open_binary_log(path: str) -> BinaryLogWriter:
+    """환경 변수 설정(LOG_FSYNC_EVERY, LOG_FSYNC_INTERVAL)을 반영한 BinaryLogWriter 생성 및 열기"""
+    writer = BinaryLogWriter(
+        path,
+        fsync_every=int(os.getenv("LOG_FSYNC_EVERY", "20")),
+        fsync_interval=float(os.getenv("LOG_FSYNC_INTERVAL", "5.0")),
+    )
+    writer.open()
+    return writer
+
+
+def write_binary_log(path: str, events: List[Dict]) -> int:
+    """
+    이벤트 전체를 새 바이너리 로그로 쓰기 (임시 파일에 쓴 뒤 교체)
+
+    Returns:
+        파일 크기 (바이트)
+    """
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    writer = BinaryLogWriter(tmp_path, fsync_every=max(1, len(events) + 1), fsync_interval=float("inf"))
+    writer.open()
+    try:
+        for event in events:
+            writer.append(event)
+    finally:
+        writer.close()
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+def convert_json_log(src: str, dst: str) -> Tuple[int, int, int]:
+    """
+    JSON Lines / 기존 JSON 배열 로그를 바이너리 로그로 변환
+
+    Returns:
+        (이벤트 수, 원본 크기, 변환된 파일 크기)
+    """
+    from event_log import read_events
+
+    events = read_events(src)
+    size = write_binary_log(dst, events)
+    return len(events), os.path.getsize(src), size
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("사용법: python binary_log.py <JSON 로그> <바이너리 로그>")
+        sys.exit(2)
+    count, src_size, dst_size = convert_json_log(sys.argv[1], sys.argv[2])
+    print(f"[INFO] 이벤트 {count}개 변환: {src_size:,}바이트 → {dst_size:,}바이트 "
+          f"({src_size / max(1, dst_size):.1f}배 작음)")
@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+"""
+활성 창 변경 감지 모듈
+- ChangeSource: "다음 변경이 생길 때까지 기다렸다가 새 스냅샷을 돌려주는" 공통 인터페이스
+- FixedPollingSource: 기존 방식 (고정 간격 폴링 후 display 비교)
+- AdaptivePollingSource: 변화가 없으면 폴링 간격을 점점 늘리고, 변화가 생기면 다시 짧게
+- NotificationChangeSource: OS 포커스 변경 알림이 오면 즉시 스냅샷 조회 (알림이 없는 변경은 적응형 폴링으로 보완)
+- SimulatedFocusWorld: 미리 정한 시각에 포커스가 바뀌는 가상 환경 (macOS가 아닌 환경에서 측정용)
+"""
+
+import asyncio
+import random
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+SnapshotProbe = Callable[[], Awaitable[Dict[str, str]]]
+
+
+# macOS 포커스 감시 도우미: 앱이 활성화될 때마다 앱 이름을 한 줄씩 출력 (JXA, NSWorkspace 알림)
+MACOS_FOCUS_WATCHER_JXA = r"""
+ObjC.import('Cocoa');
+var stdout = $.NSFileHandle.fileHandleWithStandardOutput;
+function out(s) { stdout.writeData($(s + "\n").dataUsingEncoding($.NSUTF8StringEncoding)); }
+ObjC.registerSubclass({
+    name: 'FocusObserver',
+    methods: {
+        'appActivated:': {
+            types: ['void', ['id']],
+            implementation: function (n) {
+                var name = "";
+                try { name = n.userInfo.objectForKey('NSWorkspaceApplicationKey').localizedName.js; } catch (e) {}
+                out(name);
+            }
+        }
+    }
+});
+var observer = $.FocusObserver.alloc.init;
+$.NSWorkspace.sharedWorkspace.notificationCenter.addObserverSelectorNameObject(
+    observer, 'appActivated:', $.NSWorkspaceDidActivateApplicationNotification, $());
+$.NSRunLoop.currentRunLoop.run;
+"""
+
+MACOS_FOCUS_WATCHER_ARGV = ["osascript", "-l", "JavaScript", "-e", MACOS_FOCUS_WATCHER_JXA]
+
+
+def display_of(snapshot: Dict[str, str]) -> str:
+    """스냅샷의 비교 기준 문자열 (display가 없으면 app)"""
+    return snapshot.get("display", snapshot.get("app", "unknown"))
+
+
+class ChangeSource:
+    """활성 창 변경 감지 기본 클래스"""
+
+    name = "base"
+
+    def __init__(self, probe: SnapshotProbe):
+        """
+        Args:
+            probe: 현재 스냅샷을 돌려주는 코루틴 함수
+        """
+        self._probe = probe
+        self.probes = 0
+        self.changes = 0
+
+    async def _snapshot(self) -> Dict[str, str]:
+        self.probes += 1
+        return await self._probe()
+
+    async def next_change(self, prev_display: Optional[str]) -> Dict[str, str]:
+        """
+        display가 prev_display와 달라질 때까지 기다렸다가 그 스냅샷을 반환
+
+        prev_display가 None이면 현재 스냅샷을 바로 반환하고,
+        아니면 적어도 한 번 대기한 뒤 조회함 (변경이 연달아 와도 루프를 독점하지 않도록)
+        """
+        raise NotImplementedError
+
+    async def close(self):
+        """사용한 자원 정리"""
+
+    def stats(self) -> Dict[str, int]:
+        """스냅샷 조회/변경 감지 횟수"""
+        return {"probes": self.probes, "changes": self.changes}
+
+
+class FixedPollingSource(ChangeSource):
+    """고정 간격 폴링 (기존 동작)"""
+
+    name = "poll"
+
+    def __init__(self, probe: SnapshotProbe, interval: float = 1.0):
+        super().__init__(probe)
+        self.interval = float(interval)
+
+    async def next_change(self, prev_display: Optional[str]) -> Dict[str, str]:
+        while True:
+            if prev_display is not None:
+                await asyncio.sleep(self.interval)
+            snapshot = await self._snapshot()
+            if prev_display is None or display_of(snapshot) != prev_display:
+                self.changes += 1
+                return snapshot
+
+
+class AdaptivePollingSource(ChangeSource):
+    """
+    적응형 폴링
+
+    변화가 없을 때마다 간격을 backoff배씩 늘려 max_interval까지 늦추고,
+    변화를 감지하면 다시 min_interval부터 시작함
+    """
+
+    name = "adaptive"
+
+    def __init__(self, probe: SnapshotProbe, min_interval: float = 0.25,
+                 max_interval: float = 2.0, backoff: float = 1.5):
+        """
+        Args:
+            probe: 현재 스냅샷을 돌려주는 코루틴 함수
+            min_interval: 최소 폴링 간격 (초, 변화 직후)
+            max_interval: 최대 폴링 간격 (초, 오래 유휴 상태일 때)
+            backoff: 변화가 없을 때 간격에 곱하는 배수
+        """
+        super().__init__(probe)
+        self.min_interval = float(min_interval)
+        self.max_interval = max(self.min_interval, float(max_interval))
+        self.backoff = max(1.0, float(backoff))
+        self.interval = self.min_interval
+
+    async def _wait(self, timeout: float):
+        """다음 조회까지 대기 (하위 클래스에서 알림이 오면 일찍 깨어나도록 재정의)"""
+        await asyncio.sleep(timeout)
+
+    async def next_change(self, prev_display: Optional[str]) -> Dict[str, str]:
+        while True:
+            if prev_display is not None:
+                await self._wait(self.interval)
+            snapshot = await self._snapshot()
+            if prev_display is None or display_of(snapshot) != prev_display:
+                self.changes += 1
+                self.interval = self.min_interval
+                return snapshot
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+
+
+class NotificationChangeSource(AdaptivePollingSource):
+    """
+    OS 포커스 변경 알림 기반 감지
+
+    알림이 오면 대기 중인 폴링을 바로 깨워 스냅샷을 조회함.
+    같은 앱 안에서 창 제목/탭만 바뀌는 경우는 알림이 없으므로 적응형 폴링이 보완함.
+    알림 스트림이 끝나면(도우미 종료 등) 적응형 폴링만으로 계속 동작함.
+    """
+
+    name = "notify"
+
+    def __init__(self, probe: SnapshotProbe,
+                 notifications: Callable[[], AsyncIterator[str]],
+                 min_interval: float = 0.5, max_interval: float = 5.0, backoff: float = 2.0,
+                 fallback_max_interval: Optional[float] = None):
+        """
+        Args:
+            probe: 현재 스냅샷을 돌려주는 코루틴 함수
+            notifications: 포커스 변경 알림을 하나씩 내보내는 비동기 이터레이터를 만드는 함수
+            min_interval/max_interval/backoff: 알림이 없는 변경을 잡기 위한 보조 폴링 설정
+            fallback_max_interval: 알림이 끊긴 뒤 사용할 최대 폴링 간격 (None이면 max_interval 유지)
+        """
+        super().__init__(probe, min_interval=min_interval, max_interval=max_interval, backoff=backoff)
+        self._notifications = notifications
+        self.fallback_max_interval = fallback_max_interval
+        self._event: Optional[asyncio.Event] = None
+        self._reader: Optional[asyncio.Task] = None
+        self.notifications = 0
+
+    def _ensure_reader(self):
+        if self._reader is None:
+            self._event = asyncio.Event()
+            self._reader = asyncio.get_running_loop().create_task(self._read_notifications())
+
+    async def _read_notifications(self):
+        try:
+            async for _ in self._notifications():
+                self.notifications += 1
+                self._event.set()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[WARN] 포커스 알림 수신 실패, 적응형 폴링으로 계속합니다: {e}")
+        else:
+            print("[WARN] 포커스 알림이 종료되어 적응형 폴링으로 계속합니다.")
+        if self.fallback_max_interval is not None:
+            self.max_interval = max(self.min_interval, min(self.max_interval, self.fallback_max_interval))
+
+    async def _wait(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def next_change(self, prev_display: Optional[str]) -> Dict[str, str]:
+        self._ensure_reader()
+        while True:
+            notified = False
+            if prev_display is not None:
+                await self._wait(self.interval)
+                notified = self._event.is_set()
+            # 지금까지 온 알림은 아래 조회에 반영되므로 지우고, 이후 알림만 기다림
+            self._event.clear()
+            snapshot = await self._snapshot()
+            if prev_display is None or display_of(snapshot) != prev_display:
+                self.changes += 1
+                self.interval = self.min_interval
+                return snapshot
+            if notified:
+                self.interval = self.min_interval
+            else:
+                self.interval = min(self.max_interval, self.interval * self.backoff)
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+
+    def stats(self) -> Dict[str, int]:
+        stats = super().stats()
+        stats["notifications"] = self.notifications
+        return stats
+
+
+async def process_line_notifications(argv: List[str]) -> AsyncIterator[str]:
+    """
+    도우미 프로세스가 출력하는 줄을 알림으로 내보냄 (예: MACOS_FOCUS_WATCHER_ARGV)
+
+    프로세스를 실행할 수 없거나 종료되면 이터레이터도 끝남
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *argv,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            line = await proc.stdout.readline()
+            if not line:
+                break
+            yield line.decode("utf-8", errors="replace").strip()
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+
+
+class SimulatedFocusWorld:
+    """
+    정해진 시각에 포커스가 바뀌는 가상 환경
+
+    probe()는 현재 시각의 스냅샷을, notifications()는 포커스 변경 시각마다 알림을 내보냄.
+    notify_ratio로 알림이 오는 변경의 비율을 정할 수 있음 (탭/창 제목 변경처럼 알림이 없는 경우 흉내)
+    """
+
+    def __init__(self, timeline: List[Tuple[float, str]], probe_cost: float = 0.0,
+                 notify_ratio: float = 1.0, seed: int = 0):
+        """
+        Args:
+            timeline: (시작 후 경과 초, display) 리스트
+            probe_cost: 스냅샷 조회 한 번에 소모할 CPU 시간 (초, 바쁜 대기로 흉내)
+            notify_ratio: OS 알림이 발생하는 변경의 비율 (0~1)
+            seed: 알림 누락 여부를 정하는 난수 시드
+        """
+        self.timeline = sorted(timeline)
+        self.probe_cost = float(probe_cost)
+        rng = random.Random(seed)
+        self._notified = [rng.random() < notify_ratio for _ in self.timeline]
+        self._start: Optional[float] = None
+
+    @staticmethod
+    def random_timeline(changes: int, mean_gap: float, seed: int = 0) -> List[Tuple[float, str]]:
+        """평균 mean_gap초 간격(지수 분포)으로 changes번 포커스가 바뀌는 타임라인 생성"""
+        rng = random.Random(seed)
+        timeline, t = [(0.0, "app-0")], 0.0
+        for i in range(1, changes + 1):
+            t += rng.expovariate(1.0 / mean_gap)
+            timeline.append((t, f"app-{i}"))
+        return timeline
+
+    def start(self):
+        """타임라인 시작 시각 기록"""
+        self._start = time.monotonic()
+
+    @property
+    def duration(self) -> float:
+        return self.timeline[-1][0]
+
+    def change_time(self, display: str) -> Optional[float]:
+        """display로 바뀐 절대 시각 (time.monotonic 기준)"""
+        for t, d in self.timeline:
+            if d == display:
+                return self._start + t
+        return None
+
+    def current_display(self) -> str:
+        elapsed = time.monotonic() - self._start
+        current = self.timeline[0][1]
+        for t, d in self.timeline:
+            if t > elapsed:
+                break
+            current = d
+        return current
+
+    async def probe(self) -> Dict[str, str]:
+        if self.probe_cost > 0:
+            end = time.process_time() + self.probe_cost
+            while time.process_time() < end:
+                pass
+        display = self.current_display()
+        return {"app": display, "window": "", "display": display}
+
+    async def notifications(self) -> AsyncIterator[str]:
+        for (t, display), notified in zip(self.timeline[1:], self._notified[1:]):
+            delay = self._start + t - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if notified:
+                yield display
+        # 실제 감시 도우미처럼 타임라인이 끝나도 알림 스트림은 열어 둠
+        await asyncio.Future()
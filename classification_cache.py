@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+앱/사이트 판정 결과 캐시 모듈
+- (app_core, site) 기준으로 LLM이 판정한 signal을 SQLite 파일에 저장
+- TTL이 지난 항목은 무시하고, 최대 개수를 넘으면 가장 오래 사용되지 않은 항목부터 삭제(LRU)
+- 메시지는 매번 새로 만들어야 하므로 signal만 저장
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+def normalize_key(app_core: str, site: str = "") -> Tuple[str, str]:
+    """캐시 키 정규화 (소문자, 공백/www./끝의 점 제거)"""
+    core = (app_core or "").strip().lower()
+    host = (site or "").strip().lower().rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    return core, host
+
+
+class ClassificationCache:
+    """SQLite 기반 (app_core, site) → signal 캐시"""
+
+    def __init__(self, path: str = "classification_cache.db",
+                 ttl_seconds: float = 7 * 24 * 3600, max_entries: int = 5000):
+        """
+        Args:
+            path: SQLite 파일 경로
+            ttl_seconds: 항목 유효 시간 (초, 0 이하면 만료 없음)
+            max_entries: 최대 항목 수 (넘으면 LRU 순으로 삭제)
+        """
+        self.path = path
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_entries = max(1, int(max_entries))
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS signals ("
+            " app_core TEXT NOT NULL,"
+            " site TEXT NOT NULL,"
+            " signal INTEGER NOT NULL,"
+            " source TEXT NOT NULL DEFAULT 'llm',"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (app_core, site))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS signals_last_used ON signals(last_used)")
+        self._count = self._conn.execute("SELECT COUNT(*) FROM signals").fetchone()[0]
+
+    def get(self, app_core: str, site: str = "") -> Optional[int]:
+        """
+        캐시된 signal 조회 (조회 시 LRU 사용 시각 갱신)
+
+        Returns:
+            signal (0/1/2) 또는 None (없거나 만료)
+        """
+        key = normalize_key(app_core, site)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT signal, created_at FROM signals WHERE app_core=? AND site=?", key
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            signal, created_at = row
+            if self.ttl_seconds > 0 and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM signals WHERE app_core=? AND site=?", key)
+                self._count -= 1
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE signals SET last_used=? WHERE app_core=? AND site=?", (now, *key)
+            )
+            self.hits += 1
+            return int(signal)
+
+    def put(self, app_core: str, site: str, signal: int, source: str = "llm"):
+        """판정 결과 저장 (같은 키가 있으면 덮어씀)"""
+        key = normalize_key(app_core, site)
+        now = time.time()
+        with self._lock:
+            existed = self._conn.execute(
+                "SELECT 1 FROM signals WHERE app_core=? AND site=?", key
+            ).fetchone() is not None
+            self._conn.execute(
+                "INSERT INTO signals (app_core, site, signal, source, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(app_core, site) DO UPDATE SET"
+                " signal=excluded.signal, source=excluded.source,"
+                " created_at=excluded.created_at, last_used=excluded.last_used",
+                (*key, int(signal), source, now, now),
+            )
+            if not existed:
+                self._count += 1
+            if self._count > self.max_entries:
+                self._evict(self._count - self.max_entries)
+
+    def _evict(self, n: int):
+        """가장 오래 사용되지 않은 항목 n개 삭제"""
+        self._conn.execute(
+            "DELETE FROM signals WHERE rowid IN"
+            " (SELECT rowid FROM signals ORDER BY last_used ASC LIMIT ?)",
+            (n,),
+        )
+        self._count -= n
+
+    def stats(self) -> Dict[str, int]:
+        """캐시 통계"""
+        return {"entries": self._count, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_classification_cache() -> Optional[ClassificationCache]:
+    """
+    환경 변수 설정으로 캐시 열기
+
+    CLASSIFICATION_CACHE_FILE를 빈 값으로 두면 캐시를 사용하지 않음
+    """
+    path = os.getenv("CLASSIFICATION_CACHE_FILE", "classification_cache.db").strip()
+    if not path:
+        return None
+    try:
+        return ClassificationCache(
+            path,
+            ttl_seconds=float(os.getenv("CLASSIFICATION_CACHE_TTL", str(7 * 24 * 3600))),
+            max_entries=int(os.getenv("CLASSIFICATION_CACHE_MAX", "5000")),
+        )
+    except Exception as e:
+        print(f"[WARN] 판정 캐시를 열 수 없습니다: {e}")
+        return None
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+규칙 기반(폴백) 앱/사이트 분류 모듈
+- 게임/학습 도구/브라우저 이름과 학습/콘텐츠 도메인 목록을 버전이 있는 설정 파일(JSON)에서 읽어 컴파일
+- 도메인은 라벨을 뒤집은 트라이로 색인해 하위 도메인도 매칭 (docs.github.com → github.com, *.edu → edu)
+- 감시 스레드가 파일의 (inode, mtime, 크기)만 주기적으로 확인하고, 바뀌면 새 규칙을 따로 컴파일한 뒤
+  참조 하나만 바꿔 교체 → 조회 경로에는 잠금/파일 확인이 없음
+"""
+
+import json
+import os
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+
+# 분류 결과 범주 → signal (0: 학습, 1: 확인 필요, 2: 방해)
+CATEGORY_SIGNALS: Mapping[str, int] = MappingProxyType({
+    "game": 2,
+    "browser_blank": 1,
+    "study_site": 0,
+    "content_site": 1,
+    "browser_other": 1,
+    "study_tool": 0,
+    "other": 1,
+})
+
+_TERMINAL = ""  # 트라이 노드에서 범주를 담는 키 (도메인 라벨은 빈 문자열이 될 수 없음)
+
+RULES_SCHEMA = 1  # 지원하는 규칙 파일 형식 버전
+_LIST_FIELDS = ("games", "study_tools", "browsers", "study_domains", "content_domains")
+
+
+def validate_rules(data: Dict) -> None:
+    """
+    규칙 파일 내용 검사 (형식이 맞지 않으면 ValueError)
+
+    필수: schema(지원 버전), version(규칙 버전, 정수), 목록 필드는 문자열 리스트
+    """
+    if not isinstance(data, dict):
+        raise ValueError("규칙 파일 최상위는 객체여야 합니다.")
+    if data.get("schema") != RULES_SCHEMA:
+        raise ValueError(f"지원하지 않는 규칙 형식입니다: schema={data.get('schema')!r}")
+    if not isinstance(data.get("version"), int):
+        raise ValueError("version(정수)이 필요합니다.")
+    for field in _LIST_FIELDS:
+        values = data.get(field, [])
+        if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+            raise ValueError(f"{field}는 문자열 리스트여야 합니다.")
+    pretty = data.get("pretty_names", {})
+    if not isinstance(pretty, dict) or not all(isinstance(v, str) for v in pretty.values()):
+        raise ValueError("pretty_names는 문자열 값을 가진 객체여야 합니다.")
+
+
+class DomainIndex:
+    """
+    도메인 접미사 색인 (라벨을 뒤집은 트라이)
+
+    "github.com"을 등록하면 "github.com"과 "docs.github.com"이 모두 매칭되고,
+    여러 항목이 겹치면 가장 구체적인(긴) 항목의 범주를 돌려줌
+    """
+
+    __slots__ = ("_root", "size")
+
+    def __init__(self, entries: Iterable[Tuple[str, str]]):
+        """
+        Args:
+            entries: (도메인, 범주) 목록 (같은 도메인이 여러 번 나오면 처음 것 사용)
+        """
+        root: Dict[str, dict] = {}
+        size = 0
+        for domain, category in entries:
+            labels = [label for label in domain.strip().lower().strip(".").split(".") if label]
+            if not labels:
+                continue
+            node = root
+            for label in reversed(labels):
+                node = node.setdefault(label, {})
+            if _TERMINAL not in node:
+                node[_TERMINAL] = category
+                size += 1
+        self._root = root
+        self.size = size
+
+    def lookup(self, host: str) -> Optional[str]:
+        """host에 매칭되는 가장 구체적인 범주 (없으면 None)"""
+        node = self._root
+        found = None
+        for label in reversed(host.split(".")):
+            node = node.get(label)
+            if node is None:
+                break
+            found = node.get(_TERMINAL, found)
+        return found
+
+
+class CompiledRules:
+    """한 번 컴파일하면 바뀌지 않는 분류 규칙"""
+
+    __slots__ = ("games", "study_tools", "browsers", "domains", "pretty_names", "version", "source", "loaded_at")
+
+    def __init__(self, games: Iterable[str] = (), study_tools: Iterable[str] = (),
+                 browsers: Iterable[str] = (), study_domains: Iterable[str] = (),
+                 content_domains: Iterable[str] = (), pretty_names: Optional[Dict[str, str]] = None,
+                 version: int = 0, source: str = ""):
+        self.games = frozenset(n.strip().lower() for n in games)
+        self.study_tools = frozenset(n.strip().lower() for n in study_tools)
+        self.browsers = frozenset(n.strip().lower() for n in browsers)
+        # 학습 도메인을 먼저 등록해 같은 도메인이 양쪽에 있으면 학습으로 판정 (기존 검사 순서와 동일)
+        self.domains = DomainIndex(
+            [(d, "study_site") for d in study_domains] + [(d, "content_site") for d in content_domains]
+        )
+        self.pretty_names = MappingProxyType({k.lower(): v for k, v in (pretty_names or {}).items()})
+        self.version = version
+        self.source = source
+        self.loaded_at = time.time()
+
+    @classmethod
+    def from_dict(cls, data: Dict, source: str = "") -> "CompiledRules":
+        """설정(JSON 객체)을 검사한 뒤 규칙 컴파일"""
+        validate_rules(data)
+        return cls(
+            games=data.get("games", ()),
+            study_tools=data.get("study_tools", ()),
+            browsers=data.get("browsers", ()),
+            study_domains=data.get("study_domains", ()),
+            content_domains=data.get("content_domains", ()),
+            pretty_names=data.get("pretty_names") or {},
+            version=data["version"],
+            source=source,
+        )
+
+    @classmethod
+    def from_file(cls, path: str) -> "CompiledRules":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f), source=path)
+
+    def classify(self, app_core: str, site: str = "") -> Tuple[int, str, str]:
+        """
+        앱/사이트 분류
+
+        Args:
+            app_core: 앱 이름 (소문자, 예: "chrome", "pycharm")
+            site: 브라우저인 경우 도메인 (소문자, 없으면 "")
+
+        Returns:
+            (signal, 범주, 메시지에 쓸 이름)
+        """
+        if app_core in self.games:
+            return 2, "game", app_core
+        if app_core in self.browsers:
+            if not site:
+                return 1, "browser_blank", ""
+            category = self.domains.lookup(site)
+            if category is not None:
+                return CATEGORY_SIGNALS[category], category, site
+            return 1, "browser_other", site
+        if app_core in self.study_tools:
+            return 0, "study_tool", self.pretty_names.get(app_core) or app_core.capitalize()
+        return 1, "other", app_core
+
+
+class RuleBook:
+    """
+    현재 CompiledRules를 들고 있다가 설정 파일이 바뀌면 교체
+
+    - 파일 변경 확인은 감시 스레드가 check_interval초마다 os.stat 한 번으로 함
+      (inode가 바뀌는 원자적 교체(rename)와 같은 자리 덮어쓰기를 모두 감지)
+    - 새 규칙은 감시 스레드에서 다 만든 뒤 참조 대입 한 번으로 교체하므로,
+      조회하는 쪽은 잠금 없이 교체 전/후 규칙 중 하나를 온전히 보게 됨
+    - 읽기/검사에 실패하면 기존 규칙을 그대로 유지
+    """
+
+    def __init__(self, path: str, check_interval: float = 2.0, watch: bool = True):
+        """
+        Args:
+            path: 규칙 설정 파일(JSON) 경로
+            check_interval: 파일 변경 확인 간격 (초)
+            watch: 감시 스레드 실행 여부 (False면 reload()를 직접 호출할 때만 교체)
+        """
+        self.path = path
+        self.check_interval = float(check_interval)
+        self.reloads = 0
+        self._signature: Optional[Tuple[int, int, int, int]] = None
+        self._rules = CompiledRules(source="(empty)")
+        self._reload_lock = threading.Lock()  # 교체하는 쪽끼리만 직렬화 (조회는 사용 안 함)
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self.reload(force=True)
+        if watch and self.check_interval > 0:
+            self.start_watcher()
+
+    @property
+    def rules(self) -> CompiledRules:
+        """현재 규칙"""
+        return self._rules
+
+    @property
+    def version(self) -> int:
+        return self._rules.version
+
+    def _stat_signature(self) -> Tuple[int, int, int, int]:
+        st = os.stat(self.path)
+        return st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        파일이 바뀌었으면(또는 force) 다시 읽어 교체
+
+        Returns:
+            교체했으면 True (읽기/검사 실패 시 기존 규칙 유지)
+        """
+        with self._reload_lock:
+            try:
+                signature = self._stat_signature()
+            except OSError as e:
+                if force:
+                    print(f"[WARN] 분류 규칙 파일을 찾을 수 없습니다: {e}")
+                return False
+            if not force and signature == self._signature:
+                return False
+            self._signature = signature
+            try:
+                rules = CompiledRules.from_file(self.path)
+            except Exception as e:
+                print(f"[WARN] 분류 규칙 파일을 읽을 수 없어 기존 규칙(v{self._rules.version})을 유지합니다: {e}")
+                return False
+            previous = self._rules
+            self._rules = rules
+            self.reloads += 1
+            if previous.version and previous.version != rules.version:
+                print(f"[INFO] 분류 규칙 교체: v{previous.version} → v{rules.version}")
+            return True
+
+    def start_watcher(self):
+        """파일 감시 스레드 시작"""
+        if self._watcher is None or not self._watcher.is_alive():
+            self._stop.clear()
+            self._watcher = threading.Thread(target=self._watch, name="rules-watcher", daemon=True)
+            self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=self.check_interval + 1)
+            self._watcher = None
+
+    def _watch(self):
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"[WARN] 분류 규칙 확인 오류: {e}")
+
+    def classify(self, app_core: str, site: str = "") -> Tuple[int, str, str]:
+        return self._rules.classify(app_core, site)
@@ -8,21 +8,36 @@
  * @param {number} time - 총 학습 시간 (초 단위) - 필수
  * @param {string} email - 사용자 이메일 (선택적)
  * @param {string} serverUrl - 멘토님 서버 URL (예: "https://멘토님서버.com")
+ * @param {string} room - 방 이름 (선택적, 없으면 서버 기본 방)
  * @returns {Promise<Object>} JSON 응답 데이터
  */
-async function fetch_final_result_async(time, email = '', serverUrl = 'http://localhost:8080') {
+async function fetch_final_result_async(time, email = '', serverUrl = 'http://localhost:8080', room = '') {
     try {
         let url = `${serverUrl}/finish?time=${time}`;
         if (email) {
             url += `&email=${encodeURIComponent(email)}`;
         }
+        if (room) {
+            url += `&room=${encodeURIComponent(room)}`;
+        }
         
-        const response = await fetch(url, {
-            method: 'GET',
-            headers: {
-                'Accept': 'application/json',
-            },
-        });
+        let response;
+        for (let attempt = 0; ; attempt++) {
+            response = await fetch(url, {
+                method: 'GET',
+                headers: {
+                    'Accept': 'application/json',
+                },
+            });
+            
+            // 서버가 바쁘면(429/503) Retry-After 초만큼 기다렸다가 최대 3번 다시 요청
+            if ((response.status === 429 || response.status === 503) && attempt < 3) {
+                const retryAfter = parseInt(response.headers.get('Retry-After'), 10) || 1;
+                await new Promise(resolve => setTimeout(resolve, Math.min(retryAfter, 30) * 1000));
+                continue;
+            }
+            break;
+        }
         
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
@@ -42,10 +57,11 @@ async function fetch_final_result_async(time, email = '', serverUrl = 'http://lo
  * @param {number} time - 총 학습 시간 (초 단위) - 필수
  * @param {string} email - 사용자 이메일 (선택적)
  * @param {string} serverUrl - 멘토님 서버 URL
+ * @param {string} room - 방 이름 (선택적)
  * @returns {Promise<Object>} JSON 응답 데이터
  */
-function fetch_final_result(time, email = '', serverUrl = 'http://localhost:8080') {
-    return fetch_final_result_async(time, email, serverUrl);
+function fetch_final_result(time, email = '', serverUrl = 'http://localhost:8080', room = '') {
+    return fetch_final_result_async(time, email, serverUrl, room);
 }
 
 /**
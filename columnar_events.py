@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+열 단위(NumPy) 이벤트 저장 모듈
+- 이벤트 dict 리스트 대신 열 배열로 보관: 시각(float64 epoch 초), signal(int8), 앱 ID(int32, 앱 이름 사전 인코딩)
+- 앱별 사용 시간/학습 앱 사용률/신호별 시간을 np.diff, np.bincount로 한 번에 계산 (AppAnalyzer와 같은 결과)
+- 시간 구간(예: 10분)별 통계는 (구간, 앱) 쌍 중 실제로 있는 것만 np.unique + np.bincount로 계산
+- 정수가 아닌 signal 값은 1(학습 외)로 취급
+- 로그 전체를 메모리에 올려 한 번에 분석할 때용 (benchmark.py columnar).
+  /finish와 모니터는 체크포인트 + 로그 꼬리만 읽는 증분 집계(app_analyzer.py)를 쓰므로 여기로 바꾸지 않음
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app_analyzer import UsageAnalysis, event_app_name, parse_event_time
+from event_log import read_events
+
+
+class ColumnarEvents:
+    """시간순으로 정렬된 이벤트 열 배열 + 앱 이름 사전"""
+
+    def __init__(self, times: np.ndarray, signals: np.ndarray, app_ids: np.ndarray, apps: List[str]):
+        """
+        Args:
+            times: 이벤트 시각 (epoch 초, float64)
+            signals: 이벤트 signal (int8)
+            app_ids: 이벤트 앱 ID (int32, apps의 인덱스)
+            apps: 앱 ID → 앱 이름
+        """
+        # 같은 시각은 기록 순서를 유지하도록 안정 정렬
+        order = np.argsort(times, kind="stable")
+        self.times = np.ascontiguousarray(times[order], dtype=np.float64)
+        self.signals = np.ascontiguousarray(signals[order], dtype=np.int8)
+        self.app_ids = np.ascontiguousarray(app_ids[order], dtype=np.int32)
+        self.apps = apps
+
+    @classmethod
+    def from_events(cls, events: Iterable[Dict]) -> "ColumnarEvents":
+        """이벤트 dict에서 생성 (시각이 없거나 형식이 다른 이벤트는 제외)"""
+        app_index: Dict[str, int] = {}
+        times: List[float] = []
+        signals: List[int] = []
+        app_ids: List[int] = []
+        for event in events:
+            time_sec = parse_event_time(event)
+            if time_sec is None:
+                continue
+            signal = event.get("signal", 1)
+            name = event_app_name(event)
+            app_id = app_index.get(name)
+            if app_id is None:
+                app_id = app_index[name] = len(app_index)
+            times.append(time_sec)
+            signals.append(signal if isinstance(signal, int) and -128 <= signal <= 127 else 1)
+            app_ids.append(app_id)
+        return cls(
+            np.array(times, dtype=np.float64),
+            np.array(signals, dtype=np.int8),
+            np.array(app_ids, dtype=np.int32),
+            list(app_index),
+        )
+
+    @classmethod
+    def from_log(cls, path: str) -> "ColumnarEvents":
+        """로그 파일(JSON Lines / 기존 JSON 배열)에서 생성"""
+        return cls.from_events(read_events(path))
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def _durations(self) -> Optional[np.ndarray]:
+        """
+        각 이벤트가 다음 이벤트까지 이어진 시간 (초, float64)
+
+        마지막 이벤트는 0이 아닌 마지막 간격만큼 이어진 것으로 봄 (AppAnalyzer와 같은 방식), 이벤트가 2개 미만이면 None
+        """
+        if len(self.times) < 2:
+            return None
+        diffs = np.diff(self.times)
+        nonzero = np.flatnonzero(diffs)
+        return np.append(diffs, diffs[nonzero[-1]] if len(nonzero) else 0.0)
+
+    def analyze(self) -> UsageAnalysis:
+        """앱 사용 통계/학습 앱 사용률/총 시간/신호별 시간 (AppAnalyzer.analyze()와 같은 결과)"""
+        durations = self._durations()
+        if durations is None:
+            return UsageAnalysis(event_count=len(self.times))
+        positive = durations > 0
+
+        # 앱별 시간: 빈 앱 이름("")은 전체 시간에는 들어가지만 앱 통계에서는 제외
+        counted = positive.copy()
+        if "" in self.apps:
+            counted &= self.app_ids != self.apps.index("")
+        counted_ids = self.app_ids[counted]
+        app_seconds = np.bincount(counted_ids, weights=durations[counted], minlength=len(self.apps))
+        app_total = float(app_seconds.sum())
+        app_usages = []
+        if app_total > 0:
+            # 동률일 때 순서도 AppAnalyzer와 같도록 처음 시간이 더해진 순서로 나열 (정렬 없이 앱별 첫 위치)
+            first = np.full(len(self.apps), len(counted_ids), dtype=np.int64)
+            np.minimum.at(first, counted_ids, np.arange(len(counted_ids)))
+            ids = np.flatnonzero(first < len(counted_ids))
+            for app_id in ids[np.argsort(first[ids], kind="stable")]:
+                usage_time = float(app_seconds[app_id])
+                app_usages.append({
+                    "appName": self.apps[app_id],
+                    "usageTime": int(usage_time),
+                    "percentage": round(usage_time / app_total * 100.0, 2)
+                })
+            app_usages.sort(key=lambda x: x["percentage"], reverse=True)
+
+        # int8 signal(-128~127)을 0~255로 옮겨 bincount
+        totals = np.bincount(self.signals[positive].astype(np.intp) + 128, weights=durations[positive], minlength=256)
+        signal_seconds = {int(value) - 128: float(totals[value]) for value in np.flatnonzero(totals)}
+        total_seconds = float(totals.sum())
+        learning_rate = 0.0
+        if total_seconds > 0:
+            learning_rate = round(signal_seconds.get(0, 0.0) / total_seconds * 100.0, 2)
+
+        return UsageAnalysis(
+            app_usages=app_usages,
+            learning_rate=learning_rate,
+            total_span_seconds=float(max(0, self.times[-1] - self.times[0])),
+            signal_seconds=signal_seconds,
+            event_count=len(self.times),
+        )
+
+    def window_stats(self, window_seconds: int) -> List[Dict]:
+        """
+        시간 구간별 통계 (구간은 epoch 기준 window_seconds 단위로 정렬, 예: 600이면 매 10분)
+
+        이벤트의 지속 시간은 그 이벤트가 시작된 구간에 모두 더함
+
+        Returns:
+            [{"start": 구간 시작(epoch 초), "totalSeconds", "learningSeconds", "learningRate", "topApp"}, ...]
+            (이벤트가 있는 구간만, 시간순)
+        """
+        durations = self._durations()
+        if durations is None:
+            return []
+        window_seconds = max(1, int(window_seconds))
+        buckets = np.floor_divide(self.times, window_seconds).astype(np.int64)
+        # 시각이 정렬되어 있으므로 구간 번호가 바뀌는 위치만 찾으면 됨 (np.unique 정렬 불필요)
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+        windows = buckets[starts]
+        window_idx = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(buckets))))
+
+        totals = np.bincount(window_idx, weights=durations, minlength=len(windows))
+        learning = np.bincount(window_idx, weights=np.where(self.signals == 0, durations, 0.0),
+                               minlength=len(windows))
+        # (구간, 앱) 쌍을 하나의 키로 묶어 나온 쌍만 합산 (구간 수 x 앱 수 행렬을 만들지 않음)
+        n_apps = max(1, len(self.apps))
+        keys, inverse = np.unique(window_idx * n_apps + self.app_ids, return_inverse=True)
+        pair_seconds = np.bincount(inverse, weights=durations, minlength=len(keys))
+        pair_window, pair_app = np.divmod(keys, n_apps)
+        # 구간마다 시간이 가장 긴 앱 (동률이면 앱 ID가 작은 쪽), 정렬 후 구간별 첫 항목
+        order = np.lexsort((pair_app, -pair_seconds, pair_window))
+        firsts = order[np.concatenate(([True], np.diff(pair_window[order]) != 0))]
+        top_apps = pair_app[firsts]
+
+        stats = []
+        # 원소마다 NumPy 스칼라를 만들지 않도록 파이썬 리스트로 바꿔서 순회
+        for bucket, total, learned, top_app in zip(windows.tolist(), totals.tolist(), learning.tolist(),
+                                                   top_apps.tolist()):
+            stats.append({
+                "start": bucket * window_seconds,
+                "totalSeconds": int(total),
+                "learningSeconds": int(learned),
+                "learningRate": round(learned / total * 100.0, 2) if total > 0 else 0.0,
+                "topApp": self.apps[top_app] if total > 0 else "",
+            })
+        return stats
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+이벤트 필드 해석 모듈 (분석기와 로그 형식이 함께 사용)
+- 이벤트 시각: 숫자 "ts"(epoch 초) 우선, 없으면 "time" 문자열을 고정 폭 파서로 변환
+- 앱 이름: 출력 형식의 "app" 또는 저장 형식의 snapshot(app/domain)에서 추출
+"""
+
+from datetime import datetime
+from typing import Dict, Optional
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+# "YYYY-MM-DD HH" → 그 시각(정각)의 epoch 초 (로컬 시간), 로그는 대부분 같은 시간대의 이벤트가 이어지므로 적중률이 높음
+_HOUR_EPOCH_CACHE: Dict[str, float] = {}
+_HOUR_EPOCH_CACHE_MAX = 100000
+
+
+def parse_time_string(value: str) -> Optional[float]:
+    """
+    "YYYY-MM-DD HH:MM:SS" 문자열을 epoch 초(로컬 시간)로 변환 (형식이 다르면 None)
+
+    고정 폭 형식이면 앞 13자리(날짜+시)의 epoch를 캐시해 두고 분·초만 더함
+    (시간대/서머타임 처리는 정각 epoch를 구할 때 strptime과 같게 적용됨).
+    폭이 다르거나 분·초가 범위를 벗어나면 strptime으로 처리해 기존과 같은 결과를 냄
+    """
+    if len(value) == 19 and value[13] == ":" and value[16] == ":":
+        minute = value[14:16]
+        second = value[17:19]
+        if minute.isdigit() and second.isdigit():
+            minutes = int(minute)
+            seconds = int(second)
+            if minutes < 60 and seconds < 60:
+                key = value[:13]
+                base = _HOUR_EPOCH_CACHE.get(key)
+                if base is None:
+                    try:
+                        base = datetime.strptime(key, "%Y-%m-%d %H").timestamp()
+                    except ValueError:
+                        return None
+                    if len(_HOUR_EPOCH_CACHE) >= _HOUR_EPOCH_CACHE_MAX:
+                        _HOUR_EPOCH_CACHE.clear()
+                    _HOUR_EPOCH_CACHE[key] = base
+                return base + minutes * 60 + seconds
+    try:
+        return datetime.strptime(value, TIME_FORMAT).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_event_time(event: Dict) -> Optional[float]:
+    """
+    이벤트 시각(epoch 초), 없거나 형식이 다르면 None
+
+    모니터가 함께 기록한 숫자 "ts"(epoch 초)가 있으면 그대로 쓰고,
+    없으면(기존 로그) "time" 문자열을 parse_time_string으로 변환
+    """
+    ts = event.get("ts")
+    if isinstance(ts, (int, float)) and not isinstance(ts, bool):
+        return float(ts)
+    value = event.get("time")
+    if not isinstance(value, str):
+        return None
+    return parse_time_string(value)
+
+
+def snapshot_app_name(snapshot: Dict) -> str:
+    """
+    스냅샷에서 앱 이름 추출
+
+    Args:
+        snapshot: 이벤트의 snapshot 딕셔너리
+
+    Returns:
+        앱 이름 문자열 (예: "chrome(notion.so)")
+    """
+    if not snapshot:
+        return "unknown"
+
+    # snapshot에 "app" 키가 있으면 직접 사용
+    app = snapshot.get("app", "")
+
+    # domain이 있으면 "app(domain)" 형식으로
+    domain = snapshot.get("domain", "")
+
+    if domain:
+        # 브라우저 앱 이름 정규화
+        app_lower = app.lower()
+        if app_lower == "google chrome":
+            return f"chrome({domain})"
+        elif app_lower == "safari":
+            return f"safari({domain})"
+        elif app_lower == "microsoft edge":
+            return f"edge({domain})"
+        elif app_lower == "firefox":
+            return f"firefox({domain})"
+        else:
+            return f"{app}({domain})" if app else domain
+    else:
+        # 앱 이름만
+        app_lower = app.lower()
+        if app_lower == "google chrome":
+            return "chrome"
+        elif app_lower == "safari":
+            return "safari"
+        elif app_lower == "microsoft edge":
+            return "edge"
+        elif app_lower == "firefox":
+            return "firefox"
+        else:
+            return app if app else "unknown"
+
+
+def event_app_name(event: Dict) -> str:
+    """
+    이벤트의 앱 이름 추출
+
+    출력 형식: {"time": "...", "app": "...", "signal": 1, "message": "..."}
+    저장 형식: {"time": "...", "snapshot": {...}, "signal": 1, "message": "..."}
+    """
+    if "app" in event:
+        return event.get("app", "")
+    return snapshot_app_name(event.get("snapshot", {}))
@@ -0,0 +1,493 @@
+# -*- coding: utf-8 -*-
+"""
+이벤트 로그 저장/읽기 모듈
+- JSON Lines 형식(한 줄에 이벤트 하나)으로 append-only 기록
+- fsync는 N개 이벤트 또는 T초마다 묶어서 수행
+- 비정상 종료로 잘린 마지막 줄은 다음 실행 시 자동 복구
+- 기존 JSON 배열 형식(activity_log.json)도 그대로 읽기 지원
+- 바이너리 로그(binary_log.py, LOG_MODE=binary)는 read_events()에서 매직으로 감지해 읽음
+- JsonLinesReader: 메모리 매핑한 로그를 줄 단위로 하나씩 파싱 (파일 전체 문자열/이벤트 리스트를 만들지 않음)
+- read_recent_events: 로그 끝의 이벤트 N개만 읽기 (파일 끝에서부터 거꾸로)
+- 메모리 상한을 넘는 이벤트 기록은 디스크 세그먼트로 내보내기(SpillingEventHistory)
+"""
+
+import json
+import os
+import time
+from collections import deque
+from typing import Dict, Iterator, List, Optional
+
+from binary_log import is_binary_log, read_binary_events, read_recent_binary_events
+from mapped_file import Buffer, PageReleaser, mapped_file
+
+
+def _dump_line(event: Dict) -> bytes:
+    """이벤트 하나를 JSON Lines 한 줄(bytes)로 직렬화"""
+    return (json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _first_char(path: str) -> str:
+    """파일의 첫 번째 공백이 아닌 문자 반환 (형식 감지용)"""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(64)
+            if not chunk:
+                return ""
+            stripped = chunk.lstrip()
+            if stripped:
+                return chr(stripped[0])
+
+
+def is_legacy_json_array(path: str) -> bool:
+    """기존 JSON 배열 형식 파일인지 확인"""
+    try:
+        return _first_char(path) == "["
+    except OSError:
+        return False
+
+
+def parse_events(data: str) -> List[Dict]:
+    """
+    로그 텍스트를 이벤트 리스트로 파싱
+
+    - '['로 시작하면 기존 JSON 배열 형식으로 파싱 (오류 시 JSONDecodeError)
+    - 그 외에는 JSON Lines로 파싱하며, 깨진 줄(잘린 마지막 줄 등)은 건너뜀
+
+    Args:
+        data: 로그 파일 내용
+
+    Returns:
+        이벤트 딕셔너리 리스트
+    """
+    data = data.strip()
+    if not data:
+        return []
+
+    if data[0] == "[":
+        events = json.loads(data)
+        if not isinstance(events, list):
+            events = [events] if events else []
+        return events
+
+    events: List[Dict] = []
+    skipped = 0
+    for line in data.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            event = json.loads(line)
+        except json.JSONDecodeError:
+            if not events and skipped == 0:
+                # 줄 단위가 아닌 단일 JSON 객체(여러 줄로 들여쓰기된 형식)일 수 있음
+                try:
+                    event = json.loads(data)
+                    return [event] if event else []
+                except json.JSONDecodeError:
+                    pass
+            skipped += 1
+            continue
+        if isinstance(event, dict):
+            events.append(event)
+
+    if skipped:
+        print(f"[WARN] 손상된 로그 줄 {skipped}개를 건너뛰었습니다.")
+    return events
+
+
+class JsonLinesReader:
+    """
+    JSON Lines 로그 순차/증분 읽기 상태 (다음에 읽을 파일 오프셋)
+
+    iter_events()에는 파일 전체(mapped_file 매핑 또는 bytes)를 넘기며, offset부터 개행으로 끝나는
+    BLOCK_SIZE 정도의 블록만 잘라 디코딩·파싱하므로 파일 전체 문자열이나 이벤트 리스트를 만들지 않음.
+    아직 개행이 쓰이지 않은 마지막 줄은 남겨 두었다가 다음 호출에서 읽음
+    """
+
+    BLOCK_SIZE = 1024 * 1024
+
+    def __init__(self, offset: int = 0):
+        self.offset = offset
+        self.skipped = 0  # 건너뛴 깨진 줄 수
+
+    def iter_events(self, buf: Buffer, final: bool = False) -> Iterator[Dict]:
+        """
+        offset 이후 완성된 줄의 이벤트를 기록 순서대로 하나씩 반환 (offset은 블록을 다 처리할 때마다 전진)
+
+        Args:
+            final: True면 개행 없는 마지막 줄도 파싱 (파일 전체를 한 번 읽을 때, parse_events와 같은 동작)
+        """
+        releaser = PageReleaser(buf, self.offset)
+        pos = self.offset
+        size = len(buf)
+        skipped = 0
+        while pos < size:
+            end = buf.rfind(b"\n", pos, min(pos + self.BLOCK_SIZE, size))
+            if end < 0:
+                # 블록보다 긴 줄
+                end = buf.find(b"\n", pos)
+            if end < 0:
+                if not final:
+                    break
+                end = size
+            text = buf[pos:end].decode("utf-8", errors="replace")
+            for line in text.split("\n"):
+                if not line.strip():
+                    continue
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    skipped += 1
+                    continue
+                if isinstance(event, dict):
+                    yield event
+            pos = self.offset = min(end + 1, size)
+            releaser.advance(pos)
+        if skipped:
+            self.skipped += skipped
+            print(f"[WARN] 손상된 로그 줄 {skipped}개를 건너뛰었습니다.")
+
+
+def read_events(path: str) -> List[Dict]:
+    """
+    이벤트 로그 파일 읽기 (JSON Lines / 기존 JSON 배열 / 바이너리 로그 모두 지원)
+
+    Args:
+        path: 로그 파일 경로
+
+    Returns:
+        이벤트 딕셔너리 리스트 (파일이 없으면 빈 리스트)
+    """
+    if not os.path.exists(path):
+        return []
+    if is_binary_log(path):
+        return read_binary_events(path)
+    if is_legacy_json_array(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return parse_events(f.read())
+    with mapped_file(path) as buf:
+        reader = JsonLinesReader()
+        events = list(reader.iter_events(buf, final=True))
+        if not events and reader.skipped:
+            # 줄 단위가 아닌 단일 JSON 객체(여러 줄로 들여쓰기된 형식)일 수 있음
+            return parse_events(buf[:].decode("utf-8"))
+        return events
+
+
+def read_recent_events(path: str, limit: int) -> List[Dict]:
+    """
+    로그 파일 끝의 이벤트 limit개 (기록 순서, read_events(path)[-limit:]와 같은 결과)
+
+    JSON Lines는 파일 끝에서부터 블록 단위로 거꾸로 읽어 limit개가 모이면 멈추므로 로그 크기와 관계없이 빠름
+    """
+    if limit <= 0 or not os.path.exists(path):
+        return []
+    if is_binary_log(path):
+        return read_recent_binary_events(path, limit)
+    if is_legacy_json_array(path):
+        return read_events(path)[-limit:]
+    recent: List[Dict] = []  # 최근 것부터
+    skipped = 0
+    with mapped_file(path) as buf:
+        pos = len(buf)
+        while pos > 0 and len(recent) < limit:
+            # 블록 시작을 앞쪽 줄 경계에 맞춤 (블록보다 긴 줄은 통째로 포함)
+            start = buf.rfind(b"\n", 0, max(0, pos - JsonLinesReader.BLOCK_SIZE)) + 1
+            lines = buf[start:pos].decode("utf-8", errors="replace").split("\n")
+            for line in reversed(lines):
+                if not line.strip():
+                    continue
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    skipped += 1
+                    continue
+                if isinstance(event, dict):
+                    recent.append(event)
+                    if len(recent) >= limit:
+                        break
+            pos = start
+    if not recent and skipped:
+        # 줄 단위가 아닌 단일 JSON 객체 형식
+        return read_events(path)[-limit:]
+    if skipped:
+        print(f"[WARN] 손상된 로그 줄 {skipped}개를 건너뛰었습니다.")
+    recent.reverse()
+    return recent
+
+
+class EventLogWriter:
+    """append-only JSON Lines 이벤트 로그 기록기"""
+
+    def __init__(self, path: str, fsync_every: int = 20, fsync_interval: float = 5.0):
+        """
+        Args:
+            path: 로그 파일 경로
+            fsync_every: 이 개수만큼 기록될 때마다 fsync
+            fsync_interval: 마지막 fsync 이후 이 시간(초)이 지나면 fsync
+        """
+        self.path = path
+        self.fsync_every = max(1, int(fsync_every))
+        self.fsync_interval = float(fsync_interval)
+        self._fh = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def open(self):
+        """로그 파일 열기 (기존 배열 형식 변환 및 꼬리 복구 포함)"""
+        if self._fh is not None:
+            return
+        if os.path.exists(self.path):
+            if is_binary_log(self.path):
+                # 꼬리 복구가 바이너리 레코드를 잘라내지 않도록 거부
+                raise ValueError(f"{self.path}는 바이너리 로그입니다. (LOG_MODE=binary로 기록)")
+            if is_legacy_json_array(self.path):
+                self._migrate_legacy()
+            else:
+                self._recover_tail()
+        self._fh = open(self.path, "ab")
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def append(self, event: Dict) -> int:
+        """이벤트 하나를 로그 끝에 추가 (기록한 바이트 수 반환)"""
+        if self._fh is None:
+            self.open()
+        line = _dump_line(event)
+        self._fh.write(line)
+        # 분석기가 바로 읽을 수 있도록 OS 버퍼까지는 매번 내보냄
+        self._fh.flush()
+        self._pending += 1
+        if (self._pending >= self.fsync_every
+                or time.monotonic() - self._last_sync >= self.fsync_interval):
+            self.sync()
+        return len(line)
+
+    def sync(self):
+        """버퍼를 디스크에 강제로 기록"""
+        if self._fh is None:
+            return
+        self._fh.flush()
+        try:
+            os.fsync(self._fh.fileno())
+        except OSError as e:
+            print(f"[WARN] fsync 실패: {e}")
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        """남은 이벤트를 fsync하고 파일 닫기"""
+        if self._fh is None:
+            return
+        self.sync()
+        self._fh.close()
+        self._fh = None
+
+    def _recover_tail(self):
+        """
+        비정상 종료로 잘린 마지막 줄 복구
+
+        마지막 줄이 개행으로 끝나지 않았을 때, 온전한 JSON이면 개행만 보충하고
+        그렇지 않으면 마지막 개행 위치까지 잘라냄
+        """
+        with open(self.path, "r+b") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+
+            # 마지막 개행 위치 탐색 (뒤에서부터 블록 단위)
+            pos = size
+            last_nl = -1
+            while pos > 0 and last_nl < 0:
+                step = min(4096, pos)
+                pos -= step
+                f.seek(pos)
+                block = f.read(step)
+                idx = block.rfind(b"\n")
+                if idx >= 0:
+                    last_nl = pos + idx
+
+            f.seek(last_nl + 1)
+            tail = f.read()
+            try:
+                json.loads(tail.decode("utf-8"))
+                f.seek(0, os.SEEK_END)
+                f.write(b"\n")
+                print("[INFO] 로그 마지막 줄 개행 보충")
+            except (ValueError, UnicodeDecodeError):
+                f.truncate(last_nl + 1)
+                print(f"[WARN] 잘린 로그 꼬리 {len(tail)}바이트 제거")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _migrate_legacy(self):
+        """기존 JSON 배열 파일을 JSON Lines로 1회 변환 (임시 파일 → 원자적 교체)"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                events = parse_events(f.read())
+        except json.JSONDecodeError as e:
+            # 전체 재기록 도중 중단된 배열 파일은 복구가 불가능하므로 보존 후 새로 시작
+            backup = f"{self.path}.corrupt-{int(time.time())}"
+            os.replace(self.path, backup)
+            print(f"[WARN] 손상된 JSON 배열 로그를 {backup}로 옮기고 새로 시작합니다: {e}")
+            return
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            for event in events:
+                f.write(_dump_line(event))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        print(f"[INFO] JSON 배열 로그 {len(events)}개 이벤트를 JSON Lines 형식으로 변환")
+
+
+def write_events_json_array(path: str, events: List[Dict]):
+    """
+    전체 이벤트를 JSON 배열로 다시 쓰기 (기존 방식, LOG_MODE=rewrite)
+
+    임시 파일에 쓴 뒤 교체하므로 쓰는 도중 종료되어도 기존 파일은 유지됨
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(events, f, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, path)
+
+
+def open_event_log(path: str, fsync_every: Optional[int] = None,
+                   fsync_interval: Optional[float] = None) -> EventLogWriter:
+    """환경 변수 설정을 반영한 EventLogWriter 생성 및 열기"""
+    writer = EventLogWriter(
+        path,
+        fsync_every=fsync_every if fsync_every is not None else int(os.getenv("LOG_FSYNC_EVERY", "20")),
+        fsync_interval=fsync_interval if fsync_interval is not None else float(os.getenv("LOG_FSYNC_INTERVAL", "5.0")),
+    )
+    writer.open()
+    return writer
+
+
+class SpillingEventHistory:
+    """
+    메모리 상한이 있는 이벤트 기록
+
+    최근 이벤트만 메모리(deque)에 유지하고, 메모리 사용량이 상한을 넘으면
+    오래된 이벤트부터 디스크 세그먼트 파일(JSON Lines)로 내보냄.
+    세그먼트는 크기 기준으로 교체(rotate)되며, 순회 시 세그먼트 → 메모리 순으로
+    전체 기록을 시간순으로 돌려줌.
+    """
+
+    SEGMENT_PREFIX = "segment-"
+    SEGMENT_SUFFIX = ".jsonl"
+
+    def __init__(self, segment_dir: str, max_memory_bytes: int = 4 * 1024 * 1024,
+                 segment_max_bytes: int = 8 * 1024 * 1024, max_segments: int = 0):
+        """
+        Args:
+            segment_dir: 세그먼트 파일을 저장할 디렉터리 (첫 세그먼트 생성 시 비우고 시작)
+            max_memory_bytes: 메모리에 유지할 이벤트의 직렬화 크기 합 상한
+            segment_max_bytes: 세그먼트 파일 하나의 최대 크기 (넘으면 새 파일로 교체)
+            max_segments: 유지할 최대 세그먼트 수 (0이면 무제한, 넘으면 오래된 것부터 삭제)
+        """
+        self.segment_dir = segment_dir
+        self.max_memory_bytes = max(0, int(max_memory_bytes))
+        self.segment_max_bytes = max(1, int(segment_max_bytes))
+        self.max_segments = max(0, int(max_segments))
+
+        self._recent = deque()  # (event, 직렬화된 줄)
+        self._memory_bytes = 0
+        self._segments: List[str] = []
+        self._segment_counts: List[int] = []
+        self._segment_fh = None
+        self._segment_size = 0
+        self._segment_seq = 0
+        self._spilled_count = 0
+        self._dropped_count = 0
+
+    def append(self, event: Dict):
+        """이벤트 추가 (메모리 상한 초과 시 오래된 이벤트를 세그먼트로 내보냄)"""
+        line = _dump_line(event)
+        self._recent.append((event, line))
+        self._memory_bytes += len(line)
+        while self._memory_bytes > self.max_memory_bytes and len(self._recent) > 1:
+            old_event, old_line = self._recent.popleft()
+            self._memory_bytes -= len(old_line)
+            self._spill(old_line)
+
+    def __len__(self) -> int:
+        return self._spilled_count - self._dropped_count + len(self._recent)
+
+    def __iter__(self) -> Iterator[Dict]:
+        """세그먼트와 메모리를 이어서 전체 기록을 시간순으로 순회"""
+        if self._segment_fh is not None:
+            self._segment_fh.flush()
+        for path in list(self._segments):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        line = line.strip()
+                        if line:
+                            yield json.loads(line)
+            except FileNotFoundError:
+                # 순회 도중 보존 개수 초과로 삭제된 세그먼트
+                continue
+        for event, _ in list(self._recent):
+            yield event
+
+    def recent(self, n: Optional[int] = None) -> List[Dict]:
+        """메모리에 있는 최근 이벤트 (n개 지정 시 마지막 n개)"""
+        events = [event for event, _ in self._recent]
+        return events if n is None else events[-n:]
+
+    @property
+    def memory_bytes(self) -> int:
+        """메모리에 유지 중인 이벤트의 직렬화 크기 합"""
+        return self._memory_bytes
+
+    @property
+    def segment_paths(self) -> List[str]:
+        """현재 유지 중인 세그먼트 파일 경로 (오래된 순)"""
+        return list(self._segments)
+
+    def close(self):
+        """열린 세그먼트 파일 닫기"""
+        if self._segment_fh is not None:
+            self._segment_fh.close()
+            self._segment_fh = None
+
+    def _spill(self, line: bytes):
+        if self._segment_fh is None or self._segment_size + len(line) > self.segment_max_bytes:
+            self._rotate()
+        self._segment_fh.write(line)
+        self._segment_size += len(line)
+        self._segment_counts[-1] += 1
+        self._spilled_count += 1
+
+    def _rotate(self):
+        if self._segment_fh is not None:
+            self._segment_fh.close()
+        if self._segment_seq == 0:
+            # 첫 세그먼트 생성 시 이전 실행에서 남은 세그먼트 정리
+            os.makedirs(self.segment_dir, exist_ok=True)
+            for name in os.listdir(self.segment_dir):
+                if name.startswith(self.SEGMENT_PREFIX) and name.endswith(self.SEGMENT_SUFFIX):
+                    os.remove(os.path.join(self.segment_dir, name))
+        self._segment_seq += 1
+        path = os.path.join(
+            self.segment_dir, f"{self.SEGMENT_PREFIX}{self._segment_seq:06d}{self.SEGMENT_SUFFIX}"
+        )
+        self._segment_fh = open(path, "ab")
+        self._segment_size = 0
+        self._segments.append(path)
+        self._segment_counts.append(0)
+
+        if self.max_segments and len(self._segments) > self.max_segments:
+            oldest = self._segments.pop(0)
+            self._dropped_count += self._segment_counts.pop(0)
+            try:
+                os.remove(oldest)
+            except OSError as e:
+                print(f"[WARN] 세그먼트 삭제 실패: {oldest} ({e})")
@@ -3,19 +3,30 @@
 구루미 캠스터디 종료 결과 API 서버 (FastAPI)
 - localhost:8080에서 실행
 - GET /finish?time={총학습시간(초)} 엔드포인트 제공
+- 분석은 크기가 정해진 작업 풀에서 실행 (몰리면 429/503 + Retry-After, 단계별 시간은 Server-Timing 헤더)
+- 모니터가 저장한 집계 체크포인트(activity_log.agg.json)가 있으면 그 뒤에 추가된 로그만 읽음
+- 로그가 바뀌지 않았으면 캐시된 응답 재사용, ETag/If-None-Match가 맞으면 304
+- EVENT_STORE_DIR을 지정하면 email(+room) 파라미터로 사용자별 로그를 분석 (교실 하나 = 서버 하나)
+- INGEST_ENABLED=1(+ INGEST_TOKEN)이면 POST /ingest로 모니터들이 보낸 이벤트를 받아 저장과 동시에 집계 갱신
 - CORS 설정 포함
 - 자동 API 문서: http://localhost:8080/docs
 """
 
 import os
 import json
+import secrets
 from datetime import datetime
+from time import perf_counter
 from typing import Dict, List, Optional, Tuple
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import Body, FastAPI, Header, Query, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
-from app_analyzer import AppAnalyzer
+from analysis_pool import AnalysisPool, PoolBusy, StageTimer
+from app_analyzer import AppAnalyzer, CheckpointedAppAnalyzer, SegmentedAppAnalyzer
+from ingest_store import LiveUserLog, open_live_user_log, validate_batch
+from response_cache import ResponseCache, etag_matches, file_signature
+from user_logs import DEFAULT_ROOM, HotAnalyzers, UserLogIndex, user_log_dir
 # 시연용 판정기 사용 (나중에 실제 ML 모델 사용 시 아래 주석 해제하고 위 주석 처리)
 from ml_predictor_demo import MLPredictorDemo
 # from ml_predictor import MLPredictor  # 실제 ML 모델 사용 시 주석 해제
@@ -40,26 +51,83 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Retry-After", "Server-Timing"],
 )
 
 # ======== 전역 변수 ========
-JSON_FILE = "activity_log.json"  # 모니터링 프로그램이 저장하는 파일
+# 모니터링 프로그램이 저장하는 파일 (모니터가 LOG_MODE=binary면 LOG_FILE=activity_log.bin, 형식은 자동 감지)
+JSON_FILE = os.getenv("LOG_FILE", "").strip() or "activity_log.json"
 MODEL_FILE = "model.pkl"  # 머신러닝 모델 파일
+# 모니터가 기록하며 저장하는 사용 시간 집계 체크포인트 (비어 있으면 activity_log.agg.json)
+# 없거나 로그와 맞지 않으면 로그 전체를 읽음
+AGGREGATE_FILE = os.getenv("AGGREGATE_FILE", "").strip()
+
+# 분석 작업 풀 설정
+FINISH_WORKERS = int(os.getenv("FINISH_WORKERS", "4"))  # 분석 스레드 수
+FINISH_QUEUE_MAX = int(os.getenv("FINISH_QUEUE_MAX", "16"))  # 스레드를 기다릴 수 있는 작업 수 (넘으면 429)
+FINISH_QUEUE_TIMEOUT = float(os.getenv("FINISH_QUEUE_TIMEOUT", "5"))  # 대기열에서 기다리는 최대 시간 (초, 넘으면 503)
+FINISH_JOB_TIMEOUT = float(os.getenv("FINISH_JOB_TIMEOUT", "20"))  # 분석 결과를 기다리는 최대 시간 (초, 넘으면 503)
+FINISH_SLOW_MS = float(os.getenv("FINISH_SLOW_MS", "500"))  # 이보다 오래 걸린 요청은 단계별 시간 로그 출력 (ms)
+FINISH_CACHE_MAX = int(os.getenv("FINISH_CACHE_MAX", "256"))  # 응답 캐시 최대 항목 수 (0이면 사용 안 함)
+
+# 사용자별 로그 저장소 ({디렉터리}/{방}/{이메일}/segment-*.jsonl, 비어 있으면 email을 무시하고 JSON_FILE만 분석)
+EVENT_STORE_DIR = os.getenv("EVENT_STORE_DIR", "").strip()
+DEFAULT_ROOM_PATH = os.getenv("ROOM_PATH", "").strip()  # room 파라미터가 없을 때 사용할 방
+FINISH_HOT_USERS = int(os.getenv("FINISH_HOT_USERS", "64"))  # 메모리에 유지할 사용자 분석기 수
+
+# 수집 API (모니터가 이벤트를 서버로 전송): 켜면 EVENT_STORE_DIR은 이 서버만 기록
+# (수집 중인 사용자는 모두 메모리에 있어야 하므로 FINISH_HOT_USERS는 교실 인원 이상으로)
+INGEST_REQUESTED = bool(EVENT_STORE_DIR) and os.getenv("INGEST_ENABLED", "0").strip() in ("1", "true", "yes")
+INGEST_TOKEN = os.getenv("INGEST_TOKEN", "").strip()  # "Authorization: Bearer {토큰}" 필요
+# 토큰 없이 켜면 누구나 저장소에 기록할 수 있으므로 토큰이 있어야만 수집 API를 켬
+INGEST_ENABLED = INGEST_REQUESTED and bool(INGEST_TOKEN)
 
 # 전역 분석기 인스턴스
 app_analyzer: Optional[AppAnalyzer] = None
 ml_predictor = None  # MLPredictorDemo 또는 MLPredictor
+user_log_index: Optional[UserLogIndex] = None
+user_analyzers: Optional[HotAnalyzers] = None  # (방, 이메일) → SegmentedAppAnalyzer/LiveUserLog (최근 사용자만)
+
+# 분석/판정은 이벤트 루프가 아닌 이 풀의 스레드에서 실행
+analysis_pool = AnalysisPool(
+    workers=FINISH_WORKERS,
+    queue_max=FINISH_QUEUE_MAX,
+    queue_timeout=FINISH_QUEUE_TIMEOUT,
+    job_timeout=FINISH_JOB_TIMEOUT,
+    name="finish",
+)
+
+# (로그 파일, time) → 직렬화된 응답 (로그 파일 서명이 바뀌면 무효)
+response_cache = ResponseCache(max_entries=FINISH_CACHE_MAX)
 
 
 def init_analyzers():
     """분석기 초기화"""
-    global app_analyzer, ml_predictor
+    global app_analyzer, ml_predictor, user_log_index, user_analyzers
     
     try:
-        app_analyzer = AppAnalyzer(JSON_FILE)
+        # 집계 체크포인트에서 시작하고, 이후에는 새로 추가된 줄만 파싱 (증분 모드)
+        app_analyzer = CheckpointedAppAnalyzer(JSON_FILE, AGGREGATE_FILE or None)
     except Exception as e:
         print(f"[WARN] AppAnalyzer 초기화 실패: {e}")
         app_analyzer = None
+
+    if INGEST_ENABLED:
+        # 수집 모드: 사용자 로그는 이 서버가 기록하고, 기록하면서 집계도 갱신
+        user_log_index = UserLogIndex(EVENT_STORE_DIR)
+        user_analyzers = HotAnalyzers(
+            lambda user: open_live_user_log(EVENT_STORE_DIR, *user),
+            max_resident=FINISH_HOT_USERS,
+            on_evict=LiveUserLog.close,
+        )
+    elif EVENT_STORE_DIR:
+        # 사용자 분석기는 처음 조회될 때 그 사용자의 세그먼트만 읽어 만듦
+        index = UserLogIndex(EVENT_STORE_DIR)
+        user_log_index = index
+        user_analyzers = HotAnalyzers(
+            lambda user: SegmentedAppAnalyzer(lambda: index.segments(*user), name=f"{user[0]}/{user[1]}"),
+            max_resident=FINISH_HOT_USERS,
+        )
     
     # 시연용 판정기 사용
     try:
@@ -76,17 +144,188 @@ def init_analyzers():
     #     ml_predictor = None
 
 
+def _user_partition(room: str, email: str) -> Optional[Tuple[str, str]]:
+    """
+    요청의 (방, 이메일) 키 (사용자별 저장소를 쓰지 않거나 email이 없으면 None → 단일 로그)
+
+    사용자 로그 경로가 저장소 밖을 가리키면 400
+    """
+    email = (email or "").strip().lower()
+    if user_analyzers is None or not email:
+        return None
+    room = (room or DEFAULT_ROOM_PATH).strip().strip("/").lower()
+    try:
+        user_log_dir(EVENT_STORE_DIR, room, email)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return room or DEFAULT_ROOM, email
+
+
+def _build_finish_result(timer: StageTimer, total_study_time_seconds: int,
+                         analyzer: Optional[AppAnalyzer]) -> Dict:
+    """
+    /finish 응답 데이터 계산 (작업 풀 스레드에서 실행)
+
+    Args:
+        timer: 단계별 시간 기록기 (analyze/predict)
+        total_study_time_seconds: 총 학습 시간 (초 단위)
+        analyzer: 사용할 분석기 (단일 로그 또는 사용자별 로그)
+
+    Returns:
+        /finish 응답 JSON (appUsages, studyResult)
+    """
+    # 앱 사용 분석 + 학습 앱 사용률(signal 0 비율)을 한 번에 계산
+    app_usages = []
+    learning_rate = 0.0
+    learning_app_time = 0
+    if analyzer:
+        try:
+            with timer.stage("analyze"):
+                analysis = analyzer.analyze()
+            app_usages = analysis.app_usages
+            learning_rate = analysis.learning_rate
+            # 학습 시간 중 학습 앱 사용 시간 계산
+            learning_app_time = int(total_study_time_seconds * learning_rate / 100.0)
+        except Exception as e:
+            print(f"[ERROR] 앱 사용 분석 실패: {e}")
+    else:
+        print("[WARN] AppAnalyzer가 초기화되지 않음")
+
+    # 머신러닝 합격/불합격 판정 (ml_predictor_demo 사용)
+    passed = False
+    message = "학습 통계 데이터를 분석 중입니다..."
+
+    if ml_predictor:
+        try:
+            # ml_predictor_demo의 predict 메서드로 판정 (초기화된 인스턴스 재사용)
+            total_time_minutes = total_study_time_seconds / 60.0
+            green_ratio = learning_rate / 100.0
+
+            with timer.stage("predict"):
+                prediction_result = ml_predictor.predict(total_time_minutes, green_ratio)
+            passed = prediction_result.get("passed", False)
+
+            # 메시지 생성 (합격/불합격 모두)
+            if passed:
+                messages = [
+                    "수고하셨습니다! 목표를 달성했어요 🎉",
+                    "훌륭한 학습이었습니다! 계속 이 페이스로 가요!",
+                    "완벽한 집중력을 보여주셨어요. 멋져요!",
+                    "목표 달성 성공! 다음에도 화이팅! 💪"
+                ]
+                message = messages[hash(str(total_study_time_seconds)) % len(messages)]
+            else:
+                # 불합격 메시지
+                messages = [
+                    "아쉬워요. 다음엔 더 집중해봐요! 💪",
+                    "목표까지 조금 더 남았어요. 조금만 더 힘내봐요!",
+                    "오늘도 노력하셨지만, 내일은 더 좋은 결과를 기대해요!",
+                    "다음엔 학습 앱에 더 집중해보면 좋을 것 같아요."
+                ]
+                message = messages[hash(str(total_study_time_seconds)) % len(messages)]
+
+        except Exception as e:
+            print(f"[ERROR] ML 판정 실패: {e}")
+            import traceback
+            traceback.print_exc()
+            # 에러 발생 시 기본값
+            passed = False
+            message = "판정 중 오류가 발생했습니다."
+    else:
+        # ml_predictor가 초기화되지 않은 경우
+        print("[ERROR] MLPredictorDemo가 초기화되지 않았습니다.")
+        passed = False
+        message = "판정 시스템을 사용할 수 없습니다."
+
+    # 응답 데이터 구성
+    return {
+        "appUsages": app_usages,
+        "studyResult": {
+            "passed": passed,
+            "totalStudyTime": total_study_time_seconds,
+            "learningAppTime": learning_app_time,
+            "learningRate": round(learning_rate, 2),
+            "message": message
+        }
+    }
+
+
+def _render_finish_result(timer: StageTimer, total_study_time_seconds: int,
+                          user: Optional[Tuple[str, str]]) -> bytes:
+    """/finish 응답 계산 + JSON 직렬화 (작업 풀 스레드에서 실행, 캐시에 그대로 저장)"""
+    analyzer = app_analyzer
+    if user is not None:
+        # 최근에 조회되지 않은 사용자면 여기서 그 사용자의 세그먼트를 읽음
+        with timer.stage("load"):
+            analyzer = user_analyzers.get(user)
+    response_data = _build_finish_result(timer, total_study_time_seconds, analyzer)
+    with timer.stage("encode"):
+        return json.dumps(response_data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _ingest_events(timer: StageTimer, user: Tuple[str, str], agent: str, events: List[Dict]) -> Dict:
+    """수집한 이벤트를 사용자 로그에 기록하고 집계 갱신 (작업 풀 스레드에서 실행)"""
+    # 기록하는 동안 다른 요청이 이 사용자 로그를 캐시에서 버리고(닫고) 새로 만들지 않도록 고정
+    started = perf_counter()
+    with user_analyzers.pinned(user) as log:
+        timer.add("load", perf_counter() - started)
+        with timer.stage("append"):
+            accepted, duplicates = log.ingest(agent, events)
+        return {"accepted": accepted, "duplicates": duplicates, "lastSeq": log.last_seq(agent)}
+
+
+# 거절/느린 응답 로그는 요청마다 찍지 않고 종류별로 1초에 한 번 모아서 출력 (몰릴 때 로그 출력이 부하가 되지 않게)
+_throttled_logs: Dict[str, List[float]] = {}  # 종류 → [마지막 출력 시각, 그 뒤로 생략한 건수]
+
+
+def _log_throttled(kind: str, message: str):
+    state = _throttled_logs.setdefault(kind, [0.0, 0])
+    now = perf_counter()
+    if now - state[0] < 1.0:
+        state[1] += 1
+        return
+    skipped = f" (직전 1초 동안 {state[1]}건 생략)" if state[1] else ""
+    print(f"[WARN] {message}{skipped}")
+    state[0] = now
+    state[1] = 0
+
+
+def _busy_response(path: str, e: PoolBusy) -> JSONResponse:
+    """작업 풀이 받을 수 없을 때의 429/503 응답 (Retry-After 포함)"""
+    _log_throttled(f"rejected {path}", f"{path} 요청 거절 ({e.status_code} {e.reason}, Retry-After={e.retry_after}s)")
+    return JSONResponse(
+        status_code=e.status_code,
+        headers={"Retry-After": str(e.retry_after)},
+        content={
+            "error": "server_busy" if e.status_code == 429 else "timeout",
+            "message": "요청이 많아 결과를 바로 계산할 수 없습니다. 잠시 후 다시 시도해 주세요.",
+            "retryAfter": e.retry_after
+        }
+    )
+
+
 # ======== API 엔드포인트 ========
 @app.get("/finish", response_model=Dict)
-def finish(
-    time: int = Query(..., description="총 학습 시간 (초 단위)", gt=0)
+async def finish(
+    time: int = Query(..., description="총 학습 시간 (초 단위)", gt=0),
+    email: str = Query("", description="사용자 이메일 (사용자별 로그 저장소 사용 시)"),
+    room: str = Query("", description="방 이름 (없으면 서버의 ROOM_PATH)"),
+    if_none_match: Optional[str] = Header(None, description="이전 응답의 ETag (같으면 304)")
 ):
     """
     스터디 종료 결과 조회 API
-    
+
+    분석은 작업 풀에서 실행되고, 같은 time으로 동시에 들어온 요청은 한 번의 분석 결과를 함께 사용.
+    풀이 가득 차면 429, 제한 시간 안에 끝나지 않으면 503을 Retry-After 헤더와 함께 반환.
+    로그 파일이 그대로면 캐시된 응답을 재사용하고, If-None-Match가 ETag와 같으면 본문 없이 304 반환.
+    사용자별 로그 저장소(EVENT_STORE_DIR)를 쓰면 email/room에 해당하는 사용자 로그만 분석
+
     Args:
         time: 총 학습 시간 (초 단위) - 구루미에서 받은 값
-    
+        email: 사용자 이메일
+        room: 방 이름
+        if_none_match: If-None-Match 헤더
+
     Returns:
         JSON:
         {
@@ -103,97 +342,31 @@ def finish(
             }
         }
     """
+    started = perf_counter()
+    timer = StageTimer()
+    user = _user_partition(room, email)
+    if user is None:
+        cache_key = (JSON_FILE, time)
+        signature = file_signature(JSON_FILE)
+    else:
+        cache_key = (user, time)
+        signature = user_log_index.signature(*user)
+    cached = response_cache.get(cache_key, signature)
     try:
-        total_study_time_seconds = time
-        
-        # 앱 사용 분석
-        app_usages = []
-        if app_analyzer:
-            try:
-                app_usages = app_analyzer.get_app_usage_statistics()
-            except Exception as e:
-                print(f"[ERROR] 앱 사용 분석 실패: {e}")
-                app_usages = []
-        else:
-            print("[WARN] AppAnalyzer가 초기화되지 않음")
-        
-        # 학습 앱 사용률 계산 (signal 0 비율)
-        learning_rate = 0.0
-        learning_app_time = 0
-        if app_analyzer:
-            try:
-                learning_rate = app_analyzer.get_learning_app_usage_rate()
-                # 학습 시간 중 학습 앱 사용 시간 계산
-                learning_app_time = int(total_study_time_seconds * learning_rate / 100.0)
-            except Exception as e:
-                print(f"[ERROR] 학습 앱 사용률 계산 실패: {e}")
-        
-        # 머신러닝 합격/불합격 판정 (ml_predictor_demo 사용)
-        passed = False
-        message = "학습 통계 데이터를 분석 중입니다..."
-        
-        if ml_predictor:
-            try:
-                # ml_predictor_demo의 predict 메서드로 판정 (초기화된 인스턴스 재사용)
-                total_time_minutes = total_study_time_seconds / 60.0
-                green_ratio = learning_rate / 100.0
-                
-                prediction_result = ml_predictor.predict(total_time_minutes, green_ratio)
-                passed = prediction_result.get("passed", False)
-                
-                # 메시지 생성 (합격/불합격 모두)
-                if passed:
-                    messages = [
-                        "수고하셨습니다! 목표를 달성했어요 🎉",
-                        "훌륭한 학습이었습니다! 계속 이 페이스로 가요!",
-                        "완벽한 집중력을 보여주셨어요. 멋져요!",
-                        "목표 달성 성공! 다음에도 화이팅! 💪"
-                    ]
-                    message = messages[hash(str(total_study_time_seconds)) % len(messages)]
-                else:
-                    # 불합격 메시지
-                    messages = [
-                        "아쉬워요. 다음엔 더 집중해봐요! 💪",
-                        "목표까지 조금 더 남았어요. 조금만 더 힘내봐요!",
-                        "오늘도 노력하셨지만, 내일은 더 좋은 결과를 기대해요!",
-                        "다음엔 학습 앱에 더 집중해보면 좋을 것 같아요."
-                    ]
-                    message = messages[hash(str(total_study_time_seconds)) % len(messages)]
-                    
-            except Exception as e:
-                print(f"[ERROR] ML 판정 실패: {e}")
-                import traceback
-                traceback.print_exc()
-                # 에러 발생 시 기본값
-                passed = False
-                message = "판정 중 오류가 발생했습니다."
-        else:
-            # ml_predictor가 초기화되지 않은 경우
-            print("[ERROR] MLPredictorDemo가 초기화되지 않았습니다.")
-            passed = False
-            message = "판정 시스템을 사용할 수 없습니다."
-        
-        # 응답 데이터 구성
-        response_data = {
-            "appUsages": app_usages,
-            "studyResult": {
-                "passed": passed,
-                "totalStudyTime": total_study_time_seconds,
-                "learningAppTime": learning_app_time,
-                "learningRate": round(learning_rate, 2),
-                "message": message
-            }
-        }
-        
-        return response_data
-        
+        if cached is None:
+            body, job_timer = await analysis_pool.run((cache_key, signature), _render_finish_result, time, user)
+            cached = response_cache.put(cache_key, signature, body)
+            timer.extend(job_timer)
+
+    except PoolBusy as e:
+        return _busy_response("/finish", e)
     except HTTPException:
         raise
     except Exception as e:
         print(f"[ERROR] /finish 엔드포인트 오류: {e}")
         import traceback
         traceback.print_exc()
-        
+
         return JSONResponse(
             status_code=500,
             content={
@@ -210,6 +383,58 @@ def finish(
             }
         )
 
+    # 단계별 시간 (queue/analyze/predict/encode/total) → Server-Timing 헤더 (캐시 적중이면 total만)
+    timer.add("total", perf_counter() - started)
+    headers = {
+        "ETag": cached.etag,
+        "Cache-Control": "no-cache",  # 브라우저는 매번 If-None-Match로 재검증
+        "Server-Timing": timer.server_timing(),
+    }
+    stages = timer.as_dict()
+    if stages["total"] >= FINISH_SLOW_MS:
+        _log_throttled("slow", f"/finish 느린 응답 {stages['total']:.0f}ms {stages}")
+
+    if etag_matches(if_none_match, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+@app.post("/ingest", response_model=Dict)
+async def ingest(
+    payload: Dict = Body(..., description='{"room", "email", "agent", "events": [{"seq", "time", ...}]}'),
+    authorization: Optional[str] = Header(None)
+):
+    """
+    모니터 이벤트 수집 API (INGEST_ENABLED=1일 때만)
+
+    에이전트(모니터 실행 하나)마다 seq를 1부터 붙여 보내며, 이미 받은 seq 이하의 이벤트는 무시하므로
+    응답을 못 받아 같은 묶음을 다시 보내도 중복 집계되지 않음
+
+    Returns:
+        {"accepted": 새로 반영한 수, "duplicates": 무시한 수, "lastSeq": 이 에이전트의 마지막 seq}
+    """
+    if not INGEST_ENABLED:
+        raise HTTPException(status_code=404,
+                            detail="수집 API가 꺼져 있습니다 (INGEST_ENABLED=1, EVENT_STORE_DIR, INGEST_TOKEN 필요)")
+    if not secrets.compare_digest((authorization or "").encode(), f"Bearer {INGEST_TOKEN}".encode()):
+        raise HTTPException(status_code=401, detail="인증 토큰이 올바르지 않습니다.")
+    try:
+        room, email, agent, events = validate_batch(payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    user = _user_partition(room, email)
+    first_seq = events[0]["seq"] if events else 0
+    last_seq = events[-1]["seq"] if events else 0
+    try:
+        # 같은 묶음의 재전송이 동시에 들어오면 한 번만 기록
+        result, job_timer = await analysis_pool.run(
+            ("ingest", user, agent, first_seq, last_seq), _ingest_events, user, agent, events
+        )
+    except PoolBusy as e:
+        return _busy_response("/ingest", e)
+    return JSONResponse(content=result, headers={"Server-Timing": job_timer.server_timing()})
+
 
 @app.get("/health", response_model=Dict)
 def health():
@@ -218,7 +443,11 @@ def health():
         "status": "ok",
         "timestamp": datetime.now().isoformat(),
         "app_analyzer": "ok" if app_analyzer else "not_initialized",
-        "ml_predictor": "ok" if ml_predictor else "not_initialized"
+        "ml_predictor": "ok" if ml_predictor else "not_initialized",
+        "analysis_pool": analysis_pool.stats(),
+        "response_cache": response_cache.stats(),
+        "user_analyzers": user_analyzers.stats() if user_analyzers else "disabled",
+        "ingest": "enabled" if INGEST_ENABLED else "disabled"
     }
 
 
@@ -248,10 +477,22 @@ async def startup_event():
         print(f"[OK] MLPredictorDemo (시연용) 초기화 완료")
     else:
         print(f"[WARN] MLPredictorDemo 초기화 실패")
+
+    if INGEST_ENABLED:
+        print(f"[OK] 이벤트 수집 API 사용: POST /ingest → {EVENT_STORE_DIR}")
+    elif INGEST_REQUESTED:
+        print("[WARN] INGEST_TOKEN이 없어 이벤트 수집 API(/ingest)를 켜지 않았습니다.")
     
     print("\n[서버 시작] 브라우저에서 접속을 기다리는 중...\n")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """서버 종료 시 사용자 로그 파일 정리 (수집 모드에서 남은 기록을 fsync)"""
+    if user_analyzers is not None:
+        user_analyzers.clear()
+
+
 # 메인 실행은 main.py를 사용하세요
 # if __name__ == '__main__':
 #     import uvicorn
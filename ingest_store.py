@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+이벤트 수집(ingest) 저장소 모듈 (API 서버 쪽)
+- 모니터(에이전트)가 POST /ingest로 보낸 이벤트 묶음을 사용자별 세그먼트 저장소에 append
+- append하는 자리에서 사용 시간 집계도 함께 갱신 → /finish는 파일을 읽지 않고 메모리 집계만 읽음
+- 에이전트별 일련번호(seq)보다 작거나 같은 이벤트는 이미 받은 것으로 보고 버림 (재전송해도 중복 집계 없음)
+- 시간 역순 이벤트가 들어오면 다음 조회 때 그 사용자의 세그먼트만 다시 읽어 재집계
+- room/email은 저장 경로가 되므로 형식(이메일 모양, 길이, 제어 문자, "."/".." 경로 조각)을 먼저 검사
+"""
+
+import os
+import re
+from typing import Dict, List, Tuple
+
+from app_analyzer import SegmentedAppAnalyzer, parse_event_time
+from user_logs import UserSegmentWriter, list_segments
+
+MAX_AGENT_ID_LENGTH = 64
+MAX_EMAIL_LENGTH = 254
+MAX_ROOM_LENGTH = 128
+
+_EMAIL_PATTERN = re.compile(r"[^@\s/\\]+@[^@\s/\\]+")
+
+
+def _check_room(room: str) -> str:
+    room = room.strip()
+    if len(room) > MAX_ROOM_LENGTH or not room.isprintable():
+        raise ValueError("room 형식이 올바르지 않습니다.")
+    if any(part in (".", "..") for part in re.split(r"[/\\]", room)):
+        raise ValueError("room에 '.' 또는 '..' 경로를 쓸 수 없습니다.")
+    return room
+
+
+def _check_email(email: str) -> str:
+    email = email.strip()
+    if len(email) > MAX_EMAIL_LENGTH or not email.isprintable() or not _EMAIL_PATTERN.fullmatch(email):
+        raise ValueError("email 형식이 올바르지 않습니다.")
+    return email
+
+
+def validate_batch(payload: Dict) -> Tuple[str, str, str, List[Dict]]:
+    """
+    수집 요청 본문 검사 (형식이 맞지 않으면 ValueError)
+
+    형식: {"room": "...", "email": "...", "agent": "...", "events": [{"seq": 1, "time": "...", ...}, ...]}
+
+    Returns:
+        (room, email, agent, seq 순으로 정렬한 이벤트 리스트)
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("요청 본문은 객체여야 합니다.")
+    room = payload.get("room") or ""
+    email = payload.get("email")
+    agent = payload.get("agent")
+    events = payload.get("events")
+    if not isinstance(room, str):
+        raise ValueError("room은 문자열이어야 합니다.")
+    if not isinstance(email, str) or not email.strip():
+        raise ValueError("email이 필요합니다.")
+    room = _check_room(room)
+    email = _check_email(email)
+    if not isinstance(agent, str) or not agent.strip() or len(agent) > MAX_AGENT_ID_LENGTH:
+        raise ValueError("agent(에이전트 ID)가 필요합니다.")
+    if not isinstance(events, list):
+        raise ValueError("events는 리스트여야 합니다.")
+    for event in events:
+        if not isinstance(event, dict):
+            raise ValueError("이벤트는 객체여야 합니다.")
+        seq = event.get("seq")
+        if not isinstance(seq, int) or isinstance(seq, bool) or seq <= 0:
+            raise ValueError("이벤트마다 양의 정수 seq가 필요합니다.")
+        if not isinstance(event.get("time"), str):
+            raise ValueError("이벤트마다 time 문자열이 필요합니다.")
+    return room, email, agent.strip(), sorted(events, key=lambda e: e["seq"])
+
+
+class LiveUserLog(SegmentedAppAnalyzer):
+    """
+    수집 API가 쓰는 사용자 로그 + 실시간 집계
+
+    처음 만들 때 한 번만 사용자 세그먼트를 읽어 집계와 에이전트별 마지막 seq를 복원하고,
+    이후에는 ingest()가 append와 함께 집계를 갱신하므로 analyze()는 파일을 읽지 않음
+    (같은 디렉터리에 다른 프로세스가 쓰면 안 됨)
+    """
+
+    def __init__(self, root: str, room: str, email: str, segment_max_bytes: int = 8 * 1024 * 1024):
+        """
+        Args:
+            root: 사용자별 로그 저장소 루트 (EVENT_STORE_DIR)
+            room: 방 이름
+            email: 사용자 이메일
+            segment_max_bytes: 세그먼트 파일 하나의 최대 크기
+        """
+        self._writer = UserSegmentWriter(root, room, email, segment_max_bytes=segment_max_bytes)
+        self._last_seq: Dict[str, int] = {}
+        self._dirty = True  # 첫 조회(생성자)에서 저장된 세그먼트 전체를 읽음
+        self.ingested = 0
+        self.duplicates = 0
+        directory = self._writer.directory
+        super().__init__(lambda: list_segments(directory), name=f"{room}/{email}")
+
+    def _observe_event(self, event: Dict):
+        agent = event.get("agent")
+        seq = event.get("seq")
+        if isinstance(agent, str) and isinstance(seq, int) and seq > self._last_seq.get(agent, 0):
+            self._last_seq[agent] = seq
+
+    def _refresh_incremental(self):
+        # 집계는 쓰는 시점에 갱신되므로, 시간 역순 이벤트로 어긋났을 때만 다시 읽음
+        if self._dirty:
+            self._rebuild_incremental()
+            self._dirty = False
+
+    def last_seq(self, agent: str) -> int:
+        return self._last_seq.get(agent, 0)
+
+    def ingest(self, agent: str, events: List[Dict]) -> Tuple[int, int]:
+        """
+        이벤트 append + 집계 갱신 (events는 seq 오름차순)
+
+        Returns:
+            (새로 반영한 이벤트 수, 이미 받아서 버린 이벤트 수)
+        """
+        with self._lock:
+            # 에이전트별 마지막 seq는 저장된 이벤트에서 복원하므로 먼저 맞춰 둠
+            self._refresh_incremental()
+            last = self._last_seq.get(agent, 0)
+            accepted = 0
+            for event in events:
+                seq = event["seq"]
+                if seq <= last:
+                    continue
+                stored = {**event, "agent": agent}
+                self._writer.append(stored)
+                last = seq
+                accepted += 1
+                if self._dirty:
+                    continue
+                time_sec = parse_event_time(stored)
+                if time_sec is None:
+                    continue
+                if self._acc.count and time_sec < self._acc.last_time:
+                    self._dirty = True
+                    continue
+                self._acc.add(time_sec, self._event_app_name(stored), stored.get("signal", 1))
+            if accepted:
+                # 응답(ack)을 받은 에이전트는 묶음을 버리므로 응답 전에 디스크에 기록
+                self._writer.sync()
+            self._last_seq[agent] = last
+            self.ingested += accepted
+            self.duplicates += len(events) - accepted
+            return accepted, len(events) - accepted
+
+    def close(self):
+        with self._lock:
+            self._writer.close()
+
+
+def open_live_user_log(root: str, room: str, email: str) -> LiveUserLog:
+    """환경 변수 설정(EVENT_STORE_SEGMENT_BYTES)을 반영한 LiveUserLog 생성"""
+    return LiveUserLog(
+        root, room, email,
+        segment_max_bytes=int(os.getenv("EVENT_STORE_SEGMENT_BYTES", str(8 * 1024 * 1024))),
+    )
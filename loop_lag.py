@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+이벤트 루프 지연(loop lag) 측정 모듈
+- 일정 간격으로 잠들었다가 실제로 깨어난 시각과 예정 시각의 차이를 기록
+- 최근 샘플의 최대값/p99/평균을 집계하고, 설정한 주기마다 로그로 출력
+- 루프를 막는 동기 호출(예: 멈춘 osascript)이 생기면 max/p99가 바로 커짐
+"""
+
+import asyncio
+from collections import deque
+from typing import Dict, Optional
+
+
+class LoopLagMonitor:
+    """asyncio 이벤트 루프 지연 측정기"""
+
+    def __init__(self, interval: float = 0.1, window: int = 3000, report_interval: float = 0.0):
+        """
+        Args:
+            interval: 측정 간격 (초)
+            window: 집계에 사용할 최근 샘플 수
+            report_interval: 로그 출력 주기 (초, 0 이하면 출력하지 않음)
+        """
+        self.interval = float(interval)
+        self.report_interval = float(report_interval)
+        self._samples: deque = deque(maxlen=max(1, int(window)))
+        self._task: Optional[asyncio.Task] = None
+        self.max_lag = 0.0  # 시작 후 전체 최대값 (초)
+
+    def start(self):
+        """측정 시작 (실행 중인 이벤트 루프 안에서 호출)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """측정 종료"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def record(self, lag: float):
+        """지연 샘플 한 개 추가 (초)"""
+        lag = max(0.0, lag)
+        self._samples.append(lag)
+        if lag > self.max_lag:
+            self.max_lag = lag
+
+    def stats(self) -> Dict[str, float]:
+        """
+        최근 샘플 집계 (ms)
+
+        Returns:
+            {"samples", "max_ms", "p99_ms", "mean_ms", "max_total_ms"}
+        """
+        samples = sorted(self._samples)
+        if not samples:
+            return {"samples": 0, "max_ms": 0.0, "p99_ms": 0.0, "mean_ms": 0.0, "max_total_ms": 0.0}
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        return {
+            "samples": len(samples),
+            "max_ms": round(samples[-1] * 1000.0, 3),
+            "p99_ms": round(p99 * 1000.0, 3),
+            "mean_ms": round(sum(samples) / len(samples) * 1000.0, 3),
+            "max_total_ms": round(self.max_lag * 1000.0, 3),
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_report = loop.time() + self.report_interval
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            now = loop.time()
+            self.record(now - expected)
+            if self.report_interval > 0 and now >= next_report:
+                stats = self.stats()
+                print(f"[LOOP] lag max={stats['max_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms "
+                      f"mean={stats['mean_ms']:.1f}ms (최근 {stats['samples']}개)")
+                next_report = now + self.report_interval
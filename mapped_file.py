@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+로그 파일 읽기 전용 메모리 매핑 모듈
+- 파일 전체를 bytes로 읽어 두지 않고 mmap으로 연결 → 실제로 접근한 페이지만 메모리에 올라오고,
+  다 읽은 페이지는 커널이 필요할 때 회수할 수 있음 (프로세스 힙에 파일 복사본이 생기지 않음)
+- 매핑 크기는 열 때의 파일 크기로 고정 (이후에 추가된 부분은 다음에 다시 열 때 보임)
+- 앞에서부터 한 번 훑는 읽기는 PageReleaser로 지나간 구간의 페이지를 내려놓아(MADV_DONTNEED)
+  최대 RSS가 파일 크기가 아니라 RELEASE_STEP 정도에 머물게 함 (페이지 캐시에는 남으므로 다시 읽어도 디스크 I/O 없음)
+- 매핑 중인 파일을 다른 프로세스가 잘라내면(truncate) 접근 시 SIGBUS가 날 수 있으므로,
+  로그 기록기는 꼬리 복구 외에는 파일을 줄이지 않음 (교체는 os.replace로 새 inode)
+"""
+
+import mmap
+import os
+from contextlib import contextmanager
+from typing import Iterator, Union
+
+Buffer = Union[bytes, mmap.mmap]
+
+RELEASE_STEP = 8 * 1024 * 1024  # 이만큼 읽고 지나갈 때마다 앞 구간 페이지 반환
+
+
+@contextmanager
+def mapped_file(path: str) -> Iterator[Buffer]:
+    """
+    파일을 읽기 전용으로 매핑 (빈 파일은 b"", mmap을 쓸 수 없는 파일은 통째로 읽음)
+
+    with 블록 안에서만 사용하고, 블록 밖으로는 잘라 낸 bytes만 가지고 나가야 함
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            yield b""
+            return
+        try:
+            mm = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # 매핑을 지원하지 않는 파일 시스템 등
+            yield f.read(size)
+            return
+        if hasattr(mmap, "MADV_SEQUENTIAL"):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        try:
+            yield mm
+        finally:
+            mm.close()
+
+
+class PageReleaser:
+    """
+    매핑을 앞에서부터 읽어 나갈 때 이미 지나간 구간의 페이지를 프로세스에서 내려놓음
+
+    bytes 버퍼이거나 MADV_DONTNEED를 지원하지 않으면 아무것도 하지 않음
+    """
+
+    def __init__(self, buf: Buffer, start: int = 0):
+        self._buf = buf if isinstance(buf, mmap.mmap) and hasattr(mmap, "MADV_DONTNEED") else None
+        self._released = start - start % mmap.PAGESIZE
+
+    def advance(self, pos: int):
+        """pos 이전은 다시 읽지 않음 (RELEASE_STEP 이상 쌓였을 때만 실제로 반환)"""
+        if self._buf is None or pos - self._released < RELEASE_STEP:
+            return
+        end = pos - pos % mmap.PAGESIZE
+        self._buf.madvise(mmap.MADV_DONTNEED, self._released, end - self._released)
+        self._released = end
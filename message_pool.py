@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+코멘트 메시지 풀 모듈
+- (signal, 범주) 키마다 메시지 템플릿을 모아두고, 겹치지 않게 하나씩 골라줌
+- 기본 메시지(seed) + LLM이 백그라운드에서 만들어 준 메시지를 함께 사용
+- LLM이 만든 메시지는 로컬 JSON 파일에 저장해 다음 실행에서도 재사용
+- 템플릿의 {name}은 고를 때 사이트 도메인/앱 이름으로 채움
+"""
+
+import json
+import os
+import random
+import time
+from typing import Collection, Dict, Iterable, List, Optional, Sequence
+
+
+def render_message(template: str, name: str = "") -> Optional[str]:
+    """템플릿에 이름을 채움 ({name} 외의 자리표시자가 있으면 None)"""
+    try:
+        return template.format(name=name)
+    except (KeyError, IndexError, ValueError):
+        return None
+
+
+class MessagePool:
+    """(signal, 범주)별 메시지 풀과 반복 없는 선택기"""
+
+    def __init__(self, seeds: Dict[str, Sequence[str]], path: Optional[str] = None,
+                 max_generated: int = 40, min_generated: int = 8,
+                 refresh_seconds: float = 24 * 3600, rng: Optional[random.Random] = None):
+        """
+        Args:
+            seeds: 키별 기본 메시지 템플릿 (항상 포함)
+            path: LLM이 만든 메시지를 저장할 JSON 파일 경로 (None이면 메모리에만 보관)
+            max_generated: 키별로 보관할 LLM 메시지 최대 개수 (넘으면 오래된 것부터 삭제)
+            min_generated: 키별 LLM 메시지가 이보다 적으면 보충 필요
+            refresh_seconds: 마지막 보충 후 이 시간이 지나면 보충 필요 (0이면 시간 기준 보충 안 함)
+            rng: 섞기에 사용할 난수 생성기
+        """
+        self.path = path
+        self.max_generated = max(1, int(max_generated))
+        self.min_generated = max(0, int(min_generated))
+        self.refresh_seconds = float(refresh_seconds)
+        self._rng = rng or random.Random()
+        self._seeds: Dict[str, List[str]] = {k: list(v) for k, v in seeds.items()}
+        self._generated: Dict[str, List[str]] = {}
+        self._refreshed_at: Dict[str, float] = {}
+        # 키별 "섞인 순서 + 다음 위치" (모두 한 번씩 쓰기 전에는 같은 메시지를 다시 고르지 않음)
+        self._bags: Dict[str, List[str]] = {}
+        self._cursor: Dict[str, int] = {}
+        if path:
+            self.load()
+
+    def keys(self) -> List[str]:
+        return sorted(set(self._seeds) | set(self._generated))
+
+    def templates(self, key: str) -> List[str]:
+        """키의 전체 템플릿 (기본 + LLM 생성, 중복 제거)"""
+        seen = set()
+        merged = []
+        for template in self._seeds.get(key, []) + self._generated.get(key, []):
+            if template not in seen:
+                seen.add(template)
+                merged.append(template)
+        return merged
+
+    def size(self, key: str) -> int:
+        return len(self.templates(key))
+
+    def pick(self, key: str, name: str = "", recent: Collection[str] = ()) -> str:
+        """
+        키에서 메시지 하나 선택
+
+        섞인 순서대로 내주되, 최근 메시지(recent)와 같은 것은 건너뜀.
+        모든 후보가 최근 메시지와 같으면 다음 순서의 메시지를 그대로 반환
+        """
+        bag = self._bags.get(key)
+        if bag is None:
+            bag = self._reshuffle(key)
+        if not bag:
+            return ""
+        first: Optional[str] = None
+        for _ in range(len(bag)):
+            cursor = self._cursor[key]
+            if cursor >= len(bag):
+                bag = self._reshuffle(key)
+                cursor = 0
+            self._cursor[key] = cursor + 1
+            message = render_message(bag[cursor], name)
+            if message is None:
+                continue
+            if first is None:
+                first = message
+            if message not in recent:
+                return message
+        return first or ""
+
+    def _reshuffle(self, key: str) -> List[str]:
+        bag = self.templates(key)
+        self._rng.shuffle(bag)
+        self._bags[key] = bag
+        self._cursor[key] = 0
+        return bag
+
+    def needs_top_up(self, key: str) -> bool:
+        """LLM 메시지가 부족하거나 마지막 보충이 오래되었으면 True"""
+        if len(self._generated.get(key, [])) < self.min_generated:
+            return True
+        if self.refresh_seconds > 0:
+            return time.time() - self._refreshed_at.get(key, 0.0) > self.refresh_seconds
+        return False
+
+    def add(self, key: str, templates: Iterable[str]) -> int:
+        """
+        LLM이 만든 템플릿 추가 (이미 있는 것은 무시)
+
+        Returns:
+            새로 추가된 개수
+        """
+        existing = set(self.templates(key))
+        generated = self._generated.setdefault(key, [])
+        added = 0
+        for template in templates:
+            template = str(template or "").strip()
+            if not template or template in existing or render_message(template) is None:
+                continue
+            existing.add(template)
+            generated.append(template)
+            added += 1
+        if len(generated) > self.max_generated:
+            del generated[: len(generated) - self.max_generated]
+        self._refreshed_at[key] = time.time()
+        self._bags.pop(key, None)
+        return added
+
+    def load(self):
+        """저장 파일에서 LLM 메시지 읽기 (없거나 깨졌으면 무시)"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"[WARN] 메시지 풀 파일을 읽을 수 없습니다: {e}")
+            return
+        for key, entry in (data.get("pools") or {}).items():
+            messages = entry.get("messages") if isinstance(entry, dict) else None
+            if not isinstance(messages, list):
+                continue
+            self._generated[key] = [m for m in messages if isinstance(m, str)][-self.max_generated:]
+            self._refreshed_at[key] = float(entry.get("refreshed_at") or 0.0)
+        self._bags.clear()
+
+    def save(self):
+        """LLM 메시지를 저장 파일에 기록 (임시 파일에 쓴 뒤 교체)"""
+        if not self.path:
+            return
+        data = {
+            "version": 1,
+            "pools": {
+                key: {"messages": messages, "refreshed_at": self._refreshed_at.get(key, 0.0)}
+                for key, messages in self._generated.items()
+            },
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+OpenAI 클라이언트 관리 모듈
+- 프로세스 전체에서 OpenAI / AsyncOpenAI 클라이언트를 하나씩만 만들어 재사용
+- 클라이언트는 처음 필요할 때 생성하고, OPENAI_API_KEY / OPENAI_BASE_URL이 바뀌면 다시 생성
+- HTTP 연결 풀 크기와 keep-alive 유지 시간 설정 가능
+"""
+
+import asyncio
+import os
+import threading
+from typing import Optional, Tuple
+
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+try:
+    import httpx
+except ImportError:  # openai가 사용하는 httpx를 직접 불러올 수 없는 환경
+    httpx = None
+
+
+class OpenAIClientManager:
+    """OpenAI 클라이언트 재사용 관리자"""
+
+    def __init__(self, max_connections: int = 10, max_keepalive_connections: int = 5,
+                 keepalive_expiry: float = 60.0):
+        """
+        Args:
+            max_connections: 연결 풀의 최대 연결 수
+            max_keepalive_connections: 유지할 유휴(keep-alive) 연결 수
+            keepalive_expiry: 유휴 연결 유지 시간 (초)
+        """
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+
+        self._lock = threading.Lock()
+        self._sync_client: Optional[OpenAI] = None
+        self._sync_key: Optional[Tuple[str, Optional[str]]] = None
+        self._async_client: Optional[AsyncOpenAI] = None
+        self._async_key: Optional[Tuple[str, Optional[str], int]] = None
+        self.builds = 0
+
+    @staticmethod
+    def _settings() -> Tuple[Optional[str], Optional[str]]:
+        return os.getenv("OPENAI_API_KEY") or None, os.getenv("OPENAI_BASE_URL") or None
+
+    def _http_kwargs(self) -> dict:
+        if httpx is None:
+            return {}
+        return {
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            )
+        }
+
+    def sync_client(self) -> Optional[OpenAI]:
+        """
+        동기 클라이언트 반환 (API 키가 없으면 None)
+
+        API 키나 base URL이 바뀌었으면 이전 클라이언트를 닫고 새로 만듦
+        """
+        api_key, base_url = self._settings()
+        if not api_key:
+            return None
+        key = (api_key, base_url)
+        with self._lock:
+            if self._sync_client is None or self._sync_key != key:
+                old = self._sync_client
+                self._sync_client = OpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    http_client=DefaultHttpxClient(**self._http_kwargs()),
+                )
+                self._sync_key = key
+                self.builds += 1
+                if old is not None:
+                    try:
+                        old.close()
+                    except Exception:
+                        pass
+            return self._sync_client
+
+    def async_client(self) -> Optional[AsyncOpenAI]:
+        """
+        비동기 클라이언트 반환 (API 키가 없으면 None)
+
+        연결은 이벤트 루프에 묶이므로 실행 중인 루프가 바뀌어도 새로 만듦
+        """
+        api_key, base_url = self._settings()
+        if not api_key:
+            return None
+        try:
+            loop_id = id(asyncio.get_running_loop())
+        except RuntimeError:
+            loop_id = 0
+        key = (api_key, base_url, loop_id)
+        with self._lock:
+            if self._async_client is None or self._async_key != key:
+                old, old_key = self._async_client, self._async_key
+                self._async_client = AsyncOpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    http_client=DefaultAsyncHttpxClient(**self._http_kwargs()),
+                )
+                self._async_key = key
+                self.builds += 1
+                # 같은 루프에서 설정만 바뀐 경우에만 이전 연결을 닫을 수 있음
+                if old is not None and loop_id and old_key[2] == loop_id:
+                    asyncio.get_running_loop().create_task(old.close())
+            return self._async_client
+
+    def close(self):
+        """동기 클라이언트 닫기 (비동기 클라이언트는 루프 종료 시 함께 정리됨)"""
+        with self._lock:
+            if self._sync_client is not None:
+                try:
+                    self._sync_client.close()
+                except Exception:
+                    pass
+            self._sync_client = None
+            self._sync_key = None
+            self._async_client = None
+            self._async_key = None
+
+
+def client_manager_from_env() -> OpenAIClientManager:
+    """환경 변수(OPENAI_MAX_CONNECTIONS 등) 설정을 반영한 관리자 생성"""
+    return OpenAIClientManager(
+        max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "10")),
+        max_keepalive_connections=int(os.getenv("OPENAI_MAX_KEEPALIVE", "5")),
+        keepalive_expiry=float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60")),
+    )
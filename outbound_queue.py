@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+"""
+서버 전송 대기열 모듈
+- 모니터 루프는 대기열에 넣기만 하고, 백그라운드 작업자가 순서대로 전송
+- 같은 키(예: 이메일)의 전송 대기 항목은 최신 것 하나로 합침(coalescing)
+- 대기 항목이 여러 개이고 배치 전송 함수가 있으면 한 번에 묶어서 전송
+- 대기열 길이와 전송/실패/버림/합침 횟수 집계
+- EventUploader: 이벤트에 일련번호(seq)를 붙여 묶음 전송하고, 실패하면 같은 묶음을 백오프 후 재전송
+"""
+
+import asyncio
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+
+class OutboundQueue:
+    """크기 제한이 있는 비동기 전송 대기열"""
+
+    def __init__(
+        self,
+        send: Callable[[Dict], Awaitable[bool]],
+        send_batch: Optional[Callable[[List[Dict]], Awaitable[Optional[bool]]]] = None,
+        maxsize: int = 100,
+        coalesce_key: Optional[Callable[[Dict], Hashable]] = None,
+        max_batch: int = 20,
+    ):
+        """
+        Args:
+            send: 항목 하나를 전송하는 코루틴 함수 (성공 시 True)
+            send_batch: 여러 항목을 한 번에 전송하는 코루틴 함수
+                (성공 True, 실패 False, 배치 엔드포인트가 없으면 None → 이후 개별 전송)
+            maxsize: 최대 대기 항목 수 (넘으면 가장 오래된 항목을 버림)
+            coalesce_key: 항목의 합침 키를 돌려주는 함수 (None이면 합치지 않음)
+            max_batch: 배치 하나에 담을 최대 항목 수
+        """
+        self._send = send
+        self._send_batch = send_batch
+        self.maxsize = max(1, int(maxsize))
+        self._coalesce_key = coalesce_key
+        self.max_batch = max(1, int(max_batch))
+
+        self._pending: "OrderedDict[Hashable, Dict]" = OrderedDict()
+        self._seq = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        self.enqueued = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.batches = 0
+
+    @property
+    def depth(self) -> int:
+        """현재 전송 대기 중인 항목 수"""
+        return len(self._pending)
+
+    def start(self):
+        """백그라운드 작업자 시작 (실행 중인 이벤트 루프 안에서 호출)"""
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            if self._pending:
+                self._wakeup.set()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    def put(self, item: Dict):
+        """
+        항목 추가 (대기하지 않음)
+
+        같은 합침 키의 항목이 이미 대기 중이면 새 항목으로 교체하고,
+        대기열이 가득 차면 가장 오래된 항목을 버림
+        """
+        self.enqueued += 1
+        if self._coalesce_key is not None:
+            key = self._coalesce_key(item)
+            if key in self._pending:
+                del self._pending[key]
+                self.coalesced += 1
+        else:
+            self._seq += 1
+            key = self._seq
+        while len(self._pending) >= self.maxsize:
+            self._pending.popitem(last=False)
+            self.dropped += 1
+        self._pending[key] = item
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def stop(self, drain: bool = True, timeout: float = 10.0):
+        """작업자 종료 (drain=True면 남은 항목을 먼저 전송)"""
+        if self._worker is None:
+            return
+        if drain:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            while self._pending and loop.time() < deadline:
+                await asyncio.sleep(0.05)
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    def stats(self) -> Dict[str, int]:
+        """대기열 길이 및 누적 집계"""
+        return {
+            "depth": self.depth,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "batches": self.batches,
+        }
+
+    def _take(self, n: int) -> List[Dict]:
+        items = []
+        while self._pending and len(items) < n:
+            _, item = self._pending.popitem(last=False)
+            items.append(item)
+        return items
+
+    async def _run(self):
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            if self._send_batch is not None and len(self._pending) > 1:
+                items = self._take(self.max_batch)
+                try:
+                    ok = await self._send_batch(items)
+                except Exception as e:
+                    print(f"[QUEUE] 배치 전송 오류: {e}")
+                    ok = False
+                if ok is None:
+                    # 배치 엔드포인트를 쓸 수 없으면 개별 전송으로 전환
+                    self._send_batch = None
+                    for item in items:
+                        await self._send_one(item)
+                    continue
+                self.batches += 1
+                if ok:
+                    self.sent += len(items)
+                else:
+                    self.failed += len(items)
+                continue
+
+            await self._send_one(self._take(1)[0])
+
+    async def _send_one(self, item: Dict):
+        try:
+            ok = await self._send(item)
+        except Exception as e:
+            print(f"[QUEUE] 전송 오류: {e}")
+            ok = False
+        if ok:
+            self.sent += 1
+        else:
+            self.failed += 1
+
+
+class EventUploader:
+    """
+    이벤트 수집 API(POST /ingest)로 보내는 일련번호 기반 업로더
+
+    - put()이 이벤트마다 1부터 증가하는 seq를 붙여 버퍼에 넣음 (합치지 않음, 순서 유지)
+    - 작업자는 max_batch개가 모이거나 첫 이벤트가 들어오고 flush_interval초가 지나면 묶어서 전송
+    - 전송 실패(응답 없음 포함) 시 버퍼 앞의 같은 묶음을 그대로 다시 보냄
+      → 서버는 이미 받은 seq를 무시하므로 재전송해도 중복 집계되지 않음
+    - 재시도 간격은 서버가 준 Retry-After, 없으면 1초부터 두 배씩 max_backoff까지
+    - 버퍼가 max_buffer를 넘으면 가장 오래된 이벤트를 버림 (서버가 오래 내려가 있을 때 메모리 제한)
+    """
+
+    def __init__(
+        self,
+        send_batch: Callable[[List[Dict]], Awaitable[Tuple[bool, Optional[float]]]],
+        max_batch: int = 100,
+        flush_interval: float = 2.0,
+        max_buffer: int = 10000,
+        max_backoff: float = 60.0,
+    ):
+        """
+        Args:
+            send_batch: 이벤트 묶음을 전송하는 코루틴 함수 → (성공 여부, Retry-After 초 또는 None)
+            max_batch: 묶음 하나에 담을 최대 이벤트 수
+            flush_interval: 묶음이 덜 찼어도 전송하는 간격 (초)
+            max_buffer: 전송 대기 최대 이벤트 수
+            max_backoff: 재시도 간격 상한 (초)
+        """
+        self._send_batch = send_batch
+        self.max_batch = max(1, int(max_batch))
+        self.flush_interval = max(0.0, float(flush_interval))
+        self.max_buffer = max(self.max_batch, int(max_buffer))
+        self.max_backoff = max(1.0, float(max_backoff))
+
+        self._buffer: Deque[Dict] = deque()
+        self._seq = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        self.enqueued = 0
+        self.sent = 0
+        self.batches = 0
+        self.retries = 0
+        self.dropped = 0
+
+    @property
+    def depth(self) -> int:
+        """현재 전송 대기 중인 이벤트 수"""
+        return len(self._buffer)
+
+    def start(self):
+        """백그라운드 작업자 시작 (실행 중인 이벤트 루프 안에서 호출)"""
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            if self._buffer:
+                self._wakeup.set()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    def put(self, event: Dict) -> int:
+        """이벤트 추가 (대기하지 않음), 붙인 seq 반환"""
+        self._seq += 1
+        self.enqueued += 1
+        while len(self._buffer) >= self.max_buffer:
+            self._buffer.popleft()
+            self.dropped += 1
+        self._buffer.append({**event, "seq": self._seq})
+        # 비어 있던 버퍼에 첫 이벤트가 들어오면 flush_interval 대기를 시작하도록, 묶음이 차면 바로 보내도록 깨움
+        if self._wakeup is not None and (len(self._buffer) == 1 or len(self._buffer) >= self.max_batch):
+            self._wakeup.set()
+        return self._seq
+
+    async def stop(self, drain: bool = True, timeout: float = 10.0):
+        """작업자 종료 (drain=True면 남은 이벤트를 먼저 전송, 재시도 대기 중이면 바로 다시 시도)"""
+        if self._worker is None:
+            return
+        if drain:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            while self._buffer and loop.time() < deadline and not self._worker.done():
+                self._wakeup.set()
+                await asyncio.sleep(0.05)
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        if self._buffer:
+            print(f"[WARN] 전송하지 못한 이벤트 {len(self._buffer)}개")
+
+    def stats(self) -> Dict[str, int]:
+        """버퍼 길이 및 누적 집계"""
+        return {
+            "depth": self.depth,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "batches": self.batches,
+            "retries": self.retries,
+            "dropped": self.dropped,
+            "last_seq": self._seq,
+        }
+
+    async def _wait(self, seconds: Optional[float]):
+        """seconds초 또는 깨울 때까지 대기 (None이면 깨울 때까지)"""
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self):
+        backoff = 1.0
+        retrying = False
+        while True:
+            if not retrying:
+                if not self._buffer:
+                    await self._wait(None)
+                    continue
+                if len(self._buffer) < self.max_batch:
+                    await self._wait(self.flush_interval)
+            if not self._buffer:
+                continue
+
+            # 보내는 동안 put()이 뒤에 붙이거나 앞을 버려도 되도록 복사본 전송
+            batch = [self._buffer[i] for i in range(min(self.max_batch, len(self._buffer)))]
+            try:
+                ok, retry_after = await self._send_batch(batch)
+            except Exception as e:
+                print(f"[QUEUE] 이벤트 전송 오류: {e}")
+                ok, retry_after = False, None
+
+            if ok:
+                last_seq = batch[-1]["seq"]
+                while self._buffer and self._buffer[0]["seq"] <= last_seq:
+                    self._buffer.popleft()
+                self.sent += len(batch)
+                self.batches += 1
+                backoff = 1.0
+                retrying = False
+                continue
+
+            # 실패한 묶음은 버퍼 앞에 그대로 있으므로 대기 후 같은 seq로 다시 전송
+            self.retries += 1
+            retrying = True
+            delay = retry_after if retry_after is not None else backoff
+            backoff = min(self.max_backoff, backoff * 2)
+            await self._wait(min(self.max_backoff, max(0.0, delay)))
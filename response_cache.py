@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+/finish 응답 캐시 모듈
+- 키: (로그 파일 경로, time 파라미터), 각 항목은 계산 당시 로그 파일 서명(dev, inode, 크기, mtime)을 함께 저장
+- 로그가 바뀌지 않았으면 직렬화된 응답을 그대로 재사용하고, 바뀌었으면 다시 계산한 결과로 덮어씀
+- 크기가 정해진 LRU (가장 오래 안 쓴 항목부터 삭제)
+- ETag는 응답 본문 해시 → If-None-Match가 맞으면 본문 없이 304
+"""
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+FileSignature = Tuple[int, int, int, int]
+
+
+def file_signature(path: str) -> Optional[FileSignature]:
+    """로그 파일 서명 (dev, inode, 크기, mtime_ns), 파일이 없으면 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def make_etag(body: bytes) -> str:
+    """응답 본문으로 만든 강한 ETag (따옴표 포함)"""
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 헤더에 etag가 있는지 (W/ 약한 비교, * 허용)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class CachedResponse:
+    """직렬화된 응답 하나"""
+
+    __slots__ = ("body", "etag", "signature", "created_at")
+
+    def __init__(self, body: bytes, signature: Optional[FileSignature]):
+        self.body = body
+        self.etag = make_etag(body)
+        self.signature = signature
+        self.created_at = time.time()
+
+
+class ResponseCache:
+    """
+    로그 서명으로 유효성을 확인하는 LRU 응답 캐시
+
+    이벤트 루프 스레드 하나에서만 사용 (잠금 없음)
+    """
+
+    def __init__(self, max_entries: int = 256):
+        """
+        Args:
+            max_entries: 최대 항목 수 (0이면 캐시 사용 안 함)
+        """
+        self.max_entries = max(0, int(max_entries))
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._counters = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0}
+
+    def get(self, key: Hashable, signature: Optional[FileSignature]) -> Optional[CachedResponse]:
+        """
+        로그 서명이 같은 항목 반환 (없거나 로그가 바뀌었으면 None)
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self._counters["misses"] += 1
+            return None
+        if signature is None or entry.signature != signature:
+            self._counters["stale"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self._counters["hits"] += 1
+        return entry
+
+    def put(self, key: Hashable, signature: Optional[FileSignature], body: bytes) -> CachedResponse:
+        """응답 저장 (서명이 없으면, 즉 로그 파일이 없으면 저장하지 않고 항목만 만들어 반환)"""
+        entry = CachedResponse(body, signature)
+        if self.max_entries == 0 or signature is None:
+            return entry
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "max_entries": self.max_entries, **self._counters}
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+활성 앱/창 스냅샷 백엔드 모듈
+- CallableSnapshotBackend: 기존 방식(폴링마다 osascript 프로세스 실행)을 감싸는 백엔드
+- PersistentHelperBackend: 오래 실행되는 도우미 프로세스에 파이프로 요청/응답 (프로세스 생성 비용 제거)
+- ReplaySnapshotBackend: 기록된 스냅샷을 순서대로 재생 (macOS가 아닌 환경에서 테스트/측정용)
+- ExecutorSnapshotProber: 스냅샷 조회를 전용 스레드에서 실행 (시간 제한 + 오래된 결과 재사용)
+"""
+
+import asyncio
+import json
+import os
+import select
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+
+
+# macOS 도우미: 표준 입력으로 한 줄을 받을 때마다 전면 앱/창/URL을 JSON 한 줄로 출력 (JXA)
+MACOS_HELPER_JXA = r"""
+ObjC.import('Foundation');
+var se = Application('System Events');
+var stdin = $.NSFileHandle.fileHandleWithStandardInput;
+var stdout = $.NSFileHandle.fileHandleWithStandardOutput;
+function out(s) { stdout.writeData($(s + "\n").dataUsingEncoding($.NSUTF8StringEncoding)); }
+function snap() {
+    var r = {app: "", window: ""};
+    try {
+        var p = se.processes.whose({frontmost: true})[0];
+        r.app = p.name();
+        try { r.window = p.windows[0].name(); } catch (e) {}
+        if (r.app === "Safari") {
+            try { r.url = Application("Safari").documents[0].url(); } catch (e) { r.url = ""; }
+        } else if (r.app === "Google Chrome") {
+            try { r.url = Application("Google Chrome").windows[0].activeTab.url(); } catch (e) { r.url = ""; }
+        }
+    } catch (e) { r.error = String(e); }
+    return r;
+}
+while (true) {
+    var data = stdin.availableData;
+    if (data.length === 0) { break; }
+    out(JSON.stringify(snap()));
+}
+"""
+
+MACOS_HELPER_ARGV = ["osascript", "-l", "JavaScript", "-e", MACOS_HELPER_JXA]
+
+
+class SnapshotBackend:
+    """스냅샷 백엔드 기본 클래스"""
+
+    name = "base"
+
+    def snapshot(self) -> Dict[str, str]:
+        """현재 활성 앱/창 스냅샷 반환"""
+        raise NotImplementedError
+
+    def close(self):
+        """사용한 자원 정리"""
+
+
+class CallableSnapshotBackend(SnapshotBackend):
+    """스냅샷 함수를 그대로 호출하는 백엔드 (폴링마다 프로세스를 새로 띄우는 기존 방식)"""
+
+    name = "spawn"
+
+    def __init__(self, probe: Callable[[], Dict[str, str]]):
+        self._probe = probe
+
+    def snapshot(self) -> Dict[str, str]:
+        return self._probe()
+
+
+class PersistentHelperBackend(SnapshotBackend):
+    """
+    도우미 프로세스 하나를 계속 띄워두고 파이프로 스냅샷을 받는 백엔드
+
+    요청마다 개행 한 줄을 쓰고, 도우미가 출력한 JSON 한 줄을 읽음.
+    도우미가 응답하지 않거나 종료되면 강제 종료 후 다음 요청에서 다시 실행함.
+    """
+
+    name = "helper"
+
+    def __init__(self, argv: Sequence[str],
+                 postprocess: Optional[Callable[[Dict[str, str]], Dict[str, str]]] = None,
+                 timeout: float = 2.0):
+        """
+        Args:
+            argv: 도우미 실행 명령
+            postprocess: 도우미가 준 원시 결과(app/window/url)를 스냅샷으로 바꾸는 함수
+            timeout: 응답 대기 시간 (초)
+        """
+        self.argv = list(argv)
+        self.postprocess = postprocess
+        self.timeout = float(timeout)
+        self.restarts = 0
+        self._proc: Optional[subprocess.Popen] = None
+        self._buf = b""
+
+    def _ensure_process(self) -> subprocess.Popen:
+        if self._proc is None or self._proc.poll() is not None:
+            if self._proc is not None:
+                self.restarts += 1
+            self._proc = subprocess.Popen(
+                self.argv,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                bufsize=0,
+            )
+            self._buf = b""
+        return self._proc
+
+    def _read_line(self, proc: subprocess.Popen) -> bytes:
+        deadline = time.monotonic() + self.timeout
+        fd = proc.stdout.fileno()
+        while b"\n" not in self._buf:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"도우미 응답 없음 ({self.timeout}s)")
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise EOFError("도우미 프로세스 종료")
+            self._buf += chunk
+        line, self._buf = self._buf.split(b"\n", 1)
+        return line
+
+    def snapshot(self) -> Dict[str, str]:
+        try:
+            proc = self._ensure_process()
+            proc.stdin.write(b"\n")
+            raw = json.loads(self._read_line(proc).decode("utf-8"))
+            if raw.get("error"):
+                raise RuntimeError(raw["error"])
+            return self.postprocess(raw) if self.postprocess else raw
+        except Exception as e:
+            self._kill()
+            return {"app": "error", "window": "", "display": f"error({e})"}
+
+    def _kill(self):
+        if self._proc is not None:
+            try:
+                self._proc.kill()
+                self._proc.wait(timeout=1)
+            except Exception:
+                pass
+        self._buf = b""
+
+    def close(self):
+        if self._proc is not None and self._proc.poll() is None:
+            try:
+                self._proc.stdin.close()
+                self._proc.wait(timeout=1)
+            except Exception:
+                self._kill()
+        self._proc = None
+
+
+class ReplaySnapshotBackend(SnapshotBackend):
+    """기록된 스냅샷을 호출 순서대로 돌려주는 백엔드"""
+
+    name = "replay"
+
+    def __init__(self, snapshots: List[Dict[str, str]], loop: bool = True):
+        """
+        Args:
+            snapshots: 재생할 스냅샷 리스트
+            loop: 끝까지 재생하면 처음부터 반복 (False면 마지막 스냅샷 유지)
+        """
+        if not snapshots:
+            raise ValueError("재생할 스냅샷이 없습니다.")
+        self.snapshots = snapshots
+        self.loop = loop
+        self._index = 0
+
+    @classmethod
+    def from_file(cls, path: str, loop: bool = True) -> "ReplaySnapshotBackend":
+        """
+        JSON Lines/JSON 배열 파일에서 스냅샷 로드
+
+        이벤트 로그(activity_log.json)를 그대로 넣으면 각 이벤트의 "snapshot"을 사용
+        """
+        from event_log import read_events
+
+        snapshots = []
+        for item in read_events(path):
+            snapshot = item.get("snapshot", item)
+            if isinstance(snapshot, dict) and snapshot.get("app"):
+                snapshots.append(snapshot)
+        return cls(snapshots, loop=loop)
+
+    def snapshot(self) -> Dict[str, str]:
+        if self._index >= len(self.snapshots):
+            if not self.loop:
+                return dict(self.snapshots[-1])
+            self._index = 0
+        snapshot = self.snapshots[self._index]
+        self._index += 1
+        return dict(snapshot)
+
+
+class ExecutorSnapshotProber:
+    """
+    동기 스냅샷 함수를 전용 스레드에서 실행하는 비동기 래퍼
+
+    - 이벤트 루프는 결과를 기다리기만 하므로 osascript가 멈춰도 루프(전송 등)는 계속 동작
+    - timeout 안에 응답이 없으면 마지막 정상 스냅샷이 stale_max_age 이내일 때 그것을 돌려주고,
+      아니면 오류 스냅샷을 돌려줌
+    - 이전 조회가 아직 끝나지 않았으면 새로 제출하지 않고 그 결과를 이어서 기다림 (스레드가 쌓이지 않도록)
+    """
+
+    def __init__(self, probe: Callable[[], Dict[str, str]], timeout: float = 3.0,
+                 stale_max_age: float = 10.0):
+        """
+        Args:
+            probe: 현재 스냅샷을 돌려주는 동기 함수 (예: get_active_snapshot)
+            timeout: 조회 한 번을 기다리는 최대 시간 (초)
+            stale_max_age: 시간 초과 시 대신 돌려줄 수 있는 마지막 스냅샷의 최대 나이 (초, 0이면 재사용 안 함)
+        """
+        self._probe = probe
+        self.timeout = float(timeout)
+        self.stale_max_age = float(stale_max_age)
+        # 백엔드(도우미 프로세스 등)는 스레드 안전하지 않으므로 작업자 하나로 직렬화
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot")
+        self._inflight: Optional[asyncio.Future] = None
+        self._last: Optional[Dict[str, str]] = None
+        self._last_at = 0.0
+        self.probes = 0
+        self.timeouts = 0
+        self.stale_served = 0
+
+    async def snapshot(self) -> Dict[str, str]:
+        """현재 스냅샷 (시간 초과 시 stale 정책 적용)"""
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight
+        if inflight is not None and inflight.get_loop() is not loop:
+            inflight = None
+        if inflight is not None and inflight.done():
+            # 시간 초과 뒤 늦게 끝난 결과는 최신 값이 아닐 수 있으므로 기록만 하고 새로 조회
+            self._remember(inflight)
+            inflight = None
+        if inflight is None:
+            self.probes += 1
+            inflight = loop.run_in_executor(self._executor, self._probe)
+        self._inflight = inflight
+        try:
+            await asyncio.wait_for(asyncio.shield(inflight), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return self._stale_or_error()
+        except Exception:
+            pass
+        self._inflight = None
+        snapshot = self._remember(inflight)
+        return dict(snapshot)
+
+    def _remember(self, future: asyncio.Future) -> Dict[str, str]:
+        """끝난 조회 결과를 꺼내고, 정상 스냅샷이면 stale 대비용으로 보관"""
+        error = future.exception()
+        if error is not None:
+            return {"app": "error", "window": "", "display": f"error({error})"}
+        snapshot = future.result()
+        if snapshot.get("app") != "error":
+            self._last = snapshot
+            self._last_at = time.monotonic()
+        return snapshot
+
+    def _stale_or_error(self) -> Dict[str, str]:
+        age = time.monotonic() - self._last_at
+        if self._last is not None and age <= self.stale_max_age:
+            self.stale_served += 1
+            return dict(self._last)
+        return {"app": "error", "window": "", "display": f"error(snapshot timeout {self.timeout:g}s)"}
+
+    def stats(self) -> Dict[str, int]:
+        """조회/시간 초과/stale 응답 횟수"""
+        return {
+            "probes": self.probes,
+            "timeouts": self.timeouts,
+            "stale_served": self.stale_served,
+            "in_flight": int(self._inflight is not None and not self._inflight.done()),
+        }
+
+    def close(self):
+        """작업 스레드 정리 (멈춘 조회는 기다리지 않음)"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
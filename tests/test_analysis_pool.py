@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""분석 작업 풀 테스트 (429/503, Retry-After, 같은 키 합치기)"""
+
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import finish_api_server as server
+from analysis_pool import AnalysisPool, PoolBusy
+
+
+class BlockingJob:
+    """release() 전까지 스레드를 붙잡는 작업 함수"""
+
+    def __init__(self):
+        self.calls = 0
+        self.gate = threading.Event()
+        self.started = threading.Event()
+
+    def __call__(self, timer, value):
+        self.calls += 1
+        self.started.set()
+        self.gate.wait(5)
+        with timer.stage("analyze"):
+            return value * 2
+
+    def release(self):
+        self.gate.set()
+
+
+async def _wait_started(job):
+    await asyncio.to_thread(job.started.wait, 5)
+
+
+def test_same_key_requests_share_one_job():
+    job = BlockingJob()
+
+    async def main():
+        pool = AnalysisPool(workers=2, queue_max=0)
+        try:
+            first = asyncio.ensure_future(pool.run("k", job, 21))
+            await _wait_started(job)
+            second = asyncio.ensure_future(pool.run("k", job, 21))
+            await asyncio.sleep(0.05)
+            job.release()
+            return await first, await second, pool.stats()
+        finally:
+            pool.close(wait=True)
+
+    (a, timer_a), (b, timer_b), stats = asyncio.run(main())
+    assert a == b == 42
+    assert timer_a is timer_b and "queue" in timer_a.as_dict() and "analyze" in timer_a.as_dict()
+    assert job.calls == 1
+    assert stats["submitted"] == 1 and stats["coalesced"] == 1 and stats["completed"] == 1
+    assert stats["pending"] == 0
+
+
+def test_full_queue_is_rejected_with_429():
+    job = BlockingJob()
+
+    async def main():
+        pool = AnalysisPool(workers=1, queue_max=1)
+        try:
+            running = asyncio.ensure_future(pool.run("a", job, 1))
+            await _wait_started(job)
+            queued = asyncio.ensure_future(pool.run("b", job, 2))
+            await asyncio.sleep(0)
+            with pytest.raises(PoolBusy) as busy:
+                await pool.run("c", job, 3)
+            # 진행 중인 키는 대기열이 가득 차도 합쳐서 받음
+            coalesced = asyncio.ensure_future(pool.run("a", job, 1))
+            job.release()
+            results = [r for r, _ in await asyncio.gather(running, queued, coalesced)]
+            return busy.value, results, pool.stats()
+        finally:
+            pool.close(wait=True)
+
+    busy, results, stats = asyncio.run(main())
+    assert busy.status_code == 429 and busy.reason == "queue_full"
+    assert 1 <= busy.retry_after <= 60
+    assert results == [2, 4, 2]
+    assert stats["rejected_429"] == 1 and stats["coalesced"] == 1
+
+
+def test_job_waiting_too_long_in_queue_gets_503():
+    job = BlockingJob()
+    never_run = []
+
+    async def main():
+        pool = AnalysisPool(workers=1, queue_max=4, queue_timeout=0.1, job_timeout=5.0)
+        try:
+            running = asyncio.ensure_future(pool.run("a", job, 1))
+            await _wait_started(job)
+            with pytest.raises(PoolBusy) as busy:
+                await pool.run("b", lambda timer: never_run.append(1))
+            job.release()
+            await running
+            return busy.value, pool.stats()
+        finally:
+            pool.close(wait=True)
+
+    busy, stats = asyncio.run(main())
+    assert busy.status_code == 503 and busy.reason == "queue_timeout"
+    assert never_run == []  # 취소된 작업은 시작하지 않음
+    assert stats["rejected_503"] == 1 and stats["pending"] == 0
+
+
+def test_slow_job_times_out_with_503_and_keeps_running_once():
+    job = BlockingJob()
+
+    async def main():
+        pool = AnalysisPool(workers=2, queue_max=0, queue_timeout=0.05, job_timeout=0.1)
+        try:
+            with pytest.raises(PoolBusy) as busy:
+                await pool.run("a", job, 5)
+            # 작업은 스레드에서 계속 실행 중이므로 같은 키 요청은 새 작업 없이 그 결과를 기다림
+            again = asyncio.ensure_future(pool.run("a", job, 5))
+            await asyncio.sleep(0.02)
+            job.release()
+            result, _ = await again
+            return busy.value, result, pool.stats()
+        finally:
+            pool.close(wait=True)
+
+    busy, result, stats = asyncio.run(main())
+    assert busy.status_code == 503 and busy.reason == "timeout"
+    assert result == 10 and job.calls == 1
+    assert stats["submitted"] == 1 and stats["coalesced"] == 1
+
+
+def test_job_exception_reaches_every_waiter():
+    def failing(timer):
+        raise RuntimeError("boom")
+
+    async def main():
+        pool = AnalysisPool(workers=1)
+        try:
+            return await asyncio.gather(pool.run("k", failing), pool.run("k", failing), return_exceptions=True)
+        finally:
+            pool.close(wait=True)
+
+    errors = asyncio.run(main())
+    assert all(isinstance(e, RuntimeError) for e in errors)
+
+
+@pytest.fixture
+def busy_server(tmp_path, monkeypatch):
+    """작업 풀이 항상 PoolBusy를 던지는 서버 상태"""
+    log = tmp_path / "activity_log.json"
+    log.write_text('{"time":"2024-01-01 10:00:00","app":"a","signal":0}\n', encoding="utf-8")
+    monkeypatch.setattr(server, "JSON_FILE", str(log))
+    monkeypatch.setattr(server, "EVENT_STORE_DIR", "")
+    monkeypatch.setattr(server, "user_analyzers", None)
+    server.response_cache.clear()
+    errors = []
+
+    async def run(key, fn, *args):
+        raise errors[-1]
+
+    monkeypatch.setattr(server.analysis_pool, "run", run)
+    yield errors
+    server.response_cache.clear()
+
+
+@pytest.mark.parametrize("status, error", [(429, "server_busy"), (503, "timeout")])
+def test_finish_returns_busy_status_with_retry_after(busy_server, status, error):
+    busy_server.append(PoolBusy(status, 7, "test"))
+    resp = TestClient(server.app).get("/finish", params={"time": 600})
+    assert resp.status_code == status
+    assert resp.headers["Retry-After"] == "7"
+    assert resp.json()["error"] == error and resp.json()["retryAfter"] == 7
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""AppAnalyzer 집계 테스트"""
+
+import asyncio
+import json
+import os
+
+import pytest
+
+import app_monitor
+from app_analyzer import AppAnalyzer
+from binary_log import open_binary_log
+from columnar_events import ColumnarEvents
+from event_log import open_event_log
+
+SWITCHES = [
+    {"ts": 0, "app": "pycharm", "signal": 0},
+    {"ts": 60, "app": "chrome(youtube.com)", "signal": 1},
+]
+# 같은 시각에 기록된 LLM 판정 보정 (앱 전환 기록이 아님)
+UPGRADE = {"ts": 60, "app": "chrome(youtube.com)", "signal": 2, "upgraded": True}
+
+
+def _accumulate(events):
+    analyzer = AppAnalyzer.__new__(AppAnalyzer)  # 파일 없이 _accumulate만 사용
+    return analyzer._accumulate(events).to_analysis()
+
+
+def _usages(analysis):
+    return {u["appName"]: u["percentage"] for u in analysis.app_usages}
+
+
+def test_log_ending_with_upgrade_keeps_current_app():
+    before = _accumulate(SWITCHES)
+    after = _accumulate(SWITCHES + [UPGRADE])
+    assert _usages(before) == _usages(after) == {"pycharm": 50.0, "chrome(youtube.com)": 50.0}
+    # 마지막 구간은 보정된 signal로 집계
+    assert before.signal_seconds == {0: 60.0, 1: 60.0}
+    assert after.signal_seconds == {0: 60.0, 2: 60.0}
+    assert after.learning_rate == 50.0
+    assert after.total_span_seconds == 60.0
+
+
+def test_upgrade_in_the_middle_replaces_the_quick_verdict():
+    events = SWITCHES + [UPGRADE, {"ts": 90, "app": "pycharm", "signal": 0}]
+    analysis = _accumulate(events)
+    assert analysis.signal_seconds == {0: 90.0, 2: 30.0}
+
+
+def test_events_at_a_single_time_have_no_duration():
+    analysis = _accumulate([{"ts": 5, "app": "a", "signal": 0}, {"ts": 5, "app": "b", "signal": 1}])
+    assert analysis.app_usages == [] and analysis.signal_seconds == {}
+
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_upgrade_tail_matches_across_readers(tmp_path, binary):
+    events = SWITCHES + [UPGRADE]
+    path = str(tmp_path / ("activity_log.bin" if binary else "activity_log.json"))
+    writer = open_binary_log(path) if binary else open_event_log(path)
+    for event in events:
+        writer.append(event)
+    writer.close()
+
+    expected = _accumulate(events)
+    assert AppAnalyzer(path).analyze() == expected
+    assert AppAnalyzer(path, incremental=True).analyze() == expected
+    assert ColumnarEvents.from_events(events).analyze() == expected
+
+
+def test_upgrade_is_recorded_as_same_time_correction(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(app_monitor, "_record_event", recorded.append)
+    monkeypatch.setattr(app_monitor, "_enqueue_result", lambda result: None)
+    monkeypatch.setattr(app_monitor, "_EMIT_SEQ", 7)
+
+    async def verdict(app):
+        return 2, "지금은 영상보다 과제에 다시 집중해볼까요? 조금만 더 힘내요!"
+
+    monkeypatch.setattr(app_monitor, "_llm_verdict_async", verdict)
+    quick = {"app": "chrome(youtube.com)", "signal": 1, "message": "규칙 기반 메시지"}
+    snapshot = {"app": "Google Chrome", "window": "YouTube", "url": "https://youtube.com"}
+    asyncio.run(app_monitor._upgrade_with_llm(7, "2024-01-01 10:01:00", 60, snapshot, quick))
+
+    assert len(recorded) == 1
+    event = recorded[0]
+    assert event["ts"] == 60 and event["upgraded"] is True and event["signal"] == 2
+    assert "from" not in event and "to" not in event
+
+
+def _line(i, app=None, signal=None):
+    event = {"time": f"2024-01-01 10:{i // 60:02d}:{i % 60:02d}", "app": app or f"app{i % 4}",
+             "signal": i % 3 if signal is None else signal}
+    return (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _assert_matches_full_read(path, incremental):
+    assert incremental.analyze() == AppAnalyzer(path).analyze()
+
+
+def test_incremental_analyzer_matches_full_read_through_appends_and_truncation(tmp_path):
+    path = str(tmp_path / "activity_log.json")
+    with open(path, "wb") as f:
+        f.write(b"".join(_line(i) for i in range(5)))
+    incremental = AppAnalyzer(path, incremental=True)
+    _assert_matches_full_read(path, incremental)
+
+    # 이어 쓰기: 새 줄만 읽음
+    with open(path, "ab") as f:
+        f.write(b"".join(_line(i) for i in range(5, 9)))
+    _assert_matches_full_read(path, incremental)
+
+    # 아직 개행이 없는 마지막 줄은 다음 호출로 미룸
+    partial = _line(9, app="chrome(youtube.com)")
+    with open(path, "ab") as f:
+        f.write(partial[:-10])
+    before = incremental.analyze()
+    assert before == AppAnalyzer(path, incremental=True).analyze()
+    with open(path, "ab") as f:
+        f.write(partial[-10:])
+    after = incremental.analyze()
+    assert after != before and "chrome(youtube.com)" in _usages(after)
+    _assert_matches_full_read(path, incremental)
+
+    # 같은 파일을 더 짧게 다시 씀 (크기 < 오프셋) → 처음부터 다시 집계
+    with open(path, "wb") as f:
+        f.write(b"".join(_line(i, app="notion") for i in range(3)))
+    assert _usages(incremental.analyze()) == {"notion": 100.0}
+    _assert_matches_full_read(path, incremental)
+
+
+def test_incremental_analyzer_rereads_replaced_file(tmp_path):
+    path = str(tmp_path / "activity_log.json")
+    with open(path, "wb") as f:
+        f.write(b"".join(_line(i) for i in range(4)))
+    incremental = AppAnalyzer(path, incremental=True)
+    incremental.analyze()
+
+    # rename으로 교체한 더 큰 파일 (크기만으로는 알 수 없고 inode가 바뀜)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(b"".join(_line(i, app="pycharm", signal=0) for i in range(10, 30)))
+    os.replace(tmp, path)
+    assert _usages(incremental.analyze()) == {"pycharm": 100.0}
+    _assert_matches_full_read(path, incremental)
+
+    # 시간 역순 이벤트가 이어 붙으면 전체를 정렬해 다시 집계
+    with open(path, "ab") as f:
+        f.write(_line(1, app="chrome(github.com)") + _line(40))
+    _assert_matches_full_read(path, incremental)
+
+    os.remove(path)
+    assert incremental.analyze() == AppAnalyzer(path).analyze()
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""바이너리 로그 인코딩/디코딩 왕복 테스트 (JSON Lines 로그와 같은 이벤트로 복원되는지)"""
+
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+import binary_log
+from binary_log import (BinaryLogReader, BinaryLogWriter, _EVENT_HEAD, _T_HEADER, _T_LOCAL_TIME, _T_MAP,
+                        _T_STR, read_binary_events, read_recent_binary_events, write_binary_log)
+from mapped_file import mapped_file
+
+T0 = int(datetime(2024, 3, 1, 9, 0, 0).timestamp())
+
+
+def _local(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _write(path, events):
+    writer = BinaryLogWriter(str(path))
+    writer.open()
+    for event in events:
+        writer.append(event)
+    writer.close()
+
+
+def _as_json_lines(events):
+    """JSON Lines 로그에 썼다가 읽었을 때의 이벤트"""
+    return [json.loads(json.dumps(event, ensure_ascii=False)) for event in events]
+
+
+def _top_level_tags(path):
+    """이벤트마다 최상위 값의 태그 (값이 문자열/헤더/현지 시각뿐인 이벤트만)"""
+    tags = []
+    with mapped_file(str(path)) as buf:
+        reader = BinaryLogReader()
+        for body in reader.iter_records(buf, "offsets"):
+            pos = body + _EVENT_HEAD.size
+            assert buf[pos] == _T_MAP
+            keys = binary_log._shape_keys(reader._shapes, reader.strings, int.from_bytes(buf[pos + 1:pos + 5], "little"))
+            pos += 5
+            event_tags = {}
+            for key in keys:
+                tag = buf[pos]
+                event_tags[key] = tag
+                pos += 1 if tag == _T_HEADER else 5
+            tags.append(event_tags)
+    return tags
+
+
+def test_header_fields_round_trip(tmp_path):
+    path = tmp_path / "log.bin"
+    events = [
+        {"ts": T0, "app": "pycharm", "signal": 0},
+        {"ts": T0 + 5, "app": "chrome", "signal": -3},
+        {"ts": T0 + 9, "app": "game", "signal": 127},
+    ]
+    _write(path, events)
+    assert read_binary_events(str(path)) == events
+    # ts와 signal은 본문에 다시 쓰지 않고 헤더에서 복원
+    assert [t["ts"] for t in _top_level_tags(path)] == [_T_HEADER] * 3
+    assert [t["signal"] for t in _top_level_tags(path)] == [_T_HEADER] * 3
+
+
+@pytest.mark.parametrize("event", [
+    {"ts": T0 + 0.5, "app": "a", "signal": 0},        # 정수가 아닌 ts
+    {"ts": T0, "time": _local(T0 + 60), "app": "a", "signal": 0},  # ts와 다른 time
+    {"ts": T0, "app": "a", "signal": 300},            # int8 범위 밖 signal
+    {"ts": T0, "app": "a", "signal": "1"},            # 숫자가 아닌 signal
+    {"ts": T0, "app": "a", "signal": True},           # bool은 정수로 보지 않음
+    {"ts": str(T0), "app": "a"},                      # 문자열 ts, signal 없음
+])
+def test_values_not_representable_in_header_round_trip(tmp_path, event):
+    path = tmp_path / "log.bin"
+    _write(path, [event])
+    assert read_binary_events(str(path)) == [event]
+
+
+def test_local_time_round_trip(tmp_path):
+    path = tmp_path / "log.bin"
+    events = [
+        {"time": _local(T0), "ts": T0, "app": "pycharm", "signal": 0},
+        {"time": _local(T0 + 3599), "ts": T0 + 3599, "app": "pycharm", "signal": 0},
+        {"time": _local(T0 + 86400 * 40), "app": "chrome", "signal": 1},  # ts 없이 time만
+    ]
+    _write(path, events)
+    assert read_binary_events(str(path)) == events
+    assert [t["time"] for t in _top_level_tags(path)] == [_T_LOCAL_TIME] * 3
+
+
+@pytest.mark.parametrize("time_value", ["2024-3-1 09:00:00", "2024-03-01T09:00:00", "", "2024-02-30 09:00:00"])
+def test_time_strings_not_in_time_format_are_kept_verbatim(tmp_path, time_value):
+    path = tmp_path / "log.bin"
+    event = {"time": time_value, "ts": T0, "app": "a", "signal": 0}
+    _write(path, [event])
+    assert read_binary_events(str(path)) == [event]
+    assert _top_level_tags(path)[0]["time"] == _T_STR
+
+
+def test_json_fallback_values_match_json_lines(tmp_path):
+    path = tmp_path / "log.bin"
+    events = [
+        {"ts": T0, "big": 2 ** 70, "neg": -2 ** 64, "app": "a"},
+        {"ts": T0, "keys": {1: "one", 2.5: "x"}, "app": "a"},        # 문자열이 아닌 키
+        {"ts": T0, "empty_key": {"": 1}, "sep": {"a\x1fb": 2}},      # 모양 문자열로 나타낼 수 없는 키
+        {"ts": T0, "nested": [1, [2.5, None, True], {"k": (3, 4)}], "f": -0.25},
+        {"ts": T0, "i64": 2 ** 40, "snapshot": {"app": "Chrome", "window": "", "url": None}},
+        {"": "빈 키만 있는 이벤트"},
+        {1: "문자열이 아닌 최상위 키", "ts": T0},
+    ]
+    _write(path, events)
+    assert read_binary_events(str(path)) == _as_json_lines(events)
+
+
+def test_truncated_tail_is_cut_on_open(tmp_path):
+    path = tmp_path / "log.bin"
+    events = [{"ts": T0 + i, "app": f"app{i}", "signal": 0} for i in range(5)]
+    _write(path, events)
+    size = os.path.getsize(path)
+    with open(path, "r+b") as f:
+        f.truncate(size - 3)  # 마지막 레코드 기록 중 종료
+    # 읽기는 잘린 레코드만 건너뜀
+    assert read_binary_events(str(path)) == events[:-1]
+
+    writer = BinaryLogWriter(str(path))
+    writer.open()
+    assert os.path.getsize(path) < size - 3
+    writer.append({"ts": T0 + 10, "app": "app4", "signal": 2})
+    writer.close()
+    assert read_binary_events(str(path)) == events[:-1] + [{"ts": T0 + 10, "app": "app4", "signal": 2}]
+
+
+def test_magic_only_file_is_reused(tmp_path):
+    path = tmp_path / "log.bin"
+    path.write_bytes(binary_log.BINARY_MAGIC[:3])
+    _write(path, [{"ts": T0, "app": "a", "signal": 0}])
+    assert read_binary_events(str(path)) == [{"ts": T0, "app": "a", "signal": 0}]
+
+
+def test_failed_encode_rolls_back_string_table(tmp_path):
+    path = tmp_path / "log.bin"
+    writer = BinaryLogWriter(str(path))
+    writer.open()
+    writer.append({"ts": T0, "app": "pycharm", "signal": 0})
+    with pytest.raises(TypeError):
+        # 앱 이름과 키 모양 문자열이 먼저 등록된 뒤 직렬화할 수 없는 값에서 실패
+        writer.append({"ts": T0 + 1, "app": "new-app", "extra": object()})
+    size_after_failure = os.path.getsize(path)
+    writer.append({"ts": T0 + 2, "app": "new-app", "extra": "ok"})
+    writer.close()
+    assert size_after_failure > 0
+    assert read_binary_events(str(path)) == [
+        {"ts": T0, "app": "pycharm", "signal": 0},
+        {"ts": T0 + 2, "app": "new-app", "extra": "ok"},
+    ]
+
+    # 다시 열어 이어 쓸 때도 문자열 번호가 파일과 맞아야 함
+    writer = BinaryLogWriter(str(path))
+    writer.open()
+    writer.append({"ts": T0 + 3, "app": "new-app", "extra": "again"})
+    writer.close()
+    assert read_binary_events(str(path))[-1] == {"ts": T0 + 3, "app": "new-app", "extra": "again"}
+
+
+@pytest.mark.parametrize("limit", [0, 1, 4, 30, 31, 100])
+def test_read_recent_binary_events_matches_full_read(tmp_path, limit):
+    path = tmp_path / "log.bin"
+    events = [{"time": _local(T0 + i), "ts": T0 + i, "app": f"app{i % 7}", "signal": i % 3,
+               "snapshot": {"app": f"App{i % 4}", "window": f"창 {i}"}} for i in range(30)]
+    write_binary_log(str(path), events)
+    full = read_binary_events(str(path))
+    assert full == events
+    assert read_recent_binary_events(str(path), limit) == (full[-limit:] if limit else [])
+
+
+def test_read_recent_binary_events_missing_file(tmp_path):
+    assert read_recent_binary_events(str(tmp_path / "none.bin"), 10) == []
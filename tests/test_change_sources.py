@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""창 변경 감지(ChangeSource) 테스트 (가상 포커스 알림 사용)"""
+
+import asyncio
+import os
+import time
+
+from change_sources import (AdaptivePollingSource, FixedPollingSource, NotificationChangeSource,
+                            SimulatedFocusWorld, display_of)
+
+
+class FakeFocus:
+    """현재 display를 바꾸고 포커스 알림을 직접 넣을 수 있는 가상 환경"""
+
+    def __init__(self, display="A"):
+        self.display = display
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue()
+
+    async def probe(self):
+        return {"app": self.display, "window": "", "display": self.display}
+
+    def switch(self, display, notify=True):
+        self.display = display
+        if notify:
+            self.queue.put_nowait(display)
+
+    async def notifications(self):
+        while True:
+            yield await self.queue.get()
+
+
+def _notify_source(focus, **kwargs):
+    kwargs.setdefault("min_interval", 0.01)
+    kwargs.setdefault("max_interval", 5.0)
+    return NotificationChangeSource(focus.probe, focus.notifications, **kwargs)
+
+
+def test_first_call_returns_current_snapshot_immediately():
+    async def main():
+        focus = FakeFocus("A")
+        source = _notify_source(focus)
+        try:
+            return await source.next_change(None), source.stats()
+        finally:
+            await source.close()
+
+    snapshot, stats = asyncio.run(main())
+    assert display_of(snapshot) == "A"
+    assert stats["probes"] == 1 and stats["changes"] == 1
+
+
+def test_notification_emits_new_snapshot_without_waiting_for_poll():
+    async def main():
+        focus = FakeFocus("A")
+        # 보조 폴링은 5초 간격이라 알림 없이는 제때 잡을 수 없음
+        source = _notify_source(focus, min_interval=5.0)
+        try:
+            await source.next_change(None)
+            waiter = asyncio.ensure_future(source.next_change("A"))
+            await asyncio.sleep(0.05)
+            started = time.monotonic()
+            focus.switch("B")
+            snapshot = await asyncio.wait_for(waiter, 2.0)
+            return snapshot, time.monotonic() - started, source.stats()
+        finally:
+            await source.close()
+
+    snapshot, latency, stats = asyncio.run(main())
+    assert display_of(snapshot) == "B"
+    assert latency < 1.0
+    assert stats["notifications"] == 1 and stats["changes"] == 2
+
+
+def test_burst_of_notifications_is_debounced_into_one_probe():
+    async def main():
+        focus = FakeFocus("A")
+        source = _notify_source(focus, min_interval=5.0)
+        try:
+            await source.next_change(None)
+            # 알림이 연달아 와도 대기 중인 조회 한 번으로 합쳐지고 마지막 상태만 나옴
+            for display in ("B", "C", "D"):
+                focus.switch(display)
+            snapshot = await asyncio.wait_for(source.next_change("A"), 2.0)
+            await asyncio.sleep(0.05)
+            return snapshot, source.stats()
+        finally:
+            await source.close()
+
+    snapshot, stats = asyncio.run(main())
+    assert display_of(snapshot) == "D"
+    assert stats["notifications"] == 3
+    assert stats["probes"] == 2 and stats["changes"] == 2
+
+
+def test_notification_without_change_is_not_emitted():
+    async def main():
+        focus = FakeFocus("A")
+        source = _notify_source(focus, min_interval=0.5, max_interval=0.5)
+        try:
+            await source.next_change(None)
+            waiter = asyncio.ensure_future(source.next_change("A"))
+            await asyncio.sleep(0.05)
+            focus.switch("A")  # 같은 앱으로 다시 포커스 (display 그대로)
+            await asyncio.sleep(0.1)
+            emitted_early = waiter.done()
+            focus.switch("B", notify=False)
+            snapshot = await asyncio.wait_for(waiter, 3.0)
+            return emitted_early, snapshot, source.stats()
+        finally:
+            await source.close()
+
+    emitted_early, snapshot, stats = asyncio.run(main())
+    assert not emitted_early
+    # 알림 없는 변경(탭/창 제목)은 보조 폴링이 잡음
+    assert display_of(snapshot) == "B"
+    assert stats["changes"] == 2
+
+
+def test_notification_stream_end_falls_back_to_polling():
+    async def main():
+        focus = FakeFocus("A")
+
+        async def no_notifications():
+            return
+            yield
+
+        source = NotificationChangeSource(focus.probe, no_notifications, min_interval=0.01,
+                                          max_interval=5.0, fallback_max_interval=0.05)
+        try:
+            await source.next_change(None)
+            await asyncio.sleep(0)
+            focus.switch("B", notify=False)
+            return await asyncio.wait_for(source.next_change("A"), 2.0), source.max_interval
+        finally:
+            await source.close()
+
+    snapshot, max_interval = asyncio.run(main())
+    assert display_of(snapshot) == "B"
+    assert max_interval == 0.05
+
+
+def test_adaptive_polling_backs_off_while_idle_and_resets_on_change():
+    async def main():
+        focus = FakeFocus("A")
+        source = AdaptivePollingSource(focus.probe, min_interval=0.01, max_interval=0.08, backoff=2.0)
+        await source.next_change(None)
+        waiter = asyncio.ensure_future(source.next_change("A"))
+        await asyncio.sleep(0.3)
+        idle_interval = source.interval
+        focus.switch("B", notify=False)
+        snapshot = await asyncio.wait_for(waiter, 2.0)
+        return idle_interval, snapshot, source.interval
+
+    idle_interval, snapshot, interval = asyncio.run(main())
+    assert idle_interval == 0.08
+    assert display_of(snapshot) == "B"
+    assert interval == 0.01
+
+
+def test_fixed_polling_emits_only_changes():
+    async def main():
+        focus = FakeFocus("A")
+        source = FixedPollingSource(focus.probe, interval=0.01)
+        await source.next_change(None)
+        waiter = asyncio.ensure_future(source.next_change("A"))
+        await asyncio.sleep(0.05)
+        unchanged = waiter.done()
+        focus.switch("B", notify=False)
+        return unchanged, await asyncio.wait_for(waiter, 2.0), source.stats()
+
+    unchanged, snapshot, stats = asyncio.run(main())
+    assert not unchanged
+    assert display_of(snapshot) == "B"
+    assert stats["changes"] == 2 and stats["probes"] > 2
+
+
+def test_simulated_world_changes_are_all_detected():
+    async def main():
+        world = SimulatedFocusWorld([(0.0, "app-0"), (0.05, "app-1"), (0.1, "app-2"), (0.15, "app-3")])
+        world.start()
+        source = NotificationChangeSource(world.probe, world.notifications, min_interval=1.0, max_interval=5.0)
+        seen = []
+        prev = None
+        try:
+            while len(seen) < 4:
+                snapshot = await asyncio.wait_for(source.next_change(prev), 2.0)
+                prev = display_of(snapshot)
+                seen.append(prev)
+            return seen, source.stats()
+        finally:
+            await source.close()
+
+    seen, stats = asyncio.run(main())
+    assert seen == ["app-0", "app-1", "app-2", "app-3"]
+    assert stats["notifications"] == 3
+
+
+def test_notify_fallback_poll_defaults_to_poll_interval():
+    # 탭 전환은 포커스 알림이 없으므로 기본 설정에서는 고정 폴링(POLL_INTERVAL)보다 늦게 잡히면 안 됨
+    import app_monitor
+
+    source = app_monitor._create_change_source("notify")
+    if "NOTIFY_POLL_MAX" not in os.environ:
+        assert app_monitor.NOTIFY_POLL_MAX == app_monitor.POLL_INTERVAL
+    assert source.max_interval == app_monitor.NOTIFY_POLL_MAX
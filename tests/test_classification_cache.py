@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""판정 캐시(TTL, 항목 수, LRU 삭제) 테스트"""
+
+import pytest
+
+import classification_cache
+from classification_cache import ClassificationCache, normalize_key
+
+
+class Clock:
+    """time.time()을 대신하는 시계"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(classification_cache, "time", clock)
+    return clock
+
+
+def _stored_keys(cache):
+    rows = cache._conn.execute("SELECT app_core, site FROM signals ORDER BY app_core").fetchall()
+    return [tuple(row) for row in rows]
+
+
+def test_entry_expires_after_ttl(tmp_path, clock):
+    cache = ClassificationCache(str(tmp_path / "cache.db"), ttl_seconds=100)
+    cache.put("chrome", "github.com", 0)
+    clock.now += 100
+    assert cache.get("chrome", "github.com") == 0  # TTL과 같으면 아직 유효
+    clock.now += 1
+    assert cache.get("chrome", "github.com") is None
+    # 만료된 항목은 지우고 개수에서도 뺌
+    assert _stored_keys(cache) == []
+    assert cache.stats() == {"entries": 0, "hits": 1, "misses": 1}
+
+
+def test_zero_ttl_never_expires(tmp_path, clock):
+    cache = ClassificationCache(str(tmp_path / "cache.db"), ttl_seconds=0)
+    cache.put("notion", "", 0)
+    clock.now += 10 ** 9
+    assert cache.get("notion") == 0
+
+
+def test_overwrite_refreshes_ttl_without_changing_count(tmp_path, clock):
+    cache = ClassificationCache(str(tmp_path / "cache.db"), ttl_seconds=100)
+    cache.put("chrome", "youtube.com", 1)
+    clock.now += 80
+    cache.put("Chrome", "WWW.YouTube.com.", 2)  # 같은 키 (정규화)
+    clock.now += 80
+    assert cache.get("chrome", "youtube.com") == 2
+    assert cache.stats()["entries"] == 1
+
+
+def test_count_is_restored_when_reopened(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    cache = ClassificationCache(path)
+    for i in range(4):
+        cache.put(f"app{i}", "", 0)
+    cache.close()
+    reopened = ClassificationCache(path)
+    assert reopened.stats()["entries"] == 4
+    reopened.put("app0", "", 1)
+    reopened.put("app9", "", 1)
+    assert reopened.stats()["entries"] == len(_stored_keys(reopened)) == 5
+
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path, clock):
+    cache = ClassificationCache(str(tmp_path / "cache.db"), ttl_seconds=0, max_entries=3)
+    for name in ("a", "b", "c"):
+        clock.now += 1
+        cache.put(name, "", 0)
+    clock.now += 1
+    assert cache.get("a") == 0  # a를 최근 사용으로
+
+    clock.now += 1
+    cache.put("d", "", 0)
+    assert _stored_keys(cache) == [("a", ""), ("c", ""), ("d", "")]
+    clock.now += 1
+    cache.put("e", "", 0)
+    assert _stored_keys(cache) == [("a", ""), ("d", ""), ("e", "")]
+    assert cache.stats()["entries"] == 3
+
+
+def test_normalize_key():
+    assert normalize_key(" Chrome ", "WWW.GitHub.com.") == ("chrome", "github.com")
+    assert normalize_key("", None) == ("", "")
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""규칙 기반 분류(도메인 접미사 색인, 규칙 검사, 규칙 파일 교체) 테스트"""
+
+import json
+import os
+import time
+
+import pytest
+
+from classification_rules import RULES_SCHEMA, CompiledRules, DomainIndex, RuleBook, validate_rules
+
+RULES_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "classification_rules.json")
+
+
+@pytest.mark.parametrize("host, expected", [
+    ("github.com", "study_site"),
+    ("docs.github.com", "study_site"),
+    ("a.b.github.com", "study_site"),
+    ("notgithub.com", None),       # 라벨 단위로만 매칭 (문자열 접미사가 아님)
+    ("github.com.evil.io", None),
+    ("com", None),
+    ("", None),
+])
+def test_domain_index_matches_label_suffixes(host, expected):
+    index = DomainIndex([("github.com", "study_site")])
+    assert index.lookup(host) == expected
+
+
+def test_domain_index_prefers_most_specific_entry():
+    index = DomainIndex([("youtube.com", "content_site"), ("edu.youtube.com", "study_site")])
+    assert index.lookup("youtube.com") == "content_site"
+    assert index.lookup("edu.youtube.com") == "study_site"
+    assert index.lookup("x.edu.youtube.com") == "study_site"
+    assert index.lookup("music.youtube.com") == "content_site"
+
+
+def test_domain_index_keeps_first_duplicate_and_normalizes_entries():
+    index = DomainIndex([(" GitHub.com. ", "study_site"), ("github.com", "content_site"), ("..", "x")])
+    assert index.size == 1
+    assert index.lookup("github.com") == "study_site"
+
+
+def test_shipped_rules_classify_edu_and_subdomains():
+    rules = CompiledRules.from_file(RULES_FILE)
+    # 최상위 라벨 "edu"만 등록되어 있어도 모든 *.edu가 학습 사이트
+    assert rules.classify("chrome", "cs.stanford.edu") == (0, "study_site", "cs.stanford.edu")
+    assert rules.classify("chrome", "edu") == (0, "study_site", "edu")
+    assert rules.classify("chrome", "education.com")[1] == "browser_other"
+    assert rules.classify("chrome", "docs.github.com")[:2] == (0, "study_site")
+    assert rules.classify("chrome", "notgithub.com")[:2] == (1, "browser_other")
+    assert rules.classify("safari", "m.youtube.com")[:2] == (1, "content_site")
+    assert rules.classify("chrome", "") == (1, "browser_blank", "")
+    assert rules.classify("pycharm") == (0, "study_tool", "PyCharm")
+    assert rules.classify("obsidian") == (0, "study_tool", "Obsidian")
+    assert rules.classify("valorant") == (2, "game", "valorant")
+    assert rules.classify("finder") == (1, "other", "finder")
+
+
+def test_study_domain_wins_when_listed_in_both():
+    rules = CompiledRules(browsers=["chrome"], study_domains=["example.com"], content_domains=["example.com"])
+    assert rules.classify("chrome", "www.example.com")[1] == "study_site"
+
+
+def _rules(version, **fields):
+    data = {"schema": RULES_SCHEMA, "version": version, "browsers": ["chrome"]}
+    data.update(fields)
+    return data
+
+
+def _write_rules(path, data):
+    """다른 파일에 쓴 뒤 rename으로 교체 (inode가 바뀜)"""
+    tmp = str(path) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, str(path))
+
+
+@pytest.mark.parametrize("data", [
+    [],
+    {"version": 1},                                   # schema 없음
+    {"schema": RULES_SCHEMA + 1, "version": 1},       # 지원하지 않는 형식 버전
+    {"schema": str(RULES_SCHEMA), "version": 1},
+    {"schema": RULES_SCHEMA},                         # version 없음
+    {"schema": RULES_SCHEMA, "version": "2"},
+    {"schema": RULES_SCHEMA, "version": 1, "games": "lol"},
+    {"schema": RULES_SCHEMA, "version": 1, "study_domains": ["github.com", 3]},
+    {"schema": RULES_SCHEMA, "version": 1, "pretty_names": {"pycharm": 1}},
+])
+def test_validate_rules_rejects_invalid_files(data):
+    with pytest.raises(ValueError):
+        validate_rules(data)
+    with pytest.raises(ValueError):
+        CompiledRules.from_dict(data)
+
+
+def test_shipped_rules_file_is_valid():
+    with open(RULES_FILE, "r", encoding="utf-8") as f:
+        validate_rules(json.load(f))
+
+
+def test_rule_book_swaps_rules_when_file_changes(tmp_path):
+    path = tmp_path / "rules.json"
+    _write_rules(path, _rules(1, content_domains=["github.com"]))
+    book = RuleBook(str(path), watch=False)
+    old_rules = book.rules
+    assert book.version == 1
+    assert book.classify("chrome", "github.com")[1] == "content_site"
+    assert book.reload() is False  # 바뀌지 않았으면 다시 읽지 않음
+
+    _write_rules(path, _rules(2, study_domains=["github.com"]))
+    assert book.reload() is True
+    assert book.version == 2 and book.reloads == 2
+    assert book.classify("chrome", "docs.github.com")[1] == "study_site"
+    # 이전 규칙 객체는 그대로 (조회 중이던 쪽은 교체 전 규칙을 온전히 봄)
+    assert old_rules.classify("chrome", "github.com")[1] == "content_site"
+
+
+def test_rule_book_keeps_rules_when_new_file_is_invalid(tmp_path):
+    path = tmp_path / "rules.json"
+    _write_rules(path, _rules(3, study_domains=["edu"]))
+    book = RuleBook(str(path), watch=False)
+
+    _write_rules(path, {"schema": RULES_SCHEMA + 1, "version": 4})
+    assert book.reload() is False
+    path.write_text("{not json", encoding="utf-8")
+    assert book.reload() is False
+    assert book.version == 3 and book.classify("chrome", "mit.edu")[1] == "study_site"
+
+    _write_rules(path, _rules(5))
+    assert book.reload() is True and book.version == 5
+
+
+def test_rule_book_missing_file_starts_empty(tmp_path):
+    book = RuleBook(str(tmp_path / "none.json"), watch=False)
+    assert book.version == 0
+    assert book.classify("chrome", "github.com") == (1, "other", "chrome")
+
+
+def test_rule_book_watcher_picks_up_changes(tmp_path):
+    path = tmp_path / "rules.json"
+    _write_rules(path, _rules(1))
+    book = RuleBook(str(path), check_interval=0.01)
+    try:
+        _write_rules(path, _rules(2, games=["chrome"]))
+        deadline = time.monotonic() + 5
+        while book.version != 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert book.version == 2
+        assert book.classify("chrome", "github.com")[1] == "game"
+    finally:
+        book.stop_watcher()
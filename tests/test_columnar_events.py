@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""ColumnarEvents가 AppAnalyzer와 같은 결과를 내는지 테스트"""
+
+import random
+
+import numpy as np
+
+from app_analyzer import AppAnalyzer
+from columnar_events import ColumnarEvents
+
+
+def _random_events(n, seed=0):
+    rng = random.Random(seed)
+    apps = ["pycharm", "chrome(youtube.com)", "Notion", "", "League of Legends"]
+    t = 1_704_067_200.0
+    events = []
+    for _ in range(n):
+        # 소수점 시각(ts)과 같은 시각, 역순 이벤트를 섞음
+        t += rng.choice([0.0, 0.25, 1.5, 7.75, 61.0, 300.5])
+        ts = t - rng.choice([0.0, 0.0, 0.0, 90.0])
+        events.append({"ts": ts, "app": rng.choice(apps), "signal": rng.choice([0, 0, 1, 2])})
+    return events
+
+
+def _loop_analysis(events):
+    analyzer = AppAnalyzer.__new__(AppAnalyzer)  # 파일 없이 _accumulate만 사용
+    return analyzer._accumulate(events).to_analysis()
+
+
+def test_analyze_matches_app_analyzer_with_fractional_times():
+    events = _random_events(2000)
+    columns = ColumnarEvents.from_events(events)
+    assert columns.times.dtype == np.float64
+    result = columns.analyze()
+    expected = _loop_analysis(events)
+    assert result.total_span_seconds == expected.total_span_seconds
+    assert result.learning_rate == expected.learning_rate
+    assert result.event_count == expected.event_count
+    assert [u["appName"] for u in result.app_usages] == [u["appName"] for u in expected.app_usages]
+    assert [u["usageTime"] for u in result.app_usages] == [u["usageTime"] for u in expected.app_usages]
+
+
+def test_window_stats_splits_at_fractional_boundaries():
+    events = [
+        {"ts": 599.5, "app": "A", "signal": 0},
+        {"ts": 600.0, "app": "B", "signal": 1},
+        {"ts": 600.5, "app": "B", "signal": 1},
+        {"ts": 601.0, "app": "A", "signal": 0},
+    ]
+    stats = ColumnarEvents.from_events(events).window_stats(600)
+    assert [w["start"] for w in stats] == [0, 600]
+    # 599.5초 이벤트는 0.5초 이어진 뒤 600초 구간으로 넘어감
+    assert stats[0]["topApp"] == "A" and stats[0]["learningRate"] == 100.0
+    assert stats[1]["topApp"] == "B"
+
+
+def test_window_stats_matches_dense_per_window_sums():
+    events = _random_events(3000, seed=1)
+    columns = ColumnarEvents.from_events(events)
+    window = 600
+    stats = columns.window_stats(window)
+
+    durations = np.append(np.diff(columns.times), columns.times[-1] - columns.times[-2])
+    buckets = np.floor(columns.times / window).astype(np.int64)
+    expected = []
+    for bucket in np.unique(buckets):
+        mask = buckets == bucket
+        per_app = np.bincount(columns.app_ids[mask], weights=durations[mask], minlength=len(columns.apps))
+        total = durations[mask].sum()
+        expected.append((int(bucket) * window, int(total), columns.apps[per_app.argmax()] if total > 0 else ""))
+    assert [(w["start"], w["totalSeconds"], w["topApp"]) for w in stats] == expected
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""이벤트 시각 해석(고정 폭 파서, 시간 캐시, strptime 대체 경로) 테스트"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import event_fields
+from event_fields import TIME_FORMAT, parse_event_time, parse_time_string
+
+
+def _strptime(value):
+    try:
+        return datetime.strptime(value, TIME_FORMAT).timestamp()
+    except ValueError:
+        return None
+
+
+@pytest.fixture
+def local_tz(monkeypatch):
+    """로컬 시간대를 바꾸고 시간 캐시를 비움 (테스트가 끝나면 원래 시간대로)"""
+    def use(name):
+        monkeypatch.setenv("TZ", name)
+        time.tzset()
+        monkeypatch.setattr(event_fields, "_HOUR_EPOCH_CACHE", {})
+
+    yield use
+    monkeypatch.undo()
+    time.tzset()
+
+
+@pytest.mark.parametrize("tz", ["UTC", "Asia/Seoul", "America/New_York", "Europe/London"])
+def test_fixed_width_parser_matches_strptime_across_a_year(local_tz, tz):
+    local_tz(tz)
+    # 서머타임 전환이 있는 날을 포함해 1년 동안 매 37분 7초마다
+    moment = datetime(2024, 1, 1, 0, 0, 0)
+    while moment.year == 2024:
+        value = moment.strftime(TIME_FORMAT)
+        assert parse_time_string(value) == _strptime(value), value
+        moment += timedelta(minutes=37, seconds=7)
+    # 같은 시간대의 값은 캐시를 다시 써도 같은 결과
+    for value in ("2024-03-10 02:30:00", "2024-11-03 01:30:00", "2024-03-31 01:59:59", "2024-10-27 01:00:00"):
+        assert parse_time_string(value) == parse_time_string(value) == _strptime(value), value
+
+
+@pytest.mark.parametrize("value", [
+    "2024-3-1 09:00:00",        # 폭이 다름 → strptime 경로
+    "2024-03-01 9:00:00",
+    "2024-03-01 09:05:7",
+    "2024-03-01 09:60:00",      # 분·초 범위 밖
+    "2024-03-01 09:00:61",
+    "2024-03-01 09:0x:00",
+    "2024-02-30 09:00:00",      # 없는 날짜
+    "2024-03-01 24:00:00",
+    "2024-03-01T09:00:00",
+    "",
+    "garbage",
+])
+def test_non_fixed_width_values_fall_back_to_strptime(value):
+    assert parse_time_string(value) == _strptime(value)
+
+
+def test_hour_cache_is_cleared_when_full(monkeypatch):
+    monkeypatch.setattr(event_fields, "_HOUR_EPOCH_CACHE", {})
+    monkeypatch.setattr(event_fields, "_HOUR_EPOCH_CACHE_MAX", 2)
+    values = [f"2024-05-0{d} {h:02d}:15:30" for d in (1, 2) for h in (0, 13)]
+    for value in values * 2:
+        assert parse_time_string(value) == _strptime(value)
+        assert len(event_fields._HOUR_EPOCH_CACHE) <= 2
+
+
+def test_parse_event_time_prefers_numeric_ts():
+    value = "2024-01-01 10:00:00"
+    assert parse_event_time({"ts": 12, "time": value}) == 12.0
+    assert parse_event_time({"ts": 12.5}) == 12.5
+    assert parse_event_time({"ts": True, "time": value}) == _strptime(value)  # bool은 숫자로 보지 않음
+    assert parse_event_time({"ts": "12", "time": value}) == _strptime(value)
+    assert parse_event_time({"time": 5}) is None
+    assert parse_event_time({}) is None
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""JSON Lines 이벤트 로그 기록/읽기 테스트"""
+
+import json
+import os
+
+import pytest
+
+from event_log import (EventLogWriter, JsonLinesReader, parse_events, read_events, read_recent_events,
+                       write_events_json_array)
+
+
+def _events(n, start=0):
+    return [{"time": f"2024-01-01 10:00:{i:02d}", "app": f"app{i}", "signal": i % 3}
+            for i in range(start, start + n)]
+
+
+def _lines(path):
+    with open(path, "rb") as f:
+        return f.read().split(b"\n")
+
+
+def _write(path, events):
+    writer = EventLogWriter(str(path))
+    writer.open()
+    for event in events:
+        writer.append(event)
+    writer.close()
+
+
+def test_truncated_last_line_is_removed_on_open(tmp_path):
+    path = tmp_path / "activity_log.json"
+    events = _events(3)
+    _write(path, events)
+    with open(path, "ab") as f:
+        f.write(b'{"time":"2024-01-01 10:00:03","app":"ap')  # 기록 도중 종료
+    _write(path, _events(1, start=4))
+
+    assert read_events(str(path)) == events + _events(1, start=4)
+    # 잘린 조각이 다음 줄과 이어 붙지 않음
+    assert all(json.loads(line) for line in _lines(path) if line)
+
+
+def test_complete_last_line_without_newline_is_kept(tmp_path):
+    path = tmp_path / "activity_log.json"
+    events = _events(2)
+    path.write_bytes(b"".join(json.dumps(e).encode() + b"\n" for e in events[:1]) + json.dumps(events[1]).encode())
+    _write(path, _events(1, start=2))
+    assert read_events(str(path)) == events + _events(1, start=2)
+
+
+def test_partial_first_line_only_starts_empty(tmp_path):
+    path = tmp_path / "activity_log.json"
+    path.write_bytes(b'{"time":"2024-01-01')
+    _write(path, _events(1))
+    assert read_events(str(path)) == _events(1)
+
+
+def test_legacy_indented_array_is_migrated_to_json_lines(tmp_path):
+    path = tmp_path / "activity_log.json"
+    events = _events(4)
+    write_events_json_array(str(path), events)  # 기존 방식 (indent=4 배열)
+    assert path.read_text(encoding="utf-8").startswith("[\n    {")
+
+    _write(path, _events(1, start=4))
+
+    lines = [line for line in _lines(path) if line]
+    assert [json.loads(line) for line in lines] == events + _events(1, start=4)
+    assert not os.path.exists(str(path) + ".tmp")
+
+
+def test_corrupt_legacy_array_is_moved_aside(tmp_path):
+    path = tmp_path / "activity_log.json"
+    write_events_json_array(str(path), _events(4))
+    data = path.read_bytes()
+    path.write_bytes(data[: len(data) // 2])  # 전체 재기록 도중 중단
+
+    _write(path, _events(1, start=10))
+
+    assert read_events(str(path)) == _events(1, start=10)
+    backups = [name for name in os.listdir(tmp_path) if name.startswith("activity_log.json.corrupt-")]
+    assert len(backups) == 1
+    assert (tmp_path / backups[0]).read_bytes() == data[: len(data) // 2]
+
+
+def _mixed_log():
+    """블록보다 긴 줄, 빈 줄, 깨진 줄, 개행 없는 마지막 줄이 섞인 로그"""
+    events = _events(6)
+    events[2]["message"] = "긴 메시지 " * 40
+    events[4]["snapshot"] = {"app": "Google Chrome", "window": "창\t제목", "url": "https://github.com/" + "x" * 200}
+    lines = [json.dumps(e, ensure_ascii=False).encode("utf-8") for e in events]
+    data = b"\n".join(lines[:3]) + b"\n\n   \n" + b'{"time": "broken\n' + b"\n".join(lines[3:])
+    return events, data
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 64, 1024 * 1024])
+def test_block_reader_matches_full_parse(tmp_path, monkeypatch, block_size):
+    monkeypatch.setattr(JsonLinesReader, "BLOCK_SIZE", block_size)
+    events, data = _mixed_log()
+    path = tmp_path / "activity_log.json"
+    path.write_bytes(data)
+
+    expected = parse_events(data.decode("utf-8"))
+    assert expected == events
+    assert read_events(str(path)) == expected
+    for limit in (1, 2, 5, 6, 10):
+        assert read_recent_events(str(path), limit) == expected[-limit:]
+
+    # final=False면 개행 없는 마지막 줄은 남겨 두고 그 앞에서 멈춤
+    reader = JsonLinesReader()
+    assert list(reader.iter_events(data)) == expected[:-1]
+    assert reader.offset == data.rfind(b"\n") + 1
+    assert reader.skipped == 1
+
+
+@pytest.mark.parametrize("block_size", [5, 64, 1024 * 1024])
+def test_block_reader_resumes_across_growing_file(monkeypatch, block_size):
+    monkeypatch.setattr(JsonLinesReader, "BLOCK_SIZE", block_size)
+    events, data = _mixed_log()
+    data += b"\n"
+    reader = JsonLinesReader()
+    seen = []
+    # 임의의 위치까지 쓰인 파일을 반복해서 읽어도 전체를 한 번 읽은 것과 같음
+    for end in list(range(0, len(data), 37)) + [len(data)]:
+        seen.extend(reader.iter_events(data[:end]))
+        assert data[reader.offset - 1:reader.offset] in (b"", b"\n")
+    assert seen == events == parse_events(data.decode("utf-8"))
+    assert reader.offset == len(data)
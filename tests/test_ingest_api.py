@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""수집 API(/ingest) 입력 검사와 사용자별 /finish 경로 테스트"""
+
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+import finish_api_server as server
+from ingest_store import validate_batch
+
+TOKEN = "test-token"
+
+
+def _batch(room="room-a", email="kim@example.com", n=3):
+    events = [{"seq": i + 1, "time": f"2024-01-01 10:00:{i * 10:02d}", "app": "pycharm", "signal": 0}
+              for i in range(n)]
+    return {"room": room, "email": email, "agent": "agent-1", "events": events}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """tmp_path/store를 저장소로 쓰는 수집 모드 서버 상태"""
+    store = tmp_path / "store"
+    monkeypatch.setattr(server, "EVENT_STORE_DIR", str(store))
+    monkeypatch.setattr(server, "INGEST_ENABLED", True)
+    monkeypatch.setattr(server, "INGEST_TOKEN", TOKEN)
+    monkeypatch.setattr(server, "JSON_FILE", str(tmp_path / "activity_log.json"))
+    monkeypatch.setattr(server, "user_analyzers", None)
+    monkeypatch.setattr(server, "user_log_index", None)
+    monkeypatch.setattr(server, "app_analyzer", None)
+    server.response_cache.clear()
+    server.init_analyzers()
+    yield store
+    server.user_analyzers.clear()
+
+
+@pytest.fixture
+def client():
+    return TestClient(server.app)
+
+
+def _auth():
+    return {"Authorization": f"Bearer {TOKEN}"}
+
+
+@pytest.mark.parametrize("field, value", [
+    ("room", ".."),
+    ("room", "a/../.."),
+    ("room", "."),
+    ("room", "a\\..\\b"),
+    ("room", "x" * 129),
+    ("room", "room\x00"),
+    ("email", ".."),
+    ("email", "../x@y"),
+    ("email", "x@y/.."),
+    ("email", "no-at-sign"),
+    ("email", "a@b@c"),
+    ("email", "kim @example.com"),
+    ("email", "kim@exam\x00ple.com"),
+    ("email", "a" * 250 + "@b.com"),
+])
+def test_validate_batch_rejects_unsafe_room_and_email(field, value):
+    payload = _batch()
+    payload[field] = value
+    with pytest.raises(ValueError):
+        validate_batch(payload)
+
+
+def test_validate_batch_accepts_ordinary_values():
+    room, email, agent, events = validate_batch(_batch(room=" /groomee-god/ ", email=" Kim.Student+1@Example.com "))
+    assert room == "/groomee-god/"
+    assert email == "Kim.Student+1@Example.com"
+    assert agent == "agent-1" and [e["seq"] for e in events] == [1, 2, 3]
+
+
+def test_ingest_is_disabled_without_token(store, client, monkeypatch):
+    monkeypatch.setattr(server, "INGEST_ENABLED", False)
+    assert client.post("/ingest", json=_batch()).status_code == 404
+
+
+def test_ingest_requires_matching_token(store, client):
+    assert client.post("/ingest", json=_batch()).status_code == 401
+    assert client.post("/ingest", json=_batch(), headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert not store.exists() or not any(store.iterdir())
+
+
+def test_ingest_then_finish_for_user(store, client):
+    resp = client.post("/ingest", json=_batch(), headers=_auth())
+    assert resp.status_code == 200
+    assert resp.json()["accepted"] == 3
+    assert (store / "room-a" / "kim@example.com").is_dir()
+
+    resp = client.get("/finish", params={"time": 60, "room": "room-a", "email": "kim@example.com"})
+    assert resp.status_code == 200
+    assert [u["appName"] for u in resp.json()["appUsages"]] == ["pycharm"]
+
+
+@pytest.mark.parametrize("room, email", [("..", "x@y"), ("a/../..", "x@y"), ("room-a", "../../x@y")])
+def test_ingest_rejects_traversal_and_writes_nothing(store, client, tmp_path, room, email):
+    resp = client.post("/ingest", json=_batch(room=room, email=email), headers=_auth())
+    assert resp.status_code == 400
+    written = [os.path.join(d, f) for d, _, files in os.walk(tmp_path) for f in files]
+    assert not any("segment-" in p for p in written)
+
+
+def test_finish_does_not_read_outside_store(store, client, tmp_path):
+    # 저장소 밖에 있는 로그 (room=".."이 상위 디렉터리로 풀리면 읽히게 됨)
+    outside = tmp_path / "x@y"
+    outside.mkdir()
+    (outside / "segment-000001.jsonl").write_text(
+        '{"time":"2024-01-01 10:00:00","app":"game","signal":2}\n'
+        '{"time":"2024-01-01 10:10:00","app":"game","signal":2}\n', encoding="utf-8")
+    resp = client.get("/finish", params={"time": 60, "room": "..", "email": "x@y"})
+    assert resp.status_code in (200, 400)
+    if resp.status_code == 200:
+        assert resp.json()["appUsages"] == []
+
+
+def test_finish_rejects_symlinked_user_dir(store, client, tmp_path):
+    (tmp_path / "outside").mkdir()
+    store.mkdir(exist_ok=True)
+    os.symlink(tmp_path / "outside", store / "evil")
+    resp = client.get("/finish", params={"time": 60, "room": "evil", "email": "x@y"})
+    assert resp.status_code == 400
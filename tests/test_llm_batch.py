@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""classify_apps_batch 테스트 (로컬 OpenAI 호환 가짜 서버 사용)"""
+
+import asyncio
+import json
+import socket
+import threading
+
+import pytest
+from aiohttp import web
+
+import app_monitor
+from classification_cache import ClassificationCache
+from message_pool import MessagePool
+
+GOOD_MESSAGE = "지금 학습 흐름 좋아요, 한 구간만 더 몰입해볼까요?"
+APPS = [
+    "chrome(docs.python.org)",
+    "chrome(youtube.com)",
+    "League of Legends",
+    "Notion",
+    "chrome(leetcode.com)",
+]
+
+
+class FakeOpenAIServer:
+    """
+    /v1/chat/completions만 흉내 내는 서버 (백그라운드 스레드)
+
+    respond(items)가 응답 본문 문자열을 돌려주면 그대로 content로, (status, body)를 돌려주면 HTTP 오류로 응답
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.delay = 0.0
+        self.respond = self.all_valid
+        self._loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.port = s.getsockname()[1]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    @staticmethod
+    def verdict(item, signal=None):
+        if signal is None:
+            signal = 2 if "league" in item["app_core"] else 0
+        return {"id": item["id"], "signal": signal, "message": GOOD_MESSAGE}
+
+    def all_valid(self, items):
+        return json.dumps({"results": [self.verdict(item) for item in items]}, ensure_ascii=False)
+
+    async def _chat(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        # 판정 요청은 {"items": [...]}, 메시지 풀 보충 요청은 items 없이 상황만 보냄
+        items = json.loads(body["messages"][-1]["content"]).get("items", [])
+        self.requests.append(items)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        result = self.respond(items)
+        if isinstance(result, tuple):
+            status, text = result
+            return web.json_response({"error": {"message": text}}, status=status)
+        return web.json_response({
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body.get("model", "test"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": result}}],
+        })
+
+    def _serve(self):
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._chat)
+        self._runner = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+        self._loop.run_until_complete(web.TCPSite(self._runner, "127.0.0.1", self.port).start())
+        self._started.set()
+        self._loop.run_forever()
+
+    def start(self):
+        self._thread.start()
+        self._started.wait(5)
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    fake = FakeOpenAIServer()
+    fake.start()
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("OPENAI_BASE_URL", fake.base_url)
+    cache = ClassificationCache(str(tmp_path / "classification_cache.db"))
+    monkeypatch.setattr(app_monitor, "_CLASSIFICATION_CACHE", cache)
+    monkeypatch.setattr(app_monitor, "_CLASSIFICATION_CACHE_OPENED", True)
+    yield fake
+    fake.stop()
+
+
+def _sources(results):
+    return {app: item["source"] for app, item in results.items()}
+
+
+def test_batch_classifies_all_apps_in_chunks_and_caches(server):
+    results = app_monitor.classify_apps_batch(APPS, batch_size=2)
+
+    assert [len(items) for items in server.requests] == [2, 2, 1]
+    assert set(results) == set(APPS)
+    assert all(item["source"] == "llm" for item in results.values())
+    assert results["League of Legends"]["signal"] == 2
+    assert results["chrome(docs.python.org)"]["signal"] == 0
+    assert results["chrome(docs.python.org)"]["message"] == GOOD_MESSAGE
+
+    # 두 번째 호출은 캐시에서 답하고 요청을 보내지 않음
+    again = app_monitor.classify_apps_batch(APPS, batch_size=2)
+    assert len(server.requests) == 3
+    assert all(item["source"] == "cache" for item in again.values())
+    assert again["League of Legends"]["signal"] == 2
+
+
+def test_batch_skips_duplicates_and_empty_names(server):
+    results = app_monitor.classify_apps_batch(["Notion", "", "Notion", "  ", "chrome(youtube.com)"])
+    assert set(results) == {"Notion", "chrome(youtube.com)"}
+    assert len(server.requests) == 1 and len(server.requests[0]) == 2
+
+
+def test_missing_and_malformed_items_fall_back_per_item(server):
+    def respond(items):
+        results = [
+            FakeOpenAIServer.verdict(items[0]),          # 정상
+            # items[1]: 결과 없음
+            {"id": items[2]["id"], "signal": 7, "message": GOOD_MESSAGE},  # 잘못된 signal
+            {"id": items[3]["id"], "message": GOOD_MESSAGE},               # signal 없음
+            {"id": 99, "signal": 0, "message": GOOD_MESSAGE},              # 없는 id
+            {"id": items[0]["id"], "signal": 2, "message": GOOD_MESSAGE},  # 중복 id (첫 번째 결과 사용)
+            "not an object",
+            {"id": items[4]["id"], "signal": "1", "message": "짧음"},      # 메시지 길이 벗어남
+        ]
+        return json.dumps({"results": results}, ensure_ascii=False)
+
+    server.respond = respond
+    results = app_monitor.classify_apps_batch(APPS)
+
+    assert _sources(results) == {
+        "chrome(docs.python.org)": "llm",
+        "chrome(youtube.com)": "fallback",
+        "League of Legends": "fallback",
+        "Notion": "fallback",
+        "chrome(leetcode.com)": "llm",
+    }
+    assert results["chrome(docs.python.org)"]["signal"] == 0
+    # 길이가 맞지 않는 메시지는 signal에 맞는 기본 메시지로 바꿈
+    assert results["chrome(leetcode.com)"]["signal"] == 1
+    assert 18 <= len(results["chrome(leetcode.com)"]["message"]) <= 60
+    for app in ("chrome(youtube.com)", "League of Legends", "Notion"):
+        # 메시지는 풀에서 고르므로 signal만 비교
+        assert results[app]["signal"] == app_monitor._fallback_classify(app)[0]
+
+    # 규칙 기반 판정은 캐시에 남기지 않으므로 다음 배치에서 다시 LLM에 물어봄
+    server.respond = server.all_valid
+    again = app_monitor.classify_apps_batch(APPS)
+    assert [len(items) for items in server.requests] == [5, 3]
+    assert again["chrome(docs.python.org)"]["source"] == "cache"
+    assert again["Notion"]["source"] == "llm"
+
+
+def test_unparseable_response_falls_back_for_whole_chunk(server):
+    server.respond = lambda items: "results: not json"
+    results = app_monitor.classify_apps_batch(APPS, batch_size=3)
+    assert len(server.requests) == 2
+    assert all(item["source"] == "fallback" for item in results.values())
+
+
+def test_http_error_falls_back_to_rules(server):
+    server.respond = lambda items: (400, "bad request")
+    results = app_monitor.classify_apps_batch(APPS)
+    assert all(item["source"] == "fallback" for item in results.values())
+    assert results["League of Legends"]["signal"] == app_monitor._fallback_classify("League of Legends")[0]
+
+
+def test_without_api_key_uses_rules_without_requests(server, monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY")
+    results = app_monitor.classify_apps_batch(APPS)
+    assert server.requests == []
+    assert all(item["source"] == "fallback" for item in results.values())
+
+
+def test_async_batch_sends_chunks_concurrently(server):
+    server.delay = 0.3
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        results = await app_monitor.classify_apps_batch_async(APPS, batch_size=2)
+        return results, loop.time() - started
+
+    results, elapsed = asyncio.run(main())
+    assert len(server.requests) == 3
+    assert all(item["source"] == "llm" for item in results.values())
+    assert elapsed < 0.8  # 순서대로 보냈다면 0.9초 이상
+
+
+def test_async_batch_deadline_falls_back(server):
+    server.delay = 2.0
+    results = asyncio.run(app_monitor.classify_apps_batch_async(APPS, deadline=0.2))
+    assert all(item["source"] == "fallback" for item in results.values())
+
+
+@pytest.mark.parametrize("content", ['["지금 흐름 좋아요, 한 구간만 더 이어가 볼까요?"]', '"messages"', '{"messages": "문자열"}'])
+def test_message_pool_top_up_rejects_non_object_reply(server, monkeypatch, content):
+    pool = MessagePool(seeds={"0:study": ["기본 메시지"]})
+    monkeypatch.setattr(app_monitor, "MESSAGE_POOL", pool)
+    server.respond = lambda items: content
+    # 형식이 다른 JSON이어도 예외 없이 0개 추가로 끝남 (백그라운드 작업에서 실행되므로)
+    assert asyncio.run(app_monitor._top_up_message_pool("0:study")) == 0
+    assert pool.templates("0:study") == ["기본 메시지"]
+
+
+def test_message_pool_top_up_adds_valid_messages(server, monkeypatch):
+    pool = MessagePool(seeds={"0:study": ["기본 메시지"]})
+    monkeypatch.setattr(app_monitor, "MESSAGE_POOL", pool)
+    server.respond = lambda items: json.dumps({"messages": [
+        "{name}에서 공부 흐름이 좋아요, 조금만 더 이어가 볼까요?",
+        "짧음",
+        "중괄호 {other}가 들어간 메시지는 쓰지 않아요, 걸러져야 합니다.",
+    ]}, ensure_ascii=False)
+    assert asyncio.run(app_monitor._top_up_message_pool("0:study")) == 1
+    assert pool.size("0:study") == 2
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""전송 대기열(OutboundQueue)과 이벤트 업로더(EventUploader) 테스트"""
+
+import asyncio
+
+from outbound_queue import EventUploader, OutboundQueue
+
+
+class FakeIngest:
+    """이벤트 묶음을 받는 가짜 /ingest (fail_times번은 실패)"""
+
+    def __init__(self, fail_times=0, retry_after=None):
+        self.batches = []
+        self.fail_times = fail_times
+        self.retry_after = retry_after
+
+    async def __call__(self, batch):
+        if self.fail_times:
+            self.fail_times -= 1
+            return False, self.retry_after
+        self.batches.append([event["seq"] for event in batch])
+        return True, None
+
+
+async def _until(predicate, timeout=2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate() and loop.time() < deadline:
+        await asyncio.sleep(0.01)
+    return predicate()
+
+
+def test_single_event_after_idle_is_sent_within_flush_interval():
+    async def main():
+        ingest = FakeIngest()
+        uploader = EventUploader(ingest, max_batch=100, flush_interval=0.2)
+        uploader.start()
+        await asyncio.sleep(0.3)  # 유휴 상태
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        uploader.put({"app": "A"})
+        sent = await _until(lambda: ingest.batches, timeout=2.0)
+        elapsed = loop.time() - started
+        await uploader.stop()
+        return sent, elapsed, ingest.batches, uploader.depth
+
+    sent, elapsed, batches, depth = asyncio.run(main())
+    assert sent and batches == [[1]] and depth == 0
+    assert 0.15 <= elapsed < 1.0
+
+
+def test_events_within_flush_interval_are_batched():
+    async def main():
+        ingest = FakeIngest()
+        uploader = EventUploader(ingest, max_batch=100, flush_interval=0.2)
+        uploader.start()
+        for _ in range(5):
+            uploader.put({"app": "A"})
+            await asyncio.sleep(0.01)
+        await _until(lambda: ingest.batches)
+        await uploader.stop()
+        return ingest.batches
+
+    assert asyncio.run(main()) == [[1, 2, 3, 4, 5]]
+
+
+def test_full_batch_is_sent_without_waiting():
+    async def main():
+        ingest = FakeIngest()
+        uploader = EventUploader(ingest, max_batch=3, flush_interval=10.0)
+        uploader.start()
+        for _ in range(7):
+            uploader.put({"app": "A"})
+        await _until(lambda: len(ingest.batches) >= 2, timeout=1.0)
+        full = list(ingest.batches)
+        await uploader.stop(drain=True, timeout=1.0)
+        return full, ingest.batches
+
+    full, batches = asyncio.run(main())
+    assert full == [[1, 2, 3], [4, 5, 6]]
+    assert batches == [[1, 2, 3], [4, 5, 6], [7]]
+
+
+def test_failed_batch_is_resent_with_same_seq():
+    async def main():
+        ingest = FakeIngest(fail_times=2, retry_after=0.05)
+        uploader = EventUploader(ingest, max_batch=10, flush_interval=0.05)
+        uploader.start()
+        uploader.put({"app": "A"})
+        uploader.put({"app": "B"})
+        await _until(lambda: ingest.batches)
+        await uploader.stop()
+        return ingest.batches, uploader.stats()
+
+    batches, stats = asyncio.run(main())
+    assert batches == [[1, 2]]
+    assert stats["retries"] == 2 and stats["sent"] == 2 and stats["depth"] == 0
+
+
+def test_outbound_queue_coalesces_and_batches():
+    async def main():
+        sent = []
+
+        async def send(item):
+            sent.append([item["name"]])
+            return True
+
+        async def send_batch(items):
+            sent.append([item["name"] for item in items])
+            return True
+
+        queue = OutboundQueue(send, send_batch, coalesce_key=lambda p: (p["email"], p["name"]))
+        for name in ("A", "B", "A", "C"):
+            queue.put({"email": "kim@example.com", "name": name})
+        depth = queue.depth
+        queue.start()
+        await queue.stop(drain=True, timeout=1.0)
+        return depth, sent, queue.stats()
+
+    depth, sent, stats = asyncio.run(main())
+    assert depth == 3
+    # 다시 들어온 A는 이전 자리 대신 새로 넣은 자리(B 뒤)에서 나감
+    assert sent == [["B", "A", "C"]]
+    assert stats["coalesced"] == 1 and stats["batches"] == 1 and stats["sent"] == 3
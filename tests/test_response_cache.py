@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""/finish 응답 캐시, ETag/304 테스트"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import finish_api_server as server
+from event_log import open_event_log
+from response_cache import ResponseCache, etag_matches, file_signature, make_etag
+
+
+def _event(i, app="pycharm", signal=0):
+    return {"time": f"2024-01-01 10:{i:02d}:00", "app": app, "signal": signal}
+
+
+@pytest.fixture
+def log_file(tmp_path, monkeypatch):
+    """tmp_path의 단일 로그를 분석하는 서버 상태"""
+    path = tmp_path / "activity_log.json"
+    writer = open_event_log(str(path))
+    for i in range(3):
+        writer.append(_event(i))
+    writer.close()
+    monkeypatch.setattr(server, "JSON_FILE", str(path))
+    monkeypatch.setattr(server, "AGGREGATE_FILE", "")
+    monkeypatch.setattr(server, "EVENT_STORE_DIR", "")
+    monkeypatch.setattr(server, "INGEST_ENABLED", False)
+    monkeypatch.setattr(server, "app_analyzer", None)
+    monkeypatch.setattr(server, "user_analyzers", None)
+    monkeypatch.setattr(server, "user_log_index", None)
+    server.response_cache.clear()
+    server.init_analyzers()
+    yield path
+    server.response_cache.clear()
+
+
+def test_if_none_match_gives_304_until_log_changes(log_file):
+    client = TestClient(server.app)
+    first = client.get("/finish", params={"time": 600})
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+    assert etag == make_etag(first.content)
+
+    hits = server.response_cache.stats()["hits"]
+    again = client.get("/finish", params={"time": 600}, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b"" and again.headers["ETag"] == etag
+    assert server.response_cache.stats()["hits"] == hits + 1
+    # 약한 비교와 여러 값
+    assert client.get("/finish", params={"time": 600},
+                      headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+
+    # 로그가 바뀌면 서명이 달라져 다시 계산하고 새 ETag로 200
+    writer = open_event_log(str(log_file))
+    writer.append(_event(10, app="chrome(youtube.com)", signal=2))
+    writer.close()
+    changed = client.get("/finish", params={"time": 600}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert "chrome(youtube.com)" in [u["appName"] for u in changed.json()["appUsages"]]
+
+
+def test_different_time_parameter_is_cached_separately(log_file):
+    client = TestClient(server.app)
+    a = client.get("/finish", params={"time": 600})
+    b = client.get("/finish", params={"time": 60})
+    assert a.headers["ETag"] != b.headers["ETag"]
+    assert client.get("/finish", params={"time": 60},
+                      headers={"If-None-Match": a.headers["ETag"]}).status_code == 200
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ("", False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"x", "abc"', True),
+    ("*", True),
+    ('"abcd"', False),
+    ("abc", False),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, '"abc"') is expected
+
+
+def test_cache_is_invalidated_by_signature_and_evicts_oldest(tmp_path):
+    path = tmp_path / "log"
+    path.write_bytes(b"a")
+    sig = file_signature(str(path))
+    cache = ResponseCache(max_entries=2)
+    cache.put("k1", sig, b"one")
+    assert cache.get("k1", sig).body == b"one"
+
+    path.write_bytes(b"ab")
+    assert cache.get("k1", file_signature(str(path))) is None
+    assert cache.stats()["stale"] == 1
+
+    cache.put("k2", sig, b"two")
+    cache.get("k1", sig)  # k1을 최근 사용으로
+    cache.put("k3", sig, b"three")
+    assert cache.get("k2", sig) is None and cache.get("k1", sig) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_skips_missing_log_and_disabled_cache():
+    cache = ResponseCache(max_entries=4)
+    entry = cache.put("k", None, b"body")
+    assert entry.etag == make_etag(b"body")
+    assert cache.get("k", None) is None and cache.stats()["entries"] == 0
+    disabled = ResponseCache(max_entries=0)
+    disabled.put("k", (1, 2, 3, 4), b"body")
+    assert disabled.get("k", (1, 2, 3, 4)) is None
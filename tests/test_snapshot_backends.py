@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""스냅샷 백엔드/조회기 테스트 (macOS 없이 실행)"""
+
+import asyncio
+import json
+import sys
+import threading
+import time
+
+import pytest
+
+from snapshot_backends import ExecutorSnapshotProber, PersistentHelperBackend, ReplaySnapshotBackend
+
+# 요청 한 줄마다 호출 횟수가 담긴 스냅샷을 출력하는 도우미 (osascript 대신 사용)
+ECHO_HELPER = r"""
+import json, sys
+n = 0
+for _ in sys.stdin:
+    n += 1
+    print(json.dumps({"app": "App%d" % n, "window": "w"}), flush=True)
+"""
+
+
+def _snap(app):
+    return {"app": app, "window": f"{app} 창"}
+
+
+def test_replay_returns_snapshots_in_order_and_loops():
+    backend = ReplaySnapshotBackend([_snap("A"), _snap("B"), _snap("C")])
+    apps = [backend.snapshot()["app"] for _ in range(7)]
+    assert apps == ["A", "B", "C", "A", "B", "C", "A"]
+
+
+def test_replay_without_loop_keeps_last_snapshot():
+    backend = ReplaySnapshotBackend([_snap("A"), _snap("B")], loop=False)
+    apps = [backend.snapshot()["app"] for _ in range(4)]
+    assert apps == ["A", "B", "B", "B"]
+
+
+def test_replay_returns_copies():
+    backend = ReplaySnapshotBackend([_snap("A")])
+    backend.snapshot()["app"] = "changed"
+    assert backend.snapshot()["app"] == "A"
+
+
+def test_replay_requires_snapshots():
+    with pytest.raises(ValueError):
+        ReplaySnapshotBackend([])
+
+
+def test_replay_from_event_log(tmp_path):
+    path = tmp_path / "activity_log.json"
+    events = [
+        {"time": "2024-01-01 10:00:00", "snapshot": _snap("A")},
+        {"time": "2024-01-01 10:00:05", "snapshot": {"app": "", "window": ""}},
+        {"time": "2024-01-01 10:00:10", "snapshot": _snap("B")},
+    ]
+    path.write_text("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in events), encoding="utf-8")
+    backend = ReplaySnapshotBackend.from_file(str(path))
+    assert [s["app"] for s in backend.snapshots] == ["A", "B"]
+
+
+def test_persistent_helper_reuses_one_process():
+    backend = PersistentHelperBackend([sys.executable, "-u", "-c", ECHO_HELPER], timeout=5.0)
+    try:
+        apps = [backend.snapshot()["app"] for _ in range(3)]
+    finally:
+        backend.close()
+    # 프로세스를 새로 띄웠다면 매번 App1이 나옴
+    assert apps == ["App1", "App2", "App3"]
+    assert backend.restarts == 0
+
+
+class BlockingProbe:
+    """release() 전까지 멈춰 있을 수 있는 스냅샷 함수"""
+
+    def __init__(self):
+        self.calls = 0
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self):
+        self.calls += 1
+        self.gate.wait(5)
+        return _snap(f"App{self.calls}")
+
+
+def test_prober_returns_probe_result():
+    async def main():
+        prober = ExecutorSnapshotProber(BlockingProbe(), timeout=1.0)
+        try:
+            return await prober.snapshot(), prober.stats()
+        finally:
+            prober.close()
+
+    snapshot, stats = asyncio.run(main())
+    assert snapshot["app"] == "App1"
+    assert stats["probes"] == 1 and stats["timeouts"] == 0
+
+
+def test_prober_serves_stale_snapshot_within_max_age():
+    probe = BlockingProbe()
+
+    async def main():
+        prober = ExecutorSnapshotProber(probe, timeout=0.05, stale_max_age=10.0)
+        try:
+            first = await prober.snapshot()
+            probe.gate.clear()
+            stale = await prober.snapshot()
+            return first, stale, prober.stats()
+        finally:
+            probe.gate.set()
+            prober.close()
+
+    first, stale, stats = asyncio.run(main())
+    assert stale == first
+    assert stats["timeouts"] == 1 and stats["stale_served"] == 1
+
+
+def test_prober_returns_error_after_stale_max_age():
+    probe = BlockingProbe()
+
+    async def main():
+        prober = ExecutorSnapshotProber(probe, timeout=0.05, stale_max_age=0.1)
+        try:
+            await prober.snapshot()
+            probe.gate.clear()
+            await asyncio.sleep(0.2)
+            return await prober.snapshot(), prober.stats()
+        finally:
+            probe.gate.set()
+            prober.close()
+
+    snapshot, stats = asyncio.run(main())
+    assert snapshot["app"] == "error"
+    assert "timeout" in snapshot["display"]
+    assert stats["stale_served"] == 0
+
+
+def test_prober_returns_error_without_previous_snapshot():
+    probe = BlockingProbe()
+    probe.gate.clear()
+
+    async def main():
+        prober = ExecutorSnapshotProber(probe, timeout=0.05, stale_max_age=10.0)
+        try:
+            return await prober.snapshot()
+        finally:
+            probe.gate.set()
+            prober.close()
+
+    assert asyncio.run(main())["app"] == "error"
+
+
+def test_prober_does_not_pile_up_probes_while_one_is_stuck():
+    probe = BlockingProbe()
+    probe.gate.clear()
+
+    async def main():
+        prober = ExecutorSnapshotProber(probe, timeout=0.02, stale_max_age=0.0)
+        try:
+            for _ in range(5):
+                await prober.snapshot()
+            stuck = prober.stats()
+            probe.gate.set()
+            # 멈췄던 조회가 끝나면 다음 호출은 새 조회를 한 번만 제출
+            deadline = time.monotonic() + 2
+            while prober.stats()["in_flight"] and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            after = await prober.snapshot()
+            return stuck, after, prober.stats()
+        finally:
+            probe.gate.set()
+            prober.close()
+
+    stuck, after, stats = asyncio.run(main())
+    assert stuck["probes"] == 1 and stuck["timeouts"] == 5 and stuck["in_flight"] == 1
+    assert probe.calls == 2
+    assert after["app"] == "App2"
+    assert stats["probes"] == 2 and stats["in_flight"] == 0
+
+
+def test_prober_turns_probe_exception_into_error_snapshot():
+    def failing_probe():
+        raise RuntimeError("boom")
+
+    async def main():
+        prober = ExecutorSnapshotProber(failing_probe, timeout=1.0)
+        try:
+            return await prober.snapshot()
+        finally:
+            prober.close()
+
+    snapshot = asyncio.run(main())
+    assert snapshot["app"] == "error" and "boom" in snapshot["display"]
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""모니터의 사용 시간 집계가 이벤트 루프 밖에서 만들어지고 저장되는지 테스트"""
+
+import asyncio
+import json
+import os
+import threading
+
+import pytest
+
+import app_monitor
+from app_analyzer import AppAnalyzer
+
+
+def _event(i, app="pycharm"):
+    return {"time": f"2024-01-01 10:{i // 60:02d}:{i % 60:02d}", "app": app, "signal": 0}
+
+
+@pytest.fixture
+def monitor_log(tmp_path, monkeypatch):
+    """tmp_path의 JSON Lines 로그에 append 모드로 기록하는 모니터 상태"""
+    log_file = tmp_path / "activity_log.json"
+    log_file.write_text("".join(json.dumps(_event(i)) + "\n" for i in range(10)), encoding="utf-8")
+    monkeypatch.setattr(app_monitor, "LOG_MODE", "append")
+    monkeypatch.setattr(app_monitor, "JSON_FILE", str(log_file))
+    monkeypatch.setattr(app_monitor, "LOG_FILE", str(log_file))
+    monkeypatch.setattr(app_monitor, "AGGREGATE_ENABLED", True)
+    monkeypatch.setattr(app_monitor, "AGGREGATE_FILE", str(tmp_path / "activity_log.json.agg"))
+    monkeypatch.setattr(app_monitor, "AGGREGATE_CHECKPOINT_EVERY", 3)
+    monkeypatch.setattr(app_monitor, "EVENT_STORE_DIR", "")
+    monkeypatch.setattr(app_monitor, "INGEST_URL", "")
+    monkeypatch.setattr(app_monitor, "_EVENT_LOG_WRITER", None)
+    monkeypatch.setattr(app_monitor, "_USAGE_AGGREGATE", None)
+    monkeypatch.setattr(app_monitor, "_AGGREGATE_SAVING", None)
+    monkeypatch.setattr(app_monitor, "_AGGREGATE_PENDING", 0)
+    yield log_file
+    if app_monitor._EVENT_LOG_WRITER is not None:
+        app_monitor._EVENT_LOG_WRITER.close()
+
+
+def test_aggregate_is_built_and_saved_off_the_loop(monitor_log, monkeypatch):
+    threads = {}
+    original_init = app_monitor.CheckpointedAppAnalyzer.__init__
+    original_save = app_monitor.CheckpointedAppAnalyzer.save_checkpoint
+
+    def tracking_init(self, *args, **kwargs):
+        threads["build"] = threading.get_ident()
+        original_init(self, *args, **kwargs)
+
+    def tracking_save(self, data):
+        threads.setdefault("save", threading.get_ident())
+        return original_save(self, data)
+
+    monkeypatch.setattr(app_monitor.CheckpointedAppAnalyzer, "__init__", tracking_init)
+    monkeypatch.setattr(app_monitor.CheckpointedAppAnalyzer, "save_checkpoint", tracking_save)
+
+    async def main():
+        threads["loop"] = threading.get_ident()
+        await app_monitor.prepare_usage_aggregate()
+        built = app_monitor._USAGE_AGGREGATE
+        for i in range(10, 15):
+            app_monitor._record_event(_event(i, app="chrome"))
+        # 저장은 작업 스레드에서 진행되고 루프는 바로 돌아옴
+        await app_monitor._AGGREGATE_SAVING
+        await asyncio.to_thread(app_monitor.checkpoint_usage_aggregate)
+        return built
+
+    aggregate = asyncio.run(main())
+
+    assert aggregate is app_monitor._USAGE_AGGREGATE
+    assert threads["build"] != threads["loop"]
+    assert threads["save"] != threads["loop"]
+    assert app_monitor._AGGREGATE_PENDING == 0
+
+    with open(app_monitor.AGGREGATE_FILE, encoding="utf-8") as f:
+        saved = json.load(f)
+    assert saved["offset"] == os.path.getsize(monitor_log)
+    expected = AppAnalyzer(str(monitor_log)).analyze()
+    assert aggregate.analyze() == expected
+
+
+def test_stale_checkpoint_data_does_not_overwrite_newer_save(monitor_log):
+    app_monitor._get_usage_aggregate()
+    aggregate = app_monitor._USAGE_AGGREGATE
+    old = aggregate.checkpoint_data()
+    app_monitor._record_event(_event(10, app="chrome"))
+    assert aggregate.checkpoint()
+    newer_offset = aggregate.checkpoint_offset
+
+    # 늦게 끝난 백그라운드 저장이 더 오래된 상태를 덮어쓰지 않음
+    assert aggregate.save_checkpoint(old)
+    with open(app_monitor.AGGREGATE_FILE, encoding="utf-8") as f:
+        assert json.load(f)["offset"] == newer_offset
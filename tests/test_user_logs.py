@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""사용자별 로그 저장소 경로 테스트"""
+
+import os
+
+import pytest
+
+from app_analyzer import SegmentedAppAnalyzer
+from binary_log import open_binary_log
+from ingest_store import LiveUserLog
+from user_logs import HotAnalyzers, UserLogIndex, UserSegmentWriter, partition_key, user_log_dir
+
+
+def _inside(root, path):
+    real_root = os.path.realpath(root)
+    return os.path.realpath(path).startswith(real_root + os.sep)
+
+
+@pytest.mark.parametrize("room, email", [
+    ("..", "x@y"),
+    ("..", ".."),
+    ("room", "."),
+    ("room", "../other@y"),
+    (".", "..."),
+    ("a/../..", "x@y"),
+    ("room", "..\\..\\x@y"),
+])
+def test_dot_and_slash_names_stay_inside_store(tmp_path, room, email):
+    store = tmp_path / "store"
+    store.mkdir()
+    directory = user_log_dir(str(store), room, email)
+    assert _inside(str(store), directory)
+    # 방/사용자 두 단계 아래
+    assert os.path.dirname(os.path.dirname(directory)) == str(store)
+
+
+def test_partition_key_keeps_ordinary_names():
+    assert partition_key(" Kim.Student@Example.com ") == "kim.student@example.com"
+    assert partition_key("/room-a/") == "room-a"
+    assert partition_key("..") == "%2E%2E"
+    assert partition_key("a..b") == "a..b"
+
+
+def test_empty_email_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        user_log_dir(str(tmp_path), "room", "  ")
+    with pytest.raises(ValueError):
+        UserSegmentWriter(str(tmp_path), "room", "")
+
+
+def test_symlink_out_of_store_is_rejected(tmp_path):
+    store = tmp_path / "store"
+    outside = tmp_path / "outside"
+    store.mkdir()
+    outside.mkdir()
+    os.symlink(outside, store / "evil")
+    with pytest.raises(ValueError):
+        user_log_dir(str(store), "evil", "x@y")
+    with pytest.raises(ValueError):
+        UserLogIndex(str(store)).segments("evil", "x@y")
+
+
+def test_writer_and_index_use_the_same_directory(tmp_path):
+    writer = UserSegmentWriter(str(tmp_path), "Room", "A@B.c", segment_max_bytes=64)
+    for i in range(5):
+        writer.append({"time": f"2024-01-01 10:00:0{i}", "signal": 0})
+    writer.close()
+    index = UserLogIndex(str(tmp_path))
+    segments = index.segments("room", "a@b.c")
+    assert len(segments) > 1
+    assert all(p.startswith(str(tmp_path / "room" / "a@b.c")) for p in segments)
+    assert index.segments("room", "nobody@b.c") == []
+    assert index.signature("room", "a@b.c") is not None
+
+
+def _write_binary_segment(path):
+    writer = open_binary_log(str(path))
+    writer.append({"time": "2024-01-01 11:00:00", "app": "game", "signal": 2})
+    writer.close()
+
+
+def test_binary_segment_is_rejected(tmp_path):
+    writer = UserSegmentWriter(str(tmp_path), "room", "a@b.c")
+    writer.append({"time": "2024-01-01 10:00:00", "app": "pycharm", "signal": 0})
+    writer.close()
+    index = UserLogIndex(str(tmp_path))
+    analyzer = SegmentedAppAnalyzer(lambda: index.segments("room", "a@b.c"))
+
+    # 새로 생긴 세그먼트가 바이너리 로그면 잘못된 줄로 건너뛰지 않고 거부
+    _write_binary_segment(tmp_path / "room" / "a@b.c" / "segment-000002.jsonl")
+    with pytest.raises(ValueError):
+        analyzer._refresh_incremental()
+    with pytest.raises(ValueError):
+        SegmentedAppAnalyzer(lambda: index.segments("room", "a@b.c"))
+    # 기록 쪽도 바이너리 세그먼트에 JSON 줄을 덧붙이지 않음
+    with pytest.raises(ValueError):
+        UserSegmentWriter(str(tmp_path), "room", "a@b.c").append({"time": "2024-01-01 12:00:00", "signal": 0})
+
+
+class _Closable:
+    def __init__(self, key):
+        self.key = key
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_hot_analyzers_do_not_evict_pinned_items():
+    cache = HotAnalyzers(_Closable, max_resident=1, on_evict=_Closable.close)
+    with cache.pinned("a") as a:
+        b = cache.get("b")
+        # a는 사용 중이라 남고, 넘친 만큼은 사용 중이 아닌 b를 버림
+        assert not a.closed and b.closed
+        assert cache.get("a") is a
+    c = cache.get("c")
+    # 고정이 풀린 뒤에는 가장 오래된 a를 버림
+    assert a.closed and not c.closed
+    assert len(cache) == 1
+    assert cache.stats()["evictions"] == 2
+
+
+def test_ingest_into_pinned_log_survives_eviction_pressure(tmp_path):
+    cache = HotAnalyzers(lambda user: LiveUserLog(str(tmp_path), *user), max_resident=1,
+                         on_evict=LiveUserLog.close)
+    event = {"seq": 1, "time": "2024-01-01 10:00:00", "app": "pycharm", "signal": 0}
+    user = ("room", "a@example.com")
+    with cache.pinned(user) as log:
+        # 기록 중에 다른 사용자 조회로 캐시가 넘쳐도 이 로그는 닫히거나 새로 만들어지지 않음
+        cache.get(("room", "b@example.com"))
+        assert cache.get(user) is log
+        assert log.ingest("agent", [event]) == (1, 0)
+    # 같은 묶음을 다시 보내면 중복으로 버림
+    with cache.pinned(user) as again:
+        assert again is log
+        assert again.ingest("agent", [event]) == (0, 1)
+    cache.clear()
+
+    fresh = LiveUserLog(str(tmp_path), *user)
+    try:
+        assert fresh.analyze().event_count == 1 and fresh.last_seq("agent") == 1
+    finally:
+        fresh.close()
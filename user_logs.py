@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""
+사용자별 이벤트 로그 저장소 모듈 (한 교실 = API 서버 하나)
+- 저장 위치: {루트}/{방}/{이메일}/segment-NNNNNN.jsonl (JSON Lines, 크기 기준으로 새 세그먼트)
+- UserSegmentWriter: 모니터가 자기 사용자 디렉터리에 이벤트 기록
+- UserLogIndex: (방, 이메일) → 세그먼트 파일 목록 (디렉터리 mtime이 그대로면 다시 나열하지 않음)
+- HotAnalyzers: 최근에 조회된 사용자의 분석기만 메모리에 유지하는 LRU
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Generic, Hashable, Iterator, List, Optional, Tuple, TypeVar
+from urllib.parse import quote
+
+from event_log import EventLogWriter, open_event_log
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl"
+DEFAULT_ROOM = "_"  # 방 정보가 없을 때 사용하는 디렉터리 이름
+
+T = TypeVar("T")
+
+
+def partition_key(value: str) -> str:
+    """
+    이메일/방 이름을 디렉터리 이름으로 쓸 수 있게 변환 (소문자, 안전하지 않은 문자는 %XX)
+
+    "."과 ".."처럼 점으로만 된 이름은 상위 디렉터리를 가리키지 않도록 점도 %2E로 바꿈
+    """
+    value = (value or "").strip().strip("/").lower()
+    key = quote(value, safe="@._-+") if value else ""
+    if key and not key.strip("."):
+        key = key.replace(".", "%2E")
+    return key
+
+
+def user_log_dir(root: str, room: str, email: str) -> str:
+    """
+    사용자 로그 디렉터리 경로
+
+    이메일이 비었거나, 심볼릭 링크 등으로 실제 경로가 저장소 루트 밖이면 ValueError
+    """
+    key = partition_key(email)
+    if not key:
+        raise ValueError("사용자 이메일이 필요합니다.")
+    directory = os.path.join(root, partition_key(room) or DEFAULT_ROOM, key)
+    real_root = os.path.realpath(root)
+    if os.path.commonpath([real_root, os.path.realpath(directory)]) != real_root:
+        raise ValueError(f"사용자 로그 경로가 저장소 밖을 가리킵니다: {directory}")
+    return directory
+
+
+def _segment_name(seq: int) -> str:
+    return f"{SEGMENT_PREFIX}{seq:06d}{SEGMENT_SUFFIX}"
+
+
+def list_segments(directory: str) -> List[str]:
+    """디렉터리의 세그먼트 파일 (오래된 순, 이름에 일련번호가 있으므로 이름순)"""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return [
+        os.path.join(directory, name)
+        for name in sorted(names)
+        if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+    ]
+
+
+class UserSegmentWriter:
+    """
+    한 사용자의 이벤트를 세그먼트 파일에 append
+
+    현재 세그먼트가 segment_max_bytes를 넘으면 다음 번호의 새 세그먼트로 넘어감
+    (닫힌 세그먼트는 더 이상 바뀌지 않으므로 분석기는 한 번만 읽음)
+    """
+
+    def __init__(self, root: str, room: str, email: str, segment_max_bytes: int = 8 * 1024 * 1024):
+        """
+        Args:
+            root: 저장소 루트 디렉터리
+            room: 방 이름 (ROOM_PATH)
+            email: 사용자 이메일 (SENDER_EMAIL)
+            segment_max_bytes: 세그먼트 파일 하나의 최대 크기
+        """
+        self.directory = user_log_dir(root, room, email)
+        self.segment_max_bytes = max(1, int(segment_max_bytes))
+        self._writer: Optional[EventLogWriter] = None
+        self._seq = 0
+        self._size = 0
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        segments = list_segments(self.directory)
+        if segments:
+            # 이전 실행의 마지막 세그먼트에 이어서 기록
+            last = os.path.basename(segments[-1])
+            self._seq = int(last[len(SEGMENT_PREFIX): -len(SEGMENT_SUFFIX)])
+        else:
+            self._seq = 1
+        self._open_segment()
+
+    def _open_segment(self):
+        path = os.path.join(self.directory, _segment_name(self._seq))
+        self._writer = open_event_log(path)
+        self._size = os.path.getsize(path)
+
+    def append(self, event: Dict):
+        """이벤트 하나 기록 (필요하면 새 세그먼트로 교체)"""
+        if self._writer is None:
+            self._open()
+        elif self._size >= self.segment_max_bytes:
+            self._writer.close()
+            self._seq += 1
+            self._open_segment()
+        self._size += self._writer.append(event)
+
+    def sync(self):
+        """현재 세그먼트를 디스크에 강제로 기록"""
+        if self._writer is not None:
+            self._writer.sync()
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class UserLogIndex:
+    """
+    (방, 이메일) → 세그먼트 파일 목록 색인
+
+    사용자 디렉터리의 mtime은 세그먼트가 생기거나 지워질 때만 바뀌므로,
+    조회마다 stat 한 번으로 목록이 그대로인지 확인하고 바뀐 경우에만 다시 나열함
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._entries: Dict[str, Tuple[int, List[str]]] = {}  # 사용자 디렉터리 → (mtime, 세그먼트 목록)
+        self._lock = threading.Lock()
+
+    def segments(self, room: str, email: str) -> List[str]:
+        """사용자의 세그먼트 파일 목록 (오래된 순, 없으면 빈 리스트, 경로가 올바르지 않으면 ValueError)"""
+        key = directory = user_log_dir(self.root, room, email)
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except FileNotFoundError:
+            with self._lock:
+                self._entries.pop(key, None)
+            return []
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == mtime_ns:
+                return entry[1]
+        paths = list_segments(directory)
+        with self._lock:
+            self._entries[key] = (mtime_ns, paths)
+        return paths
+
+    def signature(self, room: str, email: str) -> Optional[Tuple[int, ...]]:
+        """
+        사용자 로그 서명 (세그먼트 수 + 마지막 세그먼트의 dev/inode/크기/mtime), 로그가 없으면 None
+        """
+        paths = self.segments(room, email)
+        if not paths:
+            return None
+        try:
+            st = os.stat(paths[-1])
+        except OSError:
+            return None
+        return len(paths), st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+    def users(self) -> List[Tuple[str, str]]:
+        """저장소의 (방, 사용자) 디렉터리 이름 목록"""
+        found = []
+        try:
+            rooms = sorted(os.listdir(self.root))
+        except FileNotFoundError:
+            return []
+        for room in rooms:
+            room_dir = os.path.join(self.root, room)
+            if not os.path.isdir(room_dir):
+                continue
+            for user in sorted(os.listdir(room_dir)):
+                if os.path.isdir(os.path.join(room_dir, user)):
+                    found.append((room, user))
+        return found
+
+
+class HotAnalyzers(Generic[T]):
+    """
+    최근에 조회된 사용자의 분석기만 유지하는 LRU
+
+    max_resident를 넘으면 가장 오래 조회되지 않은 분석기를 버림
+    (다시 조회되면 그 사용자의 세그먼트만 읽어 새로 만듦).
+    pinned()로 쓰는 중인 분석기는 버리지 않음 → 버려진(닫힌) 분석기에 기록하거나,
+    기록 중에 같은 사용자의 분석기가 새로 만들어져 상태가 어긋나는 일이 없음
+    """
+
+    def __init__(self, factory: Callable[[Hashable], T], max_resident: int = 64,
+                 on_evict: Optional[Callable[[T], None]] = None):
+        """
+        Args:
+            factory: 키 → 새 분석기
+            max_resident: 메모리에 유지할 최대 분석기 수
+            on_evict: 버리는 분석기를 정리하는 함수 (열린 파일 닫기 등)
+        """
+        self.factory = factory
+        self.max_resident = max(1, int(max_resident))
+        self.on_evict = on_evict
+        self._items: "OrderedDict[Hashable, T]" = OrderedDict()
+        self._pins: Dict[Hashable, int] = {}  # 키 → 사용 중인 수
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "loads": 0, "evictions": 0}
+
+    def get(self, key: Hashable) -> T:
+        """분석기 조회 (읽기 전용으로 잠깐 쓸 때, 기록하거나 오래 쓰면 pinned() 사용)"""
+        with self.pinned(key) as item:
+            return item
+
+    @contextmanager
+    def pinned(self, key: Hashable) -> Iterator[T]:
+        """with 블록 동안 버려지지 않는 분석기"""
+        item = self._acquire(key)
+        try:
+            yield item
+        finally:
+            with self._lock:
+                count = self._pins[key] - 1
+                if count:
+                    self._pins[key] = count
+                else:
+                    del self._pins[key]
+                evicted = self._pop_unpinned()
+            self._evict(evicted)
+
+    def _acquire(self, key: Hashable) -> T:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+                self._pins[key] = self._pins.get(key, 0) + 1
+                self._counters["hits"] += 1
+                return item
+        # 분석기 생성(로그 읽기)은 잠금 밖에서 수행 → 다른 사용자 조회를 막지 않음
+        item = self.factory(key)
+        evicted = []
+        with self._lock:
+            existing = self._items.get(key)
+            if existing is not None:
+                # 같은 사용자를 동시에 만든 경우 먼저 들어간 것 사용
+                self._items.move_to_end(key)
+                evicted.append(item)
+                item = existing
+            else:
+                self._items[key] = item
+                self._counters["loads"] += 1
+            self._pins[key] = self._pins.get(key, 0) + 1
+            evicted.extend(self._pop_unpinned())
+        self._evict(evicted)
+        return item
+
+    def _pop_unpinned(self) -> List[T]:
+        """max_resident를 넘은 만큼 사용 중이 아닌 분석기를 오래된 순으로 빼냄 (잠금 안에서 호출)"""
+        excess = len(self._items) - self.max_resident
+        if excess <= 0:
+            return []
+        victims = []
+        for key in self._items:
+            if key not in self._pins:
+                victims.append(key)
+                if len(victims) == excess:
+                    break
+        self._counters["evictions"] += len(victims)
+        return [self._items.pop(key) for key in victims]
+
+    def clear(self):
+        """모든 분석기 버리기 (서버 종료 시)"""
+        with self._lock:
+            evicted = list(self._items.values())
+            self._items.clear()
+        self._evict(evicted)
+
+    def _evict(self, items: List[T]):
+        if self.on_evict is None:
+            return
+        for item in items:
+            try:
+                self.on_evict(item)
+            except Exception as e:
+                print(f"[WARN] 분석기 정리 실패: {e}")
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"resident": len(self._items), "max_resident": self.max_resident, **self._counters}